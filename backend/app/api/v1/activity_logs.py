@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
 from app.utils.jwt import get_current_user
+from app.utils.projection import resolve_fields
 from typing import Optional
 from app.services.supabase_db import list_activities
 
@@ -11,9 +12,13 @@ async def list_activity_logs(
     org_id: Optional[str] = None,
     workflow_id: Optional[str] = None,
     user_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
     current_user = Depends(get_current_user),
 ):
     """
     List activity logs for an organization, workflow, or user.
     """
-    return {"success": True, "organization_id": org_id, "workflow_id": workflow_id, "user_id": user_id, "activities": list_activities(org_id, workflow_id, user_id)}
+    projection = resolve_fields("activities", fields, view)
+    activities = list_activities(org_id, workflow_id, user_id, fields=projection)
+    return {"success": True, "organization_id": org_id, "workflow_id": workflow_id, "user_id": user_id, "activities": activities}
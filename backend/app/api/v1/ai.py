@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Depends
 from app.schemas.ai import SOPRequest, SOPResponse, RewriteRequest, RewriteResponse
 from app.services.ai import generate_sop, rewrite_step, save_workflow_to_db
+from app.services.supabase_db import rebalance_steps
 from app.utils.jwt import get_current_user
+from app.utils.log import get_logger
+from app.utils.resilience import DependencyUnavailable
 
 router = APIRouter()
+log = get_logger("ai")
 
 @router.post("/convert")
 async def convert_text_to_sop(
@@ -12,7 +17,8 @@ async def convert_text_to_sop(
 ):
     """Convert raw text to structured SOP using Gemini"""
     try:
-        result = generate_sop(payload.raw_text)
+        # Off the event loop: a slow model call must not stall other requests
+        result = await anyio.to_thread.run_sync(generate_sop, payload.raw_text)
         
         if result.get("success"):
             return {
@@ -24,6 +30,8 @@ async def convert_text_to_sop(
                 "success": False,
                 "error": result.get("error", "AI generation failed")
             }
+    except DependencyUnavailable:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -33,10 +41,11 @@ async def convert_text_to_sop(
 @router.post("/convert-and-save")
 async def convert_and_save(
     payload: dict,
+    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user)
 ):
     """Convert text and save to database"""
-    result = generate_sop(payload.get("raw_text"))
+    result = await anyio.to_thread.run_sync(generate_sop, payload.get("raw_text"))
     
     if not result.get("success"):
         return {
@@ -54,6 +63,8 @@ async def convert_and_save(
         payload.get("organization_id"),
         current_user["user_id"]
     )
+    if save_result.get("needs_rebalance"):
+        background_tasks.add_task(rebalance_steps, save_result["workflow_id"])
     
     return {
         "success": save_result.get("success"),
@@ -64,6 +75,7 @@ async def convert_and_save(
 @router.post("/save-workflow")
 async def save_workflow(
     payload: dict,
+    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user)
 ):
     """Save an AI-generated workflow with all its steps.
@@ -79,7 +91,7 @@ async def save_workflow(
         description = payload.get("description", "")
         steps = payload.get("steps", [])
         
-        print(f"[AI] save-workflow called: title='{title}', description='{description[:50]}...', steps={len(steps)}")
+        log.info("save-workflow called with %d steps", len(steps))
         
         if not title:
             return {"success": False, "error": "Title is required"}
@@ -96,7 +108,9 @@ async def save_workflow(
             current_user.get("user_id")
         )
         
-        print(f"[AI] save-workflow result: {save_result}")
+        log.info("save-workflow result: success=%s workflow_id=%s", save_result.get("success"), save_result.get("workflow_id"))
+        if save_result.get("needs_rebalance"):
+            background_tasks.add_task(rebalance_steps, save_result["workflow_id"])
         
         return {
             "success": save_result.get("success"),
@@ -104,8 +118,10 @@ async def save_workflow(
             "steps_created": save_result.get("steps_created"),
             "error": save_result.get("error")
         }
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[AI] save-workflow error: {e}")
+        log.error("save-workflow error: %s", e)
         return {
             "success": False,
             "error": f"Failed to save workflow: {str(e)}"
@@ -117,5 +133,5 @@ async def rewrite(
     current_user = Depends(get_current_user)
 ):
     """Rewrite step using Gemini"""
-    result = rewrite_step(payload.step_text, payload.tone)
+    result = await anyio.to_thread.run_sync(rewrite_step, payload.step_text, payload.tone)
     return result
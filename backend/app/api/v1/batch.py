@@ -0,0 +1,132 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.config import settings
+from app.schemas.batch import BatchItem, BatchRequest
+from app.utils.jwt import get_current_user, reuse_authentication
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+
+router = APIRouter()
+log = get_logger("batch")
+
+BATCH_ITEMS = Counter(
+    "batch_items_total", "Sub-requests served by the batch endpoint, by status class.",
+    ("status",),
+)
+
+METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+API_PREFIX = "/api/v1/"
+# Long-lived streams never finish, and batches do not nest
+NOT_BATCHABLE = ("/api/v1/stream", "/api/v1/batch")
+# Taken from the batch request itself; bodies come back uncompressed so they can be decoded
+SKIPPED_HEADERS = {"authorization", "content-length", "content-type", "host", "accept-encoding"}
+# Connection-level scope keys shared by every sub-request
+SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path", "extensions")
+
+
+def _error(status: int, detail: str) -> dict:
+    return {"status": status, "headers": {}, "body": {"detail": detail}}
+
+
+def _decode(body: bytes, content_type: str):
+    if not body:
+        return None
+    if content_type.startswith("application/json"):
+        return json.loads(body)
+    return body.decode("utf-8", errors="replace")
+
+
+async def _dispatch(request: Request, item: BatchItem) -> dict:
+    """
+    Run one sub-request through the whole app (middleware included), in this
+    process: admission control, rate limits, idempotency, tracing and metrics
+    see it like any other request.
+    """
+    method = item.method.upper()
+    url = urlsplit(item.path)
+    if method not in METHODS:
+        return _error(405, f"Method {item.method} cannot be batched")
+    if not url.path.startswith(API_PREFIX) or url.path.startswith(NOT_BATCHABLE):
+        return _error(400, f"{url.path} cannot be batched")
+
+    body = b"" if item.body is None else json.dumps(item.body).encode("utf-8")
+    headers = [
+        (k.lower().encode("latin-1"), v.encode("latin-1"))
+        for k, v in (item.headers or {}).items()
+        if k.lower() not in SKIPPED_HEADERS
+    ]
+    for name in ("authorization", "host"):
+        if name in request.headers:
+            headers.append((name.encode("latin-1"), request.headers[name].encode("latin-1")))
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    scope = {
+        **{k: request.scope[k] for k in SCOPE_KEYS if k in request.scope},
+        "state": dict(request.scope.get("state") or {}),
+        "method": method,
+        "path": url.path,
+        "raw_path": url.path.encode("utf-8"),
+        "query_string": url.query.encode("utf-8"),
+        "headers": headers,
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    result = {"status": 500, "headers": {}}
+    chunks = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["headers"] = {
+                k.decode("latin-1"): v.decode("latin-1")
+                for k, v in message.get("headers", [])
+                if k != b"content-length"
+            }
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+        result["body"] = _decode(b"".join(chunks), result["headers"].get("content-type", ""))
+    except Exception as e:
+        log.exception("Batch sub-request %s %s failed: %s", method, url.path, e)
+        return _error(500, "Internal Server Error")
+    return result
+
+
+@router.post("/")
+async def batch_route(payload: BatchRequest, request: Request, current_user = Depends(get_current_user)):
+    """
+    Run several API calls in one request.
+
+    `requests` is a list of `{method, path, body, headers}` with paths under
+    /api/v1/ (query string included). They run concurrently, authenticated
+    once as the caller, and `responses` holds each one's `status`, `headers`
+    and decoded `body`, in request order. A failing sub-request does not fail
+    the batch. At most BATCH_MAX_ITEMS requests per batch.
+    """
+    if len(payload.requests) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch holds at most {settings.BATCH_MAX_ITEMS} requests",
+        )
+
+    with reuse_authentication(current_user):
+        responses = await asyncio.gather(*(_dispatch(request, item) for item in payload.requests))
+
+    for response in responses:
+        BATCH_ITEMS.inc((f"{response['status'] // 100}xx",))
+    return {"success": True, "responses": responses}
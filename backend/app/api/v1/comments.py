@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.utils.jwt import get_current_user
+from app.utils.projection import resolve_fields
 from typing import Optional
 from pydantic import BaseModel
 from app.services.supabase_db import (
@@ -13,21 +14,30 @@ router = APIRouter()
 async def list_comments_route(
     workflow_id: Optional[str] = None,
     step_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
     current_user = Depends(get_current_user)
 ):
     """List comments for a workflow or step."""
+    projection = resolve_fields("comments", fields, view)
     return {
         "success": True,
         "workflow_id": workflow_id,
         "step_id": step_id,
-        "comments": list_comments(workflow_id, step_id)
+        "comments": list_comments(workflow_id, step_id, fields=projection)
     }
 
 
 @router.get("/step/{step_id}")
-async def list_comments_for_step(step_id: str, current_user = Depends(get_current_user)):
+async def list_comments_for_step(
+    step_id: str,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    current_user = Depends(get_current_user),
+):
     """List comments for a step."""
-    return {"success": True, "step_id": step_id, "comments": list_comments(None, step_id)}
+    projection = resolve_fields("comments", fields, view)
+    return {"success": True, "step_id": step_id, "comments": list_comments(None, step_id, fields=projection)}
 
 
 @router.post("/")
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from app.api.v1.users import user_info
+from app.config import settings
+from app.services import reads
+from app.utils.jwt import get_current_user
+from app.utils.projection import resolve_fields
+from app.utils.response_cache import DASHBOARDS, ORGANIZATIONS, current_generation, org_scope, user_scope
+from app.utils.responses import FastJSONResponse
+
+router = APIRouter()
+
+WORKFLOW_FIELDS = resolve_fields("workflows", view="summary")
+ACTIVITY_FIELDS = resolve_fields("activities", view="summary")
+
+
+@router.get("/")
+async def dashboard_route(org_id: Optional[str] = None, current_user = Depends(get_current_user)):
+    """
+    Everything the dashboard needs on first load, in one round-trip.
+
+    The current user (as /users/me), the organizations, the most recently
+    updated workflows of `org_id` (summary view, with step counts) and the
+    latest activity, fetched concurrently. Cached per user and org for
+    DASHBOARD_CACHE_TTL_SECONDS; workflow, organization and profile changes
+    invalidate it at once.
+    """
+    user_id = current_user["user_id"]
+    org_id = org_id.strip() if org_id and org_id.strip() else None
+
+    # Read the generation first: a write racing this request makes the entry stale
+    cache_key = (user_id, org_id)
+    generation = await current_generation(org_scope(org_id), ORGANIZATIONS, user_scope(user_id))
+    cached = DASHBOARDS.get(cache_key, generation)
+    if cached is not None:
+        return cached.response()
+
+    limit = settings.DASHBOARD_WORKFLOW_LIMIT
+    user, organizations, workflows, activities = await asyncio.gather(
+        reads.get_user(user_id),
+        reads.list_organizations(user_id),
+        # One extra row tells whether there are more
+        reads.list_workflows(org_id, fields=WORKFLOW_FIELDS, limit=limit + 1),
+        reads.list_activities(org_id, fields=ACTIVITY_FIELDS, limit=settings.DASHBOARD_ACTIVITY_LIMIT),
+    )
+
+    response = FastJSONResponse({
+        "success": True,
+        "organization_id": org_id,
+        "user": user_info(current_user, user),
+        "organizations": organizations,
+        "workflows": workflows[:limit],
+        "has_more_workflows": len(workflows) > limit,
+        "activities": activities,
+    })
+    DASHBOARDS.put(cache_key, generation, response)
+    return response
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.config import settings
 from app.utils.jwt import get_current_user
+from app.utils.responses import FastJSONResponse
+from app.utils.response_cache import ORGANIZATION_LISTS, ORGANIZATIONS, current_generation
 from typing import Optional
 from app.services.supabase_db import (
     insert_organization, get_organization, list_organizations,
     update_organization, get_org_members, add_org_member,
     remove_org_member, update_member_role
 )
+from app.services.transfer import MalformedImport, export_org, import_org
 
 router = APIRouter()
 
@@ -14,12 +19,20 @@ router = APIRouter()
 async def list_organizations_route(current_user = Depends(get_current_user)):
     """List organizations for the current user."""
     user_id = current_user.get("user_id")
+    # Keyed per user in case the list becomes membership-scoped
+    generation = await current_generation(ORGANIZATIONS)
+    cached = ORGANIZATION_LISTS.get(user_id, generation)
+    if cached is not None:
+        return cached.response()
+    
     orgs = list_organizations(user_id)
-    return {
+    response = FastJSONResponse({
         "success": True,
         "total": len(orgs),
         "organizations": orgs,
-    }
+    })
+    ORGANIZATION_LISTS.put(user_id, generation, response)
+    return response
 
 
 @router.get("/{org_id}")
@@ -31,6 +44,40 @@ async def get_organization_route(org_id: str, current_user = Depends(get_current
     return {"success": True, "organization": org}
 
 
+@router.get("/{org_id}/export")
+async def export_organization(org_id: str, current_user = Depends(get_current_user)):
+    """Stream the organization's workflows, steps, comments and activity as NDJSON."""
+    org = get_organization(org_id)
+    if not org:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    
+    return StreamingResponse(
+        export_org(org, settings.ORG_EXPORT_PAGE_SIZE),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="organization-{org_id}.ndjson"',
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.post("/{org_id}/import")
+async def import_organization(org_id: str, request: Request, current_user = Depends(get_current_user)):
+    """Import an NDJSON export into this organization, streaming the request body."""
+    org = get_organization(org_id)
+    if not org:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    
+    try:
+        result = await import_org(
+            org_id, request.stream(), current_user.get("user_id"),
+            batch_size=settings.ORG_IMPORT_BATCH_SIZE, max_line_bytes=settings.ORG_IMPORT_MAX_LINE_BYTES,
+        )
+    except MalformedImport as e:
+        raise HTTPException(status_code=400, detail={"error": str(e), "line": e.line, **e.result})
+    return {"success": True, "organization_id": org_id, **result}
+
+
 @router.post("/")
 async def create_organization(data: dict, current_user = Depends(get_current_user)):
     """Create an organization."""
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Query
+from app.utils.jwt import get_current_user
+from typing import Optional
+from app.services.supabase_db import search
+
+router = APIRouter()
+
+
+@router.get("/")
+async def search_route(
+    q: str = Query(..., min_length=1, max_length=200),
+    org_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user = Depends(get_current_user),
+):
+    """
+    Full-text search over workflow titles/descriptions, steps and comments.
+
+    Results are ranked, paginated with limit/offset and carry a snippet with
+    matches wrapped in <mark> (the rest of the text is HTML-escaped).
+    """
+    found = search(q, org_id, limit, offset)
+    return {
+        "success": True,
+        "query": q,
+        "organization_id": org_id,
+        "limit": limit,
+        "offset": offset,
+        "has_more": found["has_more"],
+        "results": found["results"],
+    }
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from app.utils.jwt import get_current_user
+from app.utils.projection import resolve_fields
 from typing import Optional
 from pydantic import BaseModel
 from app.services.supabase_db import (
     insert_step, get_step, list_steps,
-    update_step, delete_step, get_workflow
+    update_step, delete_step, get_workflow,
+    move_step, rebalance_steps
 )
 
 router = APIRouter()
@@ -14,14 +16,25 @@ class StepStatusUpdate(BaseModel):
     status: str
 
 
+class StepMove(BaseModel):
+    prev_id: Optional[str] = None
+    next_id: Optional[str] = None
+
+
 @router.get("/")
-async def list_steps_route(workflow_id: Optional[str] = None, current_user = Depends(get_current_user)):
+async def list_steps_route(
+    workflow_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    current_user = Depends(get_current_user),
+):
     """List steps for a workflow."""
-    return {"success": True, "workflow_id": workflow_id, "steps": list_steps(workflow_id)}
+    projection = resolve_fields("steps", fields, view)
+    return {"success": True, "workflow_id": workflow_id, "steps": list_steps(workflow_id, fields=projection)}
 
 
 @router.post("/")
-async def create_step(payload: dict, current_user = Depends(get_current_user)):
+async def create_step(payload: dict, background_tasks: BackgroundTasks, current_user = Depends(get_current_user)):
     """Create a step for a workflow."""
     workflow_id = payload.get("workflow_id")
     if not workflow_id:
@@ -44,6 +57,9 @@ async def create_step(payload: dict, current_user = Depends(get_current_user)):
     }
     
     step = insert_step(step_data, created_by=current_user.get("user_id"))
+
+    if step and step.pop("needs_rebalance", False):
+        background_tasks.add_task(rebalance_steps, workflow_id)
     return {"success": True, "step": step}
 
 
@@ -87,6 +103,25 @@ async def update_step_status_route(
     return {"success": True, "step": updated}
 
 
+@router.post("/{step_id}/move")
+async def move_step_route(
+    step_id: str,
+    payload: StepMove,
+    background_tasks: BackgroundTasks,
+    current_user = Depends(get_current_user),
+):
+    """Move a step between two neighbours (only the moved step is rewritten)."""
+    if step_id in (payload.prev_id, payload.next_id):
+        raise HTTPException(status_code=400, detail="A step cannot be its own neighbour")
+    moved = move_step(step_id, payload.prev_id, payload.next_id, moved_by=current_user.get("user_id"))
+    if not moved:
+        raise HTTPException(status_code=404, detail="Step or neighbouring step not found")
+
+    if moved.pop("needs_rebalance", False):
+        background_tasks.add_task(rebalance_steps, moved["workflow_id"])
+    return {"success": True, "step": moved}
+
+
 @router.delete("/{step_id}")
 async def delete_step_route(step_id: str, current_user = Depends(get_current_user)):
     """Delete step."""
@@ -0,0 +1,73 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.services.events import RESET, broker
+from app.utils.jwt import get_current_user
+
+router = APIRouter()
+
+# Reconnect delay suggested to EventSource clients (ms)
+RETRY_MS = 3000
+
+
+def _format(event: dict) -> str:
+    if event is RESET:
+        return "event: reset\ndata: {}\n\n"
+    data = json.dumps(event, default=str, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+@router.get("/")
+async def stream_changes(
+    request: Request,
+    org_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user = Depends(get_current_user),
+):
+    """
+    Server-Sent Events feed of an organization's workflow, step, comment and
+    activity changes (`org_id` is required).
+
+    Each event is `event: <workflow|step|comment|activity>` with a compact
+    JSON payload (summary fields only). Reconnecting clients send
+    Last-Event-ID to replay what they missed; when that is no longer possible,
+    or the client fell too far behind, a `reset` event asks it to refetch.
+    A comment line is sent as heartbeat while the feed is idle.
+    """
+    if not org_id:
+        raise HTTPException(status_code=400, detail="org_id is required")
+    sub, backlog, reset = broker.subscribe(org_id, last_event_id, settings.STREAM_QUEUE_SIZE)
+
+    async def events():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if reset:
+                yield _format(RESET)
+            for event in backlog:
+                yield _format(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format(event)
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering (nginx) so events are delivered immediately
+            "X-Accel-Buffering": "no",
+        },
+    )
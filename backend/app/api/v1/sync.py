@@ -0,0 +1,57 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+
+from app.config import settings
+from app.services.supabase_db import purge_tombstones, sync
+from app.utils.jwt import get_current_user
+from app.utils.sync import finish_page, start_sync
+
+router = APIRouter()
+
+# Tombstones are purged at most this often (seconds), piggybacking on sync calls
+PURGE_INTERVAL = 3600
+_last_purge = 0.0
+
+
+@router.get("/")
+async def sync_route(
+    background_tasks: BackgroundTasks,
+    org_id: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    current_user = Depends(get_current_user),
+):
+    """
+    Delta sync: workflows, steps and comments changed since a watermark.
+
+    Omit `since` for a full snapshot. Every response carries a new
+    `watermark` to pass as `since` next time, and `deleted` tombstones for
+    rows removed in the meantime (a workflow tombstone also covers its steps
+    and comments). Rows are upserts and may repeat across calls. When
+    `has_more` is set, call again with the returned watermark right away
+    (it is then an opaque cursor continuing the same sync).
+    If the watermark is older than tombstone retention the response is a
+    full snapshot with `full: true` and clients must drop their local copy.
+    """
+    global _last_purge
+    state = start_sync(since, datetime.now(timezone.utc))
+
+    page = sync(org_id, state["since"], limit, state["after"])
+    if page is None:
+        raise HTTPException(status_code=500, detail="Sync failed")
+
+    if time.monotonic() - _last_purge > PURGE_INTERVAL:
+        _last_purge = time.monotonic()
+        background_tasks.add_task(purge_tombstones, settings.SYNC_TOMBSTONE_DAYS)
+
+    now = page.pop("now")
+    finish_page(page, limit, now, state)
+    return {
+        "success": True,
+        "organization_id": org_id,
+        "full": state["full"],
+        **page,
+    }
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from app.utils.jwt import get_current_user
+from app.utils.projection import resolve_fields
+from typing import Optional
+from app.services.supabase_db import clone_workflow, list_templates, set_workflow_template
+
+router = APIRouter()
+
+
+class TemplateInstantiate(BaseModel):
+    organization_id: Optional[str] = None  # default: the template's organization
+    org_id: Optional[str] = None
+    title: Optional[str] = None  # default: the template's title
+
+
+@router.get("/")
+async def list_templates_route(
+    org_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    current_user = Depends(get_current_user),
+):
+    """
+    List the template library: workflows published as templates, optionally
+    only those published by `org_id`.
+    """
+    projection = resolve_fields("workflows", fields, view)
+    templates = list_templates(org_id, fields=projection)
+    return {"success": True, "organization_id": org_id, "templates": templates}
+
+
+@router.put("/{workflow_id}")
+async def publish_template(workflow_id: str, current_user = Depends(get_current_user)):
+    """Publish a workflow to the template library."""
+    workflow = set_workflow_template(workflow_id, True, updated_by=current_user.get("user_id"))
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"success": True, "template": workflow}
+
+
+@router.delete("/{workflow_id}")
+async def unpublish_template(workflow_id: str, current_user = Depends(get_current_user)):
+    """Withdraw a workflow from the template library (the workflow itself stays)."""
+    workflow = set_workflow_template(workflow_id, False, updated_by=current_user.get("user_id"))
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"success": True, "message": "Template withdrawn"}
+
+
+@router.post("/{workflow_id}/instantiate")
+async def instantiate_template(
+    workflow_id: str,
+    data: Optional[TemplateInstantiate] = None,
+    current_user = Depends(get_current_user),
+):
+    """Create a new draft workflow, with all its steps, from a template."""
+    data = data or TemplateInstantiate()
+    workflow = clone_workflow(
+        workflow_id,
+        org_id=data.organization_id or data.org_id,
+        title=data.title,
+        created_by=current_user.get("user_id"),
+        from_template=True,
+    )
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return {"success": True, "workflow_id": workflow["id"], "data": workflow}
@@ -1,41 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
 from app.utils.jwt import get_current_user
-from app.services.supabase_db import get_user, upsert_user
+from app.services.supabase_db import upsert_user
+from app.services import reads
 
 router = APIRouter()
 
 
-@router.get("/me")
-async def get_current_user_info(current_user = Depends(get_current_user)):
-    """Return the current user from the JWT."""
-    user_id = current_user["user_id"]
-    
-    # Try to get existing user data from in-memory store
-    user = get_user(user_id)
-    
+def user_info(current_user: dict, user: Optional[dict]) -> dict:
+    """The current user from the JWT, with the profile from the users table if there is one."""
+    info = {
+        "user_id": current_user["user_id"],
+        "email": current_user.get("email"),
+    }
     if user:
-        return {
-            "success": True,
-            "user_id": user_id,
-            "email": current_user.get("email"),
+        info.update({
             "name": user.get("name"),
             "avatar_url": user.get("avatar_url"),
             "phone": user.get("phone"),
             "created_at": user.get("created_at"),
             "updated_at": user.get("updated_at"),
-        }
-    
-    return {
-        "success": True,
-        "user_id": user_id,
-        "email": current_user.get("email"),
-    }
+        })
+    return info
+
+
+@router.get("/me")
+async def get_current_user_info(current_user = Depends(get_current_user)):
+    """Return the current user from the JWT."""
+    user = await reads.get_user(current_user["user_id"])
+    return {"success": True, **user_info(current_user, user)}
 
 
 @router.get("/{user_id}")
 async def get_user_by_id(user_id: str, current_user = Depends(get_current_user)):
     """Get user by ID."""
-    user = get_user(user_id)
+    user = await reads.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
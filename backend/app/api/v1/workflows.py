@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 from app.utils.jwt import get_current_user
+from app.utils.etag import CACHE_CONTROL, compute_etag, etag_matches, not_modified
+from app.utils.responses import FastJSONResponse
+from app.utils.response_cache import WORKFLOW_LISTS, current_generation, org_scope
+from app.utils.projection import resolve_fields
+from app.utils.log import SAMPLED, get_logger
 from typing import Optional
 from app.services.supabase_db import (
-    insert_workflow, get_workflow, list_workflows,
-    update_workflow, delete_workflow
+    insert_workflow, update_workflow, delete_workflow, restore_workflow, list_deleted_workflows, clone_workflow,
+    list_workflow_revisions,
 )
+from app.services import reads
+from app.services.history import HISTORY, render as render_version
 
 router = APIRouter()
+log = get_logger("api")
 
 
 # Pydantic models for request validation
@@ -25,9 +34,26 @@ class WorkflowUpdate(BaseModel):
     status: Optional[str] = None
 
 
+class WorkflowClone(BaseModel):
+    title: Optional[str] = None  # default: the source's title
+    organization_id: Optional[str] = None  # default: the source's organization
+    org_id: Optional[str] = None
+
+
 @router.get("/")
-async def list_workflows_route(org_id: Optional[str] = None, current_user = Depends(get_current_user)):
-    """List workflows for an organization."""
+async def list_workflows_route(
+    request: Request,
+    org_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    current_user = Depends(get_current_user),
+):
+    """
+    List workflows for an organization (supports If-None-Match).
+
+    `fields=` or `view=summary` limits the columns fetched and returned.
+    """
+    projection = resolve_fields("workflows", fields, view)
     import re
     # UUID regex pattern
     uuid_pattern = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
@@ -37,25 +63,103 @@ async def list_workflows_route(org_id: Optional[str] = None, current_user = Depe
     if org_id and org_id.strip() and uuid_pattern.match(org_id.strip()):
         effective_org_id = org_id.strip()
     
-    print(f"[API] list_workflows called with org_id={org_id!r}, effective_org_id={effective_org_id!r}")
+    log.debug("list_workflows called with org_id=%r, effective_org_id=%r", org_id, effective_org_id, extra=SAMPLED)
     
-    workflows = list_workflows(effective_org_id)
-    print(f"[API] Returning {len(workflows)} workflows")
+    # Read the generation first: a write racing this request makes the entry stale
+    cache_key = (effective_org_id, org_id, None if projection is None else tuple(projection))
+    generation = await current_generation(org_scope(effective_org_id))
+    cached = WORKFLOW_LISTS.get(cache_key, generation)
+    if cached is not None:
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return not_modified(cached.etag)
+        return cached.response()
     
-    return {
-        "success": True,
-        "organization_id": org_id,
-        "workflows": workflows,
-    }
+    # Validate against the (id, version) pairs before building the full payload
+    versions = await reads.list_workflow_versions(effective_org_id)
+    etag = compute_etag(
+        "workflows", org_id, projection,
+        *(f"{v['id']}:{v.get('version')}" for v in versions),
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
+    workflows = await reads.list_workflows(effective_org_id, fields=projection)
+    log.debug("Returning %d workflows", len(workflows), extra=SAMPLED)
+    
+    # Returned directly so the (large) payload skips jsonable_encoder
+    response = FastJSONResponse(
+        {
+            "success": True,
+            "organization_id": org_id,
+            "workflows": workflows,
+        },
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+    WORKFLOW_LISTS.put(cache_key, generation, response)
+    return response
+
+
+@router.get("/deleted")
+async def list_deleted_workflows_route(org_id: Optional[str] = None, current_user = Depends(get_current_user)):
+    """Deleted workflows that can still be restored (the trash)."""
+    workflows = await anyio.to_thread.run_sync(list_deleted_workflows, org_id)
+    return {"success": True, "organization_id": org_id, "workflows": workflows}
 
 
 @router.get("/{workflow_id}")
-async def get_workflow_route(workflow_id: str, current_user = Depends(get_current_user)):
-    """Get single workflow with steps."""
-    wf = get_workflow(workflow_id)
+async def get_workflow_route(
+    workflow_id: str,
+    request: Request,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    current_user = Depends(get_current_user),
+):
+    """Get single workflow with steps (supports If-None-Match, `fields=` and `view=`)."""
+    projection = resolve_fields("workflows", fields, view)
+    version = await reads.get_workflow_version(workflow_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    etag = compute_etag("workflow", workflow_id, version, projection)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
+    wf = await reads.get_workflow(workflow_id, fields=projection)
     if not wf:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return {"success": True, "workflow": wf}
+    
+    return FastJSONResponse(
+        {"success": True, "workflow": wf},
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+@router.get("/{workflow_id}/versions")
+async def list_versions_route(
+    workflow_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None,
+    current_user = Depends(get_current_user),
+):
+    """Recorded versions of a workflow, newest first (`before` pages back)."""
+    if await reads.get_workflow_version(workflow_id) is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    await HISTORY.flush(workflow_id)
+    rows = await anyio.to_thread.run_sync(lambda: list_workflow_revisions(workflow_id, limit=limit + 1, before=before))
+    versions = [{"version": r["version"], "kind": r["kind"], "created_at": r.get("created_at")} for r in rows[:limit]]
+    return {"success": True, "workflow_id": workflow_id, "versions": versions, "has_more": len(rows) > limit}
+
+
+@router.get("/{workflow_id}/versions/{version}")
+async def get_version_route(workflow_id: str, version: int, current_user = Depends(get_current_user)):
+    """The workflow and its steps as they were at `version`."""
+    if await reads.get_workflow_version(workflow_id) is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    await HISTORY.flush(workflow_id)
+    doc = await anyio.to_thread.run_sync(HISTORY.reconstruct, workflow_id, version)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return {"success": True, "workflow": render_version(workflow_id, version, doc)}
 
 
 @router.post("/")
@@ -66,6 +170,25 @@ async def create_workflow(workflow: WorkflowCreate, current_user = Depends(get_c
     return {"success": True, "workflow_id": created["id"], "data": created}
 
 
+@router.post("/{workflow_id}/clone")
+async def clone_workflow_route(
+    workflow_id: str,
+    data: Optional[WorkflowClone] = None,
+    current_user = Depends(get_current_user),
+):
+    """Copy a workflow with all its steps (one database call) as a new draft."""
+    data = data or WorkflowClone()
+    cloned = clone_workflow(
+        workflow_id,
+        org_id=data.organization_id or data.org_id,
+        title=data.title,
+        created_by=current_user.get("user_id"),
+    )
+    if not cloned:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"success": True, "workflow_id": cloned["id"], "data": cloned}
+
+
 @router.put("/{workflow_id}")
 async def update_workflow_route(workflow_id: str, data: WorkflowUpdate, current_user = Depends(get_current_user)):
     """Update workflow (full update)."""
@@ -88,9 +211,25 @@ async def patch_workflow_route(workflow_id: str, data: WorkflowUpdate, current_u
 
 @router.delete("/{workflow_id}")
 async def delete_workflow_route(workflow_id: str, current_user = Depends(get_current_user)):
-    """Delete workflow."""
-    success = delete_workflow(workflow_id, deleted_by=current_user.get("user_id"))
-    if not success:
+    """
+    Delete workflow. It disappears at once and can be restored until
+    `restorable_until`; its steps and comments are purged after that.
+    """
+    deleted = delete_workflow(workflow_id, deleted_by=current_user.get("user_id"))
+    if not deleted:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return {"success": True, "message": "Workflow deleted"}
+    return {
+        "success": True,
+        "message": "Workflow deleted",
+        "workflow_id": workflow_id,
+        "restorable_until": deleted.get("restorable_until"),
+    }
+
 
+@router.post("/{workflow_id}/restore")
+async def restore_workflow_route(workflow_id: str, current_user = Depends(get_current_user)):
+    """Restore a deleted workflow with its steps and comments."""
+    restored = restore_workflow(workflow_id, restored_by=current_user.get("user_id"))
+    if not restored:
+        raise HTTPException(status_code=404, detail="No deleted workflow to restore")
+    return {"success": True, "workflow": restored}
@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     # Google Gemini AI (INSTEAD OF OpenAI)
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-001")
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "")  # e.g. a local stand-in for load tests
     
     # AWS
     AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID", "")
@@ -25,6 +26,110 @@ class Settings(BaseSettings):
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change-me-in-production")
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
+    PREWARM_SDKS: bool = os.getenv("PREWARM_SDKS", "False").lower() == "true"  # import Gemini/AWS SDKs at startup
+    
+    # Responses
+    FAST_JSON: bool = os.getenv("FAST_JSON", "True").lower() == "true"
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    
+    # Upstream resilience (timeouts, circuit breakers, bulkheads)
+    SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    SUPABASE_MAX_CONCURRENCY: int = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "32"))
+    GEMINI_TIMEOUT: float = float(os.getenv("GEMINI_TIMEOUT", "60"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    BULKHEAD_WAIT_SECONDS: float = float(os.getenv("BULKHEAD_WAIT_SECONDS", "0.25"))
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RECOVERY_SECONDS: float = float(os.getenv("BREAKER_RECOVERY_SECONDS", "30"))
+    
+    # Coalesce identical concurrent reads into one upstream call
+    SINGLEFLIGHT_ENABLED: bool = os.getenv("SINGLEFLIGHT_ENABLED", "True").lower() == "true"
+    
+    # Cache of org-level list responses (invalidated by per-org generation counters)
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # per list cache
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+    CACHE_GENERATION_STORE: str = os.getenv("CACHE_GENERATION_STORE", "local")  # local | supabase (shared by workers)
+    CACHE_GENERATION_TTL: float = float(os.getenv("CACHE_GENERATION_TTL", "1.0"))  # seconds a shared counter is reused
+    
+    # Cross-worker cache invalidation
+    INVALIDATION_TRANSPORT: str = os.getenv("INVALIDATION_TRANSPORT", "local")  # local | unix | postgres (DATABASE_URL)
+    INVALIDATION_SOCKET_DIR: str = os.getenv("INVALIDATION_SOCKET_DIR", "/tmp/workflow-copilot-invalidation")
+    INVALIDATION_CHANNEL: str = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+    
+    # Event loop health and admission control
+    LOOP_LAG_INTERVAL: float = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))  # seconds between lag samples
+    BLOCKING_DETECT: bool = os.getenv("BLOCKING_DETECT", os.getenv("DEBUG", "True")).lower() == "true"
+    BLOCKING_THRESHOLD_MS: float = float(os.getenv("BLOCKING_THRESHOLD_MS", "100"))
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true"
+    ADMISSION_MAX_LAG_MS: float = float(os.getenv("ADMISSION_MAX_LAG_MS", "250"))
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256"))
+    ADMISSION_LOW_PRIORITY_PATHS: str = os.getenv("ADMISSION_LOW_PRIORITY_PATHS", "/api/v1/ai/")  # comma separated
+    
+    # Rate limiting: token buckets per user and per org, "count/period" (s, m, h; empty disables)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | supabase (shared by workers)
+    RATE_LIMIT_CRUD_PER_USER: str = os.getenv("RATE_LIMIT_CRUD_PER_USER", "600/m")
+    RATE_LIMIT_CRUD_PER_ORG: str = os.getenv("RATE_LIMIT_CRUD_PER_ORG", "3000/m")
+    RATE_LIMIT_AI_PER_USER: str = os.getenv("RATE_LIMIT_AI_PER_USER", "20/m")
+    RATE_LIMIT_AI_PER_ORG: str = os.getenv("RATE_LIMIT_AI_PER_ORG", "100/m")
+    RATE_LIMIT_SHARDS: int = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    
+    # Idempotency-Key replay for mutating requests
+    IDEMPOTENCY_ENABLED: bool = os.getenv("IDEMPOTENCY_ENABLED", "True").lower() == "true"
+    IDEMPOTENCY_STORE: str = os.getenv("IDEMPOTENCY_STORE", "memory")  # memory | supabase (shared by workers)
+    IDEMPOTENCY_TTL_SECONDS: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))  # memory store
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))  # for a duplicate in progress
+    # Larger (or unsized, i.e. streamed) request bodies and larger responses are not buffered
+    IDEMPOTENCY_MAX_BODY_BYTES: int = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", str(1024 * 1024)))
+    
+    # Batch endpoint
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "20"))
+    
+    # Dashboard bootstrap
+    DASHBOARD_WORKFLOW_LIMIT: int = int(os.getenv("DASHBOARD_WORKFLOW_LIMIT", "20"))
+    DASHBOARD_ACTIVITY_LIMIT: int = int(os.getenv("DASHBOARD_ACTIVITY_LIMIT", "20"))
+    DASHBOARD_CACHE_TTL_SECONDS: float = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "10"))
+    
+    # Real-time change feed
+    STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+    STREAM_QUEUE_SIZE: int = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+    
+    # Observability
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # text | json
+    LOG_PAYLOADS: bool = os.getenv("LOG_PAYLOADS", "False").lower() == "true"
+    LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "True").lower() == "true"
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "True").lower() == "true"
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "")  # OTLP/JSON lines
+    TRACE_EXPORT_URL: str = os.getenv("TRACE_EXPORT_URL", "")  # e.g. http://collector:4318/v1/traces
+    N_PLUS_ONE_DETECT: bool = os.getenv("N_PLUS_ONE_DETECT", os.getenv("DEBUG", "True")).lower() == "true"
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+    
+    # Delta sync
+    SYNC_OVERLAP_SECONDS: float = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+    SYNC_TOMBSTONE_DAYS: int = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+    
+    # Workflow soft delete: restorable for WORKFLOW_UNDELETE_DAYS, then purged in the background
+    WORKFLOW_UNDELETE_DAYS: float = float(os.getenv("WORKFLOW_UNDELETE_DAYS", "7"))
+    WORKFLOW_PURGE_ENABLED: bool = os.getenv("WORKFLOW_PURGE_ENABLED", "True").lower() == "true"
+    WORKFLOW_PURGE_INTERVAL_SECONDS: float = float(os.getenv("WORKFLOW_PURGE_INTERVAL_SECONDS", "3600"))
+    WORKFLOW_PURGE_BATCH: int = int(os.getenv("WORKFLOW_PURGE_BATCH", "1000"))
+    
+    # Workflow version history: a snapshot at least every WORKFLOW_HISTORY_SNAPSHOT_EVERY revisions, patches between
+    WORKFLOW_HISTORY_ENABLED: bool = os.getenv("WORKFLOW_HISTORY_ENABLED", "True").lower() == "true"
+    WORKFLOW_HISTORY_SNAPSHOT_EVERY: int = int(os.getenv("WORKFLOW_HISTORY_SNAPSHOT_EVERY", "20"))
+    WORKFLOW_HISTORY_DEBOUNCE_SECONDS: float = float(os.getenv("WORKFLOW_HISTORY_DEBOUNCE_SECONDS", "2"))
+    
+    # Organization export/import (streamed NDJSON)
+    ORG_EXPORT_PAGE_SIZE: int = int(os.getenv("ORG_EXPORT_PAGE_SIZE", "1000"))
+    ORG_IMPORT_BATCH_SIZE: int = int(os.getenv("ORG_IMPORT_BATCH_SIZE", "500"))
+    ORG_IMPORT_MAX_LINE_BYTES: int = int(os.getenv("ORG_IMPORT_MAX_LINE_BYTES", "1048576"))
     
     # Database (optional)
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
@@ -1,11 +1,44 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from datetime import datetime
+import math
 import os
 from app.config import settings
+from app.utils.compression import CompressionMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render as render_metrics
+from app.utils.responses import FastJSONResponse
+from app.utils.tracing import TracingMiddleware
+from app.utils.log import RequestIdMiddleware, configure_logging
+from app.utils import invalidation, sdk
+from app.utils.admission import AdmissionControlMiddleware
+from app.utils.loop_monitor import MONITOR as LOOP_MONITOR
+from app.utils.rate_limit import AI_LIMIT, CRUD_LIMIT
+from app.utils.resilience import DependencyUnavailable, readiness
+
+configure_logging()
 
 # Import route modules
-from app.api.v1 import users, organizations, workflows, steps, comments, ai, activity_logs
+from app.api.v1 import users, organizations, workflows, steps, comments, ai, activity_logs, search, stream, sync, batch, dashboard, templates
+from app.services import history, purger
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy SDKs load on first use; pre-warming moves that off the first AI request
+    if settings.PREWARM_SDKS:
+        sdk.prewarm_in_background()
+    invalidation.start()
+    LOOP_MONITOR.start()
+    purger.start()
+    history.start()
+    yield
+    history.stop()
+    purger.stop()
+    LOOP_MONITOR.stop()
+    invalidation.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -13,9 +46,24 @@ app = FastAPI(
     description="Enterprise workflow management backend (Gemini Powered)",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
+# Replay the stored response for retries carrying the same Idempotency-Key
+# (innermost, so what is stored is the uncompressed body)
+if settings.IDEMPOTENCY_ENABLED:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+        max_body=settings.IDEMPOTENCY_MAX_BODY_BYTES,
+    )
+
+# Response compression (brotli/gzip, negotiated per request)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +78,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request tracing (spans, Server-Timing header, N+1 detection in debug mode)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# Request id for log correlation (X-Request-ID in and out)
+app.add_middleware(RequestIdMiddleware)
+
+# Shed low-priority traffic (AI) while the event loop lags or too much is in flight
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        max_lag_ms=settings.ADMISSION_MAX_LAG_MS,
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+        low_priority=[p.strip() for p in settings.ADMISSION_LOW_PRIORITY_PATHS.split(",") if p.strip()],
+    )
+
+# Request metrics (outermost, so latency covers every other middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Health check
 @app.get("/health")
 def health_check():
@@ -40,6 +108,38 @@ def health_check():
         "ai_provider": "Google Gemini"
     }
 
+# Readiness: circuit breaker and bulkhead state per upstream dependency, and
+# event loop lag. 503 while a critical dependency's circuit is open.
+@app.get("/health/ready")
+def readiness_check():
+    report = readiness()
+    report["event_loop"] = LOOP_MONITOR.status()
+    report["timestamp"] = datetime.utcnow().isoformat()
+    return FastJSONResponse(report, status_code=503 if report["status"] == "unavailable" else 200)
+
+# Fail fast with an explicit degraded status when a dependency is down
+@app.exception_handler(DependencyUnavailable)
+async def dependency_unavailable_handler(request, exc: DependencyUnavailable):
+    headers = {"Retry-After": str(math.ceil(exc.retry_after))} if exc.retry_after else None
+    return FastJSONResponse(
+        {
+            "success": False,
+            "status": "degraded",
+            "dependency": exc.dependency,
+            "reason": exc.reason,
+            "detail": f"{exc.dependency} is temporarily unavailable, please retry shortly",
+        },
+        status_code=503,
+        headers=headers,
+    )
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Root endpoint
 @app.get("/")
 def root():
@@ -49,14 +149,24 @@ def root():
         "redoc": "/redoc"
     }
 
-# Include routers
-app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
-app.include_router(organizations.router, prefix="/api/v1/organizations", tags=["organizations"])
-app.include_router(workflows.router, prefix="/api/v1/workflows", tags=["workflows"])
-app.include_router(steps.router, prefix="/api/v1/steps", tags=["steps"])
-app.include_router(comments.router, prefix="/api/v1/comments", tags=["comments"])
-app.include_router(ai.router, prefix="/api/v1/ai", tags=["ai"])
-app.include_router(activity_logs.router, prefix="/api/v1/activity-logs", tags=["activity-logs"])
+# Include routers (rate limited per user and org; AI has its own, smaller budget)
+crud = [Depends(CRUD_LIMIT)] if settings.RATE_LIMIT_ENABLED else []
+app.include_router(users.router, prefix="/api/v1/users", tags=["users"], dependencies=crud)
+app.include_router(organizations.router, prefix="/api/v1/organizations", tags=["organizations"], dependencies=crud)
+app.include_router(workflows.router, prefix="/api/v1/workflows", tags=["workflows"], dependencies=crud)
+app.include_router(steps.router, prefix="/api/v1/steps", tags=["steps"], dependencies=crud)
+app.include_router(comments.router, prefix="/api/v1/comments", tags=["comments"], dependencies=crud)
+app.include_router(
+    ai.router, prefix="/api/v1/ai", tags=["ai"],
+    dependencies=[Depends(AI_LIMIT)] if settings.RATE_LIMIT_ENABLED else [],
+)
+app.include_router(activity_logs.router, prefix="/api/v1/activity-logs", tags=["activity-logs"], dependencies=crud)
+app.include_router(search.router, prefix="/api/v1/search", tags=["search"], dependencies=crud)
+app.include_router(stream.router, prefix="/api/v1/stream", tags=["stream"], dependencies=crud)
+app.include_router(sync.router, prefix="/api/v1/sync", tags=["sync"], dependencies=crud)
+app.include_router(batch.router, prefix="/api/v1/batch", tags=["batch"], dependencies=crud)
+app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["dashboard"], dependencies=crud)
+app.include_router(templates.router, prefix="/api/v1/templates", tags=["templates"], dependencies=crud)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+class BatchItem(BaseModel):
+    method: str = "GET"
+    path: str  # e.g. "/api/v1/workflows/?org_id=..."
+    body: Optional[Any] = None
+    headers: Optional[Dict[str, str]] = None  # e.g. If-None-Match
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
@@ -1,14 +1,55 @@
-from google import genai
-from google.genai import types
 import json
+import time
 from app.config import settings
 from app.utils.supabase import sb_insert
+from app.utils import invalidation
+from app.utils.projection import select_clause
+from app.services.events import publish_change
+from app.utils.ordering import needs_rebalance, spread_keys
+from app.utils.metrics import AI_CALLS, AI_LATENCY, AI_TOKENS
+from app.utils.tracing import span
+from app.utils.log import get_logger, redact
+from app.utils import sdk
+from app.utils.resilience import GEMINI, DependencyUnavailable
+
+log = get_logger("ai")
 
 
 # Initialize Gemini client
 def get_gemini_client():
     """Get configured Gemini client"""
-    return genai.Client(api_key=settings.GEMINI_API_KEY)
+    http_options = sdk.genai_types().HttpOptions(
+        base_url=settings.GEMINI_BASE_URL or None,
+        timeout=int(GEMINI.timeout * 1000),  # milliseconds
+    )
+    return sdk.genai().Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
+
+def _generate(op: str, client, **kwargs):
+    """
+    Call generate_content behind the Gemini circuit breaker and bulkhead,
+    recording latency, token usage and outcome for `op`.
+    """
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        with span("ai.generate_content", op=op, model=kwargs.get("model")) as traced:
+            with GEMINI.guard():
+                response = client.models.generate_content(**kwargs)
+            outcome = "ok" if response.text is not None else "empty"
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                AI_TOKENS.inc((op, "prompt"), usage.prompt_token_count or 0)
+                AI_TOKENS.inc((op, "output"), usage.candidates_token_count or 0)
+                if traced is not None:
+                    traced.attributes["tokens.prompt"] = usage.prompt_token_count or 0
+                    traced.attributes["tokens.output"] = usage.candidates_token_count or 0
+        return response
+    except DependencyUnavailable:
+        outcome = "unavailable"
+        raise
+    finally:
+        AI_LATENCY.observe((op,), time.perf_counter() - start)
+        AI_CALLS.inc((op, outcome))
 
 SYSTEM_PROMPT = """
 You are an enterprise workflow and SOP (Standard Operating Procedure) assistant.
@@ -43,34 +84,32 @@ def generate_sop(raw_text: str) -> dict:
         client = get_gemini_client()
         model = settings.GEMINI_MODEL
         
-        print(f"[AI] Attempting to use model: {model}")
-        print(f"[AI] API Key configured: {'Yes' if settings.GEMINI_API_KEY else 'No'}")
-        print(f"[AI] Input text length: {len(raw_text)} chars")
+        log.info("Generating SOP with %s from %d chars of input", model, len(raw_text))
+        if not settings.GEMINI_API_KEY:
+            log.warning("GEMINI_API_KEY is not configured")
         
-        print(f"[AI] Model created, sending request...")
-        
-        response = client.models.generate_content(
+        response = _generate(
+            "generate_sop",
+            client,
             model=model,
             contents=f"{SYSTEM_PROMPT}\n\nConvert this to a workflow:\n\n{raw_text}",
-            config=types.GenerateContentConfig(
+            config=sdk.genai_types().GenerateContentConfig(
                 temperature=0.2,
                 max_output_tokens=4000,  # Increased from 2000 to avoid truncation
                 top_p=0.9,
             )
         )
         
-        print(f"[AI] Response received")
-        
         # Handle case where response.text is None (blocked/empty response)
         if response.text is None:
-            print("[AI] Error: Response text is None (possibly blocked by safety filters)")
+            log.warning("Response text is None (possibly blocked by safety filters)")
             return {
                 "success": False,
                 "error": "AI returned empty response. This may be due to content safety filters."
             }
         
         content = response.text.strip()
-        print(f"[AI] Raw response: {content[:200]}...")
+        log.debug("Raw response: %s", redact(content))
         
         # Clean up markdown code blocks if present
         if content.startswith("```json"):
@@ -82,7 +121,7 @@ def generate_sop(raw_text: str) -> dict:
         try:
             workflow_data = json.loads(content)
         except json.JSONDecodeError as parse_error:
-            print(f"[AI] JSON parse error: {parse_error}")
+            log.warning("JSON parse error: %s", parse_error)
             # Try to repair truncated JSON by closing any unclosed structures
             repaired = content
             # Count unclosed braces and brackets
@@ -96,7 +135,7 @@ def generate_sop(raw_text: str) -> dict:
             repaired += '}' * open_braces
             try:
                 workflow_data = json.loads(repaired)
-                print(f"[AI] Repaired truncated JSON successfully")
+                log.info("Repaired truncated JSON successfully")
             except json.JSONDecodeError:
                 # Still failed, return error
                 return {
@@ -104,9 +143,8 @@ def generate_sop(raw_text: str) -> dict:
                     "error": f"AI returned incomplete JSON. Please try again with shorter or clearer text."
                 }
         
-        print(f"[AI] Parsed workflow: title='{workflow_data.get('title', 'No title')}'")
-        print(f"[AI] Parsed workflow: description='{workflow_data.get('description', '')[:100]}...'")
-        print(f"[AI] Parsed workflow: steps count={len(workflow_data.get('steps', []))}")
+        log.info("Parsed workflow with %d steps", len(workflow_data.get("steps", [])))
+        log.debug("Parsed workflow: %s", redact(workflow_data))
         
         return {
             "success": True,
@@ -114,15 +152,18 @@ def generate_sop(raw_text: str) -> dict:
         }
     
     except json.JSONDecodeError as e:
-        print(f"[AI] JSON parse error: {e}")
+        log.error("JSON parse error: %s", e)
         return {
             "success": False,
             "error": f"Invalid JSON response: {str(e)}",
             "raw_response": content if 'content' in locals() else None
         }
     
+    except DependencyUnavailable:
+        raise
+    
     except Exception as e:
-        print(f"[AI] Error: {type(e).__name__}: {e}")
+        log.error("Error: %s: %s", type(e).__name__, e)
         return {
             "success": False,
             "error": f"Gemini API error: {str(e)}"
@@ -143,10 +184,12 @@ def rewrite_step(step_text: str, tone: str = "clear_enterprise") -> dict:
         instruction = tone_instructions.get(tone, tone_instructions["clear_enterprise"])
         system_instruction = f"{instruction}. Keep it concise (1-2 sentences)."
         
-        response = client.models.generate_content(
+        response = _generate(
+            "rewrite_step",
+            client,
             model=model,
             contents=f"{system_instruction}\n\n{step_text}",
-            config=types.GenerateContentConfig(
+            config=sdk.genai_types().GenerateContentConfig(
                 temperature=0.3,
                 max_output_tokens=500,
             )
@@ -167,6 +210,9 @@ def rewrite_step(step_text: str, tone: str = "clear_enterprise") -> dict:
             "rewritten_text": rewritten_text
         }
     
+    except DependencyUnavailable:
+        raise
+    
     except Exception as e:
         return {
             "success": False,
@@ -186,11 +232,15 @@ def save_workflow_to_db(workflow_data: dict, organization_id: str, user_id: str)
                 "created_by": user_id,
                 "status": "draft",
             },
+            select=select_clause("workflows", None),
         )
-        workflow_id = workflow_rows[0]["id"]
+        workflow = workflow_rows[0]
+        workflow_id = workflow["id"]
 
         # 2) Insert steps
         steps = workflow_data.get("steps", [])
+        sort_keys = spread_keys(len(steps))
+        step_rows = []
         if steps:
             steps_payload = []
             for idx, step in enumerate(steps):
@@ -202,16 +252,29 @@ def save_workflow_to_db(workflow_data: dict, organization_id: str, user_id: str)
                         "assigned_to": None,
                         "status": "pending",
                         "order": idx,
+                        "sort_key": sort_keys[idx],
                     }
                 )
-            sb_insert("workflow_steps", steps_payload)
+            step_rows = sb_insert("workflow_steps", steps_payload, select=select_clause("steps", None))
+        invalidation.publish("workflow", workflow_id, "created", org_id=organization_id)
+        try:
+            # The change feed, like every other writer
+            publish_change("workflow", "created", workflow, org_id=organization_id, workflow_id=workflow_id)
+            for step in step_rows:
+                publish_change("step", "created", step, org_id=organization_id, workflow_id=workflow_id)
+        except Exception as e:
+            log.error("Error publishing saved workflow %s: %s", workflow_id, e)
 
         return {
             "success": True,
             "workflow_id": workflow_id,
             "steps_created": len(steps),
+            "needs_rebalance": any(needs_rebalance(k) for k in sort_keys),
         }
 
+    except DependencyUnavailable:
+        raise
+    
     except Exception as e:
         return {
             "success": False,
@@ -0,0 +1,168 @@
+"""
+In-process change feed.
+
+Write functions in the service layer publish compact change events here; the
+stream router fans them out to SSE subscribers. Each subscriber has a bounded
+queue: a consumer that falls too far behind has its backlog dropped and gets a
+single `reset` event telling it to refetch, so one slow client can never grow
+memory without bound. A ring buffer of recent events lets reconnecting clients
+resume from their Last-Event-ID.
+
+Every subscription is scoped to one organization and only sees that org's
+events; events without an organization are never delivered.
+
+Event ids are "<epoch>-<seq>". The epoch changes on every process start, so an
+id from another worker or an earlier run is detected and answered with `reset`.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.utils.projection import SUMMARY, project
+
+HISTORY_SIZE = 2048
+QUEUE_SIZE = 256
+
+# Marker placed in a subscriber queue after it overflowed
+RESET = {"type": "reset"}
+
+
+class Subscription:
+    def __init__(self, org_id: str, loop: asyncio.AbstractEventLoop, maxsize: int = QUEUE_SIZE):
+        self.org_id = org_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _offer(self, item) -> None:
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    def offer(self, item) -> None:
+        """Thread-safe enqueue (writers may run in worker threads)."""
+        try:
+            self.loop.call_soon_threadsafe(self._offer, item)
+        except RuntimeError:
+            # Loop already closed; the stream is gone
+            pass
+
+
+class EventBroker:
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = itertools.count(1)
+        self._history: deque = deque(maxlen=history_size)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(
+        self,
+        entity: str,
+        action: str,
+        entity_id: Optional[str],
+        org_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        data: Optional[dict] = None,
+    ) -> dict:
+        event = {
+            "type": entity,
+            "action": action,
+            "entity_id": entity_id,
+            "organization_id": org_id,
+            "workflow_id": workflow_id,
+            "data": data,
+            "ts": time.time(),
+        }
+        with self._lock:
+            event["id"] = f"{self.epoch}-{next(self._seq)}"
+            self._history.append(event)
+            targets = list(self._subscribers.get(org_id, ())) if org_id is not None else []
+        for sub in targets:
+            sub.offer(event)
+        return event
+
+    def subscribe(
+        self,
+        org_id: str,
+        last_event_id: Optional[str] = None,
+        maxsize: int = QUEUE_SIZE,
+    ) -> Tuple[Subscription, List[dict], bool]:
+        """
+        Register a subscriber to `org_id`'s events on the running loop.
+
+        Returns the subscription, the backlog to replay (events after
+        `last_event_id`) and whether the client must reset because the id is
+        unknown or already evicted from the ring buffer.
+        """
+        sub = Subscription(org_id, asyncio.get_running_loop(), maxsize)
+        backlog: List[dict] = []
+        reset = False
+
+        with self._lock:
+            if last_event_id:
+                epoch, _, seq = last_event_id.partition("-")
+                if epoch != self.epoch or not seq.isdigit():
+                    reset = True
+                else:
+                    seq = int(seq)
+                    oldest = int(self._history[0]["id"].split("-")[1]) if self._history else seq + 1
+                    if seq + 1 < oldest:
+                        reset = True
+                    else:
+                        backlog = [
+                            e for e in self._history
+                            if int(e["id"].split("-")[1]) > seq
+                            and e["organization_id"] == org_id
+                        ]
+            self._subscribers.setdefault(org_id, set()).add(sub)
+
+        return sub, backlog, reset
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.org_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.org_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+broker = EventBroker()
+
+# Entity name in events -> projection preset used for the compact payload
+_PRESETS = {"workflow": "workflows", "step": "steps", "comment": "comments", "activity": "activities"}
+
+
+def publish_change(
+    entity: str,
+    action: str,
+    row: Optional[dict] = None,
+    entity_id: Optional[str] = None,
+    org_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+) -> None:
+    """Publish a change with a compact (summary-projected) copy of the row."""
+    data = project(row, SUMMARY[_PRESETS[entity]]) if row else None
+    broker.publish(
+        entity,
+        action,
+        entity_id or (row or {}).get("id"),
+        org_id=org_id,
+        workflow_id=workflow_id,
+        data=data,
+    )
@@ -0,0 +1,216 @@
+"""
+Workflow version history.
+
+Every change to a workflow or its steps bumps workflows.version. Workflows
+changed in this worker are noted as they are published on the invalidation
+bus; a background task records them WORKFLOW_HISTORY_DEBOUNCE_SECONDS later,
+so a burst of writes (an AI regeneration adding fifty steps) becomes one
+revision. Each revision is a row in workflow_revisions holding the workflow
+and its steps at that version, as a document:
+
+    {"workflow": {title, description, ...}, "steps": {step_id: {title, sort_key, ...}}}
+
+Rows are either a full snapshot or a JSON Patch against the previous
+revision. A new snapshot is written when WORKFLOW_HISTORY_SNAPSHOT_EVERY
+patches have piled up since the last one, or when the patches since then
+together are as large as a snapshot. Rebuilding any version is then one query
+and at most SNAPSHOT_EVERY - 1 patches, reading at most about two snapshots'
+worth of data, and history stays small: a typical edit stores a few hundred
+bytes.
+"""
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import anyio
+
+from app.config import settings
+from app.services.supabase_db import get_workflow, insert_workflow_revision, list_workflow_revisions
+from app.utils import invalidation
+from app.utils.jsonpatch import apply, diff
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+
+log = get_logger("history")
+
+WORKFLOW_REVISIONS = Counter(
+    "workflow_revisions_total", "Workflow history rows written, by kind (snapshot, delta).", ("kind",),
+)
+
+WORKFLOW_FIELDS = ("title", "description", "status", "is_template")
+STEP_FIELDS = ("title", "description", "status", "assigned_to", "order", "sort_key")
+
+
+def document(workflow: dict) -> dict:
+    """What history keeps of a workflow (with its steps); steps are keyed by id so patches stay small."""
+    return {
+        "workflow": {f: workflow.get(f) for f in WORKFLOW_FIELDS},
+        "steps": {s["id"]: {f: s.get(f) for f in STEP_FIELDS} for s in workflow.get("steps") or []},
+    }
+
+
+def render(workflow_id: str, version: int, doc: dict) -> dict:
+    """A history document shaped like a workflow from the API, steps in order."""
+    steps = [{"id": sid, **fields} for sid, fields in doc["steps"].items()]
+    steps.sort(key=lambda s: (s.get("sort_key") is None, s.get("sort_key") or "", s.get("order") or 0))
+    return {"id": workflow_id, "version": version, **doc["workflow"], "steps": steps}
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+class HistoryRecorder:
+    """Records and rebuilds revisions; see the module docstring."""
+
+    def __init__(self, snapshot_every: int, debounce: float, cache_size: int = 1000):
+        self.snapshot_every = max(1, snapshot_every)
+        self.debounce = debounce
+        self.cache_size = cache_size
+        self._pending: Set[str] = set()
+        self._pending_lock = threading.Lock()
+        self._record_lock = threading.Lock()
+        # workflow id -> (version, document) of its latest revision written here
+        self._latest: "OrderedDict[str, Tuple[int, dict]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- writing ----------
+
+    def note_change(self, workflow_id: str) -> None:
+        with self._pending_lock:
+            self._pending.add(workflow_id)
+
+    def _take_pending(self, workflow_id: Optional[str] = None) -> List[str]:
+        with self._pending_lock:
+            if workflow_id is None:
+                taken, self._pending = list(self._pending), set()
+                return taken
+            if workflow_id in self._pending:
+                self._pending.discard(workflow_id)
+                return [workflow_id]
+            return []
+
+    def _base(self, workflow_id: str, latest: dict) -> Optional[dict]:
+        cached = self._latest.get(workflow_id)
+        if cached is not None and cached[0] == latest["version"]:
+            return cached[1]
+        return self.reconstruct(workflow_id, latest["version"])
+
+    def record(self, workflow_id: str) -> Optional[dict]:
+        """Store the workflow's current state if it changed since its latest revision; returns the new row."""
+        with self._record_lock:
+            workflow = get_workflow(workflow_id)
+            if not workflow:
+                return None
+            version = workflow.get("version") or 1
+            doc = document(workflow)
+            rows = list_workflow_revisions(workflow_id, limit=1)
+            latest = rows[0] if rows else None
+            if latest is not None and latest["version"] >= version:
+                return None
+
+            revision: Dict[str, Any] = {"workflow_id": workflow_id, "version": version}
+            base = self._base(workflow_id, latest) if latest is not None else None
+            if base == doc:
+                return None  # nothing history keeps changed
+            if base is not None and latest["depth"] + 1 < self.snapshot_every:
+                patch = diff(base, doc)
+                size = _size(patch)
+                if latest["chain_bytes"] + size < _size(doc):
+                    revision.update(
+                        kind="delta", base_version=latest["version"],
+                        depth=latest["depth"] + 1, chain_bytes=latest["chain_bytes"] + size, data=patch,
+                    )
+            if "kind" not in revision:
+                revision.update(kind="snapshot", base_version=None, depth=0, chain_bytes=0, data=doc)
+
+            stored = insert_workflow_revision(revision)
+            if stored is None:
+                return None
+            WORKFLOW_REVISIONS.inc((revision["kind"],))
+            self._latest[workflow_id] = (version, doc)
+            self._latest.move_to_end(workflow_id)
+            while len(self._latest) > self.cache_size:
+                self._latest.popitem(last=False)
+            return stored
+
+    async def flush(self, workflow_id: Optional[str] = None) -> None:
+        """Record pending changes now (of one workflow, or all)."""
+        for pending in self._take_pending(workflow_id):
+            try:
+                await anyio.to_thread.run_sync(self.record, pending)
+            except Exception as e:
+                log.error("Error recording history of workflow %s: %s", pending, e)
+
+    # ---------- reading ----------
+
+    def reconstruct(self, workflow_id: str, version: int) -> Optional[dict]:
+        """The document at `version`, or None if that version was not recorded."""
+        rows: Dict[int, dict] = {}
+        before = version + 1
+        while True:
+            page = list_workflow_revisions(workflow_id, limit=self.snapshot_every, before=before, with_data=True)
+            if not page:
+                return None
+            rows.update((row["version"], row) for row in page)
+            if version not in rows:
+                return None
+            before = page[-1]["version"]
+            chain = []
+            at: Optional[int] = version
+            while at in rows and rows[at]["kind"] == "delta":
+                chain.append(rows[at]["data"])
+                at = rows[at]["base_version"]
+            if at in rows:
+                doc = rows[at]["data"]
+                for patch in reversed(chain):
+                    doc = apply(doc, patch)
+                return doc
+            if at is None or at >= before:
+                log.error("Broken history chain for workflow %s at version %s", workflow_id, at)
+                return None
+            # The chain continues further back than this page
+
+    # ---------- background task ----------
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.debounce)
+            await self.flush()
+
+    def start(self) -> None:
+        self.stop()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+HISTORY = HistoryRecorder(settings.WORKFLOW_HISTORY_SNAPSHOT_EVERY, settings.WORKFLOW_HISTORY_DEBOUNCE_SECONDS)
+
+
+def _note_change(event: dict, local: bool) -> None:
+    # Only the worker that made the change records it
+    if not local or event["entity"] not in ("workflow", "step"):
+        return
+    workflow_id = event.get("workflow_id") or (event.get("id") if event["entity"] == "workflow" else None)
+    if workflow_id:
+        HISTORY.note_change(workflow_id)
+
+
+if settings.WORKFLOW_HISTORY_ENABLED:
+    invalidation.subscribe(_note_change)
+
+
+def start() -> None:
+    if settings.WORKFLOW_HISTORY_ENABLED:
+        HISTORY.start()
+
+
+def stop() -> None:
+    HISTORY.stop()
@@ -1,7 +1,13 @@
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
 import time
 import uuid
 
+from app.utils.ordering import JITTER_DIGITS, key_between, spread_keys, needs_rebalance
+from app.utils.projection import project
+from app.utils.search import InvertedIndex
+from app.services.events import publish_change
+
 # Simple in-memory store used for development/testing only
 workflows: Dict[str, dict] = {}
 steps: Dict[str, dict] = {}
@@ -10,12 +16,64 @@ activities: List[dict] = []
 organizations: Dict[str, dict] = {}
 org_members: Dict[str, List[dict]] = {}  # org_id -> list of members
 users: Dict[str, dict] = {}
+deleted_records: List[dict] = []  # tombstones for delta sync
+search_index = InvertedIndex()
 
 
 def _now_iso():
     return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
 
+def _index_workflow(wf: dict) -> None:
+    search_index.add("workflow", wf["id"], wf.get("organization_id"), wf["id"], wf.get("title"), wf.get("description"))
+
+
+def _index_step(s: dict) -> None:
+    wf = workflows.get(s.get("workflow_id") or "")
+    search_index.add(
+        "step", s["id"], wf.get("organization_id") if wf else None,
+        s.get("workflow_id"), s.get("title"), s.get("description"),
+    )
+
+
+def _index_comment(c: dict) -> None:
+    wf = workflows.get(c.get("workflow_id") or "")
+    search_index.add(
+        "comment", c["id"], wf.get("organization_id") if wf else None,
+        c.get("workflow_id"), None, c.get("content"),
+    )
+
+
+def _bump_version(wid: Optional[str]) -> None:
+    # Mirrors the database triggers: any change to a workflow or its steps
+    wf = workflows.get(wid or "")
+    if wf is not None:
+        wf["version"] = wf.get("version", 1) + 1
+
+
+def _org_of(wid: Optional[str]) -> Optional[str]:
+    wf = workflows.get(wid or "")
+    return wf.get("organization_id") if wf else None
+
+
+def _tombstone(entity_type: str, entity_id: str, workflow_id: Optional[str]) -> None:
+    deleted_records.append({
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "organization_id": _org_of(workflow_id),
+        "workflow_id": workflow_id,
+        "deleted_at": _now_iso(),
+    })
+
+
+def _log_activity(entry: dict) -> None:
+    activities.append(entry)
+    publish_change(
+        "activity", "created", entry,
+        org_id=entry.get("organization_id"), workflow_id=entry.get("workflow_id"),
+    )
+
+
 # ============ WORKFLOWS ============
 
 def insert_workflow(data: dict, created_by: Optional[str] = None) -> dict:
@@ -27,12 +85,17 @@ def insert_workflow(data: dict, created_by: Optional[str] = None) -> dict:
         "organization_id": data.get("organization_id"),
         "created_by": created_by,
         "status": data.get("status", "active"),
+        "version": 1,
+        "is_template": False,
+        "cloned_from": None,
         "created_at": _now_iso(),
         "updated_at": _now_iso(),
         "steps": [],
     }
     workflows[wid] = wf
-    activities.append({
+    _index_workflow(wf)
+    publish_change("workflow", "created", wf, org_id=wf.get("organization_id"), workflow_id=wid)
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id"),
         "user_id": created_by,
@@ -45,11 +108,37 @@ def insert_workflow(data: dict, created_by: Optional[str] = None) -> dict:
     return wf
 
 
-def get_workflow(wid: str) -> Optional[dict]:
-    return workflows.get(wid)
+def _project_workflow(wf: dict, fields: Optional[List[str]]) -> dict:
+    if fields is None:
+        return wf
+    out = project(wf, [f for f in fields if f not in ("steps", "step_count")])
+    if "steps" in fields:
+        out["steps"] = list(wf.get("steps") or [])
+    if "step_count" in fields:
+        out["step_count"] = len(wf.get("steps") or [])
+    return out
+
+
+def get_workflow(wid: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+    wf = workflows.get(wid)
+    return _project_workflow(wf, fields) if wf else None
+
+
+def get_workflow_version(wid: str) -> Optional[int]:
+    wf = workflows.get(wid)
+    return wf.get("version", 1) if wf else None
+
+
+def list_workflow_versions(org_id: Optional[str] = None) -> List[dict]:
+    if org_id is None or org_id.strip() == "":
+        result = list(workflows.values())
+    else:
+        result = [w for w in workflows.values() if w.get("organization_id") == org_id]
+    result = sorted(result, key=lambda w: w.get("updated_at", ""), reverse=True)
+    return [{"id": w["id"], "version": w.get("version", 1)} for w in result]
 
 
-def list_workflows(org_id: Optional[str] = None) -> List[dict]:
+def list_workflows(org_id: Optional[str] = None, fields: Optional[List[str]] = None) -> List[dict]:
     # Treat empty string as no filter (return all workflows)
     if org_id is None or org_id == "" or org_id.strip() == "":
         result = list(workflows.values())
@@ -58,7 +147,8 @@ def list_workflows(org_id: Optional[str] = None) -> List[dict]:
     # Add step_count to each workflow
     for wf in result:
         wf["step_count"] = len([s for s in steps.values() if s.get("workflow_id") == wf["id"]])
-    return sorted(result, key=lambda w: w.get("updated_at", ""), reverse=True)
+    result = sorted(result, key=lambda w: w.get("updated_at", ""), reverse=True)
+    return [_project_workflow(wf, fields) for wf in result]
 
 
 def update_workflow(wid: str, data: dict, updated_by: Optional[str] = None) -> Optional[dict]:
@@ -73,8 +163,11 @@ def update_workflow(wid: str, data: dict, updated_by: Optional[str] = None) -> O
     if "status" in data:
         wf["status"] = data["status"]
     wf["updated_at"] = _now_iso()
+    _bump_version(wid)
+    _index_workflow(wf)
+    publish_change("workflow", "updated", wf, org_id=wf.get("organization_id"), workflow_id=wid)
     
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id"),
         "user_id": updated_by,
@@ -96,13 +189,17 @@ def delete_workflow(wid: str, deleted_by: Optional[str] = None) -> bool:
     step_ids_to_delete = [s["id"] for s in steps.values() if s.get("workflow_id") == wid]
     for sid in step_ids_to_delete:
         del steps[sid]
+        _tombstone("step", sid, wid)
+        search_index.remove("step", sid)
     
     # Delete associated comments
     comment_ids_to_delete = [c["id"] for c in comments.values() if c.get("workflow_id") == wid]
     for cid in comment_ids_to_delete:
         del comments[cid]
+        _tombstone("comment", cid, wid)
+        search_index.remove("comment", cid)
     
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id"),
         "user_id": deleted_by,
@@ -113,21 +210,127 @@ def delete_workflow(wid: str, deleted_by: Optional[str] = None) -> bool:
         "created_at": _now_iso(),
     })
     
+    _tombstone("workflow", wid, wid)
     del workflows[wid]
+    search_index.remove("workflow", wid)
+    publish_change("workflow", "deleted", entity_id=wid, org_id=wf.get("organization_id"), workflow_id=wid)
     return True
 
 
+def clone_workflow(
+    wid: str,
+    org_id: Optional[str] = None,
+    title: Optional[str] = None,
+    created_by: Optional[str] = None,
+    from_template: bool = False,
+) -> Optional[dict]:
+    """Copy a workflow with its steps as a new draft; steps are copied in bulk, not through insert_step."""
+    src = workflows.get(wid)
+    if not src or (from_template and not src.get("is_template")):
+        return None
+    
+    target_org = org_id or src.get("organization_id")
+    cid = f"wf-{uuid.uuid4().hex[:8]}"
+    wf = {
+        "id": cid,
+        "title": title or src.get("title"),
+        "description": src.get("description"),
+        "organization_id": target_org,
+        "created_by": created_by,
+        "status": "draft",
+        "version": 1,
+        "is_template": False,
+        "cloned_from": wid,
+        "created_at": _now_iso(),
+        "updated_at": _now_iso(),
+    }
+    same_org = target_org == src.get("organization_id")
+    copies = [
+        dict(
+            s,
+            id=f"step-{uuid.uuid4().hex[:8]}",
+            workflow_id=cid,
+            status="pending",
+            assigned_to=s.get("assigned_to") if same_org else None,
+            completed_at=None,
+            completed_by=None,
+            created_at=_now_iso(),
+            updated_at=_now_iso(),
+        )
+        for s in src.get("steps") or []
+    ]
+    wf["steps"] = copies
+    workflows[cid] = wf
+    _index_workflow(wf)
+    for step in copies:
+        steps[step["id"]] = step
+        _index_step(step)
+    publish_change("workflow", "created", wf, org_id=target_org, workflow_id=cid)
+    
+    _log_activity({
+        "id": f"act-{uuid.uuid4().hex[:8]}",
+        "organization_id": target_org,
+        "user_id": created_by,
+        "workflow_id": cid,
+        "entity_type": "workflow",
+        "entity_id": cid,
+        "action": "created",
+        "details": f"Created workflow '{wf.get('title')}' from {wid}",
+        "created_at": _now_iso(),
+    })
+    return wf
+
+
+def set_workflow_template(wid: str, is_template: bool, updated_by: Optional[str] = None) -> Optional[dict]:
+    wf = workflows.get(wid)
+    if not wf:
+        return None
+    
+    wf["is_template"] = is_template
+    wf["updated_at"] = _now_iso()
+    _bump_version(wid)
+    publish_change("workflow", "updated", wf, org_id=wf.get("organization_id"), workflow_id=wid)
+    
+    _log_activity({
+        "id": f"act-{uuid.uuid4().hex[:8]}",
+        "organization_id": wf.get("organization_id"),
+        "user_id": updated_by,
+        "workflow_id": wid,
+        "entity_type": "workflow",
+        "entity_id": wid,
+        "action": "published" if is_template else "unpublished",
+        "details": f"{'Published' if is_template else 'Withdrew'} template '{wf.get('title')}'",
+        "created_at": _now_iso(),
+    })
+    return wf
+
+
+def list_templates(org_id: Optional[str] = None, fields: Optional[List[str]] = None) -> List[dict]:
+    result = [
+        w for w in workflows.values()
+        if w.get("is_template") and (not org_id or w.get("organization_id") == org_id)
+    ]
+    for wf in result:
+        wf["step_count"] = len(wf.get("steps") or [])
+    result = sorted(result, key=lambda w: w.get("title") or "")
+    return [_project_workflow(wf, fields) for wf in result]
+
+
 # ============ STEPS ============
 
 def insert_step(workflow_id: str, data: dict, created_by: Optional[str] = None) -> dict:
     sid = data.get("id") or f"step-{uuid.uuid4().hex[:8]}"
-    existing_steps = [s for s in steps.values() if s.get("workflow_id") == workflow_id]
+    # The workflow's attached steps are kept sorted, so the last key is O(1)
+    wf = workflows.get(workflow_id)
+    wf_steps = (wf.get("steps") or []) if wf is not None else []
+    last_key = wf_steps[-1].get("sort_key") if wf_steps else None
     step = {
         "id": sid,
         "workflow_id": workflow_id,
         "title": data.get("title"),
         "description": data.get("description"),
-        "step_order": data.get("order") if data.get("order") is not None else len(existing_steps),
+        "step_order": data.get("order") if data.get("order") is not None else len(wf_steps),
+        "sort_key": data.get("sort_key") or key_between(last_key, None, JITTER_DIGITS),
         "status": data.get("status", "pending"),
         "assigned_to": data.get("assigned_to"),
         "role": data.get("role"),
@@ -139,15 +342,16 @@ def insert_step(workflow_id: str, data: dict, created_by: Optional[str] = None)
         "updated_at": _now_iso(),
     }
     steps[sid] = step
+    _index_step(step)
     
     # Attach step to workflow
-    wf = workflows.get(workflow_id)
     if wf is not None:
-        wf_steps = wf.get("steps") or []
         wf_steps.append(step)
         wf["steps"] = wf_steps
+        _bump_version(workflow_id)
+    publish_change("step", "created", step, org_id=_org_of(workflow_id), workflow_id=workflow_id)
 
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id") if wf else None,
         "user_id": created_by,
@@ -159,16 +363,17 @@ def insert_step(workflow_id: str, data: dict, created_by: Optional[str] = None)
         "created_at": _now_iso(),
     })
 
-    return step
+    return {**step, "needs_rebalance": needs_rebalance(step["sort_key"])}
 
 
 def get_step(step_id: str) -> Optional[dict]:
     return steps.get(step_id)
 
 
-def list_steps(workflow_id: Optional[str] = None) -> List[dict]:
+def list_steps(workflow_id: Optional[str] = None, fields: Optional[List[str]] = None) -> List[dict]:
     result = [s for s in steps.values() if workflow_id is None or s.get("workflow_id") == workflow_id]
-    return sorted(result, key=lambda s: s.get("step_order", 0))
+    result = sorted(result, key=lambda s: (s.get("sort_key") or "", s.get("step_order", 0)))
+    return [project(s, fields) for s in result]
 
 
 def update_step(step_id: str, data: dict, updated_by: Optional[str] = None) -> Optional[dict]:
@@ -187,9 +392,13 @@ def update_step(step_id: str, data: dict, updated_by: Optional[str] = None) -> O
     if "order" in data:
         s["step_order"] = data["order"]
     s["updated_at"] = _now_iso()
+    _bump_version(s.get("workflow_id"))
+    if "title" in data or "description" in data:
+        _index_step(s)
+    publish_change("step", "updated", s, org_id=_org_of(s.get("workflow_id")), workflow_id=s.get("workflow_id"))
     
     wf = workflows.get(s.get("workflow_id", ""))
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id") if wf else None,
         "user_id": updated_by,
@@ -212,9 +421,11 @@ def update_step_status(step_id: str, status: str, completed_by: Optional[str] =
         s["completed_at"] = _now_iso()
         s["completed_by"] = completed_by
     s["updated_at"] = _now_iso()
+    _bump_version(s.get("workflow_id"))
+    publish_change("step", "updated", s, org_id=_org_of(s.get("workflow_id")), workflow_id=s.get("workflow_id"))
 
     wf = workflows.get(s.get("workflow_id", ""))
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id") if wf else None,
         "user_id": completed_by,
@@ -229,13 +440,82 @@ def update_step_status(step_id: str, status: str, completed_by: Optional[str] =
     return s
 
 
+def move_step(
+    step_id: str,
+    prev_id: Optional[str] = None,
+    next_id: Optional[str] = None,
+    moved_by: Optional[str] = None,
+) -> Optional[dict]:
+    if step_id in (prev_id, next_id):
+        return None
+    s = steps.get(step_id)
+    if not s:
+        return None
+    workflow_id = s.get("workflow_id")
+    for nid in (prev_id, next_id):
+        if nid and (nid not in steps or steps[nid].get("workflow_id") != workflow_id):
+            return None
+
+    wf = workflows.get(workflow_id or "")
+    siblings = wf.get("steps") if wf and "steps" in wf else list_steps(workflow_id)
+    ordered = [x for x in siblings if x["id"] != step_id]
+    keys = [x.get("sort_key") for x in ordered]
+    if prev_id:
+        pos = next(i for i, x in enumerate(ordered) if x["id"] == prev_id) + 1
+    elif next_id:
+        pos = next(i for i, x in enumerate(ordered) if x["id"] == next_id)
+    else:
+        pos = len(ordered)
+    if next_id and (pos >= len(ordered) or ordered[pos]["id"] != next_id):
+        return None
+
+    try:
+        s["sort_key"] = key_between(
+            keys[pos - 1] if pos > 0 else None, keys[pos] if pos < len(keys) else None, JITTER_DIGITS,
+        )
+    except ValueError:
+        return None
+    s["updated_at"] = _now_iso()
+    _bump_version(workflow_id)
+
+    if wf and "steps" in wf:
+        wf["steps"] = sorted(wf["steps"], key=lambda x: x.get("sort_key") or "")
+    publish_change("step", "moved", s, org_id=_org_of(workflow_id), workflow_id=workflow_id)
+
+    _log_activity({
+        "id": f"act-{uuid.uuid4().hex[:8]}",
+        "organization_id": wf.get("organization_id") if wf else None,
+        "user_id": moved_by,
+        "workflow_id": workflow_id,
+        "entity_type": "step",
+        "entity_id": step_id,
+        "action": "moved",
+        "details": f"Moved step '{s.get('title')}'",
+        "created_at": _now_iso(),
+    })
+    return {**s, "needs_rebalance": needs_rebalance(s["sort_key"])}
+
+
+def rebalance_steps(workflow_id: str) -> int:
+    ordered = list_steps(workflow_id)
+    written = 0
+    for s, key in zip(ordered, spread_keys(len(ordered))):
+        if s.get("sort_key") != key:
+            s["sort_key"] = key
+            written += 1
+    if written:
+        _bump_version(workflow_id)
+        publish_change("step", "rebalanced", org_id=_org_of(workflow_id), workflow_id=workflow_id)
+    return written
+
+
 def delete_step(step_id: str, deleted_by: Optional[str] = None) -> bool:
     s = steps.get(step_id)
     if not s:
         return False
     
     wf = workflows.get(s.get("workflow_id", ""))
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id") if wf else None,
         "user_id": deleted_by,
@@ -252,6 +532,10 @@ def delete_step(step_id: str, deleted_by: Optional[str] = None) -> bool:
         wf["steps"] = [step for step in wf["steps"] if step["id"] != step_id]
     
     del steps[step_id]
+    search_index.remove("step", step_id)
+    _tombstone("step", step_id, s.get("workflow_id"))
+    _bump_version(s.get("workflow_id"))
+    publish_change("step", "deleted", entity_id=step_id, org_id=_org_of(s.get("workflow_id")), workflow_id=s.get("workflow_id"))
     return True
 
 
@@ -270,9 +554,11 @@ def insert_comment(data: dict, created_by: Optional[str] = None) -> dict:
         "updated_at": _now_iso(),
     }
     comments[cid] = comment
+    _index_comment(comment)
+    publish_change("comment", "created", comment, org_id=_org_of(comment["workflow_id"]), workflow_id=comment["workflow_id"])
 
     wf = workflows.get(data.get("workflow_id", ""))
-    activities.append({
+    _log_activity({
         "id": f"act-{uuid.uuid4().hex[:8]}",
         "organization_id": wf.get("organization_id") if wf else None,
         "user_id": created_by,
@@ -291,7 +577,11 @@ def get_comment(comment_id: str) -> Optional[dict]:
     return comments.get(comment_id)
 
 
-def list_comments(workflow_id: Optional[str] = None, step_id: Optional[str] = None) -> List[dict]:
+def list_comments(
+    workflow_id: Optional[str] = None,
+    step_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> List[dict]:
     result = []
     for c in comments.values():
         if workflow_id and c.get("workflow_id") != workflow_id:
@@ -299,7 +589,8 @@ def list_comments(workflow_id: Optional[str] = None, step_id: Optional[str] = No
         if step_id and c.get("step_id") != step_id:
             continue
         result.append(c)
-    return sorted(result, key=lambda c: c.get("created_at", ""), reverse=True)
+    result = sorted(result, key=lambda c: c.get("created_at", ""), reverse=True)
+    return [project(c, fields) for c in result]
 
 
 def update_comment(comment_id: str, data: dict, updated_by: Optional[str] = None) -> Optional[dict]:
@@ -309,7 +600,9 @@ def update_comment(comment_id: str, data: dict, updated_by: Optional[str] = None
     
     if "content" in data:
         c["content"] = data["content"]
+        _index_comment(c)
     c["updated_at"] = _now_iso()
+    publish_change("comment", "updated", c, org_id=_org_of(c.get("workflow_id")), workflow_id=c.get("workflow_id"))
     
     return c
 
@@ -320,6 +613,9 @@ def delete_comment(comment_id: str, deleted_by: Optional[str] = None) -> bool:
         return False
     
     del comments[comment_id]
+    search_index.remove("comment", comment_id)
+    _tombstone("comment", comment_id, c.get("workflow_id"))
+    publish_change("comment", "deleted", entity_id=comment_id, org_id=_org_of(c.get("workflow_id")), workflow_id=c.get("workflow_id"))
     return True
 
 
@@ -469,7 +765,12 @@ def upsert_user(user_id: str, data: dict) -> dict:
 
 # ============ ACTIVITY LOGS ============
 
-def list_activities(org_id: Optional[str] = None, workflow_id: Optional[str] = None, user_id: Optional[str] = None) -> List[dict]:
+def list_activities(
+    org_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> List[dict]:
     result = []
     for a in activities:
         if org_id and a.get("organization_id") != org_id:
@@ -479,7 +780,77 @@ def list_activities(org_id: Optional[str] = None, workflow_id: Optional[str] = N
         if user_id and a.get("user_id") != user_id:
             continue
         result.append(a)
-    return sorted(result, key=lambda a: a.get("created_at", ""), reverse=True)
+    result = sorted(result, key=lambda a: a.get("created_at", ""), reverse=True)
+    return [project(a, fields) for a in result]
+
+
+# ============ SEARCH ============
+
+def search(q: str, org_id: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+    return search_index.search(q, org_id, limit, offset)
+
+
+# ============ SYNC ============
+
+def _changed_since(
+    rows,
+    since: Optional[datetime],
+    key: str,
+    limit: int,
+    after: Optional[List[Any]] = None,
+    id_key: str = "id",
+) -> List[dict]:
+    """Rows changed after `since`, in (change time, id) order, continuing after the position `after`."""
+    def position(row):
+        return datetime.fromisoformat(row[key]), row[id_key]
+    changed = [r for r in rows if r.get(key) and (since is None or position(r)[0] > since)]
+    if after is not None:
+        start = (datetime.fromisoformat(after[0]), after[1])
+        changed = [r for r in changed if position(r) > start]
+    return sorted(changed, key=position)[:limit]
+
+
+def sync(
+    org_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 1000,
+    after: Optional[Dict[str, List[Any]]] = None,
+) -> dict:
+    def in_org(wid):
+        return not org_id or _org_of(wid) == org_id
+
+    def changed(entity, rows, key="updated_at", id_key="id"):
+        # A continued sync only pages on through the lists that were cut off
+        if after is not None and entity not in after:
+            return []
+        return _changed_since(rows, since, key, limit, after.get(entity) if after else None, id_key)
+
+    wfs = [w for w in workflows.values() if not org_id or w.get("organization_id") == org_id]
+    return {
+        "now": datetime.now(timezone.utc),
+        "workflows": [
+            {k: v for k, v in w.items() if k not in ("steps", "step_count")}
+            for w in changed("workflows", wfs)
+        ],
+        "steps": changed("steps", [s for s in steps.values() if in_org(s.get("workflow_id"))]),
+        "comments": changed("comments", [c for c in comments.values() if in_org(c.get("workflow_id"))]),
+        "deleted": [
+            {k: v for k, v in d.items() if k != "organization_id"}
+            for d in changed(
+                "deleted",
+                [d for d in deleted_records if not org_id or d["organization_id"] == org_id],
+                "deleted_at", "entity_id",
+            )
+        ] if since else [],
+    }
+
+
+def purge_tombstones(keep_days: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=keep_days)
+    keep = [d for d in deleted_records if datetime.fromisoformat(d["deleted_at"]) >= cutoff]
+    purged = len(deleted_records) - len(keep)
+    deleted_records[:] = keep
+    return purged
 
 
 # ============ SEED DATA FOR DEVELOPMENT ============
@@ -0,0 +1,70 @@
+"""
+Background purge of soft-deleted workflows.
+
+Deleting a workflow only marks it (one UPDATE); its steps, comments and
+activity stay until it has been deleted for longer than
+WORKFLOW_UNDELETE_DAYS. Every WORKFLOW_PURGE_INTERVAL_SECONDS this task
+removes those rows in batches of WORKFLOW_PURGE_BATCH, each its own short
+transaction in a worker thread, so a large workflow never holds locks (or
+the event loop) for long. With several workers each runs the purge; the
+batches do not conflict, they just finish sooner.
+"""
+
+import asyncio
+from typing import Optional
+
+import anyio
+
+from app.config import settings
+from app.services.supabase_db import purge_deleted_workflows
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+
+log = get_logger("purger")
+
+PURGED_ROWS = Counter("workflow_purged_rows_total", "Rows removed by the soft-deleted workflow purge.")
+
+# Pause between batches, so the purge yields to foreground writes
+_BATCH_PAUSE = 0.1
+
+
+async def purge_once(keep_days: float, batch: int) -> int:
+    """Purge until nothing is left; returns the rows removed."""
+    total = 0
+    while True:
+        removed = await anyio.to_thread.run_sync(purge_deleted_workflows, keep_days, batch)
+        if not removed:
+            return total
+        total += removed
+        PURGED_ROWS.inc((), removed)
+        await asyncio.sleep(_BATCH_PAUSE)
+
+
+async def _run(interval: float) -> None:
+    while True:
+        try:
+            removed = await purge_once(settings.WORKFLOW_UNDELETE_DAYS, settings.WORKFLOW_PURGE_BATCH)
+            if removed:
+                log.info("Purged %d rows of deleted workflows", removed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("Error purging deleted workflows: %s", e)
+        await asyncio.sleep(interval)
+
+
+_task: Optional[asyncio.Task] = None
+
+
+def start() -> None:
+    global _task
+    stop()
+    if settings.WORKFLOW_PURGE_ENABLED:
+        _task = asyncio.get_running_loop().create_task(_run(settings.WORKFLOW_PURGE_INTERVAL_SECONDS))
+
+
+def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
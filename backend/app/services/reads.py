@@ -0,0 +1,68 @@
+"""
+Async, coalesced versions of the hot reads in supabase_db.
+
+Routers await these instead of calling supabase_db directly: the call runs
+off the event loop, and identical concurrent reads share one upstream call
+(see app/utils/singleflight.py). Set SINGLEFLIGHT_ENABLED=False to give
+every caller its own call.
+"""
+
+from typing import List, Optional
+
+from app.config import settings
+from app.services import supabase_db as db
+from app.utils.singleflight import SingleFlight
+
+
+def _fields_key(fields: Optional[List[str]]):
+    return None if fields is None else tuple(fields)
+
+
+_get_workflow = SingleFlight("get_workflow", settings.SINGLEFLIGHT_ENABLED)
+_list_workflows = SingleFlight("list_workflows", settings.SINGLEFLIGHT_ENABLED)
+_get_workflow_version = SingleFlight("get_workflow_version", settings.SINGLEFLIGHT_ENABLED)
+_list_workflow_versions = SingleFlight("list_workflow_versions", settings.SINGLEFLIGHT_ENABLED)
+_get_user = SingleFlight("get_user", settings.SINGLEFLIGHT_ENABLED)
+_list_organizations = SingleFlight("list_organizations", settings.SINGLEFLIGHT_ENABLED)
+_list_activities = SingleFlight("list_activities", settings.SINGLEFLIGHT_ENABLED)
+
+
+async def get_workflow(workflow_id: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+    return await _get_workflow.do((workflow_id, _fields_key(fields)), db.get_workflow, workflow_id, fields)
+
+
+async def list_workflows(
+    org_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    return await _list_workflows.do((org_id, _fields_key(fields), limit), db.list_workflows, org_id, fields, limit)
+
+
+async def get_workflow_version(workflow_id: str) -> Optional[int]:
+    return await _get_workflow_version.do(workflow_id, db.get_workflow_version, workflow_id)
+
+
+async def list_workflow_versions(org_id: Optional[str] = None) -> List[dict]:
+    return await _list_workflow_versions.do(org_id, db.list_workflow_versions, org_id)
+
+
+async def get_user(user_id: str) -> Optional[dict]:
+    return await _get_user.do(user_id, db.get_user, user_id)
+
+
+async def list_organizations(user_id: Optional[str] = None) -> List[dict]:
+    return await _list_organizations.do(user_id, db.list_organizations, user_id)
+
+
+async def list_activities(
+    org_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    return await _list_activities.do(
+        (org_id, workflow_id, user_id, _fields_key(fields), limit),
+        db.list_activities, org_id, workflow_id, user_id, fields, limit,
+    )
@@ -8,10 +8,18 @@ Set USE_SUPABASE=True in .env to enable Supabase, otherwise uses in-memory stora
 """
 
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import html
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple
 from dotenv import load_dotenv
-from app.utils.supabase import sb_select, sb_insert, sb_update, sb_delete
+from app.utils.supabase import sb_select, sb_insert, sb_update, sb_delete, sb_rpc
+from app.utils.resilience import DependencyUnavailable
+from app.utils.ordering import JITTER_DIGITS, key_between, spread_keys, needs_rebalance
+from app.utils.projection import select_clause
+from app.utils import invalidation
+from app.services.events import publish_change
+from app.utils.log import SAMPLED, get_logger, redact
 from app.config import settings
 
 # Load environment variables (config.py already does this, but being explicit)
@@ -20,10 +28,133 @@ load_dotenv()
 # Toggle between Supabase and in-memory storage
 USE_SUPABASE = os.getenv("USE_SUPABASE", "true").lower() == "true"
 
+log = get_logger("db")
+
+# Columns returned for whole rows. Never "*": the tables also carry the
+# generated search_vector, which must not reach responses or change events.
+_WORKFLOW_COLUMNS = select_clause("workflows", None)
+_STEP_COLUMNS = select_clause("steps", None)
+_COMMENT_COLUMNS = select_clause("comments", None)
+
+# Writes to a workflow only touch it while it is live (not soft-deleted)
+_LIVE = {"deleted_at": "is.null"}
+
 def _now_iso() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
+# A workflow never changes organization, so its org id can be cached for the
+# lifetime of the process (bounded to keep memory flat).
+_WORKFLOW_ORGS: Dict[str, Optional[str]] = {}
+_WORKFLOW_ORGS_MAX = 10000
+
+
+def _workflow_org(workflow_id: Optional[str]) -> Optional[str]:
+    """Get the organization id of a workflow (cached)."""
+    if not workflow_id:
+        return None
+    if workflow_id in _WORKFLOW_ORGS:
+        return _WORKFLOW_ORGS[workflow_id]
+    rows = sb_select("workflows", {"id": f"eq.{workflow_id}", "select": "organization_id"})
+    if not rows:
+        return None
+    if len(_WORKFLOW_ORGS) >= _WORKFLOW_ORGS_MAX:
+        _WORKFLOW_ORGS.clear()
+    _WORKFLOW_ORGS[workflow_id] = rows[0].get("organization_id")
+    return _WORKFLOW_ORGS[workflow_id]
+
+
+# Steps and comments never move to another workflow either: (table, id) -> workflow id
+_PARENT_WORKFLOWS: Dict[Tuple[str, str], Optional[str]] = {}
+_PARENT_TABLES = {"step": "workflow_steps", "comment": "comments"}
+
+
+def entity_org(kind: str, entity_id: Optional[str]) -> Optional[str]:
+    """Organization of a workflow, step or comment (cached), e.g. to charge its rate limit."""
+    if not entity_id:
+        return None
+    if kind == "workflow":
+        return _workflow_org(entity_id)
+    key = (_PARENT_TABLES[kind], entity_id)
+    if key not in _PARENT_WORKFLOWS:
+        rows = sb_select(key[0], {"id": f"eq.{entity_id}", "select": "workflow_id"})
+        if not rows:
+            return None
+        if len(_PARENT_WORKFLOWS) >= _WORKFLOW_ORGS_MAX:
+            _PARENT_WORKFLOWS.clear()
+        _PARENT_WORKFLOWS[key] = rows[0].get("workflow_id")
+    return _workflow_org(_PARENT_WORKFLOWS[key])
+
+
+# Memberships do change, so they are only cached briefly: user id -> (expiry, org ids)
+_USER_ORGS: Dict[str, Tuple[float, List[str]]] = {}
+_USER_ORGS_TTL = 60.0
+
+
+def user_orgs(user_id: Optional[str]) -> List[str]:
+    """Ids of the organizations a user belongs to, oldest membership first (cached briefly)."""
+    if not user_id:
+        return []
+    now = time.monotonic()
+    cached = _USER_ORGS.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    rows = sb_select("organization_members", {
+        "user_id": f"eq.{user_id}",
+        "select": "organization_id",
+        "order": "joined_at.asc",
+    })
+    orgs = [r["organization_id"] for r in rows]
+    if len(_USER_ORGS) >= _WORKFLOW_ORGS_MAX:
+        _USER_ORGS.clear()
+    _USER_ORGS[user_id] = (now + _USER_ORGS_TTL, orgs)
+    return orgs
+
+
+def _forget_cached_orgs(event: dict, local: bool) -> None:
+    if event["entity"] == invalidation.EVERYTHING:
+        _WORKFLOW_ORGS.clear()
+        _PARENT_WORKFLOWS.clear()
+        _USER_ORGS.clear()
+    elif event["entity"] == "workflow" and event.get("action") == "deleted":
+        _WORKFLOW_ORGS.pop(event.get("id"), None)
+    elif event["entity"] == "member":
+        _USER_ORGS.pop(event.get("id"), None)
+
+
+invalidation.subscribe(_forget_cached_orgs)
+
+
+def _publish(
+    entity: str,
+    action: str,
+    row: Optional[dict] = None,
+    entity_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+    org_id: Optional[str] = None,
+) -> None:
+    """
+    Evict the change from every worker's caches and push it to the real-time
+    feed. Never fails the write that caused it.
+    """
+    try:
+        if org_id is None:
+            org_id = _workflow_org(workflow_id)
+    except Exception as e:
+        # Without the org any cached list may be stale
+        invalidation.publish(invalidation.EVERYTHING)
+        log.error("Error publishing %s %s: %s", entity, action, e)
+        return
+    if entity != "activity":
+        invalidation.publish(
+            entity, entity_id or (row or {}).get("id"), action, org_id=org_id, workflow_id=workflow_id,
+        )
+    try:
+        publish_change(entity, action, row, entity_id=entity_id, org_id=org_id, workflow_id=workflow_id)
+    except Exception as e:
+        log.error("Error publishing %s %s: %s", entity, action, e)
+
+
 # ========== WORKFLOWS ==========
 
 def insert_workflow(data: dict, created_by: Optional[str] = None) -> dict:
@@ -39,15 +170,17 @@ def insert_workflow(data: dict, created_by: Optional[str] = None) -> dict:
         "created_by": None,  # Temporarily disable FK check - user may not exist in users table
     }
     
-    print(f"[DB] Creating workflow: {payload}")
+    log.debug("Creating workflow: %s", redact(payload))
     
     try:
-        rows = sb_insert("workflows", payload)
+        rows = sb_insert("workflows", payload, select=_WORKFLOW_COLUMNS)
         workflow = rows[0] if rows else None
-        print(f"[DB] Created workflow: {workflow}")
+        log.info("Created workflow %s", workflow.get("id") if workflow else None)
         
         # Log activity
         if workflow:
+            _WORKFLOW_ORGS[workflow["id"]] = workflow.get("organization_id")
+            _publish("workflow", "created", workflow, workflow_id=workflow["id"], org_id=workflow.get("organization_id"))
             log_activity(
                 organization_id=workflow.get("organization_id"),
                 workflow_id=workflow.get("id"),
@@ -59,49 +192,126 @@ def insert_workflow(data: dict, created_by: Optional[str] = None) -> dict:
             )
         
         return workflow
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error inserting workflow: {e}")
+        log.error("Error inserting workflow: %s", e)
         raise
 
 
-def get_workflow(workflow_id: str) -> Optional[dict]:
-    """Get a workflow by ID."""
+def _workflow_select(fields: Optional[List[str]]) -> str:
+    """PostgREST select for a workflow projection."""
+    select = select_clause("workflows", fields)
+    if fields is not None and "step_count" in fields and "steps" not in fields:
+        # Let PostgREST count the steps instead of fetching them
+        select += ",workflow_steps(count)"
+    return select
+
+
+def _only_live_workflows(params: dict) -> dict:
+    """
+    Leave out rows that belong to a soft-deleted workflow.
+
+    Embeds the parent workflow without returning any of its columns and
+    filters on its `deleted_at`; rows not tied to a workflow are kept.
+    """
+    params["select"] += ",workflows()"
+    params["workflows.deleted_at"] = "is.null"
+    params["or"] = "(workflow_id.is.null,workflows.not.is.null)"
+    return params
+
+
+def _attach_steps(workflow: dict, fields: Optional[List[str]] = None) -> None:
+    """Fill in `steps`/`step_count` for a workflow row as requested by `fields`."""
+    if fields is None or "steps" in fields:
+        steps = list_steps(workflow["id"])
+        workflow["steps"] = steps
+        if fields is None or "step_count" in fields:
+            workflow["step_count"] = len(steps)
+    elif "step_count" in fields:
+        counted = workflow.pop("workflow_steps", None) or [{}]
+        workflow["step_count"] = counted[0].get("count", 0)
+
+
+def get_workflow(workflow_id: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+    """Get a workflow by ID (with its steps unless `fields` leaves them out)."""
     try:
-        rows = sb_select("workflows", {"id": f"eq.{workflow_id}"})
+        rows = sb_select("workflows", {
+            "id": f"eq.{workflow_id}",
+            "deleted_at": "is.null",
+            "select": _workflow_select(fields),
+        })
         workflow = rows[0] if rows else None
         
         if workflow:
-            # Get steps for this workflow
-            workflow["steps"] = list_steps(workflow_id)
-            workflow["step_count"] = len(workflow["steps"])
+            _attach_steps(workflow, fields)
         
         return workflow
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error getting workflow: {e}")
+        log.error("Error getting workflow: %s", e)
         return None
 
 
-def list_workflows(org_id: Optional[str] = None) -> List[dict]:
-    """List all workflows, optionally filtered by org_id."""
+def list_workflows(
+    org_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """List workflows, newest first, optionally filtered by org_id, projected to `fields` and capped at `limit`."""
     try:
-        params = {}
+        params = {"select": _workflow_select(fields), "deleted_at": "is.null"}
         if org_id and org_id.strip():
             params["organization_id"] = f"eq.{org_id}"
         
         params["order"] = "updated_at.desc"
-        print(f"[DB] Listing workflows with params: {params}")
+        if limit is not None:
+            params["limit"] = str(limit)
+        log.debug("Listing workflows with params: %s", params, extra=SAMPLED)
         rows = sb_select("workflows", params)
-        print(f"[DB] Found {len(rows)} workflows")
+        log.debug("Found %d workflows", len(rows), extra=SAMPLED)
         
-        # Add step count to each workflow
+        # Add steps / step count to each workflow
         for wf in rows:
-            steps = list_steps(wf["id"])
-            wf["step_count"] = len(steps)
-            wf["steps"] = steps
+            _attach_steps(wf, fields)
         
         return rows
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error listing workflows: %s", e)
+        return []
+
+
+def get_workflow_version(workflow_id: str) -> Optional[int]:
+    """
+    Get a workflow's version counter without loading it or its steps.
+
+    The counter is bumped by database triggers whenever the workflow or any of
+    its steps change, so it is enough to validate a cached copy.
+    """
+    try:
+        rows = sb_select("workflows", {"id": f"eq.{workflow_id}", "deleted_at": "is.null", "select": "version"})
+        return rows[0].get("version") if rows else None
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error getting workflow version: %s", e)
+        return None
+
+
+def list_workflow_versions(org_id: Optional[str] = None) -> List[dict]:
+    """List (id, version) pairs for the workflows `list_workflows` would return."""
+    try:
+        params = {"select": "id,version", "deleted_at": "is.null", "order": "updated_at.desc"}
+        if org_id and org_id.strip():
+            params["organization_id"] = f"eq.{org_id}"
+        return sb_select("workflows", params)
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error listing workflows: {e}")
+        log.error("Error listing workflow versions: %s", e)
         return []
 
 
@@ -117,10 +327,11 @@ def update_workflow(workflow_id: str, data: dict, updated_by: Optional[str] = No
         if "status" in data:
             payload["status"] = data["status"]
         
-        rows = sb_update("workflows", {"id": workflow_id}, payload)
+        rows = sb_update("workflows", {"id": workflow_id}, payload, select=_WORKFLOW_COLUMNS, filters=_LIVE)
         workflow = rows[0] if rows else None
         
         if workflow:
+            _publish("workflow", "updated", workflow, workflow_id=workflow_id, org_id=workflow.get("organization_id"))
             log_activity(
                 organization_id=workflow.get("organization_id"),
                 workflow_id=workflow_id,
@@ -132,23 +343,35 @@ def update_workflow(workflow_id: str, data: dict, updated_by: Optional[str] = No
             )
         
         return workflow
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error updating workflow: {e}")
+        log.error("Error updating workflow: %s", e)
         return None
 
 
-def delete_workflow(workflow_id: str, deleted_by: Optional[str] = None) -> bool:
-    """Delete a workflow and its related data."""
+def delete_workflow(workflow_id: str, deleted_by: Optional[str] = None) -> Optional[dict]:
+    """
+    Soft-delete a workflow: one UPDATE, after which every read leaves it out.
+
+    It can be restored for WORKFLOW_UNDELETE_DAYS; the purger then removes
+    it with its steps and comments. Returns the deleted workflow's id,
+    organization_id, title, deleted_at and restorable_until, or None if
+    there is no such (undeleted) workflow.
+    """
     try:
-        # Get workflow for logging
-        workflow = get_workflow(workflow_id)
-        
-        # Delete related data first (cascade should handle this, but be safe)
-        sb_delete("comments", {"workflow_id": workflow_id})
-        sb_delete("workflow_steps", {"workflow_id": workflow_id})
-        sb_delete("workflows", {"id": workflow_id})
+        rows = sb_rpc("soft_delete_workflow", {
+            "wf": workflow_id,
+            "by_user": deleted_by,
+            "window_seconds": int(settings.WORKFLOW_UNDELETE_DAYS * 86400),
+        })
+        workflow = rows[0] if rows else None
         
         if workflow:
+            _publish(
+                "workflow", "deleted", entity_id=workflow_id,
+                workflow_id=workflow_id, org_id=workflow.get("organization_id"),
+            )
             log_activity(
                 organization_id=workflow.get("organization_id"),
                 workflow_id=None,
@@ -159,33 +382,206 @@ def delete_workflow(workflow_id: str, deleted_by: Optional[str] = None) -> bool:
                 details=f"Deleted workflow '{workflow.get('title')}'"
             )
         
-        return True
+        return workflow
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error deleting workflow: {e}")
-        return False
+        log.error("Error deleting workflow: %s", e)
+        return None
+
+
+def restore_workflow(workflow_id: str, restored_by: Optional[str] = None) -> Optional[dict]:
+    """Undo a soft delete within the undelete window; None if there is nothing to restore."""
+    try:
+        rows = sb_rpc("restore_workflow", {
+            "wf": workflow_id,
+            "window_seconds": int(settings.WORKFLOW_UNDELETE_DAYS * 86400),
+        })
+        if not rows:
+            return None
+        
+        workflow = get_workflow(workflow_id)
+        _publish("workflow", "restored", workflow, workflow_id=workflow_id, org_id=rows[0].get("organization_id"))
+        log_activity(
+            organization_id=rows[0].get("organization_id"),
+            workflow_id=workflow_id,
+            user_id=restored_by,
+            entity_type="workflow",
+            entity_id=workflow_id,
+            action="restored",
+            details=f"Restored workflow '{rows[0].get('title')}'"
+        )
+        return workflow
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error restoring workflow: %s", e)
+        return None
+
+
+def list_deleted_workflows(org_id: Optional[str] = None) -> List[dict]:
+    """Soft-deleted workflows that can still be restored, most recently deleted first."""
+    try:
+        since = datetime.now(timezone.utc) - timedelta(days=settings.WORKFLOW_UNDELETE_DAYS)
+        params = {
+            "select": "id,organization_id,title,deleted_at,deleted_by",
+            "deleted_at": f"gt.{since.isoformat()}",
+            "order": "deleted_at.desc",
+        }
+        if org_id and org_id.strip():
+            params["organization_id"] = f"eq.{org_id}"
+        return sb_select("workflows", params)
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error listing deleted workflows: %s", e)
+        return []
+
+
+def purge_deleted_workflows(keep_days: float, batch: int) -> int:
+    """
+    Remove up to `batch` rows belonging to workflows soft-deleted more than
+    `keep_days` ago (comments, history, activity and steps first, then the
+    workflows). Returns the rows removed; 0 once nothing is left. Raises on
+    failure.
+    """
+    return sb_rpc("purge_deleted_workflows", {"keep_seconds": int(keep_days * 86400), "batch": batch}) or 0
+
+
+def clone_workflow(
+    workflow_id: str,
+    org_id: Optional[str] = None,
+    title: Optional[str] = None,
+    created_by: Optional[str] = None,
+    from_template: bool = False,
+) -> Optional[dict]:
+    """
+    Copy a workflow with all its steps into `org_id` (default: its own org)
+    as a new draft. The copy is made by one RPC whatever the number of steps.
+    Returns the new workflow row, or None if the source does not exist (or,
+    with `from_template`, is not a published template).
+    """
+    try:
+        rows = sb_rpc("clone_workflow", {
+            "src": workflow_id,
+            "org": org_id or None,
+            "new_title": title or None,
+            "from_template": from_template,
+        }, select=_WORKFLOW_COLUMNS)
+        workflow = rows[0] if rows else None
+        
+        if workflow:
+            _WORKFLOW_ORGS[workflow["id"]] = workflow.get("organization_id")
+            _publish("workflow", "created", workflow, workflow_id=workflow["id"], org_id=workflow.get("organization_id"))
+            log_activity(
+                organization_id=workflow.get("organization_id"),
+                workflow_id=workflow["id"],
+                user_id=created_by,
+                entity_type="workflow",
+                entity_id=workflow["id"],
+                action="created",
+                details=f"Created workflow '{workflow.get('title')}' from {workflow_id}"
+            )
+        
+        return workflow
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error cloning workflow: %s", e)
+        return None
+
+
+def set_workflow_template(workflow_id: str, is_template: bool, updated_by: Optional[str] = None) -> Optional[dict]:
+    """Publish a workflow to the template library (or withdraw it)."""
+    try:
+        rows = sb_update(
+            "workflows", {"id": workflow_id}, {"is_template": is_template},
+            select=_WORKFLOW_COLUMNS, filters=_LIVE,
+        )
+        workflow = rows[0] if rows else None
+        
+        if workflow:
+            _publish("workflow", "updated", workflow, workflow_id=workflow_id, org_id=workflow.get("organization_id"))
+            log_activity(
+                organization_id=workflow.get("organization_id"),
+                workflow_id=workflow_id,
+                user_id=updated_by,
+                entity_type="workflow",
+                entity_id=workflow_id,
+                action="published" if is_template else "unpublished",
+                details=f"{'Published' if is_template else 'Withdrew'} template '{workflow.get('title')}'"
+            )
+        
+        return workflow
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error updating workflow template: %s", e)
+        return None
+
+
+def list_templates(org_id: Optional[str] = None, fields: Optional[List[str]] = None) -> List[dict]:
+    """Workflows published as templates, by title, optionally only those of `org_id`."""
+    try:
+        params = {
+            "select": _workflow_select(fields),
+            "is_template": "is.true",
+            "deleted_at": "is.null",
+            "order": "title.asc",
+        }
+        if org_id and org_id.strip():
+            params["organization_id"] = f"eq.{org_id}"
+        rows = sb_select("workflows", params)
+        for wf in rows:
+            _attach_steps(wf, fields)
+        return rows
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error listing templates: %s", e)
+        return []
 
 
 # ========== STEPS ==========
 
+def _last_sort_key(workflow_id: str) -> Optional[str]:
+    """Get the highest ordering key in a workflow (one indexed row)."""
+    rows = sb_select("workflow_steps", {
+        "workflow_id": f"eq.{workflow_id}",
+        "select": "sort_key",
+        "order": "sort_key.desc.nullslast",
+        "limit": "1",
+    })
+    return rows[0].get("sort_key") if rows else None
+
+
 def insert_step(data: dict, created_by: Optional[str] = None) -> dict:
-    """Create a new step."""
+    """
+    Create a new step (appended to the end of the workflow).
+
+    Like `move_step`, the returned step carries `needs_rebalance` when its
+    key grew too long: every append lengthens the last key a little.
+    """
+    workflow_id = data.get("workflow_id")
     payload = {
-        "workflow_id": data.get("workflow_id"),
+        "workflow_id": workflow_id,
         "title": data.get("title"),
         "description": data.get("description", ""),
         "status": data.get("status", "pending"),
         "assigned_to": data.get("assigned_to"),
         "order": data.get("order", 0),
+        "sort_key": data.get("sort_key") or key_between(_last_sort_key(workflow_id), None, JITTER_DIGITS),
     }
     
-    print(f"[DB] Creating step: {payload}")
+    log.debug("Creating step: %s", redact(payload))
     
     try:
-        rows = sb_insert("workflow_steps", payload)
+        rows = sb_insert("workflow_steps", payload, select=_STEP_COLUMNS)
         step = rows[0] if rows else None
-        print(f"[DB] Created step: {step}")
+        log.info("Created step %s", step.get("id") if step else None)
         
         if step:
+            _publish("step", "created", step, workflow_id=step.get("workflow_id"))
             log_activity(
                 workflow_id=step.get("workflow_id"),
                 user_id=created_by,
@@ -194,39 +590,49 @@ def insert_step(data: dict, created_by: Optional[str] = None) -> dict:
                 action="created",
                 details=f"Created step '{step.get('title')}'"
             )
+            step["needs_rebalance"] = needs_rebalance(step.get("sort_key"))
         
         return step
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error inserting step: {e}")
+        log.error("Error inserting step: %s", e)
         raise
 
 
 def get_step(step_id: str) -> Optional[dict]:
     """Get a step by ID."""
     try:
-        rows = sb_select("workflow_steps", {"id": f"eq.{step_id}"})
+        rows = sb_select("workflow_steps", _only_live_workflows({"id": f"eq.{step_id}", "select": _STEP_COLUMNS}))
         return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error getting step: {e}")
+        log.error("Error getting step: %s", e)
         return None
 
 
-def list_steps(workflow_id: str) -> List[dict]:
+def list_steps(workflow_id: str, fields: Optional[List[str]] = None) -> List[dict]:
     """List all steps for a workflow."""
     try:
         params = {
             "workflow_id": f"eq.{workflow_id}",
-            "order": "order.asc"
+            "select": select_clause("steps", fields),
+            "order": "sort_key.asc.nullslast,order.asc"
         }
-        return sb_select("workflow_steps", params)
+        return sb_select("workflow_steps", _only_live_workflows(params))
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error listing steps: {e}")
+        log.error("Error listing steps: %s", e)
         return []
 
 
 def update_step(step_id: str, data: dict, updated_by: Optional[str] = None) -> Optional[dict]:
-    """Update a step."""
+    """Update a step (None if it or its workflow is gone)."""
     try:
+        if not get_step(step_id):
+            return None
         payload = {"updated_at": _now_iso()}
         
         if "title" in data:
@@ -240,10 +646,11 @@ def update_step(step_id: str, data: dict, updated_by: Optional[str] = None) -> O
         if "order" in data:
             payload["order"] = data["order"]
         
-        rows = sb_update("workflow_steps", {"id": step_id}, payload)
+        rows = sb_update("workflow_steps", {"id": step_id}, payload, select=_STEP_COLUMNS)
         step = rows[0] if rows else None
         
         if step:
+            _publish("step", "updated", step, workflow_id=step.get("workflow_id"))
             log_activity(
                 workflow_id=step.get("workflow_id"),
                 user_id=updated_by,
@@ -254,30 +661,162 @@ def update_step(step_id: str, data: dict, updated_by: Optional[str] = None) -> O
             )
         
         return step
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error updating step: {e}")
+        log.error("Error updating step: %s", e)
         return None
 
 
-def delete_step(step_id: str, deleted_by: Optional[str] = None) -> bool:
-    """Delete a step."""
+def move_step(
+    step_id: str,
+    prev_id: Optional[str] = None,
+    next_id: Optional[str] = None,
+    moved_by: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    Move a step between two neighbours by giving it a new ordering key.
+
+    Only the moved row is written. `prev_id`/`next_id` are the steps that
+    should end up directly before/after it; omit both to move to the end.
+    The returned step carries `needs_rebalance` when its key grew too long.
+    """
+    if step_id in (prev_id, next_id):
+        return None
     try:
         step = get_step(step_id)
-        sb_delete("workflow_steps", {"id": step_id})
-        
-        if step:
+        if not step:
+            return None
+        workflow_id = step.get("workflow_id")
+
+        neighbour_ids = [i for i in (prev_id, next_id) if i]
+        keys = {}
+        if neighbour_ids:
+            rows = sb_select("workflow_steps", {
+                "id": f"in.({','.join(neighbour_ids)})",
+                "workflow_id": f"eq.{workflow_id}",
+                "select": "id,sort_key",
+            })
+            keys = {r["id"]: r.get("sort_key") for r in rows}
+            if len(keys) != len(neighbour_ids):
+                return None
+            if any(k is None for k in keys.values()):
+                raise ValueError("neighbour steps have no ordering key")
+
+        prev_key = keys.get(prev_id) if prev_id else None
+        next_key = keys.get(next_id) if next_id else None
+
+        # Only one neighbour given: look up the adjacent key on the other side
+        if prev_id and not next_id:
+            rows = sb_select("workflow_steps", {
+                "workflow_id": f"eq.{workflow_id}",
+                "id": f"neq.{step_id}",
+                "sort_key": f"gt.{prev_key}",
+                "select": "sort_key",
+                "order": "sort_key.asc",
+                "limit": "1",
+            })
+            next_key = rows[0]["sort_key"] if rows else None
+        elif next_id and not prev_id:
+            rows = sb_select("workflow_steps", {
+                "workflow_id": f"eq.{workflow_id}",
+                "id": f"neq.{step_id}",
+                "sort_key": f"lt.{next_key}",
+                "select": "sort_key",
+                "order": "sort_key.desc",
+                "limit": "1",
+            })
+            prev_key = rows[0]["sort_key"] if rows else None
+        elif not prev_id and not next_id:
+            prev_key = _last_sort_key(workflow_id)
+            if prev_key == step.get("sort_key"):
+                # Already last
+                return {**step, "needs_rebalance": needs_rebalance(prev_key)}
+
+        new_key = key_between(prev_key, next_key, JITTER_DIGITS)
+        rows = sb_update("workflow_steps", {"id": step_id}, {
+            "sort_key": new_key,
+            "updated_at": _now_iso(),
+        }, select=_STEP_COLUMNS)
+        moved = rows[0] if rows else None
+
+        if moved:
+            _publish("step", "moved", moved, workflow_id=workflow_id)
             log_activity(
-                workflow_id=step.get("workflow_id"),
-                user_id=deleted_by,
+                workflow_id=workflow_id,
+                user_id=moved_by,
                 entity_type="step",
                 entity_id=step_id,
-                action="deleted",
-                details=f"Deleted step '{step.get('title')}'"
+                action="moved",
+                details=f"Moved step '{moved.get('title')}'"
             )
+            moved["needs_rebalance"] = needs_rebalance(new_key)
+
+        return moved
+    except ValueError as e:
+        # Neighbours without keys or given in the wrong order
+        log.warning("Invalid step move: %s", e)
+        return None
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error moving step: %s", e)
+        return None
+
+
+def rebalance_steps(workflow_id: str) -> int:
+    """
+    Respace the ordering keys of a workflow's steps.
+
+    Runs in the background after a move produced an over-long key; rows whose
+    key is already correct are left alone. Returns the number of rows written.
+    """
+    try:
+        rows = sb_select("workflow_steps", {
+            "workflow_id": f"eq.{workflow_id}",
+            "select": "id,sort_key",
+            "order": "sort_key.asc.nullslast,order.asc",
+        })
+        written = 0
+        for row, key in zip(rows, spread_keys(len(rows))):
+            if row.get("sort_key") != key:
+                sb_update("workflow_steps", {"id": row["id"]}, {"sort_key": key})
+                written += 1
+        log.info("Rebalanced %d step keys in workflow %s", written, workflow_id)
+        if written:
+            # One event for the whole workflow; clients refetch its steps
+            _publish("step", "rebalanced", workflow_id=workflow_id)
+        return written
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error rebalancing steps: %s", e)
+        return 0
+
+
+def delete_step(step_id: str, deleted_by: Optional[str] = None) -> bool:
+    """Delete a step (False if it or its workflow is gone)."""
+    try:
+        step = get_step(step_id)
+        if not step:
+            return False
+        sb_delete("workflow_steps", {"id": step_id})
+        
+        _publish("step", "deleted", entity_id=step_id, workflow_id=step.get("workflow_id"))
+        log_activity(
+            workflow_id=step.get("workflow_id"),
+            user_id=deleted_by,
+            entity_type="step",
+            entity_id=step_id,
+            action="deleted",
+            details=f"Deleted step '{step.get('title')}'"
+        )
         
         return True
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error deleting step: {e}")
+        log.error("Error deleting step: %s", e)
         return False
 
 
@@ -293,60 +832,93 @@ def insert_comment(data: dict, created_by: Optional[str] = None) -> dict:
     }
     
     try:
-        rows = sb_insert("comments", payload)
-        return rows[0] if rows else None
+        rows = sb_insert("comments", payload, select=_COMMENT_COLUMNS)
+        comment = rows[0] if rows else None
+        if comment:
+            _publish("comment", "created", comment, workflow_id=comment.get("workflow_id"))
+        return comment
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error inserting comment: {e}")
+        log.error("Error inserting comment: %s", e)
         raise
 
 
-def list_comments(workflow_id: Optional[str] = None, step_id: Optional[str] = None) -> List[dict]:
+def list_comments(
+    workflow_id: Optional[str] = None,
+    step_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> List[dict]:
     """List comments for a workflow or step."""
     try:
-        params = {"order": "created_at.desc"}
+        if step_id and not workflow_id and not get_step(step_id):
+            # Step comments may not carry a workflow_id; the step lookup
+            # leaves out steps of deleted workflows
+            return []
+        params = {"select": select_clause("comments", fields), "order": "created_at.desc"}
         
         if workflow_id:
             params["workflow_id"] = f"eq.{workflow_id}"
         if step_id:
             params["step_id"] = f"eq.{step_id}"
         
-        return sb_select("comments", params)
+        return sb_select("comments", _only_live_workflows(params))
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error listing comments: {e}")
+        log.error("Error listing comments: %s", e)
         return []
 
 
 def update_comment(comment_id: str, data: dict, updated_by: Optional[str] = None) -> Optional[dict]:
-    """Update a comment."""
+    """Update a comment (None if it or its workflow is gone)."""
     try:
+        if not get_comment(comment_id):
+            return None
         payload = {
             "content": data.get("content"),
             "updated_at": _now_iso()
         }
-        rows = sb_update("comments", {"id": comment_id}, payload)
-        return rows[0] if rows else None
+        rows = sb_update("comments", {"id": comment_id}, payload, select=_COMMENT_COLUMNS)
+        comment = rows[0] if rows else None
+        if comment:
+            _publish("comment", "updated", comment, workflow_id=comment.get("workflow_id"))
+        return comment
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error updating comment: {e}")
+        log.error("Error updating comment: %s", e)
         return None
 
 
 def delete_comment(comment_id: str, deleted_by: Optional[str] = None) -> bool:
-    """Delete a comment."""
+    """Delete a comment (False if it or its workflow is gone)."""
     try:
+        comment = get_comment(comment_id)
+        if not comment:
+            return False
         sb_delete("comments", {"id": comment_id})
+        _publish("comment", "deleted", entity_id=comment_id, workflow_id=comment.get("workflow_id"))
         return True
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error deleting comment: {e}")
+        log.error("Error deleting comment: %s", e)
         return False
 
 
 def get_comment(comment_id: str) -> Optional[dict]:
     """Get a comment by ID."""
     try:
-        rows = sb_select("comments", {"id": f"eq.{comment_id}"})
-        return rows[0] if rows else None
+        rows = sb_select("comments", _only_live_workflows({"id": f"eq.{comment_id}", "select": _COMMENT_COLUMNS}))
+        comment = rows[0] if rows else None
+        if comment and not comment.get("workflow_id") and comment.get("step_id") and not get_step(comment["step_id"]):
+            return None
+        return comment
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error getting comment: {e}")
+        log.error("Error getting comment: %s", e)
         return None
 
 
@@ -372,19 +944,25 @@ def log_activity(
             "action": action,
             "details": details,
         }
-        sb_insert("activity_logs", payload)
+        rows = sb_insert("activity_logs", payload)
+        if rows:
+            _publish("activity", "created", rows[0], workflow_id=workflow_id, org_id=organization_id)
     except Exception as e:
-        print(f"[DB] Error logging activity: {e}")
+        log.error("Error logging activity: %s", e)
 
 
 def list_activities(
     org_id: Optional[str] = None,
     workflow_id: Optional[str] = None,
-    user_id: Optional[str] = None
+    user_id: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
 ) -> List[dict]:
-    """List activity logs."""
+    """List activity logs, newest first."""
     try:
-        params = {"order": "created_at.desc"}
+        params = {"select": select_clause("activities", fields), "order": "created_at.desc"}
+        if limit is not None:
+            params["limit"] = str(limit)
         
         if org_id and org_id.strip():
             params["organization_id"] = f"eq.{org_id}"
@@ -393,20 +971,226 @@ def list_activities(
         if user_id:
             params["user_id"] = f"eq.{user_id}"
         
-        return sb_select("activity_logs", params)
+        return sb_select("activity_logs", _only_live_workflows(params))
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error listing activities: {e}")
+        log.error("Error listing activities: %s", e)
         return []
 
 
+# ========== SEARCH ==========
+
+# ts_headline marks matches with these control characters; the snippet is
+# HTML-escaped afterwards and the markers are swapped for <mark> tags.
+_HL_START, _HL_STOP = "\x02", "\x03"
+
+
+def _render_snippet(snippet: Optional[str]) -> str:
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_HL_START, "<mark>").replace(_HL_STOP, "</mark>")
+
+
+def search(q: str, org_id: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Ranked full-text search over workflows, steps and comments.
+
+    Runs the `search_org` Postgres function (GIN-indexed tsvector columns);
+    one extra row is requested to tell whether another page exists.
+    """
+    try:
+        rows = sb_rpc("search_org", {
+            "q": q,
+            "org": org_id or None,
+            "lim": limit + 1,
+            "off": offset,
+            "hl_start": _HL_START,
+            "hl_stop": _HL_STOP,
+        })
+        for row in rows:
+            row["snippet"] = _render_snippet(row.get("snippet"))
+        return {"results": rows[:limit], "has_more": len(rows) > limit}
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error searching: %s", e)
+        return {"results": [], "has_more": False}
+
+
+# ========== SYNC ==========
+
+def sync(
+    org_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 1000,
+    after: Optional[Dict[str, list]] = None,
+) -> Optional[dict]:
+    """
+    Rows changed since `since` (None = everything) plus deletion tombstones.
+
+    Runs the `sync_org` Postgres function: one round trip, each list read from
+    an `updated_at`/`deleted_at` index in (change time, id) order and capped
+    at `limit`. `after` continues cut-off lists past the given (change time,
+    id) positions and skips the others. The returned `now` is database time,
+    used as the next watermark.
+    """
+    try:
+        page = sb_rpc("sync_org", {
+            "org": org_id or None,
+            "since": since.isoformat() if since else None,
+            "lim": limit,
+            "after": after,
+        })
+        page["now"] = datetime.fromisoformat(page["now"])
+        return page
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error syncing: %s", e)
+        return None
+
+
+def purge_tombstones(keep_days: int) -> int:
+    """Drop deletion tombstones older than `keep_days`."""
+    try:
+        purged = sb_rpc("purge_deleted_records", {"keep_days": keep_days})
+        log.info("Purged %s tombstones", purged)
+        return purged or 0
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error purging tombstones: %s", e)
+        return 0
+
+
+# ========== WORKFLOW HISTORY ==========
+
+def insert_workflow_revision(revision: dict) -> Optional[dict]:
+    """Store one history row (see history.py); None if it could not be stored."""
+    try:
+        rows = sb_insert("workflow_revisions", revision)
+        return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error storing workflow revision: %s", e)
+        return None
+
+
+def list_workflow_revisions(
+    workflow_id: str,
+    limit: Optional[int] = None,
+    before: Optional[int] = None,
+    with_data: bool = False,
+) -> List[dict]:
+    """History rows of a workflow, newest first; `before` pages back, `with_data` adds snapshot/patch."""
+    try:
+        params = {
+            "workflow_id": f"eq.{workflow_id}",
+            "select": "version,kind,base_version,depth,chain_bytes,created_at" + (",data" if with_data else ""),
+            "order": "version.desc",
+        }
+        if before is not None:
+            params["version"] = f"lt.{before}"
+        if limit is not None:
+            params["limit"] = str(limit)
+        return sb_select("workflow_revisions", params)
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        log.error("Error listing workflow revisions: %s", e)
+        return []
+
+
+# ========== EXPORT / IMPORT ==========
+
+def _in_list(ids: Iterable[str]) -> str:
+    return "in.(" + ",".join(ids) + ")"
+
+
+def export_page(
+    table: str,
+    filters: Dict[str, str],
+    columns: List[str],
+    after: Optional[str] = None,
+    limit: int = 1000,
+) -> List[dict]:
+    """
+    Next `limit` rows of `table` matching `filters`, by id after `after`
+    (keyset pagination: each page is an index range scan however deep the
+    export is). Raises on failure, so an export is never silently cut short.
+    """
+    params = dict(filters, select=",".join(columns), order="id.asc", limit=str(limit))
+    if after is not None:
+        params["id"] = f"gt.{after}"
+    return sb_select(table, params)
+
+
+def export_children(table: str, workflow_ids: List[str], columns: List[str], after: Optional[str], limit: int) -> List[dict]:
+    """export_page over the rows of `table` belonging to `workflow_ids`."""
+    return export_page(table, {"workflow_id": _in_list(workflow_ids)}, columns, after, limit)
+
+
+def import_rows(table: str, rows: List[dict]) -> List[str]:
+    """
+    Insert rows keeping their ids, in one request. Rows whose id already
+    exists are skipped (so a failed import can simply be run again). Returns
+    the ids inserted; raises on failure.
+    """
+    if not rows:
+        return []
+    return [r["id"] for r in sb_insert(table, rows, on_conflict="id", select="id")]
+
+
+def workflows_in_org(org_id: str, workflow_ids: Iterable[str]) -> Set[str]:
+    """Which of `workflow_ids` belong to `org_id`."""
+    ids = list(workflow_ids)
+    if not ids:
+        return set()
+    rows = sb_select("workflows", {"id": _in_list(ids), "organization_id": f"eq.{org_id}", "select": "id"})
+    return {r["id"] for r in rows}
+
+
+def step_workflows(step_ids: Iterable[str]) -> Dict[str, str]:
+    """The workflow of each of `step_ids` that exists."""
+    ids = list(step_ids)
+    if not ids:
+        return {}
+    rows = sb_select("workflow_steps", {"id": _in_list(ids), "select": "id,workflow_id"})
+    return {r["id"]: r["workflow_id"] for r in rows}
+
+
+def existing_users(user_ids: Iterable[str]) -> Set[str]:
+    """Which of `user_ids` exist."""
+    ids = list(user_ids)
+    if not ids:
+        return set()
+    return {r["id"] for r in sb_select("users", {"id": _in_list(ids), "select": "id"})}
+
+
+def record_import(org_id: str, imported_by: Optional[str], counts: Dict[str, int]) -> None:
+    """Evict the org's cached lists and log the import after rows were written in bulk."""
+    _publish("workflow", "imported", org_id=org_id)
+    log_activity(
+        organization_id=org_id,
+        user_id=imported_by,
+        entity_type="organization",
+        entity_id=org_id,
+        action="imported",
+        details="Imported " + ", ".join(f"{n} {kind}s" for kind, n in counts.items()),
+    )
+
+
 # ========== ORGANIZATIONS ==========
 
 def list_organizations(user_id: Optional[str] = None) -> List[dict]:
     """List organizations."""
     try:
         return sb_select("organizations", {"order": "created_at.desc"})
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error listing organizations: {e}")
+        log.error("Error listing organizations: %s", e)
         return []
 
 
@@ -415,8 +1199,10 @@ def get_organization(org_id: str) -> Optional[dict]:
     try:
         rows = sb_select("organizations", {"id": f"eq.{org_id}"})
         return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error getting organization: {e}")
+        log.error("Error getting organization: %s", e)
         return None
 
 
@@ -429,9 +1215,13 @@ def insert_organization(data: dict, created_by: Optional[str] = None) -> dict:
             "created_by": created_by,
         }
         rows = sb_insert("organizations", payload)
-        return rows[0] if rows else None
+        org = rows[0] if rows else None
+        invalidation.publish("organization", org and org.get("id"), "created", org_id=org and org.get("id"))
+        return org
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error inserting organization: {e}")
+        log.error("Error inserting organization: %s", e)
         raise
 
 
@@ -445,9 +1235,12 @@ def update_organization(org_id: str, data: dict) -> Optional[dict]:
             payload["description"] = data["description"]
         
         rows = sb_update("organizations", {"id": org_id}, payload)
+        invalidation.publish("organization", org_id, "updated", org_id=org_id)
         return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error updating organization: {e}")
+        log.error("Error updating organization: %s", e)
         return None
 
 
@@ -458,8 +1251,10 @@ def get_user(user_id: str) -> Optional[dict]:
     try:
         rows = sb_select("users", {"id": f"eq.{user_id}"})
         return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error getting user: {e}")
+        log.error("Error getting user: %s", e)
         return None
 
 
@@ -480,6 +1275,7 @@ def upsert_user(user_id: str, data: dict) -> Optional[dict]:
                 payload["phone"] = data["phone"]
             
             rows = sb_update("users", {"id": user_id}, payload)
+            invalidation.publish("user", user_id, "updated")
             return rows[0] if rows else existing
         else:
             payload = {
@@ -490,9 +1286,12 @@ def upsert_user(user_id: str, data: dict) -> Optional[dict]:
                 "phone": data.get("phone"),
             }
             rows = sb_insert("users", payload)
+            invalidation.publish("user", user_id, "created")
             return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error upserting user: {e}")
+        log.error("Error upserting user: %s", e)
         return None
 
 
@@ -506,8 +1305,10 @@ def get_org_members(org_id: str) -> List[dict]:
             "order": "joined_at.desc"
         })
         return rows
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error getting org members: {e}")
+        log.error("Error getting org members: %s", e)
         return []
 
 
@@ -520,9 +1321,12 @@ def add_org_member(org_id: str, user_id: str, role: str = "member") -> Optional[
             "role": role,
         }
         rows = sb_insert("organization_members", payload)
+        invalidation.publish("member", user_id, "created", org_id=org_id)
         return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error adding org member: {e}")
+        log.error("Error adding org member: %s", e)
         return None
 
 
@@ -533,9 +1337,12 @@ def remove_org_member(org_id: str, user_id: str) -> bool:
             "organization_id": org_id,
             "user_id": user_id
         })
+        invalidation.publish("member", user_id, "deleted", org_id=org_id)
         return True
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error removing org member: {e}")
+        log.error("Error removing org member: %s", e)
         return False
 
 
@@ -546,8 +1353,11 @@ def update_member_role(org_id: str, user_id: str, role: str) -> Optional[dict]:
             "organization_id": org_id,
             "user_id": user_id
         }, {"role": role})
+        invalidation.publish("member", user_id, "updated", org_id=org_id)
         return rows[0] if rows else None
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        print(f"[DB] Error updating member role: {e}")
+        log.error("Error updating member role: %s", e)
         return None
 
@@ -0,0 +1,310 @@
+"""
+Streaming export and import of an organization's workflows as NDJSON.
+
+An export is one JSON object per line:
+
+    {"type": "export", "format": 1, "organization": {...}, "exported_at": "..."}
+    {"type": "workflow", "data": {...}}
+    {"type": "step", "data": {...}}
+    {"type": "comment", "data": {...}}
+    {"type": "activity", "data": {...}}
+    {"type": "end", "counts": {"workflow": 12, "step": 340, ...}}
+
+Workflows are read ORG_EXPORT_PAGE_SIZE at a time by keyset pagination, and
+each page of workflows is followed by their steps and comments, so a parent
+always comes before its children. Activity comes last. The export never
+holds more than one page, whatever the size of the org.
+
+The importer parses the request body line by line as it arrives and writes
+each kind in batches of ORG_IMPORT_BATCH_SIZE rows (one request per batch),
+again in parent-before-child order. Ids are kept and rows that already exist
+are skipped, so an interrupted import can be sent again. Rows are always
+written into the target organization:
+- steps, comments and activity that point at a workflow of another org, and
+  comments that point at a step of another org, are rejected;
+- user references to users that do not exist here are cleared.
+"""
+
+import collections
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import anyio
+
+from app.services.supabase_db import (
+    existing_users, export_children, export_page, import_rows, record_import, step_workflows, workflows_in_org,
+)
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+from app.utils.projection import COLUMNS
+
+log = get_logger("transfer")
+
+TRANSFER_ROWS = Counter(
+    "org_transfer_rows_total", "Rows exported or imported, by direction and type.", ("direction", "type"),
+)
+
+FORMAT = 1
+
+# type -> (table, exported columns)
+KINDS = {
+    "workflow": ("workflows", COLUMNS["workflows"]),
+    "step": ("workflow_steps", COLUMNS["steps"]),
+    "comment": ("comments", COLUMNS["comments"]),
+    "activity": ("activity_logs", COLUMNS["activities"]),
+}
+
+# Columns an import may set; updated_at is left to the database so delta sync
+# picks the rows up, and organization_id is always the target org
+IMPORT_COLUMNS = {
+    "workflow": ("id", "title", "description", "status", "is_template", "cloned_from", "created_by", "created_at"),
+    "step": ("id", "workflow_id", "title", "description", "status", "assigned_to", "order", "sort_key", "created_at"),
+    "comment": ("id", "workflow_id", "step_id", "user_id", "content", "created_at"),
+    "activity": (
+        "id", "workflow_id", "user_id", "entity_type", "entity_id", "action", "details", "created_at",
+    ),
+}
+# User foreign keys, cleared when the user does not exist here
+USER_COLUMNS = {"workflow": "created_by", "step": "assigned_to", "activity": "user_id"}
+REQUIRED = {
+    "workflow": ("id", "title"),
+    "step": ("id", "workflow_id", "title"),
+    "comment": ("id", "workflow_id", "content"),
+    "activity": ("id", "entity_type", "action"),
+}
+
+# Workflow ids per `in.(...)` filter; keeps the PostgREST URL short
+_WORKFLOWS_PER_QUERY = 100
+# Ids remembered by an import before the caches start over
+_ID_CACHE_SIZE = 100_000
+
+
+def _line(kind: str, data) -> bytes:
+    return json.dumps({"type": kind, "data": data}, default=str, separators=(",", ":")).encode() + b"\n"
+
+
+def _header(org: dict) -> bytes:
+    return json.dumps({
+        "type": "export",
+        "format": FORMAT,
+        "organization": org,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }, default=str, separators=(",", ":")).encode() + b"\n"
+
+
+# ========== EXPORT ==========
+
+async def export_org(org: dict, page_size: int) -> AsyncIterator[bytes]:
+    """NDJSON lines for `org`, one chunk per page read."""
+    counts: collections.Counter = collections.Counter()
+    yield _header(org)
+
+    async def pages(read, *args) -> AsyncIterator[List[dict]]:
+        after = None
+        while True:
+            rows = await anyio.to_thread.run_sync(read, *args, after, page_size)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after = rows[-1]["id"]
+
+    def chunk(kind: str, rows: List[dict]) -> bytes:
+        counts[kind] += len(rows)
+        TRANSFER_ROWS.inc(("export", kind), len(rows))
+        return b"".join(_line(kind, row) for row in rows)
+
+    workflow_filter = {"organization_id": f"eq.{org['id']}", "deleted_at": "is.null"}
+    async for workflows in pages(export_page, "workflows", workflow_filter, KINDS["workflow"][1]):
+        yield chunk("workflow", workflows)
+        ids = [w["id"] for w in workflows]
+        for start in range(0, len(ids), _WORKFLOWS_PER_QUERY):
+            group = ids[start:start + _WORKFLOWS_PER_QUERY]
+            for kind in ("step", "comment"):
+                table, columns = KINDS[kind]
+                async for rows in pages(export_children, table, group, columns):
+                    yield chunk(kind, rows)
+
+    table, columns = KINDS["activity"]
+    async for rows in pages(export_page, table, {"organization_id": f"eq.{org['id']}"}, columns):
+        yield chunk("activity", rows)
+
+    yield json.dumps({"type": "end", "counts": dict(counts)}, separators=(",", ":")).encode() + b"\n"
+
+
+# ========== IMPORT ==========
+
+class MalformedImport(ValueError):
+    """The import stream is not a valid export; `line` is the 1-based line number."""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(message)
+        self.line = line
+
+
+class _BoundedSet(set):
+    def add_all(self, items: Iterable[str]) -> None:
+        if len(self) > _ID_CACHE_SIZE:
+            self.clear()
+        self.update(items)
+
+
+class OrgImporter:
+    """Feed it NDJSON chunks; rows are written in batches as they fill."""
+
+    def __init__(self, org_id: str, batch_size: int, max_line_bytes: int):
+        self.org_id = org_id
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+        self.imported: collections.Counter = collections.Counter()
+        self.skipped: collections.Counter = collections.Counter()  # already there
+        self.rejected: collections.Counter = collections.Counter()  # pointing at another org's workflow
+        self.expected: Optional[Dict[str, int]] = None  # from the end line
+        self.complete = False
+        self._header_seen = False
+        self._buffers: Dict[str, List[dict]] = {kind: [] for kind in KINDS}
+        self._pending = b""
+        self._lines = 0
+        self._own_workflows = _BoundedSet()
+        self._own_steps = _BoundedSet()
+        self._known_users = _BoundedSet()
+        self._unknown_users = _BoundedSet()
+
+    async def feed(self, chunk: bytes) -> None:
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+        for raw in lines:
+            self._check_length(raw)
+            await self._handle(raw)
+        self._check_length(self._pending)
+
+    def _check_length(self, raw: bytes) -> None:
+        if len(raw) > self.max_line_bytes:
+            raise MalformedImport(f"Line longer than {self.max_line_bytes} bytes", self._lines + 1)
+
+    async def finish(self) -> None:
+        if self._pending.strip():
+            await self._handle(self._pending)
+        self._pending = b""
+        if not self._header_seen:
+            raise MalformedImport("Empty import", 1)
+        await self._flush()
+
+    async def _handle(self, raw: bytes) -> None:
+        self._lines += 1
+        if not raw.strip():
+            return
+        if self.complete:
+            raise MalformedImport("Data after the end line", self._lines)
+        try:
+            record = json.loads(raw)
+            kind = record["type"]
+        except (ValueError, TypeError, KeyError):
+            raise MalformedImport("Not a JSON object with a type", self._lines)
+        if not self._header_seen:
+            if kind != "export" or record.get("format") != FORMAT:
+                raise MalformedImport(f"Expected an export header of format {FORMAT}", self._lines)
+            self._header_seen = True
+            return
+        if kind == "end":
+            self.expected = record.get("counts") or {}
+            self.complete = True
+            return
+        if kind not in KINDS or not isinstance(record.get("data"), dict):
+            raise MalformedImport(f"Unknown record type {kind!r}", self._lines)
+
+        data = record["data"]
+        missing = [c for c in REQUIRED[kind] if data.get(c) in (None, "")]
+        if missing:
+            raise MalformedImport(f"{kind} without {', '.join(missing)}", self._lines)
+        row = {c: data[c] for c in IMPORT_COLUMNS[kind] if c in data}
+        if kind in ("workflow", "activity"):
+            row["organization_id"] = self.org_id
+        buffer = self._buffers[kind]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        # Parents first, so every child's workflow exists when it is written
+        for kind in KINDS:
+            rows, self._buffers[kind] = self._buffers[kind], []
+            if rows:
+                await anyio.to_thread.run_sync(self._write, kind, rows)
+
+    def _learn_workflows(self, workflow_ids: Iterable[str]) -> None:
+        unknown = list(set(workflow_ids) - self._own_workflows)
+        for start in range(0, len(unknown), _WORKFLOWS_PER_QUERY):
+            self._own_workflows.add_all(workflows_in_org(self.org_id, unknown[start:start + _WORKFLOWS_PER_QUERY]))
+
+    def _learn_steps(self, step_ids: Iterable[str]) -> None:
+        unknown = list(set(step_ids) - self._own_steps)
+        for start in range(0, len(unknown), _WORKFLOWS_PER_QUERY):
+            parents = step_workflows(unknown[start:start + _WORKFLOWS_PER_QUERY])
+            self._learn_workflows(parents.values())
+            self._own_steps.add_all(s for s, w in parents.items() if w in self._own_workflows)
+
+    def _write(self, kind: str, rows: List[dict]) -> None:
+        if kind != "workflow":
+            self._learn_workflows(r["workflow_id"] for r in rows if r.get("workflow_id"))
+            if kind == "comment":
+                self._learn_steps(r["step_id"] for r in rows if r.get("step_id"))
+            allowed = [
+                r for r in rows
+                if (not r.get("workflow_id") or r["workflow_id"] in self._own_workflows)
+                and (not r.get("step_id") or r["step_id"] in self._own_steps)
+            ]
+            self.rejected[kind] += len(rows) - len(allowed)
+            rows = allowed
+
+        user_column = USER_COLUMNS.get(kind)
+        if user_column:
+            users = {r[user_column] for r in rows if r.get(user_column)}
+            unknown = users - self._known_users - self._unknown_users
+            if unknown:
+                found = existing_users(unknown)
+                self._known_users.add_all(found)
+                self._unknown_users.add_all(unknown - found)
+            for r in rows:
+                if r.get(user_column) in self._unknown_users:
+                    r[user_column] = None
+
+        table = KINDS[kind][0]
+        inserted = import_rows(table, rows)
+        if kind == "workflow":
+            self._own_workflows.add_all(inserted)
+        elif kind == "step":
+            self._own_steps.add_all(inserted)
+        self.imported[kind] += len(inserted)
+        self.skipped[kind] += len(rows) - len(inserted)
+        TRANSFER_ROWS.inc(("import", kind), len(inserted))
+
+    def result(self) -> dict:
+        return {
+            "complete": self.complete,
+            "imported": dict(self.imported),
+            "skipped": dict(self.skipped),
+            "rejected": dict(self.rejected),
+            "expected": self.expected,
+        }
+
+
+async def import_org(org_id: str, chunks: AsyncIterator[bytes], imported_by: Optional[str], **options) -> dict:
+    """
+    Import an NDJSON export into `org_id`. Raises MalformedImport on a malformed
+    stream, with what was written before it as `result`.
+    """
+    importer = OrgImporter(org_id, **options)
+    try:
+        async for chunk in chunks:
+            await importer.feed(chunk)
+        await importer.finish()
+    except MalformedImport as e:
+        e.result = importer.result()
+        raise
+    finally:
+        if importer.imported:
+            await anyio.to_thread.run_sync(record_import, org_id, imported_by, dict(importer.imported))
+    return importer.result()
@@ -0,0 +1,74 @@
+"""
+Admission control: shed low-priority requests while the worker is overloaded.
+
+Requests under ADMISSION_LOW_PRIORITY_PATHS (AI by default) are answered
+with a 503 and Retry-After while the event loop lags more than
+ADMISSION_MAX_LAG_MS or more than ADMISSION_MAX_IN_FLIGHT requests are being
+served, so interactive CRUD keeps its latency. Other requests are always
+admitted. Long-lived streams are not counted as in flight.
+"""
+
+from typing import Optional, Sequence
+
+from app.utils import loop_monitor
+from app.utils.metrics import Counter
+from app.utils.responses import FastJSONResponse
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Low-priority requests shed by admission control, by reason.",
+    ("reason",),
+)
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware; see the module docstring."""
+
+    def __init__(
+        self,
+        app,
+        max_lag_ms: float,
+        max_in_flight: int,
+        low_priority: Sequence[str] = ("/api/v1/ai/",),
+        uncounted: Sequence[str] = ("/api/v1/stream",),
+    ):
+        self.app = app
+        self.max_lag = max_lag_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.low_priority = tuple(low_priority)
+        self.uncounted = tuple(uncounted)
+        self.in_flight = 0
+
+    def _overloaded(self) -> Optional[str]:
+        if loop_monitor.recent_lag() > self.max_lag:
+            return "loop_lag"
+        if self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.uncounted):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"].startswith(self.low_priority):
+            reason = self._overloaded()
+            if reason is not None:
+                ADMISSION_REJECTIONS.inc((reason,))
+                response = FastJSONResponse(
+                    {
+                        "success": False,
+                        "status": "degraded",
+                        "reason": reason,
+                        "detail": "The server is busy, please retry shortly",
+                    },
+                    status_code=503,
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -1,5 +1,5 @@
-import boto3
 from app.config import settings
+from app.utils import sdk
 
 _s3_client = None
 
@@ -7,7 +7,7 @@ def get_s3_client():
     """Get AWS S3 client"""
     global _s3_client
     if _s3_client is None:
-        _s3_client = boto3.client(
+        _s3_client = sdk.boto3().client(
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
@@ -0,0 +1,154 @@
+import gzip
+from typing import Optional
+
+import anyio
+
+from app.utils.etag import encoded_etag, has_encoded_etag
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/x-ndjson")
+
+# Bodies above this are compressed in a worker thread to keep the event loop free
+THREAD_THRESHOLD = 256 * 1024
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q-values."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    wildcard = weights.get("*", 0.0)
+    candidates = []
+    if brotli is not None:
+        candidates.append("br")
+    candidates.append("gzip")
+
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        # Low quality levels are much cheaper and still beat gzip on JSON
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip compression for complete (non-streaming) responses.
+
+    Only single-chunk bodies at or above `minimum_size` with a compressible
+    content type are compressed. Streaming responses (SSE, NDJSON exports)
+    pass through untouched so they are never buffered.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        if_none_match = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+            elif name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+        encoding = negotiate_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # A 304 has no body to compress, but must carry the ETag the
+                    # 200 would have: tagged, if the copy the client holds was
+                    # compressed (and so this one would be too)
+                    if has_encoded_etag(if_none_match):
+                        message["headers"] = [
+                            (k, encoded_etag(v.decode("latin-1"), encoding).encode("latin-1") if k == b"etag" else v)
+                            for k, v in message.get("headers", [])
+                        ]
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = start_message.get("headers", [])
+            content_type = ""
+            already_encoded = False
+            for name, value in headers:
+                if name == b"content-type":
+                    content_type = value.decode("latin-1")
+                elif name == b"content-encoding":
+                    already_encoded = True
+
+            body = message.get("body", b"")
+            compressible = content_type.startswith(COMPRESSIBLE_TYPES) and not already_encoded
+
+            if (
+                not compressible
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                if compressible:
+                    start_message["headers"] = list(headers) + [(b"vary", b"Accept-Encoding")]
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_THRESHOLD:
+                compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            new_headers = []
+            for k, v in headers:
+                if k == b"content-length":
+                    continue
+                if k == b"etag":
+                    v = encoded_etag(v.decode("latin-1"), encoding).encode("latin-1")
+                new_headers.append((k, v))
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            start_message["headers"] = new_headers
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
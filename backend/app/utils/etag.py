@@ -0,0 +1,59 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+
+# Clients may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+ENCODING_SUFFIXES = ("gzip", "br")
+
+
+def compute_etag(*parts: Any) -> str:
+    """Build a strong ETag from version components (ids, version counters, ...)."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    Tag a strong ETag with a content-coding suffix ("abc" -> "abc-gzip").
+
+    Compressed bytes differ from the identity body, so a strong validator must
+    differ as well; `etag_matches` strips the suffix again.
+    """
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def _strip_encoding(etag: str) -> str:
+    for encoding in ENCODING_SUFFIXES:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def has_encoded_etag(if_none_match: Optional[str]) -> bool:
+    """Whether an If-None-Match header holds an ETag tagged by `encoded_etag`."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return any(_strip_encoding(c) != c for c in candidates)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    return any(_strip_encoding(c.removeprefix("W/")) == etag for c in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current validator."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
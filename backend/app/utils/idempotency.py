@@ -0,0 +1,373 @@
+"""
+Idempotency-Key support for mutating requests.
+
+Clients that retry on timeouts send the same `Idempotency-Key` header with
+every attempt. The first request with a key runs; its response is stored and
+every retry gets that response back (with `Idempotent-Replayed: true`)
+without running the route again, so a retried create makes no duplicate and
+a retried AI call is not billed twice:
+
+- A retry that arrives while the original is still running waits for it (up
+  to IDEMPOTENCY_WAIT_SECONDS, then 409 with Retry-After).
+- Keys are scoped to the caller's token, method and path; reusing a key with
+  a different body is a 422.
+- Responses are kept for IDEMPOTENCY_TTL_SECONDS. 5xx and 429 responses are
+  not kept, so those retries run again.
+- The body is buffered for the fingerprint, so only bodies of at most
+  IDEMPOTENCY_MAX_BODY_BYTES are guarded; larger uploads (org imports)
+  stream through unguarded once that much has been read (or at once, given
+  a larger Content-Length). A response larger than that is passed on but
+  not kept.
+- Stored responses live in an IdempotencyStore: in memory (bounded LRU) by
+  default, or the idempotency_keys table with IDEMPOTENCY_STORE=supabase,
+  which also covers a retry landing on another worker.
+"""
+
+import asyncio
+import base64
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+
+from app.config import settings
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+from app.utils.responses import FastJSONResponse
+from app.utils.supabase import sb_delete, sb_rpc, sb_update
+
+log = get_logger("idempotency")
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Requests with an Idempotency-Key by result (new, replayed, in_progress, mismatch, skipped).",
+    ("result",),
+)
+
+MUTATING_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+MAX_KEY_LENGTH = 255
+_POLL_INTERVAL = 0.1
+# Returned by _existing when the store is down: run the request unguarded
+_UNGUARDED = object()
+
+
+def _replayable(status: int) -> bool:
+    """Responses worth replaying; anything else may be retried for real."""
+    return status < 500 and status != 429
+
+
+class StoredResponse:
+    """A claimed key: the request's fingerprint and, once it finished, its response."""
+
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires")
+
+    def __init__(
+        self,
+        fingerprint: str,
+        status: Optional[int] = None,
+        headers: Optional[List[Tuple[str, str]]] = None,
+        body: bytes = b"",
+        expires: float = 0.0,
+    ):
+        self.fingerprint = fingerprint
+        self.status = status  # None while the original request runs
+        self.headers = headers or []
+        self.body = body
+        self.expires = expires
+
+    @property
+    def pending(self) -> bool:
+        return self.status is None
+
+    def response(self) -> Response:
+        response = Response(self.body, status_code=self.status)
+        for name, value in self.headers:
+            response.headers.append(name, value)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+
+# ========== STORES ==========
+
+class IdempotencyStore:
+    """Where claimed keys and their responses live."""
+
+    # False if calls may do I/O (they are then run off the event loop)
+    local = True
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Claim `key` for a new request: None if claimed, else what the key already holds."""
+        raise NotImplementedError
+
+    def complete(self, key: str, stored: StoredResponse) -> None:
+        raise NotImplementedError
+
+    def release(self, key: str) -> None:
+        """Forget a claim whose request failed, so a retry runs again."""
+        raise NotImplementedError
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """This worker's keys, at most `max_entries` (least recently used go first)."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            self._entries[key] = StoredResponse(fingerprint, expires=time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return None
+
+    def complete(self, key: str, stored: StoredResponse) -> None:
+        stored.expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = stored
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SupabaseIdempotencyStore(IdempotencyStore):
+    """
+    Keys in the idempotency_keys table, shared by every worker.
+
+    A claim expires after `pending_ttl` seconds unless its request completes,
+    so a key whose worker died mid-request can be used again.
+    """
+
+    local = False
+
+    def __init__(self, ttl: float, pending_ttl: float = 120.0):
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+
+    @staticmethod
+    def _from_row(row: dict) -> StoredResponse:
+        return StoredResponse(
+            row["fingerprint"],
+            row.get("status"),
+            [tuple(h) for h in row.get("headers") or []],
+            base64.b64decode(row.get("body") or ""),
+        )
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        rows = sb_rpc("claim_idempotency_key", {
+            "p_key": key,
+            "p_fingerprint": fingerprint,
+            "p_ttl_seconds": int(self.pending_ttl),
+        })
+        return self._from_row(rows[0]) if rows else None
+
+    def complete(self, key: str, stored: StoredResponse) -> None:
+        sb_update("idempotency_keys", {"key": key}, {
+            "status": stored.status,
+            "headers": [list(h) for h in stored.headers],
+            "body": base64.b64encode(stored.body).decode("ascii"),
+            "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=self.ttl)).isoformat(),
+        })
+
+    def release(self, key: str) -> None:
+        sb_delete("idempotency_keys", {"key": key})
+
+
+def _make_store() -> IdempotencyStore:
+    if settings.IDEMPOTENCY_STORE == "supabase":
+        return SupabaseIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS)
+    return MemoryIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_ENTRIES)
+
+
+_store: IdempotencyStore = _make_store()
+
+
+def set_idempotency_store(store: IdempotencyStore) -> None:
+    """Use another idempotency store (e.g. one backed by a different shared service)."""
+    global _store
+    _store = store
+
+
+async def _call(fn, *args):
+    if _store.local:
+        return fn(*args)
+    return await anyio.to_thread.run_sync(fn, *args)
+
+
+# ========== MIDDLEWARE ==========
+
+def _prepend(body: bytes, more: bool, receive):
+    """A receive() that first returns the already read `body`, then the rest of the stream."""
+    sent = False
+
+    async def prepended():
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": more}
+
+    return prepended
+
+
+def _error(status: int, detail: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return FastJSONResponse({"success": False, "detail": detail}, status_code=status, headers=headers)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; see the module docstring."""
+
+    def __init__(self, app, wait_seconds: float = 30.0, max_body: int = 1024 * 1024):
+        self.app = app
+        self.wait_seconds = wait_seconds
+        self.max_body = max_body
+        # Requests of this worker running under a key; duplicates wait on these
+        self._running: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+
+        length = headers.get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_body:
+            IDEMPOTENCY_REQUESTS.inc(("skipped",))
+            await self.app(scope, receive, send)
+            return
+
+        # The whole body is needed for the fingerprint; the route gets it replayed
+        chunks = []
+        size = 0
+        more = True
+        while more and size <= self.max_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # client gone
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        if size > self.max_body:
+            # A streamed upload too big to fingerprint: pass it on unguarded
+            IDEMPOTENCY_REQUESTS.inc(("skipped",))
+            await self.app(scope, _prepend(body, more, receive), send)
+            return
+
+        key = hashlib.sha256(b"\n".join((
+            headers.get(b"authorization", b""), scope["method"].encode(), scope["path"].encode(), idempotency_key,
+        ))).hexdigest()
+        fingerprint = hashlib.sha256(scope.get("query_string", b"") + b"\n" + body).hexdigest()
+
+        replay_receive = _prepend(body, False, receive)
+        response = await self._existing(key, fingerprint)
+        if response is None:
+            await self._run(key, fingerprint, scope, replay_receive, send)
+        elif response is _UNGUARDED:
+            await self.app(scope, replay_receive, send)
+        else:
+            await response(scope, replay_receive, send)
+
+    async def _existing(self, key: str, fingerprint: str):
+        """Claim `key` (None), or the response for the request that holds it."""
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            running = self._running.get(key)
+            if running is not None:
+                # A duplicate on this worker: wait for the original, then look again
+                try:
+                    await asyncio.wait_for(running.wait(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                continue
+            try:
+                stored = await _call(_store.claim, key, fingerprint)
+            except Exception as e:
+                # Better to run the request than to refuse it
+                log.error("Error claiming idempotency key: %s", e)
+                return _UNGUARDED
+            if stored is None:
+                return None
+            if stored.fingerprint != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc(("mismatch",))
+                return _error(422, "Idempotency-Key was already used for a different request")
+            if not stored.pending:
+                IDEMPOTENCY_REQUESTS.inc(("replayed",))
+                return stored.response()
+            # Running on another worker
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(_POLL_INTERVAL)
+        IDEMPOTENCY_REQUESTS.inc(("in_progress",))
+        return _error(
+            409, "A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"},
+        )
+
+    async def _run(self, key: str, fingerprint: str, scope, receive, send) -> None:
+        IDEMPOTENCY_REQUESTS.inc(("new",))
+        done = self._running[key] = asyncio.Event()
+        status = None
+        response_headers: List[Tuple[str, str]] = []
+        chunks = []
+        size = 0
+
+        async def capture(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.extend(
+                    (k.decode("latin-1"), v.decode("latin-1"))
+                    for k, v in message.get("headers", [])
+                    if k != b"content-length"
+                )
+            elif message["type"] == "http.response.body" and size <= self.max_body:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                chunks.append(chunk)
+                if size > self.max_body:
+                    chunks.clear()  # Too big to keep; only passed on
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            try:
+                if status is not None and _replayable(status) and size <= self.max_body:
+                    stored = StoredResponse(fingerprint, status, response_headers, b"".join(chunks))
+                    await _call(_store.complete, key, stored)
+                else:
+                    await _call(_store.release, key)
+            except Exception as e:
+                log.error("Error storing idempotent response: %s", e)
+            finally:
+                del self._running[key]
+                done.set()
+
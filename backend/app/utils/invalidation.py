@@ -0,0 +1,289 @@
+"""
+Cross-worker cache invalidation bus.
+
+Every worker (uvicorn process, pod) keeps its own in-process caches: list
+responses, workflow -> org ids. Write paths publish what changed here; the bus
+runs the subscribed handlers in this process at once and ships the event to
+every other worker, where the same handlers run:
+
+    invalidation.subscribe(on_change)       # on_change(event, local)
+    invalidation.publish("workflow", workflow_id, "updated", org_id=org_id)
+
+`local` tells a handler whether the write happened in this process (e.g. to
+bump a shared counter once) or elsewhere (only evict).
+
+Transports (INVALIDATION_TRANSPORT):
+  - local     this process only; enough for a single worker
+  - unix      datagrams between workers on one host, one socket per worker
+              in INVALIDATION_SOCKET_DIR
+  - postgres  LISTEN/NOTIFY on DATABASE_URL, across hosts and pods
+              (needs psycopg: pip install "psycopg[binary]")
+
+Sending happens on a background thread so writers never wait on peers. A
+transport that may have missed events (the Postgres listener reconnecting)
+delivers an EVERYTHING event, on which handlers drop what they hold.
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from app.config import settings
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+
+log = get_logger("invalidation")
+
+INVALIDATION_EVENTS = Counter(
+    "invalidation_events_total", "Invalidation events by direction (sent, received, dropped) and entity.",
+    ("direction", "entity"),
+)
+
+# Entity of an event that invalidates every cache
+EVERYTHING = "*"
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+Handler = Callable[[dict, bool], None]
+
+_handlers: List[Handler] = []
+
+
+def subscribe(handler: Handler) -> None:
+    _handlers.append(handler)
+
+
+def _dispatch(event: dict, local: bool) -> None:
+    for handler in list(_handlers):
+        try:
+            handler(event, local)
+        except Exception as e:
+            log.error("Invalidation handler %s failed on %s: %s", getattr(handler, "__name__", handler), event, e)
+
+
+# ========== TRANSPORTS ==========
+
+class Transport:
+    """Moves encoded events between workers. `send` may block; it runs on the bus thread."""
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        pass
+
+    def send(self, payload: bytes) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class LocalTransport(Transport):
+    """No other workers to tell."""
+
+
+class UnixSocketTransport(Transport):
+    """
+    One datagram socket per worker in `directory`; an event is sent to every
+    other socket there. Sockets left behind by dead workers are removed on
+    the first refused send.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{WORKER_ID}.sock")
+        self._sock: Optional[socket.socket] = None
+        self._out: Optional[socket.socket] = None
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._out = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._out.settimeout(1.0)
+        threading.Thread(target=self._receive, args=(self._sock, deliver), name="invalidation-recv", daemon=True).start()
+
+    @staticmethod
+    def _receive(sock: socket.socket, deliver: Callable[[bytes], None]) -> None:
+        while True:
+            try:
+                payload = sock.recv(65536)
+            except OSError:
+                return  # closed by stop()
+            deliver(payload)
+
+    def send(self, payload: bytes) -> None:
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            try:
+                self._out.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as e:
+                INVALIDATION_EVENTS.inc(("dropped", "peer"))
+                log.warning("Could not send invalidation to %s: %s", name, e)
+
+    def stop(self) -> None:
+        for sock in (self._sock, self._out):
+            if sock is not None:
+                sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class PostgresTransport(Transport):
+    """LISTEN/NOTIFY on a direct Postgres connection (PostgREST cannot LISTEN)."""
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._running = False
+        self._send_conn = None
+
+    def _connect(self):
+        import psycopg
+        return psycopg.connect(self.dsn, autocommit=True)
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        self._running = True
+        threading.Thread(target=self._listen, args=(deliver,), name="invalidation-listen", daemon=True).start()
+
+    def _listen(self, deliver: Callable[[bytes], None]) -> None:
+        from psycopg import sql
+
+        delay = 1.0
+        connected_before = False
+        while self._running:
+            try:
+                with self._connect() as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    if connected_before:
+                        # Events sent while we were away are lost
+                        deliver(json.dumps({"entity": EVERYTHING, "origin": "transport"}).encode())
+                    connected_before = True
+                    delay = 1.0
+                    while self._running:
+                        for notify in conn.notifies(timeout=1.0):
+                            deliver(notify.payload.encode())
+            except Exception as e:
+                log.warning("Invalidation listener lost its connection (retrying in %.0fs): %s", delay, e)
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def send(self, payload: bytes) -> None:
+        try:
+            if self._send_conn is None or self._send_conn.closed:
+                self._send_conn = self._connect()
+            self._send_conn.execute("SELECT pg_notify(%s, %s)", (self.channel, payload.decode()))
+        except Exception:
+            self._send_conn = None
+            raise
+
+    def stop(self) -> None:
+        self._running = False
+        if self._send_conn is not None:
+            self._send_conn.close()
+
+
+def _make_transport() -> Transport:
+    kind = settings.INVALIDATION_TRANSPORT
+    if kind == "unix":
+        return UnixSocketTransport(settings.INVALIDATION_SOCKET_DIR)
+    if kind == "postgres":
+        return PostgresTransport(settings.DATABASE_URL, settings.INVALIDATION_CHANNEL)
+    return LocalTransport()
+
+
+# ========== BUS ==========
+
+_transport: Transport = _make_transport()
+_outbox: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=10000)
+_sender: Optional[threading.Thread] = None
+
+
+def _receive(payload: bytes) -> None:
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        log.warning("Dropping malformed invalidation event: %r", payload[:200])
+        return
+    if event.get("origin") == WORKER_ID:
+        return
+    INVALIDATION_EVENTS.inc(("received", event.get("entity", "")))
+    _dispatch(event, local=False)
+
+
+def _send_loop() -> None:
+    while True:
+        payload = _outbox.get()
+        if payload is None:
+            return
+        try:
+            _transport.send(payload)
+        except Exception as e:
+            INVALIDATION_EVENTS.inc(("dropped", "send"))
+            log.error("Could not send invalidation event: %s", e)
+
+
+def publish(
+    entity: str,
+    entity_id: Optional[str] = None,
+    action: Optional[str] = None,
+    org_id: Optional[str] = None,
+    workflow_id: Optional[str] = None,
+) -> None:
+    """Evict `entity` from the caches of every worker. Never raises."""
+    event = {
+        "entity": entity,
+        "id": entity_id,
+        "action": action,
+        "org_id": org_id,
+        "workflow_id": workflow_id,
+        "origin": WORKER_ID,
+    }
+    _dispatch(event, local=True)
+    if _sender is None:
+        return
+    INVALIDATION_EVENTS.inc(("sent", entity))
+    try:
+        _outbox.put_nowait(json.dumps(event).encode())
+    except queue.Full:
+        INVALIDATION_EVENTS.inc(("dropped", entity))
+        log.error("Invalidation outbox full; dropping %s %s", entity, entity_id)
+
+
+def set_transport(transport: Transport) -> None:
+    """Use another transport (before start())."""
+    global _transport
+    _transport = transport
+
+
+def start() -> None:
+    """Connect to the other workers (called at app startup)."""
+    global _sender
+    if _sender is not None or isinstance(_transport, LocalTransport):
+        return
+    _transport.start(_receive)
+    _sender = threading.Thread(target=_send_loop, name="invalidation-send", daemon=True)
+    _sender.start()
+    log.info("Invalidation bus started (%s, worker %s)", type(_transport).__name__, WORKER_ID)
+
+
+def stop() -> None:
+    global _sender
+    if _sender is None:
+        return
+    _outbox.put(None)
+    _sender.join(timeout=2.0)
+    _sender = None
+    _transport.stop()
@@ -0,0 +1,73 @@
+"""
+JSON Patch (RFC 6902) diff and apply, for the documents kept in workflow history.
+
+Only `add`, `remove` and `replace` are produced. Objects are diffed key by
+key; any other changed value (lists included) is replaced whole, so documents
+should hold collections as objects keyed by id (as workflow history does with
+steps) to get small patches.
+"""
+
+import copy
+from typing import Any, List
+
+
+def _escape(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[dict]:
+    """Operations turning `old` into `new`."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[dict] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff(old[key], value, child))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply(doc: Any, patch: List[dict]) -> Any:
+    """`doc` with `patch` applied (`doc` itself is left alone)."""
+    doc = copy.deepcopy(doc)
+    for op in patch:
+        if op["path"] == "":
+            if op["op"] == "remove":
+                raise ValueError("cannot remove the whole document")
+            doc = copy.deepcopy(op["value"])
+            continue
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            elif op["op"] == "replace":
+                parent[index] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"unsupported op: {op['op']}")
+        elif op["op"] in ("add", "replace"):
+            if op["op"] == "replace" and last not in parent:
+                raise KeyError(op["path"])
+            parent[last] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            raise ValueError(f"unsupported op: {op['op']}")
+    return doc
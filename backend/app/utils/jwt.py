@@ -1,11 +1,35 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 
 import jwt
 
+from app.utils.log import get_logger
+from app.utils.resilience import DependencyUnavailable
+from app.utils.tracing import span
+
+log = get_logger("jwt")
+
 security = HTTPBearer(auto_error=False)
 
+# Set by the batch endpoint: its sub-requests carry the same token and reuse
+# the batch's own authentication instead of repeating the user lookup
+_authenticated: ContextVar[Optional[dict]] = ContextVar("authenticated_user", default=None)
+
+
+@contextmanager
+def reuse_authentication(user: dict):
+    """Within this block, `get_current_user` returns `user` for `user`'s own token."""
+    token = _authenticated.set(user)
+    try:
+        yield
+    finally:
+        _authenticated.reset(token)
+
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Validate JWT and extract user info, auto-create user in database if needed"""
@@ -15,6 +39,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Missing authorization header. Please log in.",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    known = _authenticated.get()
+    if known is not None and credentials.credentials == known["raw_token"]:
+        return known
     
     try:
         token = credentials.credentials
@@ -30,13 +58,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
         # Auto-create user in database if they don't exist
         try:
-            from app.services.supabase_db import get_user, upsert_user
-            existing_user = get_user(user_id)
-            if not existing_user and email:
-                upsert_user(user_id, {"email": email})
+            from app.services import reads
+            from app.services.supabase_db import upsert_user
+            with span("auth.user_lookup"):
+                existing_user = await reads.get_user(user_id)
+                if not existing_user and email:
+                    upsert_user(user_id, {"email": email})
+        except DependencyUnavailable:
+            raise
         except Exception as e:
             # Don't fail the request if user creation fails, just log it
-            print(f"[JWT] Warning: Could not auto-create user: {e}")
+            log.warning("Could not auto-create user: %s", e)
 
         return {
             "user_id": user_id,
@@ -49,6 +81,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
+    except DependencyUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,221 @@
+"""
+Structured, non-blocking logging.
+
+Records go through a bounded in-memory queue to a background listener thread
+that formats and writes them, so a request never blocks on stdout (container
+log backpressure). When the queue is full records are dropped and counted
+rather than stalling the caller.
+
+    log = get_logger("db")
+    log.info("Created workflow %s", workflow_id)
+    log.debug("Listing workflows: %s", params, extra=SAMPLED)
+    log.debug("Payload: %s", redact(payload))
+
+- Every record carries the current request id (RequestIdMiddleware; taken
+  from X-Request-ID or generated, echoed in the response) and trace id.
+- Records logged with `extra=SAMPLED` are kept 1 in LOG_SAMPLE_EVERY per
+  message template; the kept ones carry `sample_rate`.
+- `redact()` hides payload bodies (summarising their shape) unless
+  LOG_PAYLOADS is enabled.
+- LOG_FORMAT=json emits one JSON object per line, `text` a readable line.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Pass as `extra=` to mark a high-volume record for sampling
+SAMPLED = {"sampled": True}
+
+_STANDARD_ATTRS = frozenset(vars(logging.makeLogRecord({})).keys()) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"app.{name}")
+
+
+def redact(value: Any) -> Any:
+    """The value itself when LOG_PAYLOADS is on, otherwise a shape-only summary."""
+    if settings.LOG_PAYLOADS:
+        return value
+    if isinstance(value, dict):
+        return f"<dict keys={sorted(value)[:12]}>"
+    if isinstance(value, (list, tuple)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return f"<{type(value).__name__}>"
+
+
+class ContextFilter(logging.Filter):
+    """Attach request/trace ids (runs in the calling thread, where the context lives)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        from app.utils.tracing import current_trace
+        trace = current_trace()
+        record.trace_id = trace.trace_id if trace is not None else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in `every` records marked SAMPLED, counted per message template."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or self.every == 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            n = self._counts.get(key, 0)
+            self._counts[key] = n + 1
+        if n % self.every:
+            return False
+        record.sample_rate = 1 / self.every
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks: only the message is resolved in the
+    calling thread (args may be mutable), formatting happens in the listener.
+    """
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key != "sampled" and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        tag = record.name.split(".", 1)[-1].upper()
+        rid = getattr(record, "request_id", None)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} [{tag}]"
+        if rid:
+            line += f" ({rid})"
+        line += f" {record.getMessage()}"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the `app` logger (idempotent)."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    q: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(q)
+    _queue_handler.addFilter(ContextFilter())
+    _queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_EVERY))
+
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.handlers = [_queue_handler]
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware binding a request id to the context and response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = os.urandom(8).hex()
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
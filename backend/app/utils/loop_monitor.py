@@ -0,0 +1,147 @@
+"""
+Event-loop health: lag sampling and blocking-call detection.
+
+A synchronous call made on the event loop (a `requests` call from an
+`async def` route, the Gemini SDK, heavy serialization) stalls every other
+request of the worker, and nothing in the request metrics says why. The
+monitor:
+
+- samples loop lag: a task sleeps LOOP_LAG_INTERVAL seconds and records how
+  late it woke up (event_loop_lag_seconds, `recent_lag()`);
+- with BLOCKING_DETECT (on in debug mode by default) runs a watchdog thread
+  that, once the loop has not ticked for BLOCKING_THRESHOLD_MS, logs the loop
+  thread's stack, naming the route and the app function that block it.
+
+The admission controller (app/utils/admission.py) sheds low-priority traffic
+while the lag is high.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Optional
+
+from app.config import settings
+from app.utils.log import get_logger
+from app.utils.metrics import Counter, Histogram
+
+log = get_logger("loop")
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total", "Event loop stalls above BLOCKING_THRESHOLD_MS, by the app code running.",
+    ("function",),
+)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(APP_DIR, "api")
+
+
+def _app_frames(stack: traceback.StackSummary) -> List[traceback.FrameSummary]:
+    own = os.path.abspath(__file__)
+    return [f for f in stack if f.filename.startswith(APP_DIR) and f.filename != own]
+
+
+def describe_blocker(stack: traceback.StackSummary) -> str:
+    """Name the code a loop-thread stack is in: "route -> innermost app function"."""
+    frames = _app_frames(stack)
+    if not frames:
+        return "unknown"
+    route = next((f for f in frames if f.filename.startswith(API_DIR)), None)
+    inner = frames[-1]
+    if route is None or route is inner:
+        return inner.name
+    return f"{route.name} -> {inner.name}"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, blocking_threshold: Optional[float] = None, window: int = 10):
+        self.interval = interval
+        self.blocking_threshold = blocking_threshold  # seconds; None disables the watchdog
+        self.last_tick = time.monotonic()
+        self._recent: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._loop_thread: Optional[int] = None
+
+    def recent_lag(self) -> float:
+        """Worst lag of the last few samples, or how long the loop is overdue right now."""
+        if self._task is None:
+            return 0.0
+        overdue = time.monotonic() - self.last_tick - self.interval
+        return max(max(self._recent, default=0.0), overdue)
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            self._recent.append(lag)
+            self.last_tick = now
+            EVENT_LOOP_LAG.observe((), lag)
+
+    def start(self) -> None:
+        """Start sampling the running loop (and the watchdog, if enabled)."""
+        self.stop()
+        self._stopped = threading.Event()
+        self._loop_thread = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._recent.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        if self.blocking_threshold:
+            threading.Thread(target=self._watch, args=(self._stopped,), name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _watch(self, stopped: threading.Event) -> None:
+        reported = None
+        while not stopped.wait(self.blocking_threshold / 4):
+            tick = self.last_tick
+            blocked = time.monotonic() - tick - self.interval
+            if blocked < self.blocking_threshold or reported == tick:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            # Once per stall
+            reported = tick
+            stack = traceback.extract_stack(frame)
+            culprit = describe_blocker(stack)
+            EVENT_LOOP_BLOCKED.inc((culprit,))
+            frames = _app_frames(stack)
+            # From the route down; the middleware frames above it are always the same
+            route_at = next((i for i, f in enumerate(frames) if f.filename.startswith(API_DIR)), 0)
+            shown = frames[route_at:] or stack[-8:]
+            log.warning(
+                "Event loop blocked for %.0f ms in %s\n%s",
+                blocked * 1000, culprit, "".join(traceback.format_list(shown)).rstrip(),
+            )
+
+    def status(self) -> dict:
+        return {
+            "lag_ms": round(self.recent_lag() * 1000, 1),
+            "interval_ms": round(self.interval * 1000, 1),
+            "blocking_detect": bool(self.blocking_threshold),
+        }
+
+
+MONITOR = LoopMonitor(
+    settings.LOOP_LAG_INTERVAL,
+    settings.BLOCKING_THRESHOLD_MS / 1000 if settings.BLOCKING_DETECT else None,
+)
+
+
+def recent_lag() -> float:
+    return MONITOR.recent_lag()
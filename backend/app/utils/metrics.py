@@ -0,0 +1,245 @@
+"""
+Prometheus-style metrics with per-thread shards.
+
+Every metric keeps one dict of values per thread. Recording touches only the
+calling thread's dict (no lock, no contention between the event loop and the
+threadpool); a scrape merges the shards. Values only ever grow or are summed,
+so shards of threads that have exited stay valid.
+
+    HTTP_REQUESTS.inc(("GET", "/api/v1/workflows/", "200"))
+    HTTP_LATENCY.observe(("GET", "/api/v1/workflows/"), 0.012)
+
+Label values are passed as a tuple in the order the metric declared them.
+`render()` returns the text exposition format served at /metrics.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+# Seconds; Prometheus client defaults plus a 30 s bucket for AI calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: dict = {}
+            self._local.values = values
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def _snapshot(self) -> List[List[tuple]]:
+        with self._lock:
+            shards = list(self._shards)
+        # dict.items() -> list is a single C call, safe against concurrent writers
+        return [list(s.items()) for s in shards]
+
+    def _label_str(self, labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        values = self._shard()
+        values[labels] = values.get(labels, 0) + amount
+
+    def collect(self) -> Dict[Labels, float]:
+        merged: Dict[Labels, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard:
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{self._label_str(labels)} {_num(value)}"
+
+
+class Gauge(Counter):
+    """Up/down value (sum of per-thread deltas)."""
+
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: Labels, value: float) -> None:
+        values = self._shard()
+        state = values.get(labels)
+        if state is None:
+            # [per-bucket counts..., +Inf count, sum]
+            state = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self) -> Dict[Labels, list]:
+        merged: Dict[Labels, list] = {}
+        for shard in self._snapshot():
+            for labels, state in shard:
+                state = list(state)
+                current = merged.get(labels)
+                if current is None:
+                    merged[labels] = state
+                else:
+                    for i, v in enumerate(state):
+                        current[i] += v
+        return merged
+
+    def samples(self) -> Iterable[str]:
+        for labels, state in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket{self._label_str(labels, ('le', _num(bound)))} {cumulative}"
+            cumulative += state[len(self.buckets)]
+            yield f"{self.name}_bucket{self._label_str(labels, ('le', '+Inf'))} {cumulative}"
+            yield f"{self.name}_sum{self._label_str(labels)} {_num(state[-1])}"
+            yield f"{self.name}_count{self._label_str(labels)} {cumulative}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ========== METRICS ==========
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.",
+    ("method",),
+)
+
+DB_CALLS = Counter(
+    "postgrest_calls_total", "PostgREST calls by table, operation and outcome.",
+    ("table", "op", "outcome"),
+)
+DB_LATENCY = Histogram(
+    "postgrest_call_duration_seconds", "PostgREST call latency by table and operation.",
+    ("table", "op"),
+)
+
+AI_CALLS = Counter(
+    "gemini_calls_total", "Gemini calls by operation and outcome.",
+    ("op", "outcome"),
+)
+AI_LATENCY = Histogram(
+    "gemini_call_duration_seconds", "Gemini call latency by operation.",
+    ("op",),
+)
+AI_TOKENS = Counter(
+    "gemini_tokens_total", "Gemini tokens used by operation and kind (prompt/output).",
+    ("op", "kind"),
+)
+
+
+# ========== MIDDLEWARE ==========
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request count, latency and in-flight.
+
+    Requests are labelled with the matched route template (e.g.
+    /api/v1/workflows/{workflow_id}) so label cardinality stays bounded;
+    requests that match no route are grouped as "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = (method,)
+        HTTP_IN_FLIGHT.inc(in_flight)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(in_flight)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc((method, path, status))
+            HTTP_LATENCY.observe((method, path), elapsed)
@@ -0,0 +1,102 @@
+"""
+Fractional (lexicographic) ordering keys for workflow steps.
+
+Keys are base-62 strings read as fractions in [0, 1): "V" sits halfway,
+"0V" sits halfway between "" and "1", and so on. A key can always be
+generated strictly between two others, so moving a step only rewrites the
+moved row. Keys never end in "0" so that every fraction has exactly one
+spelling. The column must use a byte-wise ("C") collation so Postgres sorts
+them the same way Python does.
+
+Keys for new positions get a few random digits appended, so two writers
+that read the same neighbours at the same time still produce distinct keys.
+"""
+
+import random
+from typing import List, Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Keys longer than this trigger a background rebalance of the workflow
+MAX_KEY_LENGTH = 12
+
+# Random digits appended by writers that may race (appends and moves)
+JITTER_DIGITS = 3
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Return a key strictly between `a` and `b` (`b=None` means 1.0)."""
+    if b is not None:
+        # Skip the shared prefix, padding `a` with zeros
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+
+    # Digits are consecutive
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _validate(key: str) -> None:
+    if not key or key.endswith("0") or any(c not in DIGITS for c in key):
+        raise ValueError(f"Invalid ordering key: {key!r}")
+
+
+def key_between(before: Optional[str], after: Optional[str], jitter: int = 0) -> str:
+    """
+    Generate a key that sorts after `before` and before `after`.
+
+    Either bound may be None, meaning "start of list" / "end of list".
+    With `jitter`, that many random digits are appended (still between the
+    bounds), so concurrent calls with the same bounds almost never collide.
+    """
+    if before is not None:
+        _validate(before)
+    if after is not None:
+        _validate(after)
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Ordering keys out of order: {before!r} >= {after!r}")
+    key = _midpoint(before or "", after)
+    if jitter:
+        suffix = "".join(random.choices(DIGITS, k=jitter - 1)) + random.choice(DIGITS[1:])
+        if after is not None and key + suffix >= after:
+            # `key` is a prefix of `after`: jitter inside the narrower gap
+            return key_between(key, after, jitter)
+        key += suffix
+    return key
+
+
+def spread_keys(count: int) -> List[str]:
+    """Generate `count` evenly spaced, short keys (used for bulk inserts and rebalancing)."""
+    if count <= 0:
+        return []
+
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+
+    span = BASE ** width
+    keys = []
+    for i in range(count):
+        value = (i + 1) * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, rem = divmod(value, BASE)
+            digits.append(DIGITS[rem])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def needs_rebalance(key: Optional[str]) -> bool:
+    """Whether a key has grown long enough that the list should be respaced."""
+    return key is not None and len(key) > MAX_KEY_LENGTH
@@ -0,0 +1,88 @@
+"""
+Sparse fieldsets for list/get routes.
+
+Routes accept `fields=a,b,c` or a `view=summary|full` preset. The resolved
+field list is passed down to the data layer, which turns it into a PostgREST
+`select=` (Supabase) or a projected copy (in-memory), so unrequested columns
+are neither fetched nor serialized. `None` always means "every column"
+listed in COLUMNS, never `*`: the tables also hold internal columns (the
+generated search_vector) that must stay out of responses and caches.
+"""
+
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+COLUMNS: Dict[str, List[str]] = {
+    "workflows": [
+        "id", "organization_id", "title", "description", "status", "version",
+        "is_template", "cloned_from", "created_by", "created_at", "updated_at",
+    ],
+    "steps": [
+        "id", "workflow_id", "title", "description", "status", "assigned_to",
+        "order", "sort_key", "created_at", "updated_at",
+    ],
+    "comments": [
+        "id", "workflow_id", "step_id", "user_id", "content", "created_at", "updated_at",
+    ],
+    "activities": [
+        "id", "organization_id", "workflow_id", "user_id", "entity_type", "entity_id",
+        "action", "details", "created_at",
+    ],
+}
+
+# Computed fields that are not columns of the entity's table
+VIRTUAL: Dict[str, List[str]] = {
+    "workflows": ["step_count", "steps"],
+}
+
+SUMMARY: Dict[str, List[str]] = {
+    "workflows": ["id", "organization_id", "title", "status", "updated_at", "step_count"],
+    "steps": ["id", "workflow_id", "title", "status", "sort_key"],
+    "comments": ["id", "step_id", "user_id", "content", "created_at"],
+    "activities": ["id", "entity_type", "entity_id", "action", "details", "created_at"],
+}
+
+
+def resolve_fields(entity: str, fields: Optional[str] = None, view: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Turn `fields`/`view` query parameters into a field list (None = all).
+
+    Explicit `fields` win over `view`. `id` is always included.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        allowed = set(COLUMNS[entity]) | set(VIRTUAL.get(entity, []))
+        unknown = [f for f in requested if f not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field(s) for {entity}: {', '.join(unknown)}",
+            )
+    elif view in (None, "", "full"):
+        return None
+    elif view == "summary":
+        requested = list(SUMMARY[entity])
+    else:
+        raise HTTPException(status_code=400, detail="view must be 'summary' or 'full'")
+
+    if "id" not in requested:
+        requested.insert(0, "id")
+    # De-duplicate, keeping order
+    return list(dict.fromkeys(requested))
+
+
+def select_clause(entity: str, fields: Optional[List[str]]) -> str:
+    """PostgREST `select=` value for the real columns in `fields`."""
+    if fields is None:
+        return ",".join(COLUMNS[entity])
+    virtual = VIRTUAL.get(entity, [])
+    columns = [f for f in fields if f not in virtual]
+    return ",".join(columns) or "id"
+
+
+def project(row: dict, fields: Optional[List[str]]) -> dict:
+    """Copy of `row` restricted to `fields` (the row itself when fields is None)."""
+    if fields is None:
+        return row
+    return {f: row.get(f) for f in fields if f in row}
@@ -0,0 +1,258 @@
+"""
+Token-bucket rate limiting per user and per organization.
+
+Each RateLimit is a FastAPI dependency added to a group of routers (CRUD,
+AI). A request takes one token from its organization's bucket, then one from
+the caller's; an empty bucket is a 429 with Retry-After (and a request the
+org refuses costs the user nothing). The user comes from `get_current_user`,
+whose result FastAPI shares with the route. The organization is always one
+the caller belongs to (client-supplied ids are only hints), in order:
+
+- the organization of the workflow, step or comment the request targets (by
+  path, query or JSON body id), looked up once and cached;
+- the one named by an `org_id` path or query parameter, the
+  X-Organization-ID header or `organization_id`/`org_id` in a JSON body;
+- otherwise the caller's oldest membership.
+
+Only callers without any membership are limited per user alone.
+
+Limits are "count/period" strings (period s, m or h; "" disables): a bucket
+holds `count` tokens and refills at count/period per second, so a client may
+burst up to `count` and then sustains the average.
+
+Buckets live in a RateLimitBackend: MemoryRateLimitBackend (sharded dicts,
+O(1) per check) per worker by default, or the rate_limit_buckets table with
+RATE_LIMIT_BACKEND=supabase so workers share one budget (one RPC per check).
+"""
+
+import itertools
+import json
+import math
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import anyio
+from fastapi import Depends, HTTPException, Request
+
+from app.config import settings
+from app.utils.jwt import get_current_user
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+from app.utils.supabase import sb_rpc
+
+log = get_logger("ratelimit")
+
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests refused by rate limiting, by limit and bucket (user, org).",
+    ("limit", "bucket"),
+)
+
+_PERIODS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+ORG_HEADER = "x-organization-id"
+# JSON bodies up to this size are read to find the organization (the route reads them anyway);
+# larger or streamed bodies (imports) are left alone
+MAX_BODY_SCAN = 1024 * 1024
+# Id names identifying the target of a request, most specific owner first
+_TARGETS = (("workflow_id", "workflow"), ("step_id", "step"), ("comment_id", "comment"))
+
+
+def parse_limit(spec: str) -> Optional[Tuple[float, float]]:
+    """"20/m" -> (capacity 20, 0.333 tokens per second); None for "" or "0"."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    count, _, period = spec.partition("/")
+    try:
+        capacity = float(count)
+        seconds = _PERIODS[period.strip().lower()[:1] or "s"]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '20/m'")
+    if capacity <= 0:
+        return None
+    return capacity, capacity / seconds
+
+
+# ========== BACKENDS ==========
+
+class RateLimitBackend:
+    """Where buckets live."""
+
+    # False if calls may do I/O (they are then run off the event loop)
+    local = True
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens from bucket `key`: 0 if taken, else seconds until they would be there."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Buckets of this worker, split over `shards` dicts with a lock each.
+
+    A bucket is [tokens, last update, time it is full again]; a full bucket is
+    the same as no bucket, so once a shard holds more than `max_keys` those
+    are dropped. Shards are kept in least recently used order; if too few
+    buckets are full, the least recently used tenth goes too.
+    """
+
+    def __init__(self, shards: int = 16, max_keys: int = 100_000):
+        self._shards: List[Tuple[threading.Lock, dict]] = [(threading.Lock(), {}) for _ in range(shards)]
+        self._max_keys = max(1, max_keys // shards)
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            # Popped and re-added below, which moves it to the recent end
+            bucket = buckets.pop(key, None)
+            if bucket is None:
+                if len(buckets) >= self._max_keys:
+                    self._prune(buckets, now, self._max_keys)
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            buckets[key] = [tokens, now, now + (capacity - tokens) / rate]
+            return wait
+
+    @staticmethod
+    def _prune(buckets: dict, now: float, max_keys: int) -> None:
+        for key in [k for k, b in buckets.items() if b[2] <= now]:
+            del buckets[key]
+        excess = len(buckets) - max_keys * 9 // 10
+        for key in list(itertools.islice(buckets, max(excess, 0))):
+            del buckets[key]
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class SupabaseRateLimitBackend(RateLimitBackend):
+    """Buckets in the rate_limit_buckets table, shared by every worker."""
+
+    local = False
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        return float(sb_rpc("take_rate_limit_token", {
+            "p_key": key,
+            "p_capacity": capacity,
+            "p_rate": rate,
+            "p_cost": cost,
+        }) or 0.0)
+
+
+def _make_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "supabase":
+        return SupabaseRateLimitBackend()
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_SHARDS, settings.RATE_LIMIT_MAX_KEYS)
+
+
+_backend: RateLimitBackend = _make_backend()
+
+
+def set_rate_limit_backend(backend: RateLimitBackend) -> None:
+    """Use another rate limit backend (e.g. one backed by a different shared service)."""
+    global _backend
+    _backend = backend
+
+
+async def _take(key: str, capacity: float, rate: float) -> float:
+    try:
+        if _backend.local:
+            return _backend.take(key, capacity, rate)
+        return await anyio.to_thread.run_sync(_backend.take, key, capacity, rate)
+    except Exception as e:
+        # Better to serve the request than to refuse it
+        log.error("Error checking rate limit %s: %s", key, e)
+        return 0.0
+
+
+# ========== DEPENDENCY ==========
+
+async def _json_body(request: Request) -> dict:
+    if request.method not in ("POST", "PUT", "PATCH"):
+        return {}
+    if not request.headers.get("content-type", "").startswith("application/json"):
+        return {}
+    length = request.headers.get("content-length")
+    if not length or not length.isdigit() or int(length) > MAX_BODY_SCAN:
+        return {}
+    try:
+        body = json.loads(await request.body() or b"null")
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+async def request_org(request: Request, user_id: str) -> Optional[str]:
+    """The organization a request is charged to, if any; see the module docstring."""
+    from app.services.supabase_db import entity_org, user_orgs
+
+    body = await _json_body(request)
+    target = None
+    for name, kind in _TARGETS:
+        entity_id = request.path_params.get(name) or request.query_params.get(name) or body.get(name)
+        if entity_id and isinstance(entity_id, str):
+            target = (kind, entity_id)
+            break
+    named = (
+        request.path_params.get("org_id")
+        or request.query_params.get("org_id")
+        or request.headers.get(ORG_HEADER)
+        or body.get("organization_id")
+        or body.get("org_id")
+    )
+    try:
+        orgs = await anyio.to_thread.run_sync(user_orgs, user_id)
+        if orgs and target:
+            org_id = await anyio.to_thread.run_sync(entity_org, *target)
+            if org_id in orgs:
+                return org_id
+    except Exception as e:
+        log.error("Error resolving the organization of a request by %s: %s", user_id, e)
+        return None
+    if not orgs:
+        return None
+    return named if named in orgs else orgs[0]
+
+
+class RateLimit:
+    """FastAPI dependency taking a token from the caller's user and org buckets of `name`."""
+
+    def __init__(self, name: str, per_user: str, per_org: str, enabled: bool = True):
+        self.name = name
+        self.per_user = parse_limit(per_user)
+        self.per_org = parse_limit(per_org)
+        self.enabled = enabled
+
+    async def __call__(self, request: Request, current_user = Depends(get_current_user)) -> None:
+        if not self.enabled:
+            return
+        checks = []
+        # The org first: a request it refuses must not also spend the user's budget
+        if self.per_org:
+            org_id = await request_org(request, current_user["user_id"])
+            if org_id:
+                checks.append(("org", org_id, self.per_org))
+        if self.per_user:
+            checks.append(("user", current_user["user_id"], self.per_user))
+
+        for bucket, owner, (capacity, rate) in checks:
+            wait = await _take(f"{self.name}:{bucket}:{owner}", capacity, rate)
+            if wait > 0:
+                RATE_LIMITED.inc((self.name, bucket))
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Too many {self.name} requests for this {bucket}, please retry shortly",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+
+CRUD_LIMIT = RateLimit("crud", settings.RATE_LIMIT_CRUD_PER_USER, settings.RATE_LIMIT_CRUD_PER_ORG)
+AI_LIMIT = RateLimit("ai", settings.RATE_LIMIT_AI_PER_USER, settings.RATE_LIMIT_AI_PER_ORG)
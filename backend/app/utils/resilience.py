@@ -0,0 +1,233 @@
+"""
+Circuit breakers and bulkheads for upstream dependencies (Supabase, Gemini).
+
+Every call to a dependency goes through `Dependency.guard()`:
+
+    with SUPABASE.guard():
+        resp = requests.get(url, timeout=SUPABASE.timeout)
+        resp.raise_for_status()
+
+- The circuit breaker opens after `failure_threshold` consecutive failures
+  (timeouts, connection errors, 5xx/429 - not other 4xx, which are the
+  caller's fault) and then rejects calls immediately for `recovery_seconds`.
+  After that it lets a single probe call through (half-open): success closes
+  it, failure re-opens it.
+- The bulkhead caps concurrent calls so one slow dependency (AI) cannot tie
+  up every worker thread; callers that cannot get a slot within
+  `max_wait` seconds are rejected.
+
+Rejections and failures raise DependencyUnavailable, which the API maps to a
+503 with an explicit degraded status instead of an empty result or a 404.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from app.config import settings
+from app.utils.log import get_logger
+from app.utils.metrics import Counter
+
+log = get_logger("resilience")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEPENDENCY_REJECTIONS = Counter(
+    "dependency_rejections_total", "Calls failed fast or rejected, by dependency and reason.",
+    ("dependency", "reason"),
+)
+
+
+class DependencyUnavailable(Exception):
+    """An upstream dependency is down, slow, or shedding load."""
+
+    def __init__(self, dependency: str, reason: str, retry_after: Optional[float] = None, detail: str = ""):
+        self.dependency = dependency
+        self.reason = reason  # circuit_open | bulkhead_full | timeout | error
+        self.retry_after = retry_after
+        self.detail = detail
+        super().__init__(f"{dependency} unavailable ({reason}){': ' + detail if detail else ''}")
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, recovery_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> Optional[float]:
+        """None if the call may proceed, otherwise seconds until the next probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return None
+            remaining = self.opened_at + self.recovery_seconds - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return None
+            return max(remaining, 1.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if this opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            was_open = self.state == OPEN
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+            return self.state == OPEN and not was_open
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot without judging the dependency."""
+        with self._lock:
+            self._probing = False
+
+
+class Bulkhead:
+    def __init__(self, max_concurrent: int, max_wait: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_wait = max_wait
+        self.in_use = 0
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if self.max_wait > 0:
+            acquired = self._semaphore.acquire(timeout=self.max_wait)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+        if acquired:
+            with self._lock:
+                self.in_use += 1
+        return acquired
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+        self._semaphore.release()
+
+
+class Dependency:
+    """A named upstream with a timeout, a circuit breaker and a bulkhead."""
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        max_concurrent: int,
+        max_wait: float,
+        is_failure: Callable[[BaseException], bool],
+        failure_threshold: int,
+        recovery_seconds: float,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.is_failure = is_failure
+        self.breaker = CircuitBreaker(failure_threshold, recovery_seconds)
+        self.bulkhead = Bulkhead(max_concurrent, max_wait)
+
+    def _reject(self, reason: str, retry_after: Optional[float] = None, detail: str = "") -> DependencyUnavailable:
+        DEPENDENCY_REJECTIONS.inc((self.name, reason))
+        return DependencyUnavailable(self.name, reason, retry_after, detail)
+
+    @contextmanager
+    def guard(self):
+        retry_after = self.breaker.before_call()
+        if retry_after is not None:
+            raise self._reject("circuit_open", retry_after)
+        if not self.bulkhead.acquire():
+            self.breaker.release_probe()
+            raise self._reject("bulkhead_full", 1.0, f"{self.bulkhead.max_concurrent} calls in flight")
+        try:
+            yield
+        except DependencyUnavailable:
+            raise
+        except Exception as e:
+            if not self.is_failure(e):
+                # The dependency answered (e.g. a 4xx); it is healthy
+                self.breaker.record_success()
+                raise
+            if self.breaker.record_failure():
+                log.warning("Circuit for %s opened after %d failures: %s", self.name, self.breaker.failures, e)
+            reason = "timeout" if "timeout" in type(e).__name__.lower() or "timed out" in str(e).lower() else "error"
+            raise self._reject(reason, self.breaker.recovery_seconds, str(e)[:200]) from e
+        else:
+            self.breaker.record_success()
+        finally:
+            self.bulkhead.release()
+
+    def status(self) -> dict:
+        breaker = self.breaker
+        entry = {
+            "state": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "in_flight": self.bulkhead.in_use,
+            "max_concurrent": self.bulkhead.max_concurrent,
+        }
+        if breaker.state != CLOSED:
+            entry["retry_in_seconds"] = round(max(0.0, breaker.opened_at + breaker.recovery_seconds - time.monotonic()), 1)
+        return entry
+
+
+# ========== DEPENDENCIES ==========
+
+def _http_failure(e: BaseException) -> bool:
+    """Timeouts, connection errors, 5xx and 429 count against a dependency."""
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(e, "code", None)  # google.genai APIError
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    return True
+
+
+SUPABASE = Dependency(
+    "supabase",
+    timeout=settings.SUPABASE_TIMEOUT,
+    max_concurrent=settings.SUPABASE_MAX_CONCURRENCY,
+    max_wait=settings.BULKHEAD_WAIT_SECONDS,
+    is_failure=_http_failure,
+    failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    recovery_seconds=settings.BREAKER_RECOVERY_SECONDS,
+)
+GEMINI = Dependency(
+    "gemini",
+    timeout=settings.GEMINI_TIMEOUT,
+    max_concurrent=settings.GEMINI_MAX_CONCURRENCY,
+    max_wait=0,
+    is_failure=_http_failure,
+    failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    recovery_seconds=settings.BREAKER_RECOVERY_SECONDS,
+)
+
+DEPENDENCIES: Dict[str, Dependency] = {d.name: d for d in (SUPABASE, GEMINI)}
+
+# Without these the API cannot serve anything; the rest only degrade features
+CRITICAL = ("supabase",)
+
+
+def readiness() -> dict:
+    """Breaker and bulkhead state per dependency, and the overall status."""
+    deps = {name: dep.status() for name, dep in DEPENDENCIES.items()}
+    if any(deps[name]["state"] == OPEN for name in CRITICAL):
+        status = "unavailable"
+    elif any(d["state"] != CLOSED for d in deps.values()):
+        status = "degraded"
+    else:
+        status = "ready"
+    return {"status": status, "dependencies": deps}
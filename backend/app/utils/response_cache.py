@@ -0,0 +1,325 @@
+"""
+In-process cache of rendered list responses, invalidated by generation counters.
+
+Every cacheable list belongs to a scope (an organization's workflows, the
+organization list). Each scope has a generation counter that writes bump, and
+a cached response is only served while the generations it was built under are
+still current:
+
+    generation = await current_generation(org_scope(org_id))   # before reading
+    cached = WORKFLOW_LISTS.get(key, generation)
+    if cached is None:
+        response = build_response()
+        WORKFLOW_LISTS.put(key, generation, response)
+
+- Invalidation is O(1): every write published on the invalidation bus
+  (app/utils/invalidation.py) bumps the scopes it touches, and old entries
+  are simply never served again; they age out of the LRU.
+- Generations live in a GenerationStore. LocalGenerationStore is enough for a
+  single worker, or for several connected by the bus. CACHE_GENERATION_STORE
+  =supabase keeps them in the cache_generations table instead, so workers
+  agree even without a bus (within CACHE_GENERATION_TTL).
+- Each cache holds at most RESPONSE_CACHE_MAX_BYTES of rendered bodies (LRU),
+  and entries expire after RESPONSE_CACHE_TTL_SECONDS as a safety net for
+  writes made outside the API.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import anyio
+from fastapi import Response
+
+from app.config import settings
+from app.utils import invalidation
+from app.utils.log import get_logger
+from app.utils.metrics import Counter, Gauge
+from app.utils.supabase import sb_rpc, sb_select
+
+log = get_logger("cache")
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Response cache lookups by cache and result (hit, miss, stale, expired).",
+    ("cache", "result"),
+)
+RESPONSE_CACHE_EVICTIONS = Counter(
+    "response_cache_evictions_total", "Entries evicted to stay within the cache's byte budget.",
+    ("cache",),
+)
+RESPONSE_CACHE_BYTES = Gauge("response_cache_bytes", "Bytes of cached response bodies.", ("cache",))
+RESPONSE_CACHE_ENTRIES = Gauge("response_cache_entries", "Cached responses.", ("cache",))
+
+# Bumped when the org of a change is unknown: invalidates every scope
+ALL = "*"
+# Unfiltered workflow lists span every organization
+ANY_ORG = "org:*"
+ORGANIZATIONS = "organizations"
+
+# Rough per-entry bookkeeping (key, headers, OrderedDict slot) on top of the body
+_ENTRY_OVERHEAD = 256
+
+
+def org_scope(org_id: Optional[str]) -> str:
+    return f"org:{org_id}" if org_id else ANY_ORG
+
+
+def user_scope(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+# ========== GENERATION STORES ==========
+
+class GenerationStore:
+    """Where generation counters live. Counters only go up; unknown scopes are 0."""
+
+    # False if reads may do I/O (they are then run off the event loop)
+    local = True
+
+    def get_many(self, scopes: Sequence[str]) -> List[int]:
+        raise NotImplementedError
+
+    def bump(self, scopes: Sequence[str]) -> None:
+        raise NotImplementedError
+
+    def expire(self, scopes: Sequence[str]) -> None:
+        """Another worker bumped `scopes`: stop trusting what this one knows."""
+        self.bump(scopes)
+
+
+class LocalGenerationStore(GenerationStore):
+    """Counters in this process only."""
+
+    def __init__(self):
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, scopes: Sequence[str]) -> List[int]:
+        generations = self._generations
+        return [generations.get(scope, 0) for scope in scopes]
+
+    def bump(self, scopes: Sequence[str]) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+
+
+class SupabaseGenerationStore(GenerationStore):
+    """
+    Counters in the cache_generations table, shared by every worker.
+
+    Reads are memoised for `ttl` seconds, which bounds how long a write made on
+    another worker can go unnoticed; this worker's own bumps apply at once.
+    """
+
+    local = False
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._memo: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, scope: str, generation: int, now: float) -> None:
+        # Never step back: a bump may land between a fetch and this update
+        known = self._memo.get(scope)
+        if known is not None and known[0] > generation:
+            generation = known[0]
+        self._memo[scope] = (generation, now + self.ttl)
+
+    def get_many(self, scopes: Sequence[str]) -> List[int]:
+        now = time.monotonic()
+        memo = self._memo
+        missing = [s for s in scopes if s not in memo or memo[s][1] <= now]
+        if missing:
+            rows = sb_select("cache_generations", {
+                "scope": "in.(" + ",".join(f'"{s}"' for s in missing) + ")",
+                "select": "scope,generation",
+            })
+            fetched = {r["scope"]: int(r["generation"]) for r in rows}
+            with self._lock:
+                for scope in missing:
+                    self._remember(scope, fetched.get(scope, 0), now)
+        return [memo[s][0] for s in scopes]
+
+    def bump(self, scopes: Sequence[str]) -> None:
+        rows = sb_rpc("bump_cache_generations", {"scopes": list(scopes)})
+        now = time.monotonic()
+        with self._lock:
+            for row in rows or []:
+                self._remember(row["scope"], int(row["generation"]), now)
+
+    def expire(self, scopes: Sequence[str]) -> None:
+        # The bumping worker already wrote the table; refetch on next read
+        with self._lock:
+            for scope in scopes:
+                self._memo.pop(scope, None)
+
+
+def _make_store() -> GenerationStore:
+    if settings.CACHE_GENERATION_STORE == "supabase":
+        return SupabaseGenerationStore(settings.CACHE_GENERATION_TTL)
+    return LocalGenerationStore()
+
+
+_store: GenerationStore = _make_store()
+# Bumped when the shared store cannot be: this worker then drops everything
+_epoch = 0
+
+
+def set_generation_store(store: GenerationStore) -> None:
+    """Use another generation store (e.g. one backed by a different shared service)."""
+    global _store
+    _store = store
+
+
+def invalidate(*scopes: str) -> None:
+    """Bump the generation of `scopes`. Never raises."""
+    global _epoch
+    try:
+        _store.bump(scopes)
+    except Exception as e:
+        _epoch += 1
+        log.error("Error bumping cache generations %s: %s", scopes, e)
+
+
+def _scopes(event: dict) -> tuple:
+    entity = event["entity"]
+    if entity in ("workflow", "step", "comment"):
+        org_id = event.get("org_id")
+        return (org_scope(org_id), ANY_ORG) if org_id else (ANY_ORG,)
+    if entity in ("organization", "member"):
+        return (ORGANIZATIONS,)
+    if entity == "user" and event.get("id"):
+        return (user_scope(event["id"]),)
+    if entity == invalidation.EVERYTHING:
+        return (ALL,)
+    return ()
+
+
+def _on_change(event: dict, local: bool) -> None:
+    scopes = _scopes(event)
+    if not scopes:
+        return
+    if local:
+        invalidate(*scopes)
+    else:
+        _store.expire(scopes)
+
+
+invalidation.subscribe(_on_change)
+
+
+async def current_generation(*scopes: str) -> Optional[tuple]:
+    """Generation to build or look up a response spanning `scopes` under; None to bypass the cache."""
+    scopes = (ALL, *scopes)
+    try:
+        if _store.local:
+            generations = _store.get_many(scopes)
+        else:
+            generations = await anyio.to_thread.run_sync(_store.get_many, scopes)
+    except Exception as e:
+        log.warning("Error reading cache generations for %s: %s", scopes[1:], e)
+        return None
+    return (_epoch, *generations)
+
+
+# ========== RESPONSE CACHE ==========
+
+class CachedResponse:
+    __slots__ = ("generation", "body", "headers", "size", "expires")
+
+    def __init__(self, generation: tuple, body: bytes, headers: Dict[str, str], expires: float):
+        self.generation = generation
+        self.body = body
+        self.headers = headers
+        self.size = len(body) + _ENTRY_OVERHEAD
+        self.expires = expires
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    def response(self) -> Response:
+        return Response(self.body, media_type="application/json", headers=self.headers)
+
+
+class ResponseCache:
+    """Byte-bounded LRU of rendered 200 responses, tagged with their generation."""
+
+    def __init__(self, name: str, max_bytes: int, ttl: float, enabled: bool = True):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: Optional[tuple]) -> Optional[CachedResponse]:
+        if not self.enabled or generation is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                result = "miss"
+            elif entry.generation != generation:
+                result = "stale"
+            elif entry.expires <= time.monotonic():
+                result = "expired"
+                self._drop(key)
+            else:
+                result = "hit"
+                self._entries.move_to_end(key)
+        RESPONSE_CACHE_REQUESTS.inc((self.name, result))
+        return entry if result == "hit" else None
+
+    def put(self, key: Hashable, generation: Optional[tuple], response: Response) -> None:
+        if not self.enabled or generation is None or response.status_code != 200:
+            return
+        headers = {k: response.headers[k] for k in ("etag", "cache-control") if k in response.headers}
+        entry = CachedResponse(generation, bytes(response.body), headers, time.monotonic() + self.ttl)
+        # One huge list must not flush everything else
+        if entry.size > self.max_bytes // 4:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self.size += entry.size
+            RESPONSE_CACHE_BYTES.inc((self.name,), entry.size)
+            RESPONSE_CACHE_ENTRIES.inc((self.name,))
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                RESPONSE_CACHE_EVICTIONS.inc((self.name,))
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+            RESPONSE_CACHE_BYTES.dec((self.name,), entry.size)
+            RESPONSE_CACHE_ENTRIES.dec((self.name,))
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ========== CACHES ==========
+
+WORKFLOW_LISTS = ResponseCache(
+    "workflow_lists", settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS,
+    settings.RESPONSE_CACHE_ENABLED,
+)
+ORGANIZATION_LISTS = ResponseCache(
+    "organization_lists", settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS,
+    settings.RESPONSE_CACHE_ENABLED,
+)
+# Per user and org; activity is not a scope, hence the short TTL
+DASHBOARDS = ResponseCache(
+    "dashboards", settings.RESPONSE_CACHE_MAX_BYTES, settings.DASHBOARD_CACHE_TTL_SECONDS,
+    settings.RESPONSE_CACHE_ENABLED,
+)
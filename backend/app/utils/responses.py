@@ -0,0 +1,34 @@
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when it is installed and FAST_JSON is on.
+
+    orjson natively handles datetimes, UUIDs and dataclasses and is several
+    times faster than `json.dumps`. Anything it cannot encode goes through
+    `jsonable_encoder`, so routes may return this class directly with raw rows
+    and skip FastAPI's own encoding pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None and settings.FAST_JSON:
+            return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            default=jsonable_encoder,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
@@ -0,0 +1,58 @@
+"""
+Heavy third-party SDKs, imported on first use.
+
+google.genai takes about half a second and tens of MB to import and boto3 is
+similar, yet CRUD-only requests never touch them. Code that needs an SDK
+calls the accessor here instead of importing it at module level:
+
+    client = sdk.genai().Client(api_key=...)
+    config = sdk.genai_types().GenerateContentConfig(...)
+
+After the first call the accessors are a dict lookup in sys.modules. Set
+PREWARM_SDKS to import them in a background thread at startup instead, so
+the first AI request does not pay for the import.
+"""
+
+import importlib
+import threading
+import time
+from types import ModuleType
+
+from app.utils.log import get_logger
+
+log = get_logger("sdk")
+
+HEAVY_MODULES = ("google.genai", "google.genai.types", "boto3")
+
+
+def genai() -> ModuleType:
+    from google import genai as module
+    return module
+
+
+def genai_types() -> ModuleType:
+    from google.genai import types as module
+    return module
+
+
+def boto3() -> ModuleType:
+    import boto3 as module
+    return module
+
+
+def prewarm() -> None:
+    """Import every heavy SDK now (missing optional ones are skipped)."""
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            log.warning("Could not pre-warm %s: %s", name, e)
+            continue
+        log.info("Pre-warmed %s in %.0f ms", name, (time.perf_counter() - start) * 1000)
+
+
+def prewarm_in_background() -> threading.Thread:
+    thread = threading.Thread(target=prewarm, name="sdk-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,153 @@
+"""
+In-memory inverted index used by the in-memory backend for full-text search.
+
+It mirrors the Postgres setup (weighted tsvector + GIN index + ts_headline):
+titles weigh more than bodies, queries AND their terms, results are ranked by
+TF-IDF and come back with <mark>-highlighted snippets. Documents are indexed
+incrementally as they are written, so a query only touches the postings of
+its own terms.
+"""
+
+import heapq
+import html
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+TITLE_WEIGHT = 2.0
+SNIPPET_WORDS = 20
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+DocKey = Tuple[str, str]  # (entity_type, entity_id)
+
+
+def _stem(token: str) -> str:
+    # Light suffix stripping so "approvals" finds "approval"
+    for suffix in ("ies", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[: -len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [_stem(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class InvertedIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[DocKey, float]] = {}
+        self.docs: Dict[DocKey, dict] = {}
+
+    def add(
+        self,
+        entity_type: str,
+        entity_id: str,
+        org_id: Optional[str],
+        workflow_id: Optional[str],
+        title: Optional[str],
+        body: Optional[str],
+    ) -> None:
+        """Index (or re-index) a document."""
+        key = (entity_type, entity_id)
+        self.remove(entity_type, entity_id)
+
+        weights: Counter = Counter()
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(body):
+            weights[token] += 1.0
+
+        self.docs[key] = {
+            "org_id": org_id,
+            "workflow_id": workflow_id,
+            "title": title,
+            "body": body or "",
+            "terms": list(weights),
+        }
+        for token, weight in weights.items():
+            self.postings.setdefault(token, {})[key] = weight
+
+    def remove(self, entity_type: str, entity_id: str) -> None:
+        key = (entity_type, entity_id)
+        doc = self.docs.pop(key, None)
+        if not doc:
+            return
+        for token in doc["terms"]:
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self.postings[token]
+
+    def search(self, query: str, org_id: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return {"results": [], "has_more": False}
+
+        postings = [self.postings.get(t, {}) for t in terms]
+        if any(not p for p in postings):
+            return {"results": [], "has_more": False}
+
+        # Intersect starting from the rarest term
+        order = sorted(range(len(terms)), key=lambda i: len(postings[i]))
+        candidates = set(postings[order[0]])
+        for i in order[1:]:
+            candidates &= postings[i].keys()
+            if not candidates:
+                return {"results": [], "has_more": False}
+
+        n_docs = max(len(self.docs), 1)
+        idf = [math.log(1 + n_docs / len(p)) for p in postings]
+
+        scored = []
+        for key in candidates:
+            doc = self.docs[key]
+            if org_id and doc["org_id"] != org_id:
+                continue
+            score = sum(postings[i][key] * idf[i] for i in range(len(terms)))
+            scored.append((score, key))
+
+        # Only the requested page (plus one to detect more) needs a full sort
+        top = heapq.nsmallest(offset + limit + 1, scored, key=lambda item: (-item[0], item[1]))
+        page = top[offset: offset + limit]
+        results = []
+        for score, (entity_type, entity_id) in page:
+            doc = self.docs[(entity_type, entity_id)]
+            results.append({
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "workflow_id": doc["workflow_id"],
+                "title": doc["title"],
+                "snippet": highlight(doc["title"], doc["body"], set(terms)),
+                "rank": round(score, 4),
+            })
+        return {"results": results, "has_more": len(top) > offset + limit}
+
+
+def highlight(title: Optional[str], body: str, terms: set) -> str:
+    """Short, HTML-escaped excerpt around the first match with matches wrapped in <mark>."""
+    text = f"{title} — {body}" if title else body
+    words = text.split()
+    hits = [i for i, w in enumerate(words) if any(_stem(t) in terms for t in TOKEN_RE.findall(w.lower()))]
+    start = max(0, hits[0] - SNIPPET_WORDS // 4) if hits else 0
+    hits = set(hits)
+    window = words[start: start + SNIPPET_WORDS]
+
+    out = []
+    for i, word in enumerate(window, start):
+        word = html.escape(word)
+        out.append(f"<mark>{word}</mark>" if i in hits else word)
+    snippet = " ".join(out)
+    if start > 0:
+        snippet = "… " + snippet
+    if start + SNIPPET_WORDS < len(words):
+        snippet += " …"
+    return snippet
@@ -0,0 +1,90 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When many requests ask for the same thing at once (a team opening a shared
+workflow, a dashboard refresh storm), only the first one calls upstream; the
+others wait for that call and get its result:
+
+    flights = SingleFlight("get_workflow")
+    workflow = await flights.do(("get_workflow", workflow_id), get_workflow, workflow_id)
+
+- The function runs in a worker thread, in a task of its own, so a waiter
+  being cancelled (client gone) never cancels the call the others share.
+- An exception is raised in every waiter of that flight and is not cached:
+  the next caller starts a new flight.
+- Results handed to more than one waiter are deep-copied so callers can
+  mutate what they get.
+- `invalidate()` (called on every write) starts a new generation, so a read
+  issued after a write never joins a flight that began before it.
+"""
+
+import asyncio
+import copy
+from typing import Any, Callable, Dict, Hashable
+
+import anyio
+
+from app.utils.metrics import Counter
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total", "Coalesced reads by operation and role (leader runs the call, shared waits for it).",
+    ("op", "role"),
+)
+
+_generation = 0
+
+
+def invalidate() -> None:
+    """Stop in-flight reads from being joined by later callers."""
+    global _generation
+    _generation += 1
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 1
+
+
+def _consume(task: asyncio.Task) -> None:
+    # Mark the exception retrieved even if every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        if not self.enabled:
+            return await anyio.to_thread.run_sync(fn, *args)
+
+        loop = asyncio.get_running_loop()
+        full_key = (id(loop), _generation, key)
+        flight = self._flights.get(full_key)
+        if flight is None:
+            task = loop.create_task(self._run(full_key, fn, args))
+            task.add_done_callback(_consume)
+            flight = self._flights[full_key] = _Flight(task)
+            SINGLEFLIGHT_CALLS.inc((self.name, "leader"))
+        else:
+            flight.waiters += 1
+            SINGLEFLIGHT_CALLS.inc((self.name, "shared"))
+
+        result = await asyncio.shield(flight.task)
+        return copy.deepcopy(result) if flight.waiters > 1 else result
+
+    async def _run(self, full_key: Hashable, fn: Callable[..., Any], args: tuple) -> Any:
+        try:
+            return await anyio.to_thread.run_sync(fn, *args)
+        finally:
+            # Removed before waiters resume, so the waiter count is final
+            self._flights.pop(full_key, None)
+
+    def in_flight(self) -> int:
+        return len(self._flights)
@@ -1,6 +1,15 @@
+import time
 import requests
+from functools import wraps
 from typing import Any, Dict, List
 from app.config import settings
+from app.utils.metrics import DB_CALLS, DB_LATENCY
+from app.utils.log import get_logger
+from app.utils.resilience import SUPABASE, DependencyUnavailable
+from app.utils.singleflight import invalidate as invalidate_reads
+from app.utils.tracing import current_trace, query_shape, span
+
+log = get_logger("supabase")
 
 BASE_URL = f"{settings.SUPABASE_URL}/rest/v1"
 API_KEY = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_ANON_KEY
@@ -16,57 +25,134 @@ def _headers(prefer: str | None = None) -> Dict[str, str]:
     return h
 
 
+def _instrumented(op: str):
+    """
+    Record metrics and a trace span for an sb_* function (table is the first
+    argument; the filters, if any, the second), and run it behind the Supabase
+    circuit breaker and bulkhead.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(table: str, *args, **kwargs):
+            outcome = "error"
+            start = time.perf_counter()
+            if current_trace() is not None:
+                filters = args[0] if args and op in ("select", "update", "delete") else None
+                traced = span(f"db.{op}", shape=query_shape(op, table, filters), table=table)
+            else:
+                traced = span(f"db.{op}")
+            try:
+                with traced, SUPABASE.guard():
+                    result = fn(table, *args, **kwargs)
+                outcome = "ok"
+                return result
+            except DependencyUnavailable:
+                outcome = "unavailable"
+                raise
+            finally:
+                if op in ("insert", "update", "delete"):
+                    # Reads issued after a write must not join flights from before it
+                    invalidate_reads()
+                DB_LATENCY.observe((table, op), time.perf_counter() - start)
+                DB_CALLS.inc((table, op, outcome))
+        return wrapper
+    return decorator
+
+
+@_instrumented("select")
 def sb_select(table: str, params: Dict[str, str] | None = None) -> List[Dict[str, Any]]:
     """Simple GET from Supabase REST API."""
     url = f"{BASE_URL}/{table}"
-    resp = requests.get(url, headers=_headers(), params=params or {})
+    resp = requests.get(url, headers=_headers(), params=params or {}, timeout=SUPABASE.timeout)
     resp.raise_for_status()
     return resp.json()
 
 
+@_instrumented("insert")
 def sb_insert(
     table: str,
     payload: Dict[str, Any] | List[Dict[str, Any]],
+    on_conflict: str | None = None,
+    select: str | None = None,
 ) -> List[Dict[str, Any]]:
-    """Insert row(s) and return inserted data."""
+    """
+    Insert row(s) and return inserted data (only the `select` columns, if given).
+
+    With `on_conflict` (e.g. "id"), rows clashing with existing ones on those
+    columns are skipped and left out of the result.
+    """
     url = f"{BASE_URL}/{table}"
+    prefer = "return=representation"
+    params = {}
+    if on_conflict:
+        prefer += ",resolution=ignore-duplicates"
+        params["on_conflict"] = on_conflict
+    if select:
+        params["select"] = select
     resp = requests.post(
         url,
-        headers=_headers("return=representation"),
+        headers=_headers(prefer),
+        params=params,
         json=payload,
+        timeout=SUPABASE.timeout,
     )
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
         # Log the actual error from Supabase
-        print(f"[SUPABASE ERROR] {resp.status_code}: {resp.text}")
+        log.error("Insert into %s failed with %s: %s", table, resp.status_code, resp.text)
         raise
     return resp.json()
 
 
+@_instrumented("update")
 def sb_update(
     table: str,
     match: Dict[str, Any],
     payload: Dict[str, Any],
+    select: str | None = None,
+    filters: Dict[str, str] | None = None,
 ) -> List[Dict[str, Any]]:
-    """Update rows matching equality filters in `match`."""
+    """
+    Update rows matching equality filters in `match` (and any raw PostgREST
+    `filters`, e.g. {"deleted_at": "is.null"}); returns them (only the
+    `select` columns, if given).
+    """
     url = f"{BASE_URL}/{table}"
     params = {k: f"eq.{v}" for k, v in match.items()}
+    params.update(filters or {})
+    if select:
+        params["select"] = select
     resp = requests.patch(
         url,
         headers=_headers("return=representation"),
         params=params,
         json=payload,
+        timeout=SUPABASE.timeout,
     )
     resp.raise_for_status()
     return resp.json()
 
 
+@_instrumented("delete")
 def sb_delete(table: str, match: Dict[str, Any]) -> bool:
     """Delete rows matching equality filters in `match`."""
     url = f"{BASE_URL}/{table}"
     params = {k: f"eq.{v}" for k, v in match.items()}
-    resp = requests.delete(url, headers=_headers(), params=params)
+    resp = requests.delete(url, headers=_headers(), params=params, timeout=SUPABASE.timeout)
     resp.raise_for_status()
     return True
 
+
+@_instrumented("rpc")
+def sb_rpc(function: str, args: Dict[str, Any] | None = None, select: str | None = None) -> Any:
+    """
+    Call a Postgres function exposed by PostgREST (POST /rpc/<function>).
+
+    `select` picks the columns of a function returning table rows.
+    """
+    url = f"{BASE_URL}/rpc/{function}"
+    params = {"select": select} if select else {}
+    resp = requests.post(url, headers=_headers(), params=params, json=args or {}, timeout=SUPABASE.timeout)
+    resp.raise_for_status()
+    return resp.json()
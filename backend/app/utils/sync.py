@@ -0,0 +1,130 @@
+"""
+Watermarks and cursors for the delta sync endpoint.
+
+A watermark is the database time at which a sync was produced, sent to the
+client as an ISO-8601 string. The next sync asks for rows changed after it
+minus a small overlap: a write whose transaction started before the watermark
+but committed after it carries an older `updated_at`, and the overlap makes
+sure it is still picked up. Clients therefore treat sync rows as upserts and
+may see a row twice, but never miss one.
+
+When a list is cut off at `limit`, the response carries an opaque cursor
+instead of a watermark (clients pass it back as `since` just the same). The
+cursor holds the lower bound of the sync, the time of its first page, and
+for each unfinished list the (change time, id) of its last row, so the next
+page continues exactly after it, however many rows share one timestamp. The
+overlap is applied once, to the watermark the last page hands out (the time
+of the first page).
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+# Entity lists in a sync page, in the order they are applied by clients
+ENTITIES = ("workflows", "steps", "comments", "deleted")
+
+# Marks a `since` value as a continuation cursor rather than a watermark
+CURSOR_PREFIX = "c1."
+
+
+def parse_watermark(value: Optional[str]) -> Optional[datetime]:
+    """Parse a client watermark (None = full sync). Raises 400 when malformed."""
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value.replace(" ", "+"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be a watermark returned by /sync")
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def query_since(since: Optional[datetime]) -> Optional[datetime]:
+    """Lower bound actually queried for a watermark (overlap applied)."""
+    if since is None:
+        return None
+    return since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+
+def too_old(since: Optional[datetime], now: datetime) -> bool:
+    """True when tombstones older than `since` may already have been purged."""
+    return since is not None and now - since > timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+
+
+def _position(entity: str, row: dict) -> List[Any]:
+    if entity == "deleted":
+        return [row.get("deleted_at"), row.get("entity_id")]
+    return [row.get("updated_at"), row.get("id")]
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    data = {
+        "since": state["since"].isoformat() if state["since"] else None,
+        "started": state["started"].isoformat(),
+        "after": state["after"],
+        "full": state["full"],
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return CURSOR_PREFIX + base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(value: str) -> Dict[str, Any]:
+    try:
+        body = value[len(CURSOR_PREFIX):]
+        data = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+        return {
+            "since": datetime.fromisoformat(data["since"]) if data["since"] else None,
+            "started": datetime.fromisoformat(data["started"]),
+            "after": {k: list(v) for k, v in data["after"].items() if k in ENTITIES},
+            "full": bool(data["full"]),
+        }
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="since must be a watermark returned by /sync")
+
+
+def start_sync(since: Optional[str], now: datetime) -> Dict[str, Any]:
+    """
+    Sync state for a `since` parameter: a watermark (or nothing) starts a
+    sync, a cursor continues one.
+
+    The state holds `since` (lower bound queried, overlap applied), `started`
+    (time of the first page; None until known), `after` (keyset positions,
+    None on a first page) and `full`.
+    """
+    if since and since.startswith(CURSOR_PREFIX):
+        return _decode_cursor(since)
+    watermark = parse_watermark(since)
+    if too_old(watermark, now):
+        watermark = None
+    return {"since": query_since(watermark), "started": None, "after": None, "full": watermark is None}
+
+
+def finish_page(page: dict, limit: int, now: datetime, state: Dict[str, Any]) -> dict:
+    """
+    Set `watermark` and `has_more` on a page of sync results.
+
+    Each entity list is ordered by (change time, id) and capped at `limit`.
+    If any list was cut off, `watermark` is a cursor continuing every cut-off
+    list after its last row; otherwise it is the time of the first page.
+    """
+    started = state["started"] or now
+    after: Dict[str, List[Any]] = {}
+    for entity in ENTITIES:
+        if state["after"] is not None and entity not in state["after"]:
+            continue  # finished on an earlier page
+        rows = page.get(entity) or []
+        if len(rows) >= limit:
+            after[entity] = _position(entity, rows[-1])
+    page["has_more"] = bool(after)
+    if after:
+        page["watermark"] = encode_cursor({**state, "started": started, "after": after})
+    else:
+        page["watermark"] = started.isoformat()
+    return page
@@ -0,0 +1,351 @@
+"""
+Request-scoped tracing.
+
+TracingMiddleware opens a trace per HTTP request (continuing an incoming W3C
+`traceparent` when present) and stores it in a context variable, so code deep
+in the service layer can open spans without passing anything around:
+
+    with span("db.select", table="workflows"):
+        ...
+
+Outside a request `span()` is a no-op. At response start the spans are
+summed per category into a `Server-Timing` header (db, ai, auth, total);
+optionally the whole trace is exported as OTLP/JSON to a file and/or a
+collector by a background thread.
+
+Database spans carry a query "shape" (operation, table and filter columns
+without values). In debug mode a request that runs the same shape more than
+N_PLUS_ONE_THRESHOLD times is reported as a likely N+1; `detect_n_plus_one()`
+does the same check around any block of code, e.g. in a test.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import requests
+
+from app.config import settings
+from app.utils.log import get_logger
+
+log = get_logger("trace")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("span", default=None)
+
+
+class NPlusOneError(AssertionError):
+    """Raised by detect_n_plus_one() when a query shape repeats too often."""
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "attributes", "start", "end", "_token")
+
+    def __init__(self, name: str, attributes: dict):
+        self.span_id = os.urandom(8).hex()
+        self.parent_id: Optional[str] = None
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.end = 0.0
+        self._token = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+
+class Trace:
+    def __init__(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.spans: List[Span] = []
+        self.shapes: Counter = Counter()
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.end: Optional[float] = None
+
+    def _unix_nano(self, perf: float) -> int:
+        return self.start_ns + int((perf - self.start) * 1e9)
+
+    def summary(self) -> Dict[str, List[float]]:
+        """Category -> [total ms, span count] (category = span name before the first dot)."""
+        totals: Dict[str, List[float]] = {}
+        for s in list(self.spans):
+            if not s.end:
+                continue
+            category = s.name.split(".", 1)[0]
+            entry = totals.setdefault(category, [0.0, 0])
+            entry[0] += s.duration_ms
+            entry[1] += 1
+        return totals
+
+    def repeated_shapes(self, threshold: int) -> Dict[str, int]:
+        return {shape: n for shape, n in self.shapes.items() if n > threshold}
+
+    def server_timing(self) -> str:
+        parts = []
+        for category, (ms, count) in sorted(self.summary().items()):
+            parts.append(f'{category};dur={ms:.1f};desc="{count} span{"s" if count != 1 else ""}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span")
+
+    def __init__(self, trace: Trace, span: Span):
+        self.trace = trace
+        self.span = span
+
+    def __enter__(self) -> Span:
+        s = self.span
+        s.parent_id = _current_span.get() or self.trace.parent_id
+        s._token = _current_span.set(s.span_id)
+        s.start = time.perf_counter()
+        return s
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        s = self.span
+        s.end = time.perf_counter()
+        if exc_type is not None:
+            s.attributes["error"] = exc_type.__name__
+        _current_span.reset(s._token)
+        self.trace.spans.append(s)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, shape: Optional[str] = None, **attributes):
+    """Time a block as a span of the current trace (no-op outside a request)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    if shape is not None:
+        trace.shapes[shape] += 1
+        attributes["shape"] = shape
+    return _SpanContext(trace, Span(name, attributes))
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def query_shape(op: str, table: str, filters: Optional[dict]) -> str:
+    """Shape of a PostgREST call: values are dropped, operators are kept."""
+    if not filters:
+        return f"{op} {table}"
+    keys = []
+    for key in sorted(filters):
+        value = filters[key]
+        if key in ("select", "order"):
+            keys.append(f"{key}={value}")
+        elif isinstance(value, str) and "." in value:
+            keys.append(f"{key}={value.split('.', 1)[0]}")
+        else:
+            keys.append(key)
+    return f"{op} {table} ?{'&'.join(keys)}"
+
+
+class detect_n_plus_one:
+    """
+    Context manager that traces the enclosed code and raises NPlusOneError if
+    any query shape ran more than `threshold` times:
+
+        with detect_n_plus_one(threshold=3):
+            list_workflows(org_id)
+    """
+
+    def __init__(self, threshold: Optional[int] = None):
+        self.threshold = settings.N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.trace: Optional[Trace] = None
+        self._token = None
+
+    def __enter__(self) -> Trace:
+        self.trace = Trace("detect_n_plus_one")
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_trace.reset(self._token)
+        if exc_type is None:
+            repeated = self.trace.repeated_shapes(self.threshold)
+            if repeated:
+                raise NPlusOneError(_describe(repeated))
+
+
+def _describe(repeated: Dict[str, int]) -> str:
+    return "; ".join(f"'{shape}' x{n}" for shape, n in sorted(repeated.items(), key=lambda i: -i[1]))
+
+
+# ========== EXPORT ==========
+
+def _otlp_attributes(attributes: dict) -> List[dict]:
+    out = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            out.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            out.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            out.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            out.append({"key": key, "value": {"stringValue": str(value)}})
+    return out
+
+
+def to_otlp(trace: Trace, attributes: Optional[dict] = None) -> dict:
+    """The trace as an OTLP/JSON ExportTraceServiceRequest."""
+    root_id = os.urandom(8).hex()
+    end = trace.end or time.perf_counter()
+    spans = [{
+        "traceId": trace.trace_id,
+        "spanId": root_id,
+        "parentSpanId": trace.parent_id or "",
+        "name": trace.name,
+        "kind": 2,  # SERVER
+        "startTimeUnixNano": str(trace.start_ns),
+        "endTimeUnixNano": str(trace._unix_nano(end)),
+        "attributes": _otlp_attributes(attributes or {}),
+    }]
+    for s in trace.spans:
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": root_id if s.parent_id in (None, trace.parent_id) else s.parent_id,
+            "name": s.name,
+            "kind": 3 if s.name.split(".", 1)[0] in ("db", "ai") else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(trace._unix_nano(s.start)),
+            "endTimeUnixNano": str(trace._unix_nano(s.end)),
+            "attributes": _otlp_attributes(s.attributes),
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": "workflow-copilot-api"})},
+            "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Writes traces from a background thread so requests never wait on I/O."""
+
+    def __init__(self, path: str = "", url: str = "", maxsize: int = 10000):
+        self.path = path
+        self.url = url
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: dict) -> None:
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            payload = self._queue.get()
+            try:
+                if self.path:
+                    with open(self.path, "a") as f:
+                        f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+                if self.url:
+                    requests.post(self.url, json=payload, timeout=5)
+            except Exception as e:
+                log.warning("Export failed: %s", e)
+
+
+_exporter: Optional[TraceExporter] = None
+
+
+def _get_exporter() -> Optional[TraceExporter]:
+    global _exporter
+    if _exporter is None and (settings.TRACE_EXPORT_PATH or settings.TRACE_EXPORT_URL):
+        _exporter = TraceExporter(settings.TRACE_EXPORT_PATH, settings.TRACE_EXPORT_URL)
+    return _exporter
+
+
+# ========== MIDDLEWARE ==========
+
+def _parse_traceparent(value: Optional[bytes]):
+    # version-traceid-parentid-flags
+    if not value:
+        return None, None
+    parts = value.decode("latin-1").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware that runs each HTTP request inside a Trace."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                traceparent = value
+                break
+        trace_id, parent_id = _parse_traceparent(traceparent)
+        trace = Trace(f"{scope['method']} {scope['path']}", trace_id, parent_id)
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if settings.SERVER_TIMING:
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    headers.append((b"timing-allow-origin", settings.FRONTEND_URL.encode("latin-1")))
+                if settings.N_PLUS_ONE_DETECT:
+                    repeated = trace.repeated_shapes(settings.N_PLUS_ONE_THRESHOLD)
+                    if repeated:
+                        headers.append((b"x-n-plus-one", _describe(repeated).encode("latin-1", "replace")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            trace.end = time.perf_counter()
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                trace.name = f"{scope['method']} {route}"
+            if settings.N_PLUS_ONE_DETECT:
+                repeated = trace.repeated_shapes(settings.N_PLUS_ONE_THRESHOLD)
+                if repeated:
+                    log.warning("Possible N+1 in %s: %s", trace.name, _describe(repeated))
+            exporter = _get_exporter()
+            if exporter is not None:
+                exporter.submit(to_otlp(trace, {
+                    "http.method": scope["method"],
+                    "http.route": route or scope["path"],
+                    "http.status_code": status,
+                }))
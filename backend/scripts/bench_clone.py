@@ -0,0 +1,146 @@
+"""
+Benchmark copying a workflow: client-side copy vs POST /workflows/{id}/clone.
+
+Starts the load-test stand-ins (scripts/loadtest/fakes.py) in a subprocess
+and times, in-process (httpx ASGI transport), copying one workflow of
+`--steps` steps:
+
+  - client: GET the workflow, POST a new workflow, then POST each step, as
+    the client had to before
+  - clone: one POST /api/v1/workflows/{id}/clone (a single clone_workflow RPC)
+
+Also reports the upstream (PostgREST) calls each copy made, from the fakes'
+call counters.
+
+Usage:
+    python scripts/bench_clone.py [--iterations 10] [--steps 50] [--db-latency-ms 20] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "ERROR",
+    "DEBUG": "False",
+    "RATE_LIMIT_ENABLED": "False",
+})
+
+import httpx
+import jwt
+
+from app.main import app
+
+
+def wait_for_fixtures(timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return httpx.get(f"http://127.0.0.1:{PORT}/__fixtures", timeout=1.0).json()
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("fakes did not come up")
+
+
+def upstream_calls() -> int:
+    stats = httpx.get(f"http://127.0.0.1:{PORT}/__stats").json()
+    return sum(n for key, n in stats.items() if key.startswith("db."))
+
+
+async def run(fixtures, args) -> dict:
+    source_id = fixtures["orgs"][0]["workflows"][0]["id"]
+    headers = {"Authorization": "Bearer " + jwt.encode({"sub": fixtures["users"][0]}, "bench")}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=120) as client:
+
+        async def client_copy():
+            resp = await client.get(f"/api/v1/workflows/{source_id}")
+            resp.raise_for_status()
+            source = resp.json()["workflow"]
+            resp = await client.post("/api/v1/workflows/", json={
+                "title": source["title"], "description": source.get("description"),
+                "organization_id": source.get("organization_id"),
+            })
+            resp.raise_for_status()
+            copy_id = resp.json()["workflow_id"]
+            for step in source["steps"]:
+                (await client.post("/api/v1/steps/", json={
+                    "workflow_id": copy_id, "title": step["title"], "description": step.get("description"),
+                })).raise_for_status()
+
+        async def clone():
+            (await client.post(f"/api/v1/workflows/{source_id}/clone")).raise_for_status()
+
+        await client.get("/api/v1/users/me")  # warm up auth and the middleware stack
+        for mode, call in (("client", client_copy), ("clone", clone)):
+            times, calls = [], []
+            for _ in range(args.iterations):
+                httpx.post(f"http://127.0.0.1:{PORT}/__reset")
+                start = time.perf_counter()
+                await call()
+                times.append((time.perf_counter() - start) * 1000)
+                calls.append(upstream_calls())
+            results[mode] = {
+                "median_ms": round(statistics.median(times), 1),
+                "p95_ms": round(sorted(times)[int(0.95 * (len(times) - 1))], 1),
+                "upstream_calls": round(statistics.median(calls)),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "loadtest", "fakes.py"), "--port", str(PORT),
+         "--db-latency-ms", str(args.db_latency_ms), "--orgs", "1", "--workflows", "1",
+         "--steps", str(args.steps), "--users", "1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        fixtures = wait_for_fixtures()
+        results = {"iterations": args.iterations, "steps": args.steps, "db_latency_ms": args.db_latency_ms,
+                   "modes": asyncio.run(run(fixtures, args))}
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    print(f"Copy a {args.steps}-step workflow, upstream latency {args.db_latency_ms:.0f} ms, "
+          f"{args.iterations} iterations")
+    print(f"{'mode':<8} {'upstream calls':>15} {'median ms':>10} {'p95 ms':>8}")
+    for mode, r in results["modes"].items():
+        print(f"{mode:<8} {r['upstream_calls']:>15} {r['median_ms']:>10.1f} {r['p95_ms']:>8.1f}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark the dashboard bootstrap: separate calls vs GET /api/v1/dashboard.
+
+Starts the load-test stand-ins (scripts/loadtest/fakes.py) in a subprocess
+and times, in-process (httpx ASGI transport), what the dashboard needs on
+first load:
+
+  - separate: /users/me, /organizations, /workflows (summary) and
+    /activity-logs, one after the other as the client issues them today
+  - dashboard: one GET /api/v1/dashboard, with the response caches off
+  - cached: the same, served from the per-user dashboard cache
+
+With a fixed upstream latency the separate calls cost the sum of their
+queries, the dashboard roughly the slowest one.
+
+Usage:
+    python scripts/bench_dashboard.py [--iterations 30] [--db-latency-ms 20] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "ERROR",
+    "DEBUG": "False",
+})
+
+import httpx
+import jwt
+
+from app.main import app
+from app.utils.response_cache import DASHBOARDS, ORGANIZATION_LISTS, WORKFLOW_LISTS
+
+
+def wait_for_fixtures(timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return httpx.get(f"http://127.0.0.1:{PORT}/__fixtures", timeout=1.0).json()
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("fakes did not come up")
+
+
+def set_caches(enabled: bool) -> None:
+    for cache in (DASHBOARDS, ORGANIZATION_LISTS, WORKFLOW_LISTS):
+        cache.enabled = enabled
+        cache.clear()
+
+
+async def run(fixtures, args) -> dict:
+    org_id = fixtures["orgs"][0]["id"]
+    headers = {"Authorization": "Bearer " + jwt.encode({"sub": fixtures["users"][0]}, "bench")}
+    separate = [
+        ("/api/v1/users/me", {}),
+        ("/api/v1/organizations/", {}),
+        ("/api/v1/workflows/", {"org_id": org_id, "view": "summary"}),
+        ("/api/v1/activity-logs/", {"org_id": org_id, "view": "summary"}),
+    ]
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+
+        async def separate_calls():
+            for path, params in separate:
+                (await client.get(path, params=params)).raise_for_status()
+
+        async def dashboard():
+            (await client.get("/api/v1/dashboard/", params={"org_id": org_id})).raise_for_status()
+
+        for mode, call, cached in (("separate", separate_calls, False), ("dashboard", dashboard, False),
+                                   ("cached", dashboard, True)):
+            set_caches(cached)
+            await call()  # warm up (and fill the cache)
+            times = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                await call()
+                times.append((time.perf_counter() - start) * 1000)
+            results[mode] = {
+                "median_ms": round(statistics.median(times), 1),
+                "p95_ms": round(sorted(times)[int(0.95 * (len(times) - 1))], 1),
+                "round_trips": len(separate) if mode == "separate" else 1,
+            }
+    set_caches(True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--workflows", type=int, default=50)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "loadtest", "fakes.py"), "--port", str(PORT),
+         "--db-latency-ms", str(args.db_latency_ms), "--orgs", "1", "--workflows", str(args.workflows),
+         "--steps", "5", "--users", "5"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        fixtures = wait_for_fixtures()
+        results = {"iterations": args.iterations, "db_latency_ms": args.db_latency_ms,
+                   "modes": asyncio.run(run(fixtures, args))}
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    print(f"Dashboard bootstrap, upstream latency {args.db_latency_ms:.0f} ms, {args.iterations} iterations")
+    print(f"{'mode':<10} {'round trips':>12} {'median ms':>10} {'p95 ms':>8}")
+    for mode, r in results["modes"].items():
+        print(f"{mode:<10} {r['round_trips']:>12} {r['median_ms']:>10.1f} {r['p95_ms']:>8.1f}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark workflow history: storage vs rebuild cost by snapshot spacing.
+
+Runs the load-test stand-ins (scripts/loadtest/fakes.py) in-process, seeds a
+workflow of `--steps` steps and applies the same random sequence of `--edits`
+edits (step text edits, added and removed steps, renames) to one copy of it
+per WORKFLOW_HISTORY_SNAPSHOT_EVERY value, recording a revision after every
+edit. For each spacing it reports:
+
+  - stored bytes of history (snapshots plus patches), against storing a
+    full snapshot every time (spacing 1)
+  - time to rebuild a version (median and worst over every version) and
+    the most patches applied for one
+
+Usage:
+    python scripts/bench_history.py [--steps 50] [--edits 200] [--spacings 1,5,10,20,50] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+sys.path.insert(0, os.path.join(HERE, "loadtest"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "ERROR",
+    "DEBUG": "False",
+    "WORKFLOW_HISTORY_ENABLED": "False",
+})
+
+import fakes
+from app.services import supabase_db as db
+from app.services.history import HistoryRecorder, document
+
+
+def edit(workflow_id: str, step_ids: list, rng: random.Random, i: int) -> None:
+    roll = rng.random()
+    if roll < 0.7:
+        db.update_step(rng.choice(step_ids), {"description": f"Revised instructions, pass {i}: " + "details " * 8})
+    elif roll < 0.8:
+        step_ids.append(db.insert_step({"workflow_id": workflow_id, "title": f"Added step {i}",
+                                        "description": "New step " * 10})["id"])
+    elif roll < 0.9 and len(step_ids) > 1:
+        db.delete_step(step_ids.pop(rng.randrange(len(step_ids))))
+    else:
+        db.update_workflow(workflow_id, {"title": f"Vendor onboarding v{i}"})
+
+
+def run_spacing(source_id: str, spacing: int, args) -> dict:
+    copy = db.clone_workflow(source_id)
+    workflow_id = copy["id"]
+    step_ids = [s["id"] for s in db.list_steps(workflow_id)]
+    recorder = HistoryRecorder(spacing, debounce=0)
+    rng = random.Random(args.seed)
+    recorder.record(workflow_id)
+    for i in range(args.edits):
+        edit(workflow_id, step_ids, rng, i)
+        recorder.record(workflow_id)
+
+    rows = db.list_workflow_revisions(workflow_id, with_data=True)
+    rebuild_ms = []
+    for row in rows:
+        recorder._latest.clear()
+        start = time.perf_counter()
+        doc = recorder.reconstruct(workflow_id, row["version"])
+        rebuild_ms.append((time.perf_counter() - start) * 1000)
+        assert doc is not None
+    latest = recorder.reconstruct(workflow_id, rows[0]["version"])
+    assert latest == document(db.get_workflow(workflow_id)), "latest version does not match the workflow"
+    return {
+        "revisions": len(rows),
+        "snapshots": sum(1 for r in rows if r["kind"] == "snapshot"),
+        "stored_kb": round(sum(len(json.dumps(r["data"])) for r in rows) / 1024, 1),
+        "max_patches": max(r["depth"] for r in rows),
+        "rebuild_median_ms": round(statistics.median(rebuild_ms), 2),
+        "rebuild_max_ms": round(max(rebuild_ms), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--spacings", default="1,5,10,20,50")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    store = fakes.Store()
+    fixtures = store.seed(1, 1, args.steps, 1, random.Random(args.seed))
+    server = fakes.serve(PORT, args.db_latency_ms, 0, 0, store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    source_id = fixtures["orgs"][0]["workflows"][0]["id"]
+
+    results = {"steps": args.steps, "edits": args.edits, "spacings": {}}
+    for spacing in [int(s) for s in args.spacings.split(",")]:
+        results["spacings"][spacing] = run_spacing(source_id, spacing, args)
+    server.shutdown()
+
+    print(f"{args.edits} edits of a {args.steps}-step workflow, one revision per edit")
+    print(f"{'spacing':>8} {'snapshots':>10} {'stored KB':>10} {'max patches':>12} {'rebuild p50 ms':>15} "
+          f"{'rebuild max ms':>15}")
+    for spacing, r in results["spacings"].items():
+        print(f"{spacing:>8} {r['snapshots']:>10} {r['stored_kb']:>10.1f} {r['max_patches']:>12} "
+              f"{r['rebuild_median_ms']:>15.2f} {r['rebuild_max_ms']:>15.2f}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark API cold start: import time and RSS of `app.main`.
+
+Each run is a fresh interpreter started with `python -X importtime -c
+"import app.main"` (what a new uvicorn worker does before serving). Reports:
+  - wall time to import app.main, and the importtime total (median of runs)
+  - max RSS after the import
+  - the slowest modules by cumulative import time
+  - which heavy SDKs (google.genai, boto3) got imported; with lazy imports
+    none should be, unless PREWARM_SDKS is set
+
+The tracked baseline lives in scripts/baselines/imports.json. `--check` fails
+(exit 1) when import time or RSS regress more than --tolerance against it,
+or when a heavy SDK is imported at startup; `--update-baseline` rewrites it.
+
+Usage:
+    python scripts/bench_imports.py [--runs 5] [--top 15] [--check] [--update-baseline] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BASELINE = os.path.join(BACKEND, "scripts", "baselines", "imports.json")
+
+HEAVY = ("google.genai", "boto3", "botocore")
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"wall_s": elapsed, "rss_mb": rss_kb / 1024,
+                  "heavy": sorted(m for m in %r if m in sys.modules)}))
+""" % (HEAVY,)
+
+
+def run_once(env: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # "import time: self [us] | cumulative | imported package"
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    result["importtime_s"] = modules.get("app.main", 0) / 1e6
+    result["modules"] = modules
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--prewarm", action="store_true", help="measure with PREWARM_SDKS=True")
+    parser.add_argument("--check", action="store_true", help="compare against the tracked baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression for --check")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PREWARM_SDKS": "True" if args.prewarm else "False", "LOG_LEVEL": "WARNING"}
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    cumulative = {}
+    for r in runs:
+        for name, us in r["modules"].items():
+            cumulative.setdefault(name, []).append(us)
+    slowest = sorted(((statistics.median(v), k) for k, v in cumulative.items()), reverse=True)
+    top = [(k, round(us / 1000, 1)) for us, k in slowest if k != "app.main"][:args.top]
+
+    results = {
+        "runs": args.runs,
+        "prewarm": args.prewarm,
+        "python": sys.version.split()[0],
+        "wall_ms": round(statistics.median(r["wall_s"] for r in runs) * 1000, 1),
+        "importtime_ms": round(statistics.median(r["importtime_s"] for r in runs) * 1000, 1),
+        "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+        "heavy_imported": runs[-1]["heavy"],
+        "slowest_modules_ms": dict(top),
+    }
+
+    print(f"import app.main ({args.runs} fresh interpreters, median)")
+    print(f"  wall time:      {results['wall_ms']:>8.1f} ms")
+    print(f"  -X importtime:  {results['importtime_ms']:>8.1f} ms")
+    print(f"  max RSS:        {results['rss_mb']:>8.1f} MB")
+    print(f"  heavy SDKs:     {', '.join(results['heavy_imported']) or 'none'}")
+    print("  slowest modules (cumulative):")
+    for name, ms in top:
+        print(f"    {ms:>8.1f} ms  {name}")
+
+    status = 0
+    if args.check:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        limit = 1 + args.tolerance
+        failures = []
+        for key in ("importtime_ms", "rss_mb"):
+            if results[key] > baseline[key] * limit:
+                failures.append(f"{key} {results[key]} > {baseline[key]} (+{args.tolerance:.0%})")
+        if results["heavy_imported"] and not args.prewarm:
+            failures.append(f"heavy SDKs imported at startup: {', '.join(results['heavy_imported'])}")
+        for key in ("importtime_ms", "rss_mb"):
+            change = (results[key] - baseline[key]) / baseline[key] * 100
+            print(f"  vs baseline {key}: {baseline[key]} -> {results[key]} ({change:+.0f}%)")
+        if failures:
+            print("FAIL: " + "; ".join(failures))
+            status = 1
+        else:
+            print("OK: within baseline")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline updated: {os.path.relpath(BASELINE, BACKEND)}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Check cross-worker cache invalidation: stale reads after writes.
+
+Starts the load-test stand-ins (scripts/loadtest/fakes.py) and uvicorn with
+several workers, once per invalidation transport. For each write (renaming a
+workflow through one worker) it then reads the org's workflow list over fresh
+connections, so the reads spread across workers, and counts the reads that
+still show the old title and the writes that every later read saw.
+
+With INVALIDATION_TRANSPORT=local each worker's list cache only learns of its
+own writes, so reads served by the others stay stale (until the cache TTL);
+with `unix` (or `postgres`) every read after the write is fresh.
+
+Usage:
+    python scripts/bench_invalidation.py [--transports local unix] [--workers 2] [--writes 10] [--reads 20] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import jwt
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def run_transport(transport: str, args) -> dict:
+    fakes_port, api_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": f"http://127.0.0.1:{fakes_port}",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench",
+        "LOG_LEVEL": "WARNING",
+        "DEBUG": "False",
+        "INVALIDATION_TRANSPORT": transport,
+        "INVALIDATION_SOCKET_DIR": tempfile.mkdtemp(prefix="invalidation-"),
+    }
+    fakes = subprocess.Popen(
+        [sys.executable, "scripts/loadtest/fakes.py", "--port", str(fakes_port), "--db-latency-ms", "1",
+         "--orgs", "1", "--workflows", "10", "--users", "5"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port), "--workers", str(args.workers)],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{fakes_port}/__fixtures")
+        wait_for(f"http://127.0.0.1:{api_port}/health")
+        time.sleep(1.0)  # every worker up
+        fixtures = httpx.get(f"http://127.0.0.1:{fakes_port}/__fixtures").json()
+        org = fixtures["orgs"][0]
+        workflow_id = org["workflows"][0]["id"]
+        headers = {"Authorization": "Bearer " + jwt.encode({"sub": fixtures["users"][0]}, "bench")}
+        base = f"http://127.0.0.1:{api_port}"
+
+        def read_title() -> str:
+            # A new connection each time, so the kernel spreads reads over workers
+            with httpx.Client(base_url=base, headers=headers) as client:
+                resp = client.get("/api/v1/workflows/", params={"org_id": org["id"], "view": "summary"})
+                resp.raise_for_status()
+                return next(w["title"] for w in resp.json()["workflows"] if w["id"] == workflow_id)
+
+        for _ in range(args.reads):
+            read_title()  # fill every worker's cache
+
+        stale = reads = 0
+        fully_fresh = 0
+        for i in range(args.writes):
+            title = f"Renamed {i}"
+            with httpx.Client(base_url=base, headers=headers) as client:
+                client.put(f"/api/v1/workflows/{workflow_id}", json={"title": title}).raise_for_status()
+            time.sleep(args.settle_ms / 1000)
+            stale_now = 0
+            for _ in range(args.reads):
+                reads += 1
+                if read_title() != title:
+                    stale_now += 1
+            stale += stale_now
+            fully_fresh += stale_now == 0
+        return {
+            "reads_after_writes": reads,
+            "stale_reads": stale,
+            "stale_ratio": round(stale / reads, 3) if reads else 0.0,
+            "writes_fully_fresh": fully_fresh,
+            "writes": args.writes,
+        }
+    finally:
+        api.terminate()
+        fakes.terminate()
+        api.wait()
+        fakes.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transports", nargs="+", default=["local", "unix"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--writes", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=20, help="reads after each write")
+    parser.add_argument("--settle-ms", type=float, default=20.0, help="pause between a write and its reads")
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {"workers": args.workers, "transports": {}}
+    for transport in args.transports:
+        results["transports"][transport] = run_transport(transport, args)
+
+    print(f"{args.workers} workers, {args.writes} writes, {args.reads} reads after each "
+          f"({args.settle_ms:.0f} ms after the write)")
+    print(f"{'transport':<10} {'stale reads':>12} {'stale ratio':>12} {'writes seen by all':>19}")
+    for transport, r in results["transports"].items():
+        print(f"{transport:<10} {r['stale_reads']:>12} {r['stale_ratio']:>12.1%} "
+              f"{r['writes_fully_fresh']:>13}/{r['writes']}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark CRUD route throughput with blocking vs queued logging.
+
+Runs a create/get/update/add-step/list-steps/delete cycle against the app
+in-process (httpx ASGI transport; the sb_* helpers are swapped for an
+in-process table store so the network is out of the picture) while stdout is
+a pipe drained at a limited rate, like a container log driver under
+backpressure. Compared modes:
+
+  - print:  synchronous stdout handler, full payloads, every message
+            (what the old print() calls did)
+  - queue:  queue-backed handler with defaults (INFO, redaction, sampling)
+  - queue+debug: queue-backed handler at DEBUG with payloads, to separate
+            the effect of the background writer from the smaller output
+
+Usage:
+    python scripts/bench_logging.py [--cycles 300] [--drain-kbps 64] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import jwt
+
+from app.config import settings
+from app.services import supabase_db
+from app.utils import log as applog
+
+
+# ---------- in-process PostgREST stand-in ----------
+
+TABLES = {}
+
+
+def _match(row, filters):
+    for key, expr in (filters or {}).items():
+        if key in ("select", "order", "limit", "offset"):
+            continue
+        op, _, value = str(expr).partition(".")
+        if op == "eq" and str(row.get(key)) != value:
+            return False
+    return True
+
+
+def fake_select(table, params=None):
+    return [dict(r) for r in TABLES.get(table, {}).values() if _match(r, params)]
+
+
+def fake_insert(table, payload):
+    rows = payload if isinstance(payload, list) else [payload]
+    out = []
+    for p in rows:
+        row = {"id": str(uuid.uuid4()), "created_at": "2024-01-01T00:00:00Z",
+               "updated_at": "2024-01-01T00:00:00Z", "version": 1, **p}
+        TABLES.setdefault(table, {})[row["id"]] = row
+        out.append(dict(row))
+    return out
+
+
+def fake_update(table, match, payload):
+    out = []
+    for row in TABLES.get(table, {}).values():
+        if all(str(row.get(k)) == str(v) for k, v in match.items()):
+            row.update(payload)
+            out.append(dict(row))
+    return out
+
+
+def fake_delete(table, match):
+    rows = TABLES.get(table, {})
+    for rid in [r["id"] for r in rows.values() if all(str(r.get(k)) == str(v) for k, v in match.items())]:
+        del rows[rid]
+    return True
+
+
+def install_fake_db():
+    supabase_db.sb_select = fake_select
+    supabase_db.sb_insert = fake_insert
+    supabase_db.sb_update = fake_update
+    supabase_db.sb_delete = fake_delete
+
+
+# ---------- slow stdout ----------
+
+def slow_stdout(drain_kbps: int):
+    """Point fd 1 at a pipe drained at `drain_kbps`; returns a restore function."""
+    read_fd, write_fd = os.pipe()
+    saved = os.dup(1)
+    os.dup2(write_fd, 1)
+    os.close(write_fd)
+    stop = threading.Event()
+
+    def drain():
+        chunk = 4096
+        delay = chunk / (drain_kbps * 1024)
+        while not stop.is_set():
+            if not os.read(read_fd, chunk):
+                break
+            time.sleep(delay)
+
+    t = threading.Thread(target=drain, daemon=True)
+    t.start()
+
+    def restore():
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        stop.set()
+
+    return restore
+
+
+# ---------- logging modes ----------
+
+def use_print_mode():
+    applog.shutdown_logging()
+    logger = logging.getLogger("app")
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(applog.TextFormatter())
+    handler.addFilter(applog.ContextFilter())
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    settings.LOG_PAYLOADS = True
+    settings.LOG_SAMPLE_EVERY = 1
+
+
+def use_queue_mode(debug: bool):
+    applog.shutdown_logging()
+    settings.LOG_LEVEL = "DEBUG" if debug else "INFO"
+    settings.LOG_PAYLOADS = debug
+    settings.LOG_SAMPLE_EVERY = 1 if debug else 100
+    applog.configure_logging()
+
+
+async def run_cycles(app, cycles: int) -> float:
+    token = jwt.encode({"sub": "bench-user"}, "bench")
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for i in range(cycles):
+            r = await client.post("/api/v1/workflows/", json={"title": f"W{i}", "description": "x" * 400}, headers=headers)
+            wid = r.json()["workflow_id"]
+            await client.get(f"/api/v1/workflows/{wid}", headers=headers)
+            await client.patch(f"/api/v1/workflows/{wid}", json={"status": "published"}, headers=headers)
+            await client.post("/api/v1/steps/", json={"workflow_id": wid, "title": "Review", "description": "y" * 400}, headers=headers)
+            await client.get(f"/api/v1/steps/workflow/{wid}", headers=headers)
+            await client.delete(f"/api/v1/workflows/{wid}", headers=headers)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cycles", type=int, default=300)
+    parser.add_argument("--drain-kbps", type=int, default=64, help="stdout drain rate (KiB/s)")
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    install_fake_db()
+    settings.N_PLUS_ONE_DETECT = False
+    from app.main import app
+
+    modes = {
+        "print": use_print_mode,
+        "queue": lambda: use_queue_mode(debug=False),
+        "queue+debug": lambda: use_queue_mode(debug=True),
+    }
+    requests_per_cycle = 6
+    results = {"cycles": args.cycles, "drain_kbps": args.drain_kbps, "req_per_s": {}}
+
+    asyncio.run(run_cycles(app, 20))  # warm up
+    for name, setup in modes.items():
+        restore = slow_stdout(args.drain_kbps)
+        try:
+            setup()
+            elapsed = asyncio.run(run_cycles(app, args.cycles))
+        finally:
+            applog.shutdown_logging()
+            restore()
+        results["req_per_s"][name] = round(args.cycles * requests_per_cycle / elapsed, 1)
+
+    print(f"CRUD cycle x{args.cycles} ({requests_per_cycle} requests each), stdout drained at {args.drain_kbps} KiB/s")
+    base = results["req_per_s"]["print"]
+    for name, rps in results["req_per_s"].items():
+        print(f"  {name:<12} {rps:>10.1f} req/s  ({rps / base:.2f}x)")
+    print(f"  records dropped by the queue handler: {applog.dropped_records()}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmark event-loop lag, blocking-call detection and admission control.
+
+Starts the load-test stand-ins (scripts/loadtest/fakes.py) in a subprocess,
+so they do not compete with the event loop for the GIL, and runs three kinds
+of users against the app in-process (httpx ASGI transport) for a fixed time,
+with admission control off and on:
+
+  - readers: workflow list and workflow page (reads run in worker threads)
+  - writers: step edits (synchronous PostgREST calls on the event loop)
+  - AI users: POST /api/v1/ai/convert (low priority)
+
+Reports loop lag percentiles (timer oversleep), read latency, AI
+requests served and shed, and the stalls the blocking detector attributed,
+by the app code that caused them.
+
+Usage:
+    python scripts/bench_loop_lag.py [--seconds 10] [--readers 20] [--writers 1] [--ai-users 10] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+sys.path.insert(0, os.path.join(HERE, "loadtest"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "GEMINI_API_KEY": "bench",
+    "GEMINI_BASE_URL": f"http://127.0.0.1:{PORT}",
+    "LOG_LEVEL": "ERROR",
+    "DEBUG": "False",
+    "BLOCKING_DETECT": "True",
+})
+
+import httpx
+import jwt
+
+from app.main import app
+from app.utils.admission import ADMISSION_REJECTIONS, AdmissionControlMiddleware
+from app.utils.loop_monitor import EVENT_LOOP_BLOCKED, MONITOR
+
+from scenarios import RAW_SOP
+
+
+def pct(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def wait_for_fixtures(timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return httpx.get(f"http://127.0.0.1:{PORT}/__fixtures", timeout=1.0).json()
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("fakes did not come up")
+
+
+def find_admission() -> AdmissionControlMiddleware:
+    layer = app.middleware_stack
+    while layer is not None and not isinstance(layer, AdmissionControlMiddleware):
+        layer = getattr(layer, "app", None)
+    if layer is None:
+        raise SystemExit("AdmissionControlMiddleware is not installed (ADMISSION_CONTROL_ENABLED=False?)")
+    return layer
+
+
+async def run_case(fixtures, args, enabled: bool) -> dict:
+    org = fixtures["orgs"][0]
+    tokens = [jwt.encode({"sub": uid}, "bench") for uid in fixtures["users"]]
+    rng = random.Random(1)
+    read_ms, write_ms, lags = [], [], []
+    ai = {"ok": 0, "shed": 0, "other": 0}
+    errors = {"read": 0, "write": 0}
+    blocked_before = dict(EVENT_LOOP_BLOCKED.collect())
+    shed_before = sum(ADMISSION_REJECTIONS.collect().values())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await client.get("/health")  # builds the middleware stack
+        admission = find_admission()
+        admission.max_lag = args.max_lag_ms / 1000 if enabled else float("inf")
+        admission.max_in_flight = args.max_in_flight if enabled else 1 << 30
+        MONITOR.start()
+        deadline = time.perf_counter() + args.seconds
+
+        async def reader(token):
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < deadline:
+                wf = rng.choice(org["workflows"])
+                start = time.perf_counter()
+                if rng.random() < 0.5:
+                    resp = await client.get("/api/v1/workflows/", params={"org_id": org["id"], "view": "summary"},
+                                            headers=headers)
+                else:
+                    resp = await client.get(f"/api/v1/workflows/{wf['id']}", headers=headers)
+                if resp.status_code != 200:
+                    errors["read"] += 1
+                    continue
+                read_ms.append((time.perf_counter() - start) * 1000)
+
+        async def writer(token):
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < deadline:
+                wf = rng.choice(org["workflows"])
+                start = time.perf_counter()
+                resp = await client.patch(f"/api/v1/steps/{rng.choice(wf['steps'])}",
+                                          json={"description": f"Edited {time.time():.3f}"}, headers=headers)
+                if resp.status_code != 200:
+                    errors["write"] += 1
+                    continue
+                write_ms.append((time.perf_counter() - start) * 1000)
+
+        async def ai_user(token):
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < deadline:
+                resp = await client.post("/api/v1/ai/convert", json={"raw_text": RAW_SOP}, headers=headers)
+                if resp.status_code == 503 and resp.json().get("reason") in ("loop_lag", "in_flight"):
+                    ai["shed"] += 1
+                    await asyncio.sleep(float(resp.headers.get("retry-after", 1)))
+                elif resp.status_code == 200:
+                    ai["ok"] += 1
+                else:
+                    ai["other"] += 1
+
+        async def probe():
+            # Same measurement as the monitor, but every sample rather than the recent worst
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await asyncio.sleep(MONITOR.interval)
+                lags.append(max(0.0, time.perf_counter() - start - MONITOR.interval) * 1000)
+
+        users = (
+            [reader(tokens[i % len(tokens)]) for i in range(args.readers)]
+            + [writer(tokens[i % len(tokens)]) for i in range(args.writers)]
+            + [ai_user(tokens[i % len(tokens)]) for i in range(args.ai_users)]
+        )
+        await asyncio.gather(probe(), *users)
+        MONITOR.stop()
+
+    blocked = {k[0]: v - blocked_before.get(k, 0) for k, v in EVENT_LOOP_BLOCKED.collect().items()
+               if v - blocked_before.get(k, 0) > 0}
+    return {
+        "loop_lag_p50_ms": round(pct(lags, 50), 1),
+        "loop_lag_p95_ms": round(pct(lags, 95), 1),
+        "loop_lag_max_ms": round(max(lags, default=0.0), 1),
+        "reads": len(read_ms),
+        "read_p50_ms": round(pct(read_ms, 50), 1),
+        "read_p95_ms": round(pct(read_ms, 95), 1),
+        "writes": len(write_ms),
+        "write_p95_ms": round(pct(write_ms, 95), 1),
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+        "ai_ok": ai["ok"],
+        "ai_shed": int(sum(ADMISSION_REJECTIONS.collect().values()) - shed_before),
+        "ai_other": ai["other"],
+        "stalls_detected": dict(sorted(blocked.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--ai-users", type=int, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--ai-latency-ms", type=float, default=500.0)
+    parser.add_argument("--max-lag-ms", type=float, default=50.0, help="admission limit when on")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="admission limit when on")
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "loadtest", "fakes.py"), "--port", str(PORT),
+         "--db-latency-ms", str(args.db_latency_ms), "--ai-latency-ms", str(args.ai_latency_ms),
+         "--orgs", "1", "--workflows", "20", "--steps", "5", "--users", "20"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        fixtures = wait_for_fixtures()
+        results = {k: getattr(args, k) for k in ("seconds", "readers", "writers", "ai_users", "db_latency_ms",
+                                                   "ai_latency_ms", "max_lag_ms", "max_in_flight")}
+        results["modes"] = {}
+        for mode, enabled in (("off", False), ("on", True)):
+            results["modes"][mode] = asyncio.run(run_case(fixtures, args, enabled))
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.ai_users} AI users for {args.seconds:.0f} s; "
+          f"upstream {args.db_latency_ms:.0f} ms, AI {args.ai_latency_ms:.0f} ms")
+    print(f"{'admission':<10} {'lag p50':>8} {'lag p95':>8} {'lag max':>8} {'reads':>6} {'read p50':>9} "
+          f"{'read p95':>9} {'AI ok':>6} {'AI shed':>8}")
+    for mode, r in results["modes"].items():
+        print(f"{mode:<10} {r['loop_lag_p50_ms']:>8.1f} {r['loop_lag_p95_ms']:>8.1f} {r['loop_lag_max_ms']:>8.1f} "
+              f"{r['reads']:>6} {r['read_p50_ms']:>9.1f} {r['read_p95_ms']:>9.1f} {r['ai_ok']:>6} {r['ai_shed']:>8}")
+    for mode, r in results["modes"].items():
+        if r["stalls_detected"]:
+            print(f"stalls over the blocking threshold ({mode}):")
+            for culprit, n in r["stalls_detected"].items():
+                print(f"  {n:>5}  {culprit}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
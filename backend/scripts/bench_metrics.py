@@ -0,0 +1,128 @@
+"""
+Benchmark the cost of recording metrics.
+
+Reports:
+  - ns per Counter.inc / Histogram.observe call
+  - per-request overhead of MetricsMiddleware (a bare ASGI app called with and
+    without it; the budget is 20 µs per request)
+  - multi-threaded recording throughput, to show shards do not contend
+  - time to render /metrics
+
+Usage:
+    python scripts/bench_metrics.py [--requests 200000] [--threads 8] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.metrics import Counter, Histogram, MetricsMiddleware, render
+
+BUDGET_US = 20.0
+
+
+class _Route:
+    path = "/api/v1/workflows/{workflow_id}"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def drive(app, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/workflows/abc", "headers": []}
+        await app(scope, _receive, _send)
+    return time.perf_counter() - start
+
+
+def per_op_ns(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def threaded(fn, n: int, threads: int) -> float:
+    """Total ops/second with `threads` threads each doing `n` ops."""
+    def worker():
+        for _ in range(n):
+            fn()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return n * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+    n = args.requests
+
+    counter = Counter("bench_counter_total", "bench", ("route", "status"))
+    histogram = Histogram("bench_latency_seconds", "bench", ("route",))
+    labels = ("/api/v1/workflows/{workflow_id}", "200")
+    hlabels = ("/api/v1/workflows/{workflow_id}",)
+
+    results = {
+        "counter_inc_ns": round(per_op_ns(lambda: counter.inc(labels), n), 1),
+        "histogram_observe_ns": round(per_op_ns(lambda: histogram.observe(hlabels, 0.0123), n), 1),
+    }
+
+    # Warm up both paths, then take the best of three runs each
+    asyncio.run(drive(bare_app, 1000))
+    asyncio.run(drive(MetricsMiddleware(bare_app), 1000))
+    bare = min(asyncio.run(drive(bare_app, n)) for _ in range(3))
+    wrapped = min(asyncio.run(drive(MetricsMiddleware(bare_app), n)) for _ in range(3))
+    overhead_us = (wrapped - bare) / n * 1e6
+    results["middleware_overhead_us"] = round(overhead_us, 2)
+    results["within_budget"] = overhead_us < BUDGET_US
+
+    single = threaded(lambda: histogram.observe(hlabels, 0.0123), n // args.threads, 1)
+    multi = threaded(lambda: histogram.observe(hlabels, 0.0123), n // args.threads, args.threads)
+    results["observe_ops_per_s"] = {"1 thread": int(single), f"{args.threads} threads": int(multi)}
+
+    start = time.perf_counter()
+    body = render()
+    results["render_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    results["render_bytes"] = len(body)
+
+    print(f"Counter.inc:          {results['counter_inc_ns']:>8.1f} ns")
+    print(f"Histogram.observe:    {results['histogram_observe_ns']:>8.1f} ns")
+    print(f"Middleware overhead:  {overhead_us:>8.2f} µs/request "
+          f"({'within' if results['within_budget'] else 'OVER'} the {BUDGET_US:.0f} µs budget)")
+    print(f"observe() throughput: {int(single):,d} ops/s (1 thread), "
+          f"{int(multi):,d} ops/s ({args.threads} threads)")
+    print(f"render():             {results['render_ms']:>8.3f} ms ({len(body):,d} B)")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark the per-request overhead of rate limiting.
+
+1. Bucket checks: MemoryRateLimitBackend.take() per call, from one thread
+   over few and many keys, and from several threads with one shard vs the
+   configured number (lock contention).
+2. End to end: GET /api/v1/users/me in-process (httpx ASGI transport)
+   against the load-test stand-ins (scripts/loadtest/fakes.py, no added
+   latency), with the CRUD limit off and on.
+
+Usage:
+    python scripts/bench_rate_limit.py [--checks 200000] [--requests 2000] [--threads 8] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "ERROR",
+    "DEBUG": "False",
+    # Generous limits: the benchmark measures the check, not refusals
+    "RATE_LIMIT_CRUD_PER_USER": "1000000/s",
+    "RATE_LIMIT_CRUD_PER_ORG": "1000000/s",
+})
+
+import httpx
+import jwt
+
+from app.config import settings
+from app.main import app
+from app.utils.rate_limit import CRUD_LIMIT, MemoryRateLimitBackend
+
+
+def wait_for_fixtures(timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return httpx.get(f"http://127.0.0.1:{PORT}/__fixtures", timeout=1.0).json()
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("fakes did not come up")
+
+
+def bench_checks(checks: int, keys: int, threads: int, shards: int) -> float:
+    """Nanoseconds per take(), wall clock over all threads."""
+    backend = MemoryRateLimitBackend(shards=shards, max_keys=max(keys * 2, 1000))
+    names = [f"crud:user:{i}" for i in range(keys)]
+    per_thread = checks // threads
+
+    def work():
+        take = backend.take
+        for i in range(per_thread):
+            take(names[i % keys], 1e9, 1e9)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+async def bench_requests(fixtures, requests: int) -> dict:
+    headers = {"Authorization": "Bearer " + jwt.encode({"sub": fixtures["users"][0]}, "bench")}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for _ in range(50):
+            await client.get("/api/v1/users/me")  # warm up
+        times = {False: [], True: []}
+        # Interleaved, so drift in the fakes affects both equally
+        for i in range(requests * 2):
+            enabled = bool(i % 2)
+            CRUD_LIMIT.enabled = enabled
+            start = time.perf_counter()
+            (await client.get("/api/v1/users/me")).raise_for_status()
+            times[enabled].append((time.perf_counter() - start) * 1e6)
+        CRUD_LIMIT.enabled = True
+        for enabled, label in ((False, "off"), (True, "on")):
+            results[label] = {
+                "median_us": round(statistics.median(times[enabled]), 1),
+                "mean_us": round(statistics.fmean(times[enabled]), 1),
+            }
+    results["overhead_us"] = round(results["on"]["median_us"] - results["off"]["median_us"], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    shards = settings.RATE_LIMIT_SHARDS
+    results = {"checks": {
+        "1 thread, 10 keys": bench_checks(args.checks, 10, 1, shards),
+        "1 thread, 100000 keys": bench_checks(args.checks, 100_000, 1, shards),
+        f"{args.threads} threads, 1 shard": bench_checks(args.checks, 1000, args.threads, 1),
+        f"{args.threads} threads, {shards} shards": bench_checks(args.checks, 1000, args.threads, shards),
+    }}
+
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "loadtest", "fakes.py"), "--port", str(PORT),
+         "--db-latency-ms", "0", "--orgs", "1", "--workflows", "1", "--users", "1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        results["requests"] = asyncio.run(bench_requests(wait_for_fixtures(), args.requests))
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    print("Bucket checks (MemoryRateLimitBackend.take)")
+    for label, ns in results["checks"].items():
+        print(f"  {label:<24} {ns:>8.0f} ns/check")
+    r = results["requests"]
+    print(f"GET /api/v1/users/me, {args.requests} requests each (median)")
+    print(f"  limit off  {r['off']['median_us']:>8.1f} us")
+    print(f"  limit on   {r['on']['median_us']:>8.1f} us   ({r['overhead_us']:+.1f} us)")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
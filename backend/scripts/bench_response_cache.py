@@ -0,0 +1,177 @@
+"""
+Benchmark the org-level list response cache.
+
+Serves the load-test PostgREST stand-in (scripts/loadtest/fakes.py) in-process
+with a fixed upstream latency, then has N users repeatedly load an org's
+dashboard lists (httpx ASGI transport), with the response cache on and off:
+
+  - GET /api/v1/workflows/?org_id=...&view=summary
+  - GET /api/v1/organizations/
+
+Every --write-every reads, one user renames a workflow of the org, which bumps
+the org's generation and invalidates its cached lists.
+
+Reports upstream PostgREST calls per read (without each user's own auth
+lookup), cache hit ratio, throughput and p50/p95 read latency.
+
+Usage:
+    python scripts/bench_response_cache.py [--users 20] [--requests 50] [--write-every 50] [--db-latency-ms 20] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+sys.path.insert(0, os.path.join(HERE, "loadtest"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "WARNING",
+    "DEBUG": "False",
+})
+
+import httpx
+import jwt
+
+import fakes
+from app.main import app
+from app.utils.response_cache import ORGANIZATION_LISTS, RESPONSE_CACHE_REQUESTS, WORKFLOW_LISTS
+
+CACHES = (WORKFLOW_LISTS, ORGANIZATION_LISTS)
+
+
+def set_cache(enabled: bool) -> None:
+    for cache in CACHES:
+        cache.clear()
+        cache.enabled = enabled
+
+
+def cache_counts() -> dict:
+    names = {cache.name for cache in CACHES}
+    counts = {}
+    for (name, result), n in RESPONSE_CACHE_REQUESTS.collect().items():
+        if name in names:
+            counts[result] = counts.get(result, 0) + n
+    return counts
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def run_case(store, tokens, org, requests_per_user, write_every) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    workflow_ids = [w["id"] for w in org["workflows"]]
+    reads = {"n": 0}
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def user(token):
+            headers = {"Authorization": f"Bearer {token}"}
+            for i in range(requests_per_user):
+                start = time.perf_counter()
+                if i % 2:
+                    resp = await client.get("/api/v1/organizations/", headers=headers)
+                else:
+                    resp = await client.get(
+                        "/api/v1/workflows/", params={"org_id": org["id"], "view": "summary"}, headers=headers,
+                    )
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                reads["n"] += 1
+                if write_every and reads["n"] % write_every == 0:
+                    workflow_id = random.choice(workflow_ids)
+                    resp = await client.put(
+                        f"/api/v1/workflows/{workflow_id}", json={"title": f"Renamed {reads['n']}"}, headers=headers,
+                    )
+                    resp.raise_for_status()
+
+        await user(tokens[0])  # warm up
+        store.calls.clear()
+        latencies.clear()
+        reads["n"] = 0
+        before = cache_counts()
+        start = time.perf_counter()
+        await asyncio.gather(*(user(t) for t in tokens))
+        wall = time.perf_counter() - start
+
+    after = cache_counts()
+    lookups = {k: after.get(k, 0) - before.get(k, 0) for k in after}
+    total_lookups = sum(lookups.values())
+    upstream = sum(n for k, n in store.calls.items() if k.startswith("db.") and k != "db.select users")
+    return {
+        "reads": len(latencies),
+        "upstream_calls_per_read": round(upstream / len(latencies), 2),
+        "hit_ratio": round(lookups.get("hit", 0) / total_lookups, 3) if total_lookups else 0.0,
+        "lookups": lookups,
+        "reads_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": round(pct(latencies, 50) * 1000, 1),
+        "p95_ms": round(pct(latencies, 95) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=50, help="list reads per user")
+    parser.add_argument("--write-every", type=int, default=50, help="one workflow update per this many reads (0: none)")
+    parser.add_argument("--workflows", type=int, default=50, help="workflows in the org")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    store = fakes.Store()
+    fixtures = store.seed(1, args.workflows, 8, args.users, random.Random(1))
+    server = fakes.serve(PORT, args.db_latency_ms, 0, 0, store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    org = fixtures["orgs"][0]
+    tokens = [jwt.encode({"sub": uid}, "bench") for uid in fixtures["users"]][:args.users]
+
+    results = {
+        "users": args.users, "requests_per_user": args.requests, "write_every": args.write_every,
+        "db_latency_ms": args.db_latency_ms, "modes": {},
+    }
+    for mode, enabled in (("off", False), ("on", True)):
+        set_cache(enabled)
+        random.seed(1)
+        results["modes"][mode] = asyncio.run(run_case(store, tokens, org, args.requests, args.write_every))
+    server.shutdown()
+
+    print(f"{args.users} users x {args.requests} list reads, one write per {args.write_every} reads, "
+          f"upstream latency {args.db_latency_ms:.0f} ms")
+    print(f"{'cache':<6} {'upstream/read':>14} {'hit ratio':>10} {'reads/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode, r in results["modes"].items():
+        print(f"{mode:<6} {r['upstream_calls_per_read']:>14.2f} {r['hit_ratio']:>10.1%} {r['reads_per_s']:>9.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f}")
+    off, on = results["modes"]["off"], results["modes"]["on"]
+    if off["upstream_calls_per_read"]:
+        reduction = (1 - on["upstream_calls_per_read"] / off["upstream_calls_per_read"]) * 100
+        print(f"upstream calls per read: -{reduction:.0f}%, throughput x{on['reads_per_s'] / off['reads_per_s']:.1f}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
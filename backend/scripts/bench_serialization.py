@@ -0,0 +1,124 @@
+"""
+Benchmark JSON serialization and compression of a large list_workflows payload.
+
+Builds a synthetic organization (1,000 workflows with 10 steps each by default),
+then reports render time and bytes on the wire for:
+  - the stock path: jsonable_encoder + stdlib json (FastAPI's JSONResponse)
+  - FastJSONResponse (orjson when installed)
+  - gzip / brotli compression of the rendered body
+
+Usage:
+    python scripts/bench_serialization.py [--workflows 1000] [--steps 10] [--json out.json]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.compression import brotli, compress
+from app.utils.responses import FastJSONResponse, orjson
+
+
+def build_payload(n_workflows: int, n_steps: int) -> dict:
+    org_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat()
+    workflows = []
+    for w in range(n_workflows):
+        wid = str(uuid.uuid4())
+        steps = [
+            {
+                "id": str(uuid.uuid4()),
+                "workflow_id": wid,
+                "title": f"Step {s + 1}: review and approve the request",
+                "description": "Check the submitted details against the policy, "
+                               "then forward to the next approver with any notes.",
+                "status": "pending",
+                "assigned_to": None,
+                "order": s,
+                "sort_key": f"{s + 1:02d}",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for s in range(n_steps)
+        ]
+        workflows.append({
+            "id": wid,
+            "organization_id": org_id,
+            "title": f"Standard operating procedure #{w}",
+            "description": "Onboarding procedure for new finance team members.",
+            "status": "published" if w % 3 else "draft",
+            "version": 1,
+            "created_by": None,
+            "created_at": now,
+            "updated_at": now,
+            "step_count": n_steps,
+            "steps": steps,
+        })
+    return {"success": True, "organization_id": org_id, "workflows": workflows}
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    payload = build_payload(args.workflows, args.steps)
+    results = {"workflows": args.workflows, "steps_per_workflow": args.steps, "orjson": orjson is not None}
+
+    t_stock, body = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    t_fast, fast_body = timed(lambda: FastJSONResponse(payload).body, args.repeat)
+    assert json.loads(body) == json.loads(fast_body)
+
+    results["serialize_ms"] = {
+        "jsonable_encoder+json": round(t_stock * 1000, 2),
+        "FastJSONResponse": round(t_fast * 1000, 2),
+    }
+    results["bytes"] = {"identity": len(fast_body)}
+    results["compress_ms"] = {}
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        t_comp, compressed = timed(lambda: compress(fast_body, encoding), args.repeat)
+        results["bytes"][encoding] = len(compressed)
+        results["compress_ms"][encoding] = round(t_comp * 1000, 2)
+
+    print(f"Payload: {args.workflows} workflows x {args.steps} steps (orjson={'yes' if orjson else 'no'})")
+    print("Serialization (best of %d):" % args.repeat)
+    for name, ms in results["serialize_ms"].items():
+        print(f"  {name:<24} {ms:>10.2f} ms")
+    print("Bytes on the wire:")
+    for name, size in results["bytes"].items():
+        extra = f"  ({results['compress_ms'][name]:.2f} ms to compress)" if name in results["compress_ms"] else ""
+        print(f"  {name:<24} {size:>10,d} B{extra}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark single-flight coalescing of hot reads.
+
+Serves the load-test PostgREST stand-in (scripts/loadtest/fakes.py) in-process
+with a fixed upstream latency, then fires bursts of identical concurrent
+requests at the app (httpx ASGI transport), with coalescing on and off:
+
+  - open:      N users open the same workflow  (GET /api/v1/workflows/{id})
+  - dashboard: N users refresh the same org list (GET /api/v1/workflows/?org_id=...)
+
+Reports upstream PostgREST calls per burst (counted at the stand-in; in total
+and for the shared resource, i.e. without each user's own auth lookup), burst
+wall time and p50/p95 request latency.
+
+Usage:
+    python scripts/bench_singleflight.py [--users 100] [--bursts 5] [--db-latency-ms 20] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+sys.path.insert(0, os.path.join(HERE, "loadtest"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "WARNING",
+    "DEBUG": "False",
+})
+
+import httpx
+import jwt
+
+import fakes
+from app.main import app
+from app.services import reads
+from app.utils.singleflight import SingleFlight
+
+SUMMARY_FIELDS = "id,organization_id,title,description,status,created_at,updated_at,step_count"
+
+
+def set_coalescing(enabled: bool) -> None:
+    for value in vars(reads).values():
+        if isinstance(value, SingleFlight):
+            value.enabled = enabled
+
+
+async def burst(client, users, url, params) -> list:
+    async def one(token):
+        start = time.perf_counter()
+        resp = await client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        resp.raise_for_status()
+        return time.perf_counter() - start
+    return await asyncio.gather(*(one(t) for t in users))
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def run_case(store, tokens, url, params, bursts) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await burst(client, tokens[:1], url, params)  # warm up
+        store.calls.clear()
+        latencies, walls = [], []
+        for _ in range(bursts):
+            start = time.perf_counter()
+            latencies += await burst(client, tokens, url, params)
+            walls.append(time.perf_counter() - start)
+    upstream = sum(n for k, n in store.calls.items() if k.startswith("db."))
+    # Every user's auth lookup is a different key, so only the rest can coalesce
+    shared = upstream - store.calls.get("db.select users", 0)
+    return {
+        "upstream_calls_per_burst": round(upstream / bursts, 1),
+        "shared_resource_calls_per_burst": round(shared / bursts, 1),
+        "by_call": dict(store.calls),
+        "burst_wall_ms": round(sum(walls) / len(walls) * 1000, 1),
+        "p50_ms": round(pct(latencies, 50) * 1000, 1),
+        "p95_ms": round(pct(latencies, 95) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100, help="concurrent requests per burst")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    store = fakes.Store()
+    fixtures = store.seed(1, 50, 8, args.users, random.Random(1))
+    server = fakes.serve(PORT, args.db_latency_ms, 0, 0, store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    org = fixtures["orgs"][0]
+    tokens = [jwt.encode({"sub": uid}, "bench") for uid in fixtures["users"]]
+    tokens = (tokens * (args.users // max(len(tokens), 1) + 1))[:args.users]
+    cases = {
+        "open": (f"/api/v1/workflows/{org['workflows'][0]['id']}", None),
+        "dashboard": ("/api/v1/workflows/", {"org_id": org["id"], "fields": SUMMARY_FIELDS}),
+    }
+
+    results = {"users": args.users, "bursts": args.bursts, "db_latency_ms": args.db_latency_ms, "cases": {}}
+    for name, (url, params) in cases.items():
+        results["cases"][name] = {}
+        for mode, enabled in (("off", False), ("on", True)):
+            set_coalescing(enabled)
+            results["cases"][name][mode] = asyncio.run(run_case(store, tokens, url, params, args.bursts))
+    server.shutdown()
+
+    print(f"{args.users} concurrent identical requests per burst, upstream latency {args.db_latency_ms:.0f} ms")
+    print(f"{'case':<10} {'coalescing':<11} {'upstream/burst':>15} {'shared/burst':>13} {'burst ms':>10} "
+          f"{'p50 ms':>9} {'p95 ms':>9}")
+    for name, modes in results["cases"].items():
+        for mode, r in modes.items():
+            print(f"{name:<10} {mode:<11} {r['upstream_calls_per_burst']:>15.1f} "
+                  f"{r['shared_resource_calls_per_burst']:>13.1f} {r['burst_wall_ms']:>10.1f} "
+                  f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f}")
+        reduction = {}
+        for key in ("upstream_calls_per_burst", "shared_resource_calls_per_burst"):
+            off, on = modes["off"][key], modes["on"][key]
+            reduction[key] = (1 - on / off) * 100 if off else 0.0
+        print(f"{'':<10} {'reduction':<11} {reduction['upstream_calls_per_burst']:>14.0f}% "
+              f"{reduction['shared_resource_calls_per_burst']:>12.0f}%")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
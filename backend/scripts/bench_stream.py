@@ -0,0 +1,161 @@
+"""
+Load test for the SSE change feed: hold many idle subscribers on one process.
+
+Starts the API with uvicorn in a subprocess, opens N concurrent connections to
+/api/v1/stream, keeps them idle for a while and reports:
+  - how long it took to establish all streams
+  - server RSS before/after (and per subscriber)
+  - heartbeats received, i.e. whether every idle stream stays alive
+
+Usage:
+    python scripts/bench_stream.py [--subscribers 5000] [--hold 20] [--heartbeat 5] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import jwt
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def wait_for_server(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def subscriber(port: int, token: str, org_id: str, stats: dict, stop: asyncio.Event) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/v1/stream/?org_id={org_id} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+        f"Accept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        stats["failed"] += 1
+        writer.close()
+        return
+    stats["connected"] += 1
+    try:
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                stats["closed"] += 1
+                break
+            if line.startswith(b": keep-alive"):
+                stats["heartbeats"] += 1
+    finally:
+        writer.close()
+
+
+async def run(args) -> dict:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, args.subscribers * 2 + 1024)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    env = {
+        **os.environ,
+        "STREAM_HEARTBEAT_SECONDS": str(args.heartbeat),
+        "COMPRESSION_ENABLED": "False",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--log-level", "warning", "--backlog", str(args.subscribers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_server(args.port)
+        rss_before = rss_kb(server.pid)
+
+        token = jwt.encode({"sub": "bench-user"}, "bench")
+        stats = {"connected": 0, "failed": 0, "closed": 0, "heartbeats": 0}
+        stop = asyncio.Event()
+
+        start = time.perf_counter()
+        tasks = []
+        for i in range(args.subscribers):
+            tasks.append(asyncio.create_task(subscriber(args.port, token, f"org-{i % 50}", stats, stop)))
+            if i % 200 == 199:
+                await asyncio.sleep(0)
+        while stats["connected"] + stats["failed"] < args.subscribers:
+            if time.perf_counter() - start > 120:
+                break
+            await asyncio.sleep(0.1)
+        connect_s = time.perf_counter() - start
+
+        await asyncio.sleep(args.hold)
+        rss_after = rss_kb(server.pid)
+        stop.set()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    expected = stats["connected"] * int(args.hold // args.heartbeat)
+    return {
+        "subscribers": args.subscribers,
+        "connected": stats["connected"],
+        "failed": stats["failed"],
+        "closed_early": stats["closed"],
+        "connect_seconds": round(connect_s, 2),
+        "hold_seconds": args.hold,
+        "heartbeats": stats["heartbeats"],
+        "heartbeats_expected_min": expected,
+        "server_rss_mb": {"before": round(rss_before / 1024, 1), "after": round(rss_after / 1024, 1)},
+        "rss_per_subscriber_kb": round((rss_after - rss_before) / max(stats["connected"], 1), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--hold", type=float, default=20.0, help="seconds to keep the streams idle")
+    parser.add_argument("--heartbeat", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=3099)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"Subscribers: {results['connected']}/{results['subscribers']} connected "
+          f"in {results['connect_seconds']:.2f} s ({results['failed']} failed, "
+          f"{results['closed_early']} closed early)")
+    print(f"Heartbeats over {args.hold:.0f} s: {results['heartbeats']:,d} "
+          f"(expected >= {results['heartbeats_expected_min']:,d})")
+    print(f"Server RSS: {results['server_rss_mb']['before']} MB -> {results['server_rss_mb']['after']} MB "
+          f"({results['rss_per_subscriber_kb']} KB per subscriber)")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
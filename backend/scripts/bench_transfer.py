@@ -0,0 +1,165 @@
+"""
+Benchmark organization export/import: throughput and peak memory by org size.
+
+Starts the load-test stand-ins (scripts/loadtest/fakes.py) in a subprocess,
+seeded with one org of `--workflows` workflows of `--steps` steps, then:
+
+  - export: streams the org to NDJSON (app.services.transfer.export_org)
+    into a temporary file, as a client would
+  - import: restarts the fakes with an empty org and feeds the export into
+    it in 64 KB chunks (app.services.transfer.import_org)
+
+and reports rows per second, upstream calls, and peak Python memory of this
+process (tracemalloc) for each. Run it at two sizes to see that memory stays
+flat: neither side holds the org in memory.
+
+Usage:
+    python scripts/bench_transfer.py [--workflows 200] [--steps 25] [--db-latency-ms 0] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, '..')))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update({
+    "SUPABASE_URL": f"http://127.0.0.1:{PORT}",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "LOG_LEVEL": "ERROR",
+    "DEBUG": "False",
+})
+
+import httpx
+
+from app.services.supabase_db import get_organization
+from app.services.transfer import export_org, import_org
+
+CHUNK = 64 * 1024
+
+
+def start_fakes(args, workflows: int, seed: int):
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "loadtest", "fakes.py"), "--port", str(PORT),
+         "--db-latency-ms", str(args.db_latency_ms), "--jitter", "0", "--orgs", "1",
+         "--workflows", str(workflows), "--steps", str(args.steps), "--users", "5", "--seed", str(seed)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            return fakes, httpx.get(f"http://127.0.0.1:{PORT}/__fixtures", timeout=1.0).json()
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    fakes.terminate()
+    raise RuntimeError("fakes did not come up")
+
+
+def stop_fakes(fakes) -> None:
+    fakes.terminate()
+    fakes.wait()
+
+
+async def export_bytes(org: dict, page_size: int, path: str) -> dict:
+    size = 0
+    with open(path, "wb") as f:
+        async for chunk in export_org(org, page_size):
+            size += len(chunk)
+            f.write(chunk)
+    return {"bytes": size}
+
+
+async def import_file(org_id: str, path: str, batch_size: int) -> dict:
+    async def chunks():
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+    return await import_org(org_id, chunks(), None, batch_size=batch_size, max_line_bytes=1 << 20)
+
+
+def measure(coro) -> tuple:
+    httpx.post(f"http://127.0.0.1:{PORT}/__reset")
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = asyncio.run(coro)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = httpx.get(f"http://127.0.0.1:{PORT}/__stats").json()
+    calls = sum(n for key, n in stats.items() if key.startswith("db."))
+    return result, seconds, peak, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=25)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.ndjson")
+        fakes, fixtures = start_fakes(args, args.workflows, args.seed)
+        try:
+            org = get_organization(fixtures["orgs"][0]["id"])
+            exported, export_s, export_peak, export_calls = measure(export_bytes(org, args.page_size, path))
+        finally:
+            stop_fakes(fakes)
+        with open(path, "rb") as f:
+            rows = sum(1 for line in f if b'"data":' in line)
+
+        fakes, fixtures = start_fakes(args, 0, args.seed + 1)
+        try:
+            target = fixtures["orgs"][0]["id"]
+            imported, import_s, import_peak, import_calls = measure(import_file(target, path, args.batch_size))
+        finally:
+            stop_fakes(fakes)
+
+    assert imported["complete"] and sum(imported["imported"].values()) == rows, imported
+    results = {
+        "workflows": args.workflows, "steps": args.steps, "rows": rows,
+        "export_mb": round(exported["bytes"] / 2**20, 2),
+        "export": {"rows_per_s": round(rows / export_s), "upstream_calls": export_calls,
+                   "peak_mb": round(export_peak / 2**20, 2)},
+        "import": {"rows_per_s": round(rows / import_s), "upstream_calls": import_calls,
+                   "peak_mb": round(import_peak / 2**20, 2)},
+    }
+
+    print(f"{rows} rows ({args.workflows} workflows x {args.steps} steps), export {results['export_mb']} MB")
+    print(f"{'':<8} {'rows/s':>10} {'upstream calls':>15} {'peak MB':>8}")
+    for mode in ("export", "import"):
+        r = results[mode]
+        print(f"{mode:<8} {r['rows_per_s']:>10} {r['upstream_calls']:>15} {r['peak_mb']:>8.2f}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+"""
+Local stand-ins for Supabase (PostgREST) and Gemini, served from one process.
+
+PostgREST (under /rest/v1) implements what app/utils/supabase.py relies on:
+  - filters  eq. neq. in.(...) is. gt. gte. lt. lte. not.<op>.
+  - select   column lists, embedded counts (`workflow_steps(count)`) and
+             empty parent embeds (`workflows()`) used only for filtering
+  - embedded `workflows.<col>=` filters, `workflows=not.is.null` and `or=(...)`
+  - order    col[.asc|.desc][.nullsfirst|.nullslast], comma separated
+  - limit / offset
+  - POST/PATCH honour `Prefer: return=representation`; DELETE returns 204
+  - POST honours `Prefer: resolution=ignore-duplicates` (on id); POST, PATCH
+    and table-returning RPCs honour `select`
+  - RPCs     search_org, sync_org, purge_deleted_records, bump_cache_generations,
+             claim_idempotency_key, take_rate_limit_token, soft_delete_workflow,
+             restore_workflow, purge_deleted_workflows, clone_workflow
+  - triggers workflows.version is bumped by changes to a workflow or its steps
+Gemini answers POST /v1beta/models/<model>:generateContent with a canned
+workflow (or a rewritten sentence for rewrite prompts) and token usage.
+
+Both take a configurable latency (mean plus uniform jitter). Call counts are
+exposed at GET /__stats and reset by POST /__reset; GET /__fixtures returns
+the ids of the seeded data.
+
+Usage:
+    python scripts/loadtest/fakes.py [--port 54321] [--db-latency-ms 3] [--ai-latency-ms 800]
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.utils.ordering import spread_keys
+
+# Embedded counts: child table -> foreign key column pointing at the parent
+EMBED_KEYS = {"workflow_steps": "workflow_id", "comments": "workflow_id"}
+
+# Embedded parents: parent table -> foreign key column on the child
+PARENT_KEYS = {"workflows": "workflow_id", "workflow_steps": "step_id"}
+
+TOMBSTONE_TYPES = {"workflows": "workflow", "workflow_steps": "step", "comments": "comment"}
+
+CANNED_WORKFLOW = {
+    "title": "Vendor Onboarding",
+    "description": "Collect documents, verify and register a new vendor.",
+    "steps": [
+        {"title": "Collect W-9", "description": "Request the signed W-9 form from the vendor.", "role": "Procurement"},
+        {"title": "Verify bank details", "description": "Confirm account details by phone.", "role": "Finance"},
+        {"title": "Security review", "description": "Run the vendor security questionnaire.", "role": "Security"},
+        {"title": "Create vendor record", "description": "Register the vendor in the ERP.", "role": "Finance"},
+        {"title": "Notify requester", "description": "Tell the requester the vendor is approved.", "role": None},
+    ],
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Store:
+    """In-memory tables plus upstream call counters."""
+
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.fixtures = {}
+
+    # ---------- query evaluation ----------
+
+    @staticmethod
+    def _match(current, expr: str) -> bool:
+        op, _, value = expr.partition(".")
+        if op == "not":
+            return not Store._match(current, value)
+        if op == "is":
+            return current is None if value == "null" else str(current).lower() == value
+        if op == "in":
+            return current is not None and str(current) in Store._in_values(value)
+        if current is None:
+            return False
+        if op == "eq":
+            return str(current) == value
+        if op == "neq":
+            return str(current) != value
+        if op in ("gt", "gte", "lt", "lte"):
+            left, right = str(current), value
+            try:
+                left, right = float(left), float(right)
+            except ValueError:
+                pass
+            return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+        raise ValueError(f"unsupported operator: {op}")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _in_values(value: str) -> frozenset:
+        return frozenset(v.strip('"') for v in value.strip("()").split(","))
+
+    def _value(self, row, column, embedded):
+        # An embedded parent reads as its id, or null if missing or filtered out
+        if column in PARENT_KEYS and column not in row:
+            parent = self.tables.get(column, {}).get(row.get(PARENT_KEYS[column]))
+            if parent is None or not all(self._match(parent.get(c), e) for c, e in embedded.get(column, ())):
+                return None
+            return parent["id"]
+        return row.get(column)
+
+    def filter(self, rows, params):
+        embedded = {}
+        for column, expr in params:
+            parent, dot, field = column.partition(".")
+            if dot and parent in PARENT_KEYS:
+                embedded.setdefault(parent, []).append((field, expr))
+        for column, expr in params:
+            if column in ("select", "order", "limit", "offset", "on_conflict"):
+                continue
+            if column.partition(".")[0] in embedded and "." in column:
+                continue  # applied through the embedded parent
+            if column == "or":
+                terms = [t.partition(".")[::2] for t in expr.strip("()").split(",")]
+                rows = [r for r in rows if any(self._match(self._value(r, c, embedded), e) for c, e in terms)]
+                continue
+            rows = [r for r in rows if self._match(self._value(r, column, embedded), expr)]
+        return rows
+
+    @staticmethod
+    def order(rows, spec: str):
+        for part in reversed(spec.split(",")):
+            bits = part.split(".")
+            column = bits[0]
+            desc = "desc" in bits[1:]
+            present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: r[column], reverse=desc)
+            missing = [r for r in rows if r.get(column) is None]
+            nulls_first = "nullsfirst" in bits[1:] or (desc and "nullslast" not in bits[1:])
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def project(self, rows, select):
+        if not select or select == "*":
+            return [dict(r) for r in rows]
+        out = []
+        for row in rows:
+            projected = {}
+            for column in select.split(","):
+                embedded = re.fullmatch(r"(\w+)\(count\)", column)
+                if embedded:
+                    child = embedded.group(1)
+                    key = EMBED_KEYS.get(child, "workflow_id")
+                    count = sum(1 for c in self.tables.get(child, {}).values() if c.get(key) == row["id"])
+                    projected[child] = [{"count": count}]
+                elif re.fullmatch(r"\w+\(\)", column):
+                    continue
+                elif column == "*":
+                    projected.update(row)
+                else:
+                    projected[column] = row.get(column)
+            out.append(projected)
+        return out
+
+    def select(self, table, params):
+        p = dict(params)
+        with self.lock:
+            rows = self.filter(list(self.tables.get(table, {}).values()), params)
+            if "order" in p:
+                rows = self.order(rows, p["order"])
+            rows = rows[int(p.get("offset", 0)):]
+            if "limit" in p:
+                rows = rows[:int(p["limit"])]
+            return self.project(rows, p.get("select"))
+
+    def _bump_version(self, table, row):
+        # The version triggers: any change to a workflow or one of its steps
+        workflow_id = row["id"] if table == "workflows" else row.get("workflow_id") if table == "workflow_steps" else None
+        workflow = self.tables.get("workflows", {}).get(workflow_id)
+        if workflow is not None:
+            workflow["version"] = workflow.get("version", 1) + 1
+
+    def insert(self, table, items, ignore_duplicates=False):
+        out = []
+        with self.lock:
+            rows = self.tables.setdefault(table, {})
+            for item in items:
+                if ignore_duplicates and item.get("id") in rows:
+                    continue
+                row = {"id": str(uuid.uuid4()), "created_at": _now(), "updated_at": _now()}
+                if table == "workflows":
+                    row["version"] = 1
+                row.update(item)
+                rows[row["id"]] = row
+                if table == "workflow_steps":
+                    self._bump_version(table, row)
+                out.append(dict(row))
+        return out
+
+    def update(self, table, params, payload):
+        with self.lock:
+            rows = self.filter(list(self.tables.get(table, {}).values()), params)
+            for row in rows:
+                row.update(payload)
+                if "updated_at" in row:
+                    row["updated_at"] = _now()
+                self._bump_version(table, row)
+            return [dict(r) for r in rows]
+
+    def delete(self, table, params):
+        with self.lock:
+            rows = self.filter(list(self.tables.get(table, {}).values()), params)
+            for row in rows:
+                if table in TOMBSTONE_TYPES:
+                    workflow_id = row["id"] if table == "workflows" else row.get("workflow_id")
+                    org = (self.tables.get("workflows", {}).get(workflow_id) or {}).get("organization_id")
+                    self.tables.setdefault("deleted_records", {})[row["id"]] = {
+                        "id": str(uuid.uuid4()),
+                        "entity_type": TOMBSTONE_TYPES[table],
+                        "entity_id": row["id"],
+                        "organization_id": org,
+                        "workflow_id": workflow_id,
+                        "deleted_at": _now(),
+                    }
+                del self.tables[table][row["id"]]
+                self._bump_version(table, row)
+
+    # ---------- RPCs ----------
+
+    def _org_of(self, workflow_id):
+        return (self.tables.get("workflows", {}).get(workflow_id) or {}).get("organization_id")
+
+    def _live(self, workflow_id) -> bool:
+        workflow = self.tables.get("workflows", {}).get(workflow_id)
+        return workflow is not None and workflow.get("deleted_at") is None
+
+    def rpc_search_org(self, q, org=None, lim=20, off=0, hl_start="<mark>", hl_stop="</mark>"):
+        terms = [t.lower() for t in re.findall(r"\w+", q or "")]
+        hits = []
+        with self.lock:
+            sources = (
+                ("workflow", "workflows", "title", "description"),
+                ("step", "workflow_steps", "title", "description"),
+                ("comment", "comments", None, "content"),
+            )
+            for entity_type, table, title_col, body_col in sources:
+                for row in self.tables.get(table, {}).values():
+                    workflow_id = row["id"] if table == "workflows" else row.get("workflow_id")
+                    if not self._live(workflow_id) or (org and self._org_of(workflow_id) != org):
+                        continue
+                    title = row.get(title_col) if title_col else None
+                    text = f"{title or ''} {row.get(body_col) or ''}".lower()
+                    rank = sum(text.count(t) for t in terms)
+                    if terms and all(t in text for t in terms):
+                        snippet = f"{title + ' — ' if title else ''}{row.get(body_col) or ''}"[:160]
+                        for t in terms:
+                            snippet = re.sub(f"(?i)({re.escape(t)})", f"{hl_start}\\1{hl_stop}", snippet)
+                        hits.append({
+                            "entity_type": entity_type, "entity_id": row["id"], "workflow_id": workflow_id,
+                            "title": title, "snippet": snippet, "rank": float(rank),
+                        })
+        hits.sort(key=lambda h: (-h["rank"], h["entity_id"]))
+        return hits[off:off + lim]
+
+    def rpc_sync_org(self, org=None, since=None, lim=1000, after=None):
+        def changed(table, column, keep, entity, key="id"):
+            if after is not None and entity not in after:
+                return []
+            position = tuple(after[entity]) if after is not None else None
+            rows = [dict(r) for r in self.tables.get(table, {}).values()
+                    if keep(r) and (since is None or r[column] > since)
+                    and (position is None or (r[column], r[key]) > position)]
+            return sorted(rows, key=lambda r: (r[column], r[key]))[:lim]
+
+        in_org = lambda r: self._live(r.get("workflow_id")) and (org is None or self._org_of(r.get("workflow_id")) == org)
+        with self.lock:
+            return {
+                "now": _now(),
+                "workflows": changed("workflows", "updated_at", lambda r: r.get("deleted_at") is None and (
+                    org is None or r.get("organization_id") == org), "workflows"),
+                "steps": changed("workflow_steps", "updated_at", in_org, "steps"),
+                "comments": changed("comments", "updated_at", in_org, "comments"),
+                "deleted": [] if since is None else changed(
+                    "deleted_records", "deleted_at", lambda r: org is None or r.get("organization_id") == org,
+                    "deleted", key="entity_id"),
+            }
+
+    def rpc_purge_deleted_records(self, keep_days=30):
+        return 0
+
+    def rpc_soft_delete_workflow(self, wf, by_user=None, window_seconds=604800):
+        with self.lock:
+            row = self.tables.get("workflows", {}).get(wf)
+            if row is None or row.get("deleted_at") is not None:
+                return []
+            now = datetime.now(timezone.utc)
+            row.update(deleted_at=now.isoformat(), deleted_by=by_user)
+            self.tables.setdefault("deleted_records", {})[wf] = {
+                "id": str(uuid.uuid4()), "entity_type": "workflow", "entity_id": wf,
+                "organization_id": row.get("organization_id"), "workflow_id": wf, "deleted_at": _now(),
+            }
+            restorable_until = datetime.fromtimestamp(now.timestamp() + window_seconds, timezone.utc)
+            return [{
+                "id": wf, "organization_id": row.get("organization_id"), "title": row.get("title"),
+                "deleted_at": row["deleted_at"], "restorable_until": restorable_until.isoformat(),
+            }]
+
+    def rpc_restore_workflow(self, wf, window_seconds=604800):
+        with self.lock:
+            row = self.tables.get("workflows", {}).get(wf)
+            cutoff = datetime.fromtimestamp(time.time() - window_seconds, timezone.utc).isoformat()
+            if row is None or row.get("deleted_at") is None or row["deleted_at"] <= cutoff:
+                return []
+            row.update(deleted_at=None, deleted_by=None, updated_at=_now())
+            tombstones = self.tables.get("deleted_records", {})
+            for key, tombstone in list(tombstones.items()):
+                if tombstone["entity_type"] == "workflow" and tombstone["entity_id"] == wf:
+                    del tombstones[key]
+            for table in ("workflow_steps", "comments"):
+                for child in self.tables.get(table, {}).values():
+                    if child.get("workflow_id") == wf:
+                        child["updated_at"] = _now()
+            return [{"id": wf, "organization_id": row.get("organization_id"), "title": row.get("title")}]
+
+    def rpc_purge_deleted_workflows(self, keep_seconds, batch=1000):
+        cutoff = datetime.fromtimestamp(time.time() - keep_seconds, timezone.utc).isoformat()
+        with self.lock:
+            doomed = {wid for wid, w in self.tables.get("workflows", {}).items()
+                      if w.get("deleted_at") is not None and w["deleted_at"] < cutoff}
+            for table in ("comments", "workflow_revisions", "activity_logs", "workflow_steps", "workflows"):
+                rows = self.tables.get(table, {})
+                ids = [rid for rid, r in rows.items()
+                       if (rid if table == "workflows" else r.get("workflow_id")) in doomed][:batch]
+                if ids:
+                    for rid in ids:
+                        del rows[rid]
+                    return len(ids)
+            return 0
+
+    def rpc_clone_workflow(self, src, org=None, new_title=None, from_template=False):
+        with self.lock:
+            source = self.tables.get("workflows", {}).get(src)
+            if source is None or source.get("deleted_at") is not None or (from_template and not source.get("is_template")):
+                return []
+            steps = [dict(s) for s in self.tables.get("workflow_steps", {}).values() if s.get("workflow_id") == src]
+        target = org or source.get("organization_id")
+        [copy] = self.insert("workflows", [{
+            "organization_id": target, "title": new_title or source.get("title"),
+            "description": source.get("description"), "status": "draft", "is_template": False, "cloned_from": src,
+        }])
+        self.insert("workflow_steps", [{
+            "workflow_id": copy["id"], "title": s.get("title"), "description": s.get("description"),
+            "status": "pending", "order": s.get("order"), "sort_key": s.get("sort_key"),
+            "assigned_to": s.get("assigned_to") if target == source.get("organization_id") else None,
+        } for s in steps])
+        return [copy]
+
+    def rpc_bump_cache_generations(self, scopes):
+        with self.lock:
+            rows = self.tables.setdefault("cache_generations", {})
+            for scope in scopes:
+                row = rows.setdefault(scope, {"scope": scope, "generation": 0})
+                row["generation"] += 1
+            return [dict(rows[scope]) for scope in scopes]
+
+    def rpc_claim_idempotency_key(self, p_key, p_fingerprint, p_ttl_seconds):
+        with self.lock:
+            rows = self.tables.setdefault("idempotency_keys", {})
+            row = rows.get(p_key)
+            if row is not None and row["expires_at"] > _now():
+                return [dict(row)]
+            expires = datetime.now(timezone.utc).timestamp() + p_ttl_seconds
+            rows[p_key] = {
+                "id": p_key, "key": p_key, "fingerprint": p_fingerprint, "status": None,
+                "expires_at": datetime.fromtimestamp(expires, timezone.utc).isoformat(),
+            }
+            return []
+
+    def rpc_take_rate_limit_token(self, p_key, p_capacity, p_rate, p_cost=1):
+        with self.lock:
+            rows = self.tables.setdefault("rate_limit_buckets", {})
+            now = time.time()
+            row = rows.setdefault(p_key, {"id": p_key, "key": p_key, "tokens": p_capacity, "ts": now})
+            available = min(p_capacity, row["tokens"] + (now - row["ts"]) * p_rate)
+            row["ts"] = now
+            if available >= p_cost:
+                row["tokens"] = available - p_cost
+                return 0
+            row["tokens"] = available
+            return (p_cost - available) / p_rate
+
+    # ---------- seed data ----------
+
+    def seed(self, orgs: int, workflows: int, steps: int, users: int, rng: random.Random) -> dict:
+        """Create `orgs` organizations with `workflows` workflows of `steps` steps each."""
+        fixtures = {"users": [], "orgs": []}
+        user_ids = [str(uuid.uuid4()) for _ in range(users)]
+        self.insert("users", [{"id": uid, "email": f"user{i}@loadtest.local", "name": f"User {i}"}
+                              for i, uid in enumerate(user_ids)])
+        for o in range(orgs):
+            org = self.insert("organizations", [{"name": f"Org {o}", "description": "Load test"}])[0]
+            members = user_ids[o::orgs] or user_ids[:1]
+            self.insert("organization_members", [
+                {"organization_id": org["id"], "user_id": uid, "role": "admin" if i == 0 else "member",
+                 "joined_at": _now()}
+                for i, uid in enumerate(members)
+            ])
+            org_fixture = {"id": org["id"], "users": members, "workflows": []}
+            for w in range(workflows):
+                wf = self.insert("workflows", [{
+                    "organization_id": org["id"], "title": f"Workflow {w}",
+                    "description": "Seeded workflow " + "lorem ipsum " * rng.randint(2, 20),
+                    "status": rng.choice(["draft", "active", "archived"]), "created_by": members[0],
+                }])[0]
+                step_rows = self.insert("workflow_steps", [{
+                    "workflow_id": wf["id"], "title": f"Step {s}", "description": "Do the thing " * rng.randint(1, 8),
+                    "order": s, "sort_key": key, "status": "pending",
+                } for s, key in enumerate(spread_keys(steps))])
+                self.insert("comments", [{
+                    "workflow_id": wf["id"], "step_id": rng.choice(step_rows)["id"] if step_rows else None,
+                    "user_id": rng.choice(members), "content": f"Comment {c}",
+                } for c in range(rng.randint(0, 3))])
+                self.insert("activity_logs", [{
+                    "organization_id": org["id"], "workflow_id": wf["id"], "user_id": members[0],
+                    "entity_type": "workflow", "entity_id": wf["id"], "action": "created",
+                    "details": f"Created workflow '{wf['title']}'",
+                }])
+                org_fixture["workflows"].append({"id": wf["id"], "steps": [s["id"] for s in step_rows]})
+            fixtures["orgs"].append(org_fixture)
+        fixtures["users"] = user_ids
+        self.fixtures = fixtures
+        return fixtures
+
+
+def _gemini_reply(prompt: str) -> str:
+    if "Convert this to a workflow" in prompt:
+        return json.dumps(CANNED_WORKFLOW)
+    return "Verify the vendor's bank details by calling the number on file before approving payment."
+
+
+def make_handler(store: Store, db_latency: float, ai_latency: float, jitter: float):
+    def pause(mean: float) -> None:
+        if mean > 0:
+            time.sleep(max(0.0, mean + random.uniform(-jitter, jitter) * mean))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, body=None) -> None:
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(n) or b"null")
+
+        def _route(self):
+            url = urlparse(self.path)
+            return url.path, parse_qsl(url.query)
+
+        def _wants_representation(self) -> bool:
+            return "return=representation" in (self.headers.get("Prefer") or "")
+
+        def do_GET(self):
+            path, params = self._route()
+            if path == "/__stats":
+                return self._send(200, dict(store.calls))
+            if path == "/__fixtures":
+                return self._send(200, store.fixtures)
+            if not path.startswith("/rest/v1/"):
+                return self._send(404, {"message": "not found"})
+            table = path.rsplit("/", 1)[-1]
+            store.calls[f"db.select {table}"] += 1
+            pause(db_latency)
+            self._send(200, store.select(table, params))
+
+        def do_POST(self):
+            path, params = self._route()
+            if path == "/__reset":
+                store.calls.clear()
+                return self._send(200, {})
+            body = self._body()
+            if ":generateContent" in path:
+                store.calls["ai.generate_content"] += 1
+                pause(ai_latency)
+                prompt = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+                text = _gemini_reply(prompt)
+                return self._send(200, {
+                    "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                    "usageMetadata": {
+                        "promptTokenCount": len(prompt) // 4,
+                        "candidatesTokenCount": len(text) // 4,
+                        "totalTokenCount": (len(prompt) + len(text)) // 4,
+                    },
+                })
+            if path.startswith("/rest/v1/rpc/"):
+                function = path.rsplit("/", 1)[-1]
+                handler = getattr(store, f"rpc_{function}", None)
+                if handler is None:
+                    return self._send(404, {"message": f"function {function} not found"})
+                store.calls[f"db.rpc {function}"] += 1
+                pause(db_latency)
+                result = handler(**(body or {}))
+                if isinstance(result, list) and dict(params).get("select"):
+                    result = store.project(result, dict(params)["select"])
+                return self._send(200, result)
+            if not path.startswith("/rest/v1/"):
+                return self._send(404, {"message": "not found"})
+            table = path.rsplit("/", 1)[-1]
+            store.calls[f"db.insert {table}"] += 1
+            pause(db_latency)
+            ignore = "resolution=ignore-duplicates" in (self.headers.get("Prefer") or "")
+            rows = store.insert(table, body if isinstance(body, list) else [body], ignore_duplicates=ignore)
+            self._send(201, store.project(rows, dict(params).get("select")) if self._wants_representation() else None)
+
+        def do_PATCH(self):
+            path, params = self._route()
+            table = path.rsplit("/", 1)[-1]
+            store.calls[f"db.update {table}"] += 1
+            pause(db_latency)
+            rows = store.update(table, params, self._body())
+            if self._wants_representation():
+                return self._send(200, store.project(rows, dict(params).get("select")))
+            self._send(204)
+
+        def do_DELETE(self):
+            path, params = self._route()
+            table = path.rsplit("/", 1)[-1]
+            store.calls[f"db.delete {table}"] += 1
+            pause(db_latency)
+            store.delete(table, params)
+            self._send(204)
+
+    return Handler
+
+
+def serve(port: int, db_latency_ms: float, ai_latency_ms: float, jitter: float, store: Store) -> ThreadingHTTPServer:
+    handler = make_handler(store, db_latency_ms / 1000, ai_latency_ms / 1000, jitter)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--db-latency-ms", type=float, default=3.0)
+    parser.add_argument("--ai-latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter", type=float, default=0.25, help="± fraction of the mean latency")
+    parser.add_argument("--orgs", type=int, default=5)
+    parser.add_argument("--workflows", type=int, default=50, help="per organization")
+    parser.add_argument("--steps", type=int, default=8, help="per workflow")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    store = Store()
+    store.seed(args.orgs, args.workflows, args.steps, args.users, random.Random(args.seed))
+    server = serve(args.port, args.db_latency_ms, args.ai_latency_ms, args.jitter, store)
+    print(f"Fake PostgREST + Gemini listening on http://127.0.0.1:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
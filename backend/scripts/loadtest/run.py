@@ -0,0 +1,266 @@
+"""
+End-to-end load test of app.main:app against local Supabase and Gemini stand-ins.
+
+Boots the fake upstream (scripts/loadtest/fakes.py) and the API under uvicorn
+as separate processes, then drives each scenario with `--concurrency` virtual
+users for `--duration` seconds. Per scenario it reports throughput, p50/p95/p99
+latency (per iteration and per endpoint), errors, and the upstream calls made
+(PostgREST by operation and table, Gemini), measured at the stand-in.
+
+Scenarios (see scenarios.py): dashboard, step_edit, ai_convert, mixed.
+
+Usage:
+    python scripts/loadtest/run.py [--scenarios dashboard,step_edit,ai_convert,mixed]
+        [--concurrency 20] [--duration 15] [--db-latency-ms 3] [--ai-latency-ms 800]
+        [--workers 1] [--json results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.abspath(os.path.join(HERE, "..", ".."))
+sys.path.insert(0, HERE)
+
+import httpx
+import jwt
+
+from scenarios import SCENARIOS, VirtualUser
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args[1]} exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"timed out waiting for {url}")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(values: List[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round((ordered[-1] if ordered else 0) * 1000, 2),
+    }
+
+
+def upstream_summary(calls: Dict[str, int], iterations: int) -> dict:
+    db = sum(n for k, n in calls.items() if k.startswith("db."))
+    ai = sum(n for k, n in calls.items() if k.startswith("ai."))
+    per = max(iterations, 1)
+    return {
+        "db_calls": db,
+        "ai_calls": ai,
+        "db_calls_per_iteration": round(db / per, 2),
+        "ai_calls_per_iteration": round(ai / per, 3),
+        "by_call": dict(sorted(calls.items(), key=lambda item: -item[1])),
+    }
+
+
+async def run_scenario(name: str, api: str, upstream: str, fixtures: dict, args) -> dict:
+    scenario = SCENARIOS[name]
+    users = [(uid, org) for org in fixtures["orgs"] for uid in org["users"]]
+    limits = httpx.Limits(max_connections=args.concurrency * 4, max_keepalive_connections=args.concurrency * 4)
+
+    async with httpx.AsyncClient(base_url=api, limits=limits, timeout=args.timeout) as client:
+        await client.post(f"{upstream}/__reset")
+        vus = []
+        for i in range(args.concurrency):
+            user_id, org = users[i % len(users)]
+            token = jwt.encode({"sub": user_id, "email": f"{user_id}@loadtest.local"}, "loadtest")
+            vus.append(VirtualUser(client, token, org, random.Random(args.seed + i)))
+
+        iterations: List[float] = []
+        deadline = time.perf_counter() + args.duration
+
+        async def loop(vu: VirtualUser) -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await scenario(vu)
+                iterations.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(loop(vu) for vu in vus))
+        elapsed = time.perf_counter() - started
+        calls = (await client.get(f"{upstream}/__stats")).json()
+
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for vu in vus:
+        for endpoint, values in vu.samples.items():
+            samples.setdefault(endpoint, []).extend(values)
+        for endpoint, n in vu.errors.items():
+            errors[endpoint] = errors.get(endpoint, 0) + n
+    requests_made = sum(len(v) for v in samples.values())
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "iterations": len(iterations),
+        "iterations_per_s": round(len(iterations) / elapsed, 2),
+        "requests": requests_made,
+        "requests_per_s": round(requests_made / elapsed, 2),
+        "errors": sum(errors.values()),
+        "errors_by_endpoint": errors,
+        "iteration_latency": latency_summary(iterations),
+        "endpoints": {endpoint: latency_summary(values) for endpoint, values in sorted(samples.items())},
+        "upstream": upstream_summary(calls, len(iterations)),
+    }
+
+
+def print_report(results: dict, baseline: Optional[dict]) -> None:
+    print()
+    print(f"{'scenario':<12} {'iter/s':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'db/iter':>8} {'ai/iter':>8}")
+    for name, r in results["scenarios"].items():
+        lat = r["iteration_latency"]
+        up = r["upstream"]
+        print(f"{name:<12} {r['iterations_per_s']:>8.1f} {r['requests_per_s']:>8.1f} {lat['p50_ms']:>8.1f} "
+              f"{lat['p95_ms']:>8.1f} {lat['p99_ms']:>8.1f} {r['errors']:>7d} "
+              f"{up['db_calls_per_iteration']:>8.2f} {up['ai_calls_per_iteration']:>8.3f}")
+        if baseline and name in baseline.get("scenarios", {}):
+            old = baseline["scenarios"][name]
+            d_rps = _change(old["requests_per_s"], r["requests_per_s"])
+            d_p95 = _change(old["iteration_latency"]["p95_ms"], lat["p95_ms"])
+            d_db = _change(old["upstream"]["db_calls_per_iteration"], up["db_calls_per_iteration"])
+            print(f"{'  vs base':<12} {'':>8} {d_rps:>8} {'':>8} {d_p95:>8} {'':>8} {'':>7} {d_db:>8}")
+
+    for name, r in results["scenarios"].items():
+        print(f"\n{name}: per endpoint")
+        for endpoint, lat in r["endpoints"].items():
+            print(f"  {endpoint:<34} n={lat['count']:<6d} p50={lat['p50_ms']:>8.1f}  "
+                  f"p95={lat['p95_ms']:>8.1f}  p99={lat['p99_ms']:>8.1f} ms")
+        top = list(r["upstream"]["by_call"].items())[:6]
+        print("  upstream: " + ", ".join(f"{k} x{v}" for k, v in top))
+
+
+def _change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--db-latency-ms", type=float, default=3.0)
+    parser.add_argument("--ai-latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter", type=float, default=0.25)
+    parser.add_argument("--orgs", type=int, default=5)
+    parser.add_argument("--workflows", type=int, default=50, help="per organization")
+    parser.add_argument("--steps", type=int, default=8, help="per workflow")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per request, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    upstream_port, api_port = free_port(), free_port()
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    api = f"http://127.0.0.1:{api_port}"
+
+    fakes = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "fakes.py"), "--port", str(upstream_port),
+        "--db-latency-ms", str(args.db_latency_ms), "--ai-latency-ms", str(args.ai_latency_ms),
+        "--jitter", str(args.jitter), "--orgs", str(args.orgs), "--workflows", str(args.workflows),
+        "--steps", str(args.steps), "--users", str(max(args.concurrency, args.orgs)), "--seed", str(args.seed),
+    ], stdout=subprocess.DEVNULL)
+    env = {
+        **os.environ,
+        "SUPABASE_URL": upstream,
+        "SUPABASE_SERVICE_ROLE_KEY": "loadtest",
+        "GEMINI_API_KEY": "loadtest",
+        "GEMINI_BASE_URL": upstream,
+        "DEBUG": "False",
+        "LOG_LEVEL": "WARNING",
+    }
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ], cwd=BACKEND, env=env)
+
+    try:
+        wait_for(f"{upstream}/__fixtures", fakes)
+        wait_for(f"{api}/health", server)
+        fixtures = httpx.get(f"{upstream}/__fixtures").json()
+
+        results = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("json_out", "compare")},
+            "scenarios": {},
+        }
+        for name in names:
+            print(f"Running {name} ({args.concurrency} users, {args.duration:.0f}s)...", flush=True)
+            results["scenarios"][name] = asyncio.run(run_scenario(name, api, upstream, fixtures, args))
+    finally:
+        for proc in (server, fakes):
+            proc.terminate()
+        for proc in (server, fakes):
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Request mixes driven by the load test, modelled on what the frontend does.
+
+Each scenario is an async function taking a VirtualUser and running one
+iteration; requests that the browser issues in parallel are gathered.
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+SUMMARY_FIELDS = "id,organization_id,title,description,status,created_at,updated_at,step_count"
+
+RAW_SOP = (
+    "Hi team, when a new vendor asks to be onboarded please get their signed W-9 first. "
+    "Finance then confirms the bank details by phone (never by email). Security runs the "
+    "vendor questionnaire, and once that passes Finance creates the vendor in the ERP. "
+    "Finally let whoever requested the vendor know it has been approved."
+)
+
+
+class VirtualUser:
+    """One simulated browser session: an auth token, an org, and a latency log."""
+
+    def __init__(self, client: httpx.AsyncClient, token: str, org: dict, rng: random.Random):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.org = org
+        self.rng = rng
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> dict:
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = resp.status_code < 400
+            body = resp.json() if ok and resp.content else {}
+            if isinstance(body, dict) and body.get("success") is False:
+                ok = False
+        except (httpx.HTTPError, ValueError):
+            ok, body = False, {}
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return body
+
+    def pick_workflow(self) -> dict:
+        return self.rng.choice(self.org["workflows"])
+
+
+async def dashboard(vu: VirtualUser) -> None:
+    """Dashboard layout and landing page: current user, workflow list, org activity."""
+    org_id = vu.org["id"]
+    await asyncio.gather(
+        vu.request("GET /users/me", "GET", "/api/v1/users/me"),
+        vu.request("GET /workflows/ (summary)", "GET", "/api/v1/workflows/",
+                   params={"org_id": org_id, "fields": SUMMARY_FIELDS}),
+        vu.request("GET /activity-logs/ (org)", "GET", "/api/v1/activity-logs/",
+                   params={"org_id": org_id, "limit": 50}),
+    )
+
+
+async def step_edit(vu: VirtualUser) -> None:
+    """Open a workflow page, then edit, reorder and complete steps and comment."""
+    wf = vu.pick_workflow()
+    wid = wf["id"]
+    await asyncio.gather(
+        vu.request("GET /workflows/{id}", "GET", f"/api/v1/workflows/{wid}"),
+        vu.request("GET /steps/", "GET", "/api/v1/steps/", params={"workflow_id": wid}),
+        vu.request("GET /comments/", "GET", "/api/v1/comments/", params={"workflow_id": wid}),
+        vu.request("GET /activity-logs/ (workflow)", "GET", "/api/v1/activity-logs/", params={"workflow_id": wid}),
+    )
+    if not wf["steps"]:
+        return
+    step_id = vu.rng.choice(wf["steps"])
+    await vu.request("PATCH /steps/{id}", "PATCH", f"/api/v1/steps/{step_id}",
+                     json={"description": f"Edited at {time.time():.3f}"})
+    if len(wf["steps"]) > 1:
+        prev_id = vu.rng.choice([s for s in wf["steps"] if s != step_id])
+        await vu.request("POST /steps/{id}/move", "POST", f"/api/v1/steps/{step_id}/move",
+                         json={"prev_id": prev_id, "next_id": None})
+    await vu.request("PATCH /steps/{id}/status", "PATCH", f"/api/v1/steps/{step_id}/status",
+                     json={"status": vu.rng.choice(["pending", "in_progress", "completed"])})
+    await vu.request("POST /comments/", "POST", "/api/v1/comments/",
+                     json={"workflow_id": wid, "step_id": step_id, "content": "Looks good"})
+
+
+async def ai_convert(vu: VirtualUser) -> None:
+    """Paste text into the new-workflow page and convert it with AI."""
+    await vu.request("POST /ai/convert", "POST", "/api/v1/ai/convert", json={"raw_text": RAW_SOP})
+
+
+# name -> weight within the mixed scenario
+MIX = {"dashboard": 70, "step_edit": 25, "ai_convert": 5}
+
+
+async def mixed(vu: VirtualUser) -> None:
+    """Weighted blend of the other scenarios (see MIX)."""
+    name = vu.rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    await SCENARIOS[name](vu)
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], Awaitable[None]]] = {
+    "dashboard": dashboard,
+    "step_edit": step_edit,
+    "ai_convert": ai_convert,
+    "mixed": mixed,
+}
@@ -62,6 +62,7 @@ CREATE TABLE IF NOT EXISTS public.workflows (
     title TEXT NOT NULL,
     description TEXT,
     status TEXT DEFAULT 'draft',
+    version BIGINT NOT NULL DEFAULT 1,
     created_by UUID REFERENCES public.users(id),
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
@@ -76,6 +77,7 @@ CREATE TABLE IF NOT EXISTS public.workflow_steps (
     status TEXT DEFAULT 'pending',
     assigned_to UUID REFERENCES public.users(id),
     "order" INTEGER DEFAULT 0,
+    sort_key TEXT COLLATE "C",
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
@@ -104,12 +106,541 @@ CREATE TABLE IF NOT EXISTS public.activity_logs (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Migration: fractional step ordering. Steps sort by a base-62 "sort_key" string,
+-- so a reorder rewrites only the moved row. Byte-wise collation keeps Postgres
+-- ordering identical to the backend's. Existing rows are backfilled from "order".
+ALTER TABLE public.workflow_steps ADD COLUMN IF NOT EXISTS sort_key TEXT COLLATE "C";
+UPDATE public.workflow_steps s
+SET sort_key = rtrim(lpad(r.rn::text, 8, '0'), '0')
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY workflow_id ORDER BY "order", created_at) AS rn
+    FROM public.workflow_steps
+) r
+WHERE s.id = r.id AND s.sort_key IS NULL;
+
+-- Migration: workflow version counter used for ETags. Any change to a workflow
+-- or to one of its steps bumps workflows.version, so a conditional GET only
+-- needs to read that one column.
+ALTER TABLE public.workflows ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION public.bump_workflow_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_workflows_version ON public.workflows;
+CREATE TRIGGER trg_workflows_version
+    BEFORE UPDATE ON public.workflows
+    FOR EACH ROW EXECUTE FUNCTION public.bump_workflow_version();
+
+CREATE OR REPLACE FUNCTION public.bump_parent_workflow_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE public.workflows SET version = version + 1 WHERE id = NEW.workflow_id;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.workflow_id IS DISTINCT FROM NEW.workflow_id) THEN
+        UPDATE public.workflows SET version = version + 1 WHERE id = OLD.workflow_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_workflow_steps_version ON public.workflow_steps;
+CREATE TRIGGER trg_workflow_steps_version
+    AFTER INSERT OR UPDATE OR DELETE ON public.workflow_steps
+    FOR EACH ROW EXECUTE FUNCTION public.bump_parent_workflow_version();
+
+-- Migration: soft delete. Deleting a workflow only sets deleted_at; every read
+-- filters it out, and purge_deleted_workflows() (below) removes it for good in
+-- bounded batches once the undelete window has passed.
+ALTER TABLE public.workflows ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+ALTER TABLE public.workflows ADD COLUMN IF NOT EXISTS deleted_by UUID;
+
+-- Migration: full-text search. Weighted tsvector columns (title > body) with GIN
+-- indexes, and a search_org() function that ranks matches across workflows,
+-- steps and comments and only builds highlighted snippets for the returned page.
+ALTER TABLE public.workflows ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+ALTER TABLE public.workflow_steps ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+ALTER TABLE public.comments ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_workflows_search ON public.workflows USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_steps_search ON public.workflow_steps USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_comments_search ON public.comments USING GIN (search_vector);
+
+CREATE OR REPLACE FUNCTION public.search_org(
+    q TEXT,
+    org UUID DEFAULT NULL,
+    lim INTEGER DEFAULT 20,
+    off INTEGER DEFAULT 0,
+    hl_start TEXT DEFAULT '<mark>',
+    hl_stop TEXT DEFAULT '</mark>'
+)
+RETURNS TABLE (
+    entity_type TEXT,
+    entity_id UUID,
+    workflow_id UUID,
+    title TEXT,
+    snippet TEXT,
+    rank REAL
+)
+LANGUAGE sql STABLE AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('english', q) AS tsq
+    ),
+    hits AS (
+        SELECT 'workflow'::TEXT AS entity_type, w.id AS entity_id, w.id AS workflow_id,
+               w.title, coalesce(w.description, '') AS body,
+               ts_rank(w.search_vector, query.tsq) AS rank
+        FROM public.workflows w, query
+        WHERE w.search_vector @@ query.tsq
+          AND (org IS NULL OR w.organization_id = org)
+          AND w.deleted_at IS NULL
+        UNION ALL
+        SELECT 'step', s.id, s.workflow_id, s.title, coalesce(s.description, ''),
+               ts_rank(s.search_vector, query.tsq)
+        FROM public.workflow_steps s
+        JOIN public.workflows w ON w.id = s.workflow_id, query
+        WHERE s.search_vector @@ query.tsq
+          AND (org IS NULL OR w.organization_id = org)
+          AND w.deleted_at IS NULL
+        UNION ALL
+        SELECT 'comment', c.id, c.workflow_id, NULL, c.content,
+               ts_rank(c.search_vector, query.tsq)
+        FROM public.comments c
+        JOIN public.workflows w ON w.id = c.workflow_id, query
+        WHERE c.search_vector @@ query.tsq
+          AND (org IS NULL OR w.organization_id = org)
+          AND w.deleted_at IS NULL
+    ),
+    page AS (
+        SELECT * FROM hits ORDER BY rank DESC, entity_id LIMIT lim OFFSET off
+    )
+    SELECT page.entity_type, page.entity_id, page.workflow_id, page.title,
+           ts_headline(
+               'english',
+               coalesce(page.title || ' — ', '') || page.body,
+               query.tsq,
+               format('StartSel=%s, StopSel=%s, MaxWords=20, MinWords=8, MaxFragments=2', hl_start, hl_stop)
+           ) AS snippet,
+           page.rank
+    FROM page, query
+    ORDER BY page.rank DESC, page.entity_id;
+$$;
+
+-- Migration: delta sync. updated_at is maintained by the database (one clock for
+-- every writer), deletions leave tombstones in deleted_records, and sync_org()
+-- returns everything that changed in an organization since a watermark.
+CREATE OR REPLACE FUNCTION public.set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Version bumps from step triggers (depth > 0) must not reorder the workflow list
+DROP TRIGGER IF EXISTS trg_workflows_updated_at ON public.workflows;
+CREATE TRIGGER trg_workflows_updated_at
+    BEFORE UPDATE ON public.workflows
+    FOR EACH ROW WHEN (pg_trigger_depth() < 1) EXECUTE FUNCTION public.set_updated_at();
+DROP TRIGGER IF EXISTS trg_workflow_steps_updated_at ON public.workflow_steps;
+CREATE TRIGGER trg_workflow_steps_updated_at
+    BEFORE UPDATE ON public.workflow_steps
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+DROP TRIGGER IF EXISTS trg_comments_updated_at ON public.comments;
+CREATE TRIGGER trg_comments_updated_at
+    BEFORE UPDATE ON public.comments
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+CREATE TABLE IF NOT EXISTS public.deleted_records (
+    id BIGSERIAL PRIMARY KEY,
+    entity_type TEXT NOT NULL,
+    entity_id UUID NOT NULL,
+    organization_id UUID,
+    workflow_id UUID,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE OR REPLACE FUNCTION public.record_deletion() RETURNS trigger AS $$
+DECLARE
+    org UUID;
+BEGIN
+    IF TG_ARGV[0] = 'workflow' THEN
+        INSERT INTO public.deleted_records (entity_type, entity_id, organization_id, workflow_id)
+        VALUES ('workflow', OLD.id, OLD.organization_id, OLD.id);
+    ELSE
+        -- NULL when the parent workflow is (being) deleted; its tombstone covers this row
+        SELECT organization_id INTO org FROM public.workflows WHERE id = OLD.workflow_id AND deleted_at IS NULL;
+        INSERT INTO public.deleted_records (entity_type, entity_id, organization_id, workflow_id)
+        VALUES (TG_ARGV[0], OLD.id, org, OLD.workflow_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_workflows_tombstone ON public.workflows;
+CREATE TRIGGER trg_workflows_tombstone
+    AFTER DELETE ON public.workflows
+    FOR EACH ROW EXECUTE FUNCTION public.record_deletion('workflow');
+DROP TRIGGER IF EXISTS trg_workflow_steps_tombstone ON public.workflow_steps;
+CREATE TRIGGER trg_workflow_steps_tombstone
+    AFTER DELETE ON public.workflow_steps
+    FOR EACH ROW EXECUTE FUNCTION public.record_deletion('step');
+DROP TRIGGER IF EXISTS trg_comments_tombstone ON public.comments;
+CREATE TRIGGER trg_comments_tombstone
+    AFTER DELETE ON public.comments
+    FOR EACH ROW EXECUTE FUNCTION public.record_deletion('comment');
+
+-- `after` continues a page that was cut off at `lim` rows: for each list, the
+-- (change time, id) of the last row already returned, so rows sharing one
+-- timestamp are never repeated or skipped. Lists missing from it are finished.
+DROP FUNCTION IF EXISTS public.sync_org(UUID, TIMESTAMPTZ, INTEGER);
+CREATE OR REPLACE FUNCTION public.sync_org(
+    org UUID DEFAULT NULL,
+    since TIMESTAMPTZ DEFAULT NULL,
+    lim INTEGER DEFAULT 1000,
+    after JSONB DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE sql STABLE AS $$
+    SELECT jsonb_build_object(
+        'now', clock_timestamp(),
+        'workflows', coalesce((
+            SELECT jsonb_agg(to_jsonb(w) - 'search_vector' ORDER BY w.updated_at, w.id)
+            FROM (
+                SELECT workflows.* FROM public.workflows, LATERAL (
+                    SELECT (after->'workflows'->>0)::timestamptz AS ts, (after->'workflows'->>1)::uuid AS id
+                ) k
+                WHERE (org IS NULL OR organization_id = org)
+                  AND (since IS NULL OR updated_at > since)
+                  AND deleted_at IS NULL
+                  AND (after IS NULL OR (k.ts IS NOT NULL AND updated_at >= k.ts
+                       AND (updated_at > k.ts OR workflows.id > k.id)))
+                ORDER BY updated_at, workflows.id LIMIT lim
+            ) w
+        ), '[]'::jsonb),
+        'steps', coalesce((
+            SELECT jsonb_agg(to_jsonb(s) - 'search_vector' ORDER BY s.updated_at, s.id)
+            FROM (
+                SELECT st.* FROM public.workflow_steps st
+                JOIN public.workflows wf ON wf.id = st.workflow_id,
+                LATERAL (
+                    SELECT (after->'steps'->>0)::timestamptz AS ts, (after->'steps'->>1)::uuid AS id
+                ) k
+                WHERE (org IS NULL OR wf.organization_id = org)
+                  AND wf.deleted_at IS NULL
+                  AND (since IS NULL OR st.updated_at > since)
+                  AND (after IS NULL OR (k.ts IS NOT NULL AND st.updated_at >= k.ts
+                       AND (st.updated_at > k.ts OR st.id > k.id)))
+                ORDER BY st.updated_at, st.id LIMIT lim
+            ) s
+        ), '[]'::jsonb),
+        'comments', coalesce((
+            SELECT jsonb_agg(to_jsonb(c) - 'search_vector' ORDER BY c.updated_at, c.id)
+            FROM (
+                SELECT cm.* FROM public.comments cm
+                JOIN public.workflows wf ON wf.id = cm.workflow_id,
+                LATERAL (
+                    SELECT (after->'comments'->>0)::timestamptz AS ts, (after->'comments'->>1)::uuid AS id
+                ) k
+                WHERE (org IS NULL OR wf.organization_id = org)
+                  AND wf.deleted_at IS NULL
+                  AND (since IS NULL OR cm.updated_at > since)
+                  AND (after IS NULL OR (k.ts IS NOT NULL AND cm.updated_at >= k.ts
+                       AND (cm.updated_at > k.ts OR cm.id > k.id)))
+                ORDER BY cm.updated_at, cm.id LIMIT lim
+            ) c
+        ), '[]'::jsonb),
+        'deleted', coalesce((
+            SELECT jsonb_agg(to_jsonb(d) - 'id' - 'organization_id' ORDER BY d.deleted_at, d.entity_id)
+            FROM (
+                SELECT dr.* FROM public.deleted_records dr, LATERAL (
+                    SELECT (after->'deleted'->>0)::timestamptz AS ts, (after->'deleted'->>1)::uuid AS id
+                ) k
+                WHERE since IS NOT NULL AND dr.deleted_at > since
+                  AND (org IS NULL OR dr.organization_id = org)
+                  AND (after IS NULL OR (k.ts IS NOT NULL AND dr.deleted_at >= k.ts
+                       AND (dr.deleted_at > k.ts OR dr.entity_id > k.id)))
+                ORDER BY dr.deleted_at, dr.entity_id LIMIT lim
+            ) d
+        ), '[]'::jsonb)
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION public.purge_deleted_records(keep_days INTEGER DEFAULT 30)
+RETURNS INTEGER
+LANGUAGE sql AS $$
+    WITH gone AS (
+        DELETE FROM public.deleted_records
+        WHERE deleted_at < clock_timestamp() - make_interval(days => keep_days)
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM gone;
+$$;
+
+-- Generation counters of cached API responses, shared by every API worker
+-- (CACHE_GENERATION_STORE=supabase). Writes bump the scopes they touch.
+CREATE TABLE IF NOT EXISTS public.cache_generations (
+    scope TEXT PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION public.bump_cache_generations(scopes TEXT[])
+RETURNS TABLE (scope TEXT, generation BIGINT)
+LANGUAGE sql AS $$
+    INSERT INTO public.cache_generations AS g (scope, generation)
+    SELECT s, 1 FROM unnest(scopes) AS s
+    ON CONFLICT (scope) DO UPDATE SET generation = g.generation + 1, updated_at = NOW()
+    RETURNING g.scope, g.generation;
+$$;
+
+-- Responses to requests sent with an Idempotency-Key, replayed to retries
+-- (IDEMPOTENCY_STORE=supabase). status is NULL while the first request runs;
+-- body is base64.
+CREATE TABLE IF NOT EXISTS public.idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status INTEGER,
+    headers JSONB,
+    body TEXT,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Claim a key: no row back if the caller now holds it, else the row holding it.
+-- Expired keys are swept a few at a time on the way.
+CREATE OR REPLACE FUNCTION public.claim_idempotency_key(p_key TEXT, p_fingerprint TEXT, p_ttl_seconds INTEGER)
+RETURNS SETOF public.idempotency_keys
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM public.idempotency_keys WHERE key IN (
+        SELECT key FROM public.idempotency_keys WHERE expires_at < NOW() LIMIT 10
+    ) OR (key = p_key AND expires_at < NOW());
+    INSERT INTO public.idempotency_keys (key, fingerprint, expires_at)
+    VALUES (p_key, p_fingerprint, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (key) DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT * FROM public.idempotency_keys WHERE key = p_key;
+    END IF;
+END;
+$$;
+
+-- Token buckets for rate limiting shared by every API worker
+-- (RATE_LIMIT_BACKEND=supabase).
+CREATE TABLE IF NOT EXISTS public.rate_limit_buckets (
+    key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Refill the bucket, then take p_cost tokens: returns 0 if taken, else the
+-- seconds until they would be there. The upsert locks the row, so concurrent
+-- takes on one bucket serialize.
+CREATE OR REPLACE FUNCTION public.take_rate_limit_token(
+    p_key TEXT, p_capacity DOUBLE PRECISION, p_rate DOUBLE PRECISION, p_cost DOUBLE PRECISION DEFAULT 1
+)
+RETURNS DOUBLE PRECISION
+LANGUAGE plpgsql AS $$
+DECLARE
+    ts TIMESTAMPTZ := clock_timestamp();
+    available DOUBLE PRECISION;
+BEGIN
+    INSERT INTO public.rate_limit_buckets AS b (key, tokens, updated_at)
+    VALUES (p_key, p_capacity, ts)
+    ON CONFLICT (key) DO UPDATE
+        SET tokens = LEAST(p_capacity, b.tokens + EXTRACT(EPOCH FROM ts - b.updated_at) * p_rate),
+            updated_at = ts
+    RETURNING tokens INTO available;
+    IF available >= p_cost THEN
+        UPDATE public.rate_limit_buckets SET tokens = available - p_cost WHERE key = p_key;
+        RETURN 0;
+    END IF;
+    RETURN (p_cost - available) / p_rate;
+END;
+$$;
+
+-- Soft delete and undelete of workflows (see the soft delete migration above).
+-- A soft-deleted workflow leaves sync like a deleted one.
+DROP TRIGGER IF EXISTS trg_workflows_soft_delete_tombstone ON public.workflows;
+CREATE TRIGGER trg_workflows_soft_delete_tombstone
+    AFTER UPDATE OF deleted_at ON public.workflows
+    FOR EACH ROW WHEN (OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL)
+    EXECUTE FUNCTION public.record_deletion('workflow');
+
+CREATE OR REPLACE FUNCTION public.soft_delete_workflow(
+    wf UUID,
+    by_user UUID DEFAULT NULL,
+    window_seconds INTEGER DEFAULT 604800
+)
+RETURNS TABLE (id UUID, organization_id UUID, title TEXT, deleted_at TIMESTAMPTZ, restorable_until TIMESTAMPTZ)
+LANGUAGE sql AS $$
+    UPDATE public.workflows w
+    SET deleted_at = clock_timestamp(), deleted_by = by_user
+    WHERE w.id = wf AND w.deleted_at IS NULL
+    RETURNING w.id, w.organization_id, w.title, w.deleted_at, w.deleted_at + make_interval(secs => window_seconds);
+$$;
+
+CREATE OR REPLACE FUNCTION public.restore_workflow(wf UUID, window_seconds INTEGER DEFAULT 604800)
+RETURNS TABLE (id UUID, organization_id UUID, title TEXT)
+LANGUAGE plpgsql AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+        WITH restored AS (
+            UPDATE public.workflows w SET deleted_at = NULL, deleted_by = NULL
+            WHERE w.id = wf AND w.deleted_at > clock_timestamp() - make_interval(secs => window_seconds)
+            RETURNING w.id, w.organization_id, w.title
+        )
+        SELECT * FROM restored;
+    IF FOUND THEN
+        -- The workflow is back: a tombstone left behind would delete it again
+        -- on clients syncing from before the soft delete
+        DELETE FROM public.deleted_records WHERE entity_type = 'workflow' AND entity_id = wf;
+        -- Sync clients dropped these with the workflow's tombstone: send them again
+        UPDATE public.workflow_steps SET updated_at = clock_timestamp() WHERE workflow_id = wf;
+        UPDATE public.comments SET updated_at = clock_timestamp() WHERE workflow_id = wf;
+    END IF;
+END;
+$$;
+
+-- Remove workflows soft-deleted more than keep_seconds ago: their comments,
+-- history, activity and steps, then the workflows, at most `batch` rows per
+-- call so no statement holds locks for long. Returns the rows removed; 0 when
+-- done.
+CREATE OR REPLACE FUNCTION public.purge_deleted_workflows(keep_seconds INTEGER, batch INTEGER DEFAULT 1000)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := clock_timestamp() - make_interval(secs => keep_seconds);
+    removed INTEGER;
+BEGIN
+    DELETE FROM public.comments WHERE id IN (
+        SELECT c.id FROM public.comments c JOIN public.workflows w ON w.id = c.workflow_id
+        WHERE w.deleted_at < cutoff LIMIT batch
+    );
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    IF removed > 0 THEN
+        RETURN removed;
+    END IF;
+
+    DELETE FROM public.workflow_revisions WHERE (workflow_id, version) IN (
+        SELECT r.workflow_id, r.version FROM public.workflow_revisions r JOIN public.workflows w ON w.id = r.workflow_id
+        WHERE w.deleted_at < cutoff LIMIT batch
+    );
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    IF removed > 0 THEN
+        RETURN removed;
+    END IF;
+
+    DELETE FROM public.activity_logs WHERE id IN (
+        SELECT a.id FROM public.activity_logs a JOIN public.workflows w ON w.id = a.workflow_id
+        WHERE w.deleted_at < cutoff LIMIT batch
+    );
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    IF removed > 0 THEN
+        RETURN removed;
+    END IF;
+
+    DELETE FROM public.workflow_steps WHERE id IN (
+        SELECT s.id FROM public.workflow_steps s JOIN public.workflows w ON w.id = s.workflow_id
+        WHERE w.deleted_at < cutoff LIMIT batch
+    );
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    IF removed > 0 THEN
+        RETURN removed;
+    END IF;
+
+    DELETE FROM public.workflows WHERE id IN (
+        SELECT w.id FROM public.workflows w WHERE w.deleted_at < cutoff LIMIT batch
+    );
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$;
+
+-- Migration: workflow templates. A workflow marked is_template appears in the
+-- template library; clones and template instances record where they came from.
+ALTER TABLE public.workflows ADD COLUMN IF NOT EXISTS is_template BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE public.workflows ADD COLUMN IF NOT EXISTS cloned_from UUID;
+
+-- Copy a workflow and its steps into an organization (the source's if org is
+-- NULL) with two INSERT ... SELECT statements, so the cost does not depend on
+-- the number of steps. Steps keep their order; progress is reset, and
+-- assignees are kept only within the same organization. Returns the new
+-- workflow, or no row if the source does not exist (or is deleted, or is not
+-- a template when from_template is set).
+CREATE OR REPLACE FUNCTION public.clone_workflow(
+    src UUID,
+    org UUID DEFAULT NULL,
+    new_title TEXT DEFAULT NULL,
+    from_template BOOLEAN DEFAULT FALSE
+)
+RETURNS SETOF public.workflows
+LANGUAGE plpgsql AS $$
+DECLARE
+    copy_id UUID;
+BEGIN
+    INSERT INTO public.workflows (organization_id, title, description, status, cloned_from)
+    SELECT COALESCE(org, w.organization_id), COALESCE(new_title, w.title), w.description, 'draft', w.id
+    FROM public.workflows w
+    WHERE w.id = src AND w.deleted_at IS NULL AND (w.is_template OR NOT from_template)
+    RETURNING id INTO copy_id;
+    IF copy_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO public.workflow_steps (workflow_id, title, description, status, assigned_to, "order", sort_key)
+    SELECT copy_id, s.title, s.description, 'pending',
+           CASE WHEN org IS NULL OR org = w.organization_id THEN s.assigned_to END, s."order", s.sort_key
+    FROM public.workflow_steps s JOIN public.workflows w ON w.id = s.workflow_id
+    WHERE s.workflow_id = src;
+
+    RETURN QUERY SELECT * FROM public.workflows WHERE id = copy_id;
+END;
+$$;
+
+-- Workflow version history (app/services/history.py). Each row is the workflow
+-- and its steps at `version`: a full snapshot, or a JSON Patch against
+-- base_version. depth counts the patches since the last snapshot and
+-- chain_bytes their total size, so the writer knows when a new snapshot is
+-- cheaper than another patch.
+CREATE TABLE IF NOT EXISTS public.workflow_revisions (
+    workflow_id UUID NOT NULL REFERENCES public.workflows(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('snapshot', 'delta')),
+    base_version BIGINT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    chain_bytes INTEGER NOT NULL DEFAULT 0,
+    data JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (workflow_id, version)
+);
+
 -- Create indexes for performance
 CREATE INDEX IF NOT EXISTS idx_workflows_org ON public.workflows(organization_id);
 CREATE INDEX IF NOT EXISTS idx_workflows_created_by ON public.workflows(created_by);
 CREATE INDEX IF NOT EXISTS idx_steps_workflow ON public.workflow_steps(workflow_id);
+CREATE INDEX IF NOT EXISTS idx_steps_workflow_sort_key ON public.workflow_steps(workflow_id, sort_key);
 CREATE INDEX IF NOT EXISTS idx_comments_workflow ON public.comments(workflow_id);
 CREATE INDEX IF NOT EXISTS idx_activity_org ON public.activity_logs(organization_id);
+CREATE INDEX IF NOT EXISTS idx_workflows_org_updated ON public.workflows(organization_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_steps_updated ON public.workflow_steps(updated_at);
+CREATE INDEX IF NOT EXISTS idx_comments_updated ON public.comments(updated_at);
+CREATE INDEX IF NOT EXISTS idx_deleted_records_org_deleted ON public.deleted_records(organization_id, deleted_at);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON public.idempotency_keys(expires_at);
+CREATE INDEX IF NOT EXISTS idx_workflows_deleted ON public.workflows(deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_workflows_templates ON public.workflows(title) WHERE is_template AND deleted_at IS NULL;
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE public.users ENABLE ROW LEVEL SECURITY;
@@ -119,6 +650,11 @@ ALTER TABLE public.workflows ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.workflow_steps ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.comments ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.activity_logs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.deleted_records ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.cache_generations ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.idempotency_keys ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.rate_limit_buckets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.workflow_revisions ENABLE ROW LEVEL SECURITY;
 
 -- Create permissive policies for service role (backend)
 CREATE POLICY IF NOT EXISTS "Service role full access" ON public.users FOR ALL USING (true);
@@ -128,6 +664,11 @@ CREATE POLICY IF NOT EXISTS "Service role full access" ON public.workflows FOR A
 CREATE POLICY IF NOT EXISTS "Service role full access" ON public.workflow_steps FOR ALL USING (true);
 CREATE POLICY IF NOT EXISTS "Service role full access" ON public.comments FOR ALL USING (true);
 CREATE POLICY IF NOT EXISTS "Service role full access" ON public.activity_logs FOR ALL USING (true);
+CREATE POLICY IF NOT EXISTS "Service role full access" ON public.deleted_records FOR ALL USING (true);
+CREATE POLICY IF NOT EXISTS "Service role full access" ON public.cache_generations FOR ALL USING (true);
+CREATE POLICY IF NOT EXISTS "Service role full access" ON public.idempotency_keys FOR ALL USING (true);
+CREATE POLICY IF NOT EXISTS "Service role full access" ON public.rate_limit_buckets FOR ALL USING (true);
+CREATE POLICY IF NOT EXISTS "Service role full access" ON public.workflow_revisions FOR ALL USING (true);
 """
 
 def execute_sql(sql: str) -> dict:
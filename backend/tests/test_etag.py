@@ -0,0 +1,58 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.utils.compression import CompressionMiddleware
+from app.utils.etag import compute_etag, encoded_etag, etag_matches, has_encoded_etag, not_modified
+
+ETAG = compute_etag("workflow", "w1", 3)
+
+
+def make_app(size: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/item")
+    async def item(request: Request):
+        if etag_matches(request.headers.get("if-none-match"), ETAG):
+            return not_modified(ETAG)
+        return JSONResponse({"data": "x" * size}, headers={"ETag": ETAG})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return app
+
+
+async def get(app, headers):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get("/item", headers=headers)
+
+
+def test_encoded_etag_round_trip():
+    tagged = encoded_etag(ETAG, "gzip")
+    assert tagged != ETAG
+    assert etag_matches(tagged, ETAG)
+    assert etag_matches(f'W/{tagged}, "other"', ETAG)
+    assert has_encoded_etag(tagged)
+    assert not has_encoded_etag(ETAG)
+    assert not has_encoded_etag(None)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("size", [4096, 10])
+async def test_304_repeats_the_200_etag(size):
+    app = make_app(size)
+    first = await get(app, {"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert (first.headers.get("content-encoding") == "gzip") == (size >= 1024)
+
+    again = await get(app, {"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.anyio
+async def test_304_without_compression_is_untagged():
+    again = await get(make_app(4096), {"Accept-Encoding": "identity", "If-None-Match": encoded_etag(ETAG, "gzip")})
+    assert again.status_code == 304
+    assert again.headers["etag"] == ETAG
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.services.events import EventBroker
+
+
+def drain(sub):
+    events = []
+    while not sub.queue.empty():
+        events.append(sub.queue.get_nowait())
+    return events
+
+
+@pytest.mark.anyio
+async def test_subscribers_only_see_their_org():
+    broker = EventBroker()
+    a, _, _ = broker.subscribe("org-a")
+    b, _, _ = broker.subscribe("org-b")
+    broker.publish("workflow", "updated", "w1", org_id="org-a")
+    broker.publish("workflow", "updated", "w2", org_id="org-b")
+    broker.publish("workflow", "updated", "w3", org_id=None)
+    await asyncio.sleep(0)
+    assert [e["entity_id"] for e in drain(a)] == ["w1"]
+    assert [e["entity_id"] for e in drain(b)] == ["w2"]
+
+
+@pytest.mark.anyio
+async def test_replay_is_scoped_to_the_org():
+    broker = EventBroker()
+    first = broker.publish("step", "created", "s0", org_id="org-a")
+    broker.publish("step", "created", "s1", org_id="org-a")
+    broker.publish("step", "created", "s2", org_id="org-b")
+    _, backlog, reset = broker.subscribe("org-a", first["id"])
+    assert not reset
+    assert [e["entity_id"] for e in backlog] == ["s1"]
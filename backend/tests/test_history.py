@@ -0,0 +1,193 @@
+import copy
+import random
+
+import pytest
+
+from app.services import history
+from app.services.history import HistoryRecorder, document
+from app.utils.jsonpatch import apply, diff
+
+
+@pytest.mark.parametrize("old, new", [
+    ({}, {}),
+    ({"a": 1}, {"a": 2}),
+    ({"a": 1, "b": 2}, {"b": 2, "c": 3}),
+    ({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 1, "d": None}}}),
+    ({"a": [1, 2]}, {"a": [2, 1, 3]}),
+    ({"a": 1}, {"a": 1.0}),
+    ({"a": 0}, {"a": False}),
+    ({"we/ird~key": 1}, {"we/ird~key": 2, "~1": 3}),
+    ({"a": {"b": 1}}, {"a": "flat"}),
+    ([1], {"a": 1}),
+    ("x", None),
+])
+def test_diff_then_apply_gives_the_new_document(old, new):
+    patch = diff(old, new)
+    result = apply(old, patch)
+    assert result == new
+    assert [type(v) for v in _leaves(result)] == [type(v) for v in _leaves(new)]
+
+
+def _leaves(value):
+    if isinstance(value, dict):
+        return [leaf for k in sorted(value) for leaf in _leaves(value[k])]
+    if isinstance(value, list):
+        return [leaf for v in value for leaf in _leaves(v)]
+    return [value]
+
+
+def test_unchanged_documents_need_no_patch():
+    doc = {"workflow": {"title": "T"}, "steps": {"s1": {"title": "A"}}}
+    assert diff(doc, copy.deepcopy(doc)) == []
+
+
+def test_only_changed_fields_are_in_the_patch():
+    old = {"steps": {"s1": {"title": "A", "status": "pending"}, "s2": {"title": "B"}}}
+    new = {"steps": {"s1": {"title": "A", "status": "done"}, "s2": {"title": "B"}}}
+    assert diff(old, new) == [{"op": "replace", "path": "/steps/s1/status", "value": "done"}]
+
+
+def test_apply_leaves_its_input_alone():
+    old = {"a": {"b": [1]}}
+    apply(old, [{"op": "add", "path": "/a/b/-", "value": 2}, {"op": "add", "path": "/a/c", "value": {}}])
+    assert old == {"a": {"b": [1]}}
+
+
+def test_apply_list_ops():
+    doc = apply([1, 2, 3], [
+        {"op": "remove", "path": "/0"},
+        {"op": "add", "path": "/1", "value": 9},
+        {"op": "replace", "path": "/0", "value": 7},
+    ])
+    assert doc == [7, 9, 3]
+
+
+def test_apply_refuses_bad_ops():
+    with pytest.raises(KeyError):
+        apply({}, [{"op": "replace", "path": "/missing", "value": 1}])
+    with pytest.raises(ValueError):
+        apply({}, [{"op": "move", "path": "/a", "from": "/b"}])
+    with pytest.raises(ValueError):
+        apply({}, [{"op": "remove", "path": ""}])
+
+
+def test_random_edits_round_trip():
+    rng = random.Random(0)
+    doc = {"workflow": {"title": "T"}, "steps": {}}
+    for _ in range(200):
+        new = copy.deepcopy(doc)
+        steps = new["steps"]
+        roll = rng.random()
+        if roll < 0.4 or not steps:
+            steps[f"s{rng.randrange(50)}"] = {"title": str(rng.random()), "order": rng.randrange(10)}
+        elif roll < 0.6:
+            del steps[rng.choice(list(steps))]
+        elif roll < 0.9:
+            steps[rng.choice(list(steps))]["title"] = str(rng.random())
+        else:
+            new["workflow"]["title"] = str(rng.random())
+        assert apply(doc, diff(doc, new)) == new
+        doc = new
+
+
+class Revisions:
+    """workflow_revisions and the workflow being recorded, for one workflow."""
+
+    def __init__(self):
+        steps = [{"id": f"s{n}", "title": f"Step {n}", "description": "x" * 100, "sort_key": f"a{n}"} for n in range(5)]
+        self.workflow = {"id": "w1", "version": 1, "title": "T", "steps": steps}
+        self.rows = []
+        self.pages = 0
+
+    def get_workflow(self, workflow_id):
+        return copy.deepcopy(self.workflow)
+
+    def insert_workflow_revision(self, revision):
+        self.rows.append(copy.deepcopy(revision))
+        return revision
+
+    def list_workflow_revisions(self, workflow_id, limit=None, before=None, with_data=False):
+        self.pages += 1
+        rows = sorted(self.rows, key=lambda r: r["version"], reverse=True)
+        rows = [r for r in rows if before is None or r["version"] < before]
+        rows = rows[:limit] if limit is not None else rows
+        if not with_data:
+            rows = [{k: v for k, v in r.items() if k != "data"} for r in rows]
+        return copy.deepcopy(rows)
+
+    def edit(self, n):
+        self.workflow["version"] += 1
+        self.workflow["steps"][n % 5]["status"] = f"edit {n}"
+
+
+@pytest.fixture
+def revisions(monkeypatch):
+    table = Revisions()
+    for name in ("get_workflow", "insert_workflow_revision", "list_workflow_revisions"):
+        monkeypatch.setattr(history, name, getattr(table, name))
+    return table
+
+
+def record_versions(revisions, recorder, count):
+    docs = {}
+    for n in range(count):
+        if n:
+            revisions.edit(n)
+        recorder.record("w1")
+        docs[revisions.workflow["version"]] = document(revisions.workflow)
+    return docs
+
+
+def test_record_writes_deltas_between_snapshots(revisions):
+    recorder = HistoryRecorder(snapshot_every=4, debounce=0)
+    record_versions(revisions, recorder, 9)
+    assert [r["kind"] for r in revisions.rows] == ["snapshot"] + ["delta"] * 3 + ["snapshot"] + ["delta"] * 3 + ["snapshot"]
+    assert [r["depth"] for r in revisions.rows] == [0, 1, 2, 3, 0, 1, 2, 3, 0]
+
+
+def test_large_patches_start_a_new_snapshot(revisions):
+    recorder = HistoryRecorder(snapshot_every=4, debounce=0)
+    recorder.record("w1")
+    revisions.workflow["version"] += 1
+    for step in revisions.workflow["steps"]:
+        step["id"] = "new-" + step["id"]  # every step replaced: the patch outweighs the document
+    recorder.record("w1")
+    assert [r["kind"] for r in revisions.rows] == ["snapshot", "snapshot"]
+
+
+def test_unchanged_workflow_is_not_recorded_again(revisions):
+    recorder = HistoryRecorder(snapshot_every=4, debounce=0)
+    recorder.record("w1")
+    revisions.workflow["version"] += 1  # e.g. a field history does not keep
+    assert recorder.record("w1") is None
+    assert len(revisions.rows) == 1
+
+
+def test_every_version_is_rebuilt(revisions):
+    docs = record_versions(revisions, HistoryRecorder(snapshot_every=4, debounce=0), 9)
+    reader = HistoryRecorder(snapshot_every=4, debounce=0)
+    for version, doc in docs.items():
+        assert reader.reconstruct("w1", version) == doc
+
+
+def test_chains_longer_than_a_page_are_followed_back(revisions):
+    # Written with a long chain, then read after SNAPSHOT_EVERY was lowered
+    docs = record_versions(revisions, HistoryRecorder(snapshot_every=8, debounce=0), 8)
+    assert [r["kind"] for r in revisions.rows].count("snapshot") == 1
+    reader = HistoryRecorder(snapshot_every=3, debounce=0)
+    revisions.pages = 0
+    assert reader.reconstruct("w1", 8) == docs[8]
+    assert revisions.pages == 3
+
+
+def test_unrecorded_version_is_none(revisions):
+    record_versions(revisions, HistoryRecorder(snapshot_every=4, debounce=0), 3)
+    reader = HistoryRecorder(snapshot_every=4, debounce=0)
+    assert reader.reconstruct("w1", 99) is None
+    assert reader.reconstruct("w1", 0) is None
+
+
+def test_broken_chain_is_none(revisions):
+    record_versions(revisions, HistoryRecorder(snapshot_every=8, debounce=0), 5)
+    revisions.rows = [r for r in revisions.rows if r["kind"] != "snapshot"]
+    assert HistoryRecorder(snapshot_every=2, debounce=0).reconstruct("w1", 5) is None
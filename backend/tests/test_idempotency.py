@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+
+from app.utils import idempotency
+from app.utils.idempotency import IdempotencyMiddleware, MemoryIdempotencyStore, StoredResponse
+
+
+def test_claim_then_replay():
+    store = MemoryIdempotencyStore(ttl=60, max_entries=10)
+    assert store.claim("k", "f1") is None
+    pending = store.claim("k", "f1")
+    assert pending.pending and pending.fingerprint == "f1"
+
+    store.complete("k", StoredResponse("f1", 201, [("content-type", "application/json")], b"{}"))
+    done = store.claim("k", "f1")
+    assert not done.pending
+    response = done.response()
+    assert response.status_code == 201
+    assert response.headers["idempotent-replayed"] == "true"
+
+
+def test_claim_reports_the_fingerprint_it_holds():
+    store = MemoryIdempotencyStore(ttl=60, max_entries=10)
+    store.claim("k", "f1")
+    assert store.claim("k", "f2").fingerprint == "f1"
+
+
+def test_release_lets_a_retry_run_again():
+    store = MemoryIdempotencyStore(ttl=60, max_entries=10)
+    store.claim("k", "f1")
+    store.release("k")
+    assert store.claim("k", "f1") is None
+
+
+def test_entries_expire(monkeypatch):
+    store = MemoryIdempotencyStore(ttl=5, max_entries=10)
+    now = time.monotonic()
+    store.claim("k", "f1")
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now + 6)
+    assert store.claim("k", "f1") is None
+
+
+def test_least_recently_used_entries_go_first():
+    store = MemoryIdempotencyStore(ttl=60, max_entries=2)
+    store.claim("a", "f")
+    store.claim("b", "f")
+    store.claim("a", "f")  # touch
+    store.claim("c", "f")
+    assert store.claim("a", "f") is not None
+    assert store.claim("b", "f") is None  # evicted, so claimable again
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(idempotency, "_store", MemoryIdempotencyStore(ttl=60, max_entries=100))
+    app = FastAPI()
+    app.state.calls = []
+
+    @app.post("/items")
+    async def create(request: Request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        app.state.calls.append(size)
+        if request.query_params.get("fail"):
+            raise HTTPException(status_code=503, detail="down")
+        if request.query_params.get("slow"):
+            await asyncio.sleep(0.1)
+        return {"n": len(app.state.calls)}
+
+    app.add_middleware(IdempotencyMiddleware, wait_seconds=2, max_body=100)
+    return app
+
+
+async def post(client, body=b"{}", key="k1", **params):
+    return await client.post("/items", content=body, params=params, headers={"Idempotency-Key": key})
+
+
+@pytest.mark.anyio
+async def test_retry_gets_the_stored_response(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = await post(client)
+        again = await post(client)
+    assert first.json() == again.json() == {"n": 1}
+    assert again.headers["idempotent-replayed"] == "true"
+    assert len(app.state.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_same_key_with_another_body_is_refused(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await post(client, b'{"a": 1}')
+        resp = await post(client, b'{"a": 2}')
+    assert resp.status_code == 422
+    assert len(app.state.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_server_errors_are_not_replayed(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        codes = [(await post(client, fail="1")).status_code for _ in range(2)]
+    assert codes == [503, 503]
+    assert len(app.state.calls) == 2
+
+
+@pytest.mark.anyio
+async def test_duplicate_in_flight_waits_for_the_original(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first, second = await asyncio.gather(post(client, slow="1"), post(client, slow="1"))
+    assert first.json() == second.json()
+    assert len(app.state.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_large_bodies_stream_through_unguarded(app):
+    async def chunks():
+        for _ in range(5):
+            yield b"x" * 40
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        sized = [await post(client, b"x" * 500, key="big") for _ in range(2)]
+        streamed = await client.post("/items", content=chunks(), headers={"Idempotency-Key": "stream"})
+    assert [r.json()["n"] for r in sized] == [1, 2]
+    assert "idempotent-replayed" not in sized[1].headers
+    assert streamed.status_code == 200
+    assert app.state.calls == [500, 500, 200]
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from app.services import in_memory
+from app.utils.ordering import (
+    BASE, DIGITS, JITTER_DIGITS, MAX_KEY_LENGTH, key_between, needs_rebalance, spread_keys,
+)
+
+
+def assert_valid(key):
+    assert key and not key.endswith("0")
+    assert all(c in DIGITS for c in key)
+
+
+def test_digits_sort_bytewise():
+    assert list(DIGITS) == sorted(DIGITS)
+    assert BASE == 62
+
+
+@pytest.mark.parametrize("before, after", [
+    (None, None), ("V", None), (None, "V"), ("1", "2"), ("V", "W"), ("0V", "1"),
+    ("z", None), ("zz", None), (None, "01"), ("A", "A1"), ("Az", "B"), ("0001", "0002"),
+])
+def test_key_between_is_strictly_between(before, after):
+    key = key_between(before, after)
+    assert_valid(key)
+    if before is not None:
+        assert before < key
+    if after is not None:
+        assert key < after
+
+
+@pytest.mark.parametrize("before, after", [
+    (None, None), ("V", None), (None, "V"), ("1", "2"), ("U", "V5"), ("V", "V1"), (None, "01"), ("A", "A1"),
+])
+def test_jittered_key_is_strictly_between(before, after):
+    for _ in range(200):
+        key = key_between(before, after, JITTER_DIGITS)
+        assert_valid(key)
+        assert before is None or before < key
+        assert after is None or key < after
+
+
+def test_racing_appends_get_distinct_keys():
+    random.seed(0)
+    last = "zzV"
+    keys = [key_between(last, None, JITTER_DIGITS) for _ in range(50)]
+    assert len(set(keys)) == len(keys)
+    assert all(k > last for k in keys)
+
+
+def test_key_between_empty_list_is_midpoint():
+    assert key_between(None, None) == "V"
+
+
+def test_repeated_inserts_stay_ordered():
+    rng = random.Random(0)
+    keys = [key_between(None, None)]
+    for _ in range(500):
+        i = rng.randrange(len(keys) + 1)
+        key = key_between(keys[i - 1] if i else None, keys[i] if i < len(keys) else None)
+        assert_valid(key)
+        keys.insert(i, key)
+        assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_appending_flags_rebalance_before_keys_get_long():
+    keys = [key_between(None, None)]
+    while not needs_rebalance(keys[-1]):
+        keys.append(key_between(keys[-1], None))
+        assert_valid(keys[-1])
+    assert keys == sorted(keys)
+    assert len(keys) > MAX_KEY_LENGTH
+    # A rebalance respaces them all into short keys
+    assert max(len(k) for k in spread_keys(len(keys))) <= 2
+
+
+@pytest.mark.parametrize("before, after", [("V", "V"), ("W", "V"), ("V0", None), ("", None), ("V!", None)])
+def test_key_between_rejects_bad_bounds(before, after):
+    with pytest.raises(ValueError):
+        key_between(before, after)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 61, 62, 100, 5000])
+def test_spread_keys(count):
+    keys = spread_keys(count)
+    assert len(keys) == count
+    assert keys == sorted(keys)
+    assert len(set(keys)) == count
+    for key in keys:
+        assert_valid(key)
+    if keys:
+        assert max(len(k) for k in keys) <= (1 if count < BASE else 2 if count < BASE ** 2 else 3)
+
+
+def test_spread_keys_leave_room_at_both_ends():
+    keys = spread_keys(10)
+    assert key_between(None, keys[0]) < keys[0]
+    assert key_between(keys[-1], None) > keys[-1]
+
+
+def test_needs_rebalance():
+    assert not needs_rebalance(None)
+    assert not needs_rebalance("V" * MAX_KEY_LENGTH)
+    assert needs_rebalance("V" * (MAX_KEY_LENGTH + 1))
+
+
+def test_in_memory_append_flags_rebalance():
+    wf = in_memory.insert_workflow({"title": "Appends"})
+    for i in range(200):
+        step = in_memory.insert_step(wf["id"], {"title": f"Step {i}"})
+        if step["needs_rebalance"]:
+            break
+    else:
+        pytest.fail("appends never asked for a rebalance")
+    before = [s["id"] for s in in_memory.list_steps(wf["id"])]
+
+    assert in_memory.rebalance_steps(wf["id"]) > 0
+    after = in_memory.list_steps(wf["id"])
+    assert [s["id"] for s in after] == before
+    assert not any(needs_rebalance(s["sort_key"]) for s in after)
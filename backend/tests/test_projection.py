@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils.projection import COLUMNS, resolve_fields, select_clause
+
+
+@pytest.mark.parametrize("entity", sorted(COLUMNS))
+def test_full_select_lists_columns_explicitly(entity):
+    select = select_clause(entity, None)
+    assert "*" not in select
+    assert "search_vector" not in select
+    assert select.split(",") == COLUMNS[entity]
+
+
+def test_select_drops_virtual_fields():
+    assert select_clause("workflows", ["id", "title", "step_count", "steps"]) == "id,title"
+
+
+def test_resolve_fields():
+    assert resolve_fields("steps") is None
+    assert resolve_fields("steps", fields="title,status") == ["id", "title", "status"]
+    assert resolve_fields("workflows", view="summary")[0] == "id"
+    with pytest.raises(HTTPException):
+        resolve_fields("comments", fields="search_vector")
@@ -0,0 +1,129 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.services import supabase_db
+from app.utils import rate_limit
+from app.utils.jwt import get_current_user
+from app.utils.rate_limit import MemoryRateLimitBackend, RateLimit, parse_limit
+
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: self.now)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("", None), ("0/m", None), ("20/m", (20.0, 20 / 60)), ("5/s", (5.0, 5.0)), ("7/hour", (7.0, 7 / 3600)),
+])
+def test_parse_limit(spec, expected):
+    assert parse_limit(spec) == expected
+
+
+def test_parse_limit_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_limit("lots/week")
+
+
+def test_take_bursts_then_waits(monkeypatch):
+    clock = Clock(monkeypatch)
+    backend = MemoryRateLimitBackend(shards=2)
+    assert [backend.take("k", 3, 1.0) for _ in range(3)] == [0, 0, 0]
+    assert backend.take("k", 3, 1.0) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert backend.take("k", 3, 1.0) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert backend.take("k", 3, 1.0) == 0
+
+
+def test_buckets_are_independent(monkeypatch):
+    Clock(monkeypatch)
+    backend = MemoryRateLimitBackend()
+    backend.take("a", 1, 1.0)
+    assert backend.take("a", 1, 1.0) > 0
+    assert backend.take("b", 1, 1.0) == 0
+
+
+def test_full_buckets_are_pruned(monkeypatch):
+    clock = Clock(monkeypatch)
+    backend = MemoryRateLimitBackend(shards=1, max_keys=10)
+    for i in range(10):
+        backend.take(f"k{i}", 1, 1.0)
+    clock.now += 2  # all full again
+    backend.take("new", 1, 1.0)
+    assert len(backend) == 1
+
+
+def test_random_keys_cannot_grow_it_without_bound(monkeypatch):
+    Clock(monkeypatch)
+    backend = MemoryRateLimitBackend(shards=1, max_keys=100)
+    backend.take("busy", 5, 0.001)
+    for i in range(1000):
+        backend.take(f"random-{i}", 5, 0.001)
+        if i % 50 == 0:
+            backend.take("busy", 5, 0.001)
+    assert len(backend) <= 100
+    # The recently used bucket survived the evictions: it is still drained
+    assert backend.take("busy", 5, 0.001) > 0
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    Clock(monkeypatch)
+    monkeypatch.setattr(rate_limit, "_backend", MemoryRateLimitBackend())
+    memberships = {"alice": ["org-a"], "bob": ["org-b", "org-a"], "carol": []}
+    owners = {"w-a": "org-a", "w-b": "org-b"}
+    monkeypatch.setattr(supabase_db, "user_orgs", lambda user_id: memberships.get(user_id, []))
+    monkeypatch.setattr(supabase_db, "entity_org", lambda kind, entity_id: owners.get(entity_id))
+
+    limit = RateLimit("crud", per_user="100/m", per_org="2/m")
+    app = FastAPI()
+
+    @app.get("/workflows/{workflow_id}", dependencies=[Depends(limit)])
+    async def get_workflow(workflow_id: str):
+        return {}
+
+    @app.get("/me", dependencies=[Depends(limit)])
+    async def me():
+        return {}
+
+    user = {"user_id": "alice"}
+    app.dependency_overrides[get_current_user] = lambda: user
+    return app, user
+
+
+async def codes(app, path, count, headers=None):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return [(await client.get(path, headers=headers)).status_code for _ in range(count)]
+
+
+@pytest.mark.anyio
+async def test_made_up_org_ids_are_charged_to_the_callers_org(limited):
+    app, _ = limited
+    made_up = [await codes(app, "/me", 1, {"X-Organization-ID": f"random-{i}"}) for i in range(3)]
+    assert sum(made_up, []) == [200, 200, 429]
+
+
+@pytest.mark.anyio
+async def test_naming_another_tenant_does_not_drain_it(limited):
+    app, user = limited
+    user["user_id"] = "alice"
+    assert await codes(app, "/me", 3, {"X-Organization-ID": "org-b"}) == [200, 200, 429]
+    user["user_id"] = "bob"
+    assert await codes(app, "/me", 2, {"X-Organization-ID": "org-b"}) == [200, 200]
+
+
+@pytest.mark.anyio
+async def test_addressed_entity_picks_among_the_callers_orgs(limited):
+    app, user = limited
+    user["user_id"] = "bob"
+    assert await codes(app, "/workflows/w-a", 3) == [200, 200, 429]
+    assert await codes(app, "/workflows/w-b", 2) == [200, 200]
+
+
+@pytest.mark.anyio
+async def test_callers_without_an_org_are_limited_per_user_only(limited):
+    app, user = limited
+    user["user_id"] = "carol"
+    assert await codes(app, "/me", 5, {"X-Organization-ID": "org-a"}) == [200] * 5
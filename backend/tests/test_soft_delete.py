@@ -0,0 +1,122 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "loadtest"))
+
+import fakes
+from app.services import purger, supabase_db as db
+from app.utils.resilience import DependencyUnavailable
+
+ORG = str(uuid.uuid4())
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """supabase_db talking to the load test's fake PostgREST, in process."""
+    store = fakes.Store()
+
+    def select(table, params=None):
+        return store.select(table, list((params or {}).items()))
+
+    def insert(table, payload, on_conflict=None, select=None):
+        rows = store.insert(table, payload if isinstance(payload, list) else [payload], ignore_duplicates=bool(on_conflict))
+        return store.project(rows, select)
+
+    def update(table, match, payload, select=None, filters=None):
+        params = [(k, f"eq.{v}") for k, v in match.items()] + list((filters or {}).items())
+        return store.project(store.update(table, params, payload), select)
+
+    def delete(table, match):
+        store.delete(table, [(k, f"eq.{v}") for k, v in match.items()])
+        return True
+
+    def rpc(function, args=None, select=None):
+        result = getattr(store, f"rpc_{function}")(**(args or {}))
+        return store.project(result, select) if isinstance(result, list) and select else result
+
+    for name, fake in (("sb_select", select), ("sb_insert", insert), ("sb_update", update),
+                       ("sb_delete", delete), ("sb_rpc", rpc)):
+        monkeypatch.setattr(db, name, fake)
+    monkeypatch.setattr(purger, "_BATCH_PAUSE", 0)
+    return store
+
+
+@pytest.fixture
+def workflow(store):
+    workflow = db.insert_workflow({"organization_id": ORG, "title": "Doomed"})
+    steps = [db.insert_step({"workflow_id": workflow["id"], "title": f"Step {n}"}) for n in range(3)]
+    comment = db.insert_comment({"workflow_id": workflow["id"], "step_id": steps[0]["id"], "content": "Hi"})
+    return workflow["id"], [s["id"] for s in steps], comment["id"]
+
+
+def test_children_of_a_deleted_workflow_are_hidden(workflow):
+    workflow_id, step_ids, comment_id = workflow
+    assert db.delete_workflow(workflow_id)
+    assert db.get_workflow(workflow_id) is None
+    assert db.get_step(step_ids[0]) is None
+    assert db.list_steps(workflow_id) == []
+    assert db.list_comments(workflow_id=workflow_id) == []
+    assert db.list_comments(step_id=step_ids[0]) == []
+    assert db.get_comment(comment_id) is None
+
+
+def test_children_of_a_deleted_workflow_cannot_be_changed(workflow, store):
+    workflow_id, step_ids, comment_id = workflow
+    db.delete_workflow(workflow_id)
+    assert db.update_workflow(workflow_id, {"title": "Back"}) is None
+    assert db.update_step(step_ids[0], {"title": "Edited"}) is None
+    assert db.delete_step(step_ids[1]) is False
+    assert db.update_comment(comment_id, {"content": "Edited"}) is None
+    assert db.delete_comment(comment_id) is False
+    assert store.tables["workflows"][workflow_id]["title"] == "Doomed"
+    assert store.tables["workflow_steps"][step_ids[0]]["title"] == "Step 0"
+    assert step_ids[1] in store.tables["workflow_steps"]
+    assert comment_id in store.tables["comments"]
+
+
+def test_restore_brings_everything_back(workflow, store):
+    workflow_id, step_ids, comment_id = workflow
+    db.delete_workflow(workflow_id)
+    assert db.restore_workflow(workflow_id)["id"] == workflow_id
+    assert {s["id"] for s in db.list_steps(workflow_id)} == set(step_ids)
+    assert db.get_comment(comment_id)["id"] == comment_id
+    assert not [t for t in store.tables["deleted_records"].values() if t["entity_id"] == workflow_id]
+    assert db.restore_workflow(workflow_id) is None  # nothing left to restore
+
+
+@pytest.mark.anyio
+async def test_purge_removes_old_deletions_in_batches(workflow, store):
+    workflow_id, step_ids, comment_id = workflow
+    kept = db.insert_workflow({"organization_id": ORG, "title": "Kept"})
+    db.delete_workflow(workflow_id)
+    store.tables["workflows"][workflow_id]["deleted_at"] = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+
+    assert await purger.purge_once(keep_days=7, batch=2) >= 5  # workflow, 3 steps, 1 comment
+    assert workflow_id not in store.tables["workflows"]
+    assert not [s for s in store.tables["workflow_steps"].values() if s["workflow_id"] == workflow_id]
+    assert comment_id not in store.tables["comments"]
+    assert kept["id"] in store.tables["workflows"]
+    assert await purger.purge_once(keep_days=7, batch=2) == 0
+
+
+@pytest.mark.anyio
+async def test_recent_deletions_are_kept_for_undelete(workflow, store):
+    workflow_id, _, _ = workflow
+    db.delete_workflow(workflow_id)
+    assert await purger.purge_once(keep_days=7, batch=100) == 0
+    assert workflow_id in store.tables["workflows"]
+
+
+def test_purges_report_an_unavailable_database(store, monkeypatch):
+    def down(function, args=None, select=None):
+        raise DependencyUnavailable("supabase", "circuit_open")
+
+    monkeypatch.setattr(db, "sb_rpc", down)
+    with pytest.raises(DependencyUnavailable):
+        db.purge_tombstones(30)
+    with pytest.raises(DependencyUnavailable):
+        db.purge_deleted_workflows(7, 100)
@@ -0,0 +1,163 @@
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts", "loadtest"))
+
+import fakes
+from app.api.v1 import sync as sync_api
+from app.services import in_memory
+from app.utils.jwt import get_current_user
+from app.utils.sync import CURSOR_PREFIX
+
+ORG = str(uuid.uuid4())
+STAMP = "2026-01-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = fakes.Store()
+
+    def sync(org_id=None, since=None, limit=1000, after=None):
+        # Round-trip through JSON like the RPC does
+        args = json.loads(json.dumps({"org": org_id, "since": since.isoformat() if since else None,
+                                      "lim": limit, "after": after}))
+        page = json.loads(json.dumps(store.rpc_sync_org(**args)))
+        page["now"] = datetime.fromisoformat(page["now"])
+        return page
+
+    monkeypatch.setattr(sync_api, "sync", sync)
+    monkeypatch.setattr(sync_api, "purge_tombstones", lambda keep_days: 0)
+    return store
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    for name in ("workflows", "steps", "comments"):
+        monkeypatch.setattr(in_memory, name, {})
+    monkeypatch.setattr(in_memory, "deleted_records", [])
+    monkeypatch.setattr(sync_api, "sync", in_memory.sync)
+    monkeypatch.setattr(sync_api, "purge_tombstones", lambda keep_days: 0)
+    return in_memory
+
+
+def add(store, table, count, **fields):
+    rows = store.tables.setdefault(table, {})
+    ids = []
+    for _ in range(count):
+        row = {"id": str(uuid.uuid4()), "created_at": STAMP, "updated_at": STAMP, **fields}
+        rows[row["id"]] = row
+        ids.append(row["id"])
+    return ids
+
+
+async def sync_all(since=None, limit=3, max_calls=50):
+    app = FastAPI()
+    app.include_router(sync_api.router, prefix="/sync")
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+    seen = {"workflows": [], "steps": [], "comments": [], "deleted": []}
+    calls = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        while True:
+            calls += 1
+            assert calls <= max_calls, "sync never finished"
+            params = {"org_id": ORG, "limit": limit}
+            if since:
+                params["since"] = since
+            resp = await client.get("/sync/", params=params)
+            assert resp.status_code == 200, resp.text
+            page = resp.json()
+            for entity in seen:
+                seen[entity] += [r.get("id") or r.get("entity_id") for r in page[entity]]
+            since = page["watermark"]
+            if not page["has_more"]:
+                return seen, since, calls
+
+
+@pytest.mark.anyio
+async def test_rows_sharing_one_timestamp_are_paged_through(store):
+    workflows = add(store, "workflows", 7, organization_id=ORG, deleted_at=None)
+    steps = add(store, "workflow_steps", 10, workflow_id=workflows[0])
+    comments = add(store, "comments", 2, workflow_id=workflows[1])
+
+    seen, watermark, calls = await sync_all(limit=3)
+
+    assert sorted(seen["workflows"]) == sorted(workflows)
+    assert sorted(seen["steps"]) == sorted(steps)
+    assert sorted(seen["comments"]) == sorted(comments)
+    assert len(seen["steps"]) == len(set(seen["steps"]))
+    assert calls == 4  # ceil(10 / 3), with the last page partly full
+    assert not watermark.startswith(CURSOR_PREFIX)
+
+
+@pytest.mark.anyio
+async def test_more_rows_than_limit_inside_the_overlap_window(store):
+    recent = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    workflows = add(store, "workflows", 8, organization_id=ORG, deleted_at=None)
+    for wid in workflows:
+        store.tables["workflows"][wid]["updated_at"] = recent
+
+    seen, _, calls = await sync_all(since=datetime.now(timezone.utc).isoformat(), limit=3)
+
+    assert sorted(seen["workflows"]) == sorted(workflows)
+    assert calls == 3
+
+
+@pytest.mark.anyio
+async def test_last_page_watermark_is_the_first_page_time(store):
+    add(store, "workflows", 4, organization_id=ORG, deleted_at=None)
+    before = datetime.now(timezone.utc)
+    _, watermark, calls = await sync_all(limit=2)
+    assert calls == 3
+    assert before <= datetime.fromisoformat(watermark) <= datetime.now(timezone.utc)
+
+
+@pytest.mark.anyio
+async def test_malformed_cursor_is_rejected(store):
+    app = FastAPI()
+    app.include_router(sync_api.router, prefix="/sync")
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/sync/", params={"since": CURSOR_PREFIX + "garbage"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_restored_workflow_is_not_deleted_again(store):
+    workflow, other = add(store, "workflows", 2, organization_id=ORG, deleted_at=None, version=1)
+    steps = add(store, "workflow_steps", 2, workflow_id=workflow)
+    _, watermark, _ = await sync_all()
+
+    store.rpc_soft_delete_workflow(workflow)
+    store.rpc_restore_workflow(workflow)
+    seen, _, _ = await sync_all(since=watermark)
+
+    assert seen["workflows"] == [workflow]
+    assert sorted(seen["steps"]) == sorted(steps)
+    assert seen["deleted"] == []
+
+
+@pytest.mark.anyio
+async def test_in_memory_backend_pages_like_the_database(memory):
+    # Second-resolution timestamps: every row shares one
+    stamp = "2026-01-01T00:00:00Z"
+    workflows = [str(uuid.uuid4()) for _ in range(5)]
+    for wid in workflows:
+        memory.workflows[wid] = {"id": wid, "organization_id": ORG, "updated_at": stamp}
+    steps = [str(uuid.uuid4()) for _ in range(8)]
+    for sid in steps:
+        memory.steps[sid] = {"id": sid, "workflow_id": workflows[0], "updated_at": stamp}
+
+    seen, watermark, calls = await sync_all(limit=3)
+
+    assert sorted(seen["workflows"]) == sorted(workflows)
+    assert sorted(seen["steps"]) == sorted(steps)
+    assert len(seen["steps"]) == len(set(seen["steps"]))
+    assert calls == 3
+    assert not watermark.startswith(CURSOR_PREFIX)
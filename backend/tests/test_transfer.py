@@ -0,0 +1,151 @@
+import json
+
+import pytest
+
+from app.services import transfer
+from app.services.transfer import FORMAT, MalformedImport, OrgImporter
+
+ORG = "org-a"
+OTHER = "org-b"
+
+
+class Tables:
+    """Just enough of the database for the importer."""
+
+    def __init__(self):
+        self.rows = {"workflows": {}, "workflow_steps": {}, "comments": {}, "activity_logs": {}}
+        self.users = {"u1"}
+
+    def import_rows(self, table, rows):
+        existing = self.rows[table]
+        inserted = [r["id"] for r in rows if r["id"] not in existing]
+        for r in rows:
+            existing.setdefault(r["id"], dict(r))
+        return inserted
+
+    def workflows_in_org(self, org_id, ids):
+        return {i for i in ids if self.rows["workflows"].get(i, {}).get("organization_id") == org_id}
+
+    def step_workflows(self, ids):
+        steps = self.rows["workflow_steps"]
+        return {i: steps[i]["workflow_id"] for i in ids if i in steps}
+
+    def existing_users(self, ids):
+        return set(ids) & self.users
+
+
+@pytest.fixture
+def db(monkeypatch):
+    tables = Tables()
+    for name in ("import_rows", "workflows_in_org", "step_workflows", "existing_users"):
+        monkeypatch.setattr(transfer, name, getattr(tables, name))
+    return tables
+
+
+def counts(importer, which):
+    return {k: v for k, v in importer.result()[which].items() if v}
+
+
+def line(record):
+    return json.dumps(record).encode() + b"\n"
+
+
+HEADER = line({"type": "export", "format": FORMAT})
+
+
+def export(*records, end=True):
+    body = HEADER + b"".join(line({"type": kind, "data": data}) for kind, data in records)
+    if end:
+        body += line({"type": "end", "counts": {}})
+    return body
+
+
+async def run(body, chunk_size=None, max_line_bytes=10_000, batch_size=2):
+    importer = OrgImporter(ORG, batch_size=batch_size, max_line_bytes=max_line_bytes)
+    chunk_size = chunk_size or len(body)
+    for start in range(0, len(body), chunk_size):
+        await importer.feed(body[start:start + chunk_size])
+    await importer.finish()
+    return importer
+
+
+SAMPLE = [
+    ("workflow", {"id": "w1", "title": "One", "created_by": "ghost"}),
+    ("step", {"id": "s1", "workflow_id": "w1", "title": "First", "assigned_to": "u1"}),
+    ("step", {"id": "s2", "workflow_id": "w1", "title": "Second"}),
+    ("comment", {"id": "c1", "workflow_id": "w1", "step_id": "s1", "content": "Hi"}),
+    ("activity", {"id": "a1", "workflow_id": "w1", "entity_type": "workflow", "action": "created"}),
+]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 64])
+async def test_lines_split_across_chunks(db, chunk_size):
+    importer = await run(export(*SAMPLE), chunk_size=chunk_size)
+    assert importer.complete
+    assert counts(importer, "imported") == {"workflow": 1, "step": 2, "comment": 1, "activity": 1}
+    workflow = db.rows["workflows"]["w1"]
+    assert workflow["organization_id"] == ORG
+    assert workflow["created_by"] is None  # unknown user cleared
+    assert db.rows["workflow_steps"]["s1"]["assigned_to"] == "u1"
+
+
+@pytest.mark.anyio
+async def test_running_an_import_again_skips_existing_rows(db):
+    await run(export(*SAMPLE))
+    importer = await run(export(*SAMPLE))
+    assert counts(importer, "imported") == {}
+    assert counts(importer, "skipped") == {"workflow": 1, "step": 2, "comment": 1, "activity": 1}
+
+
+@pytest.mark.anyio
+async def test_rows_pointing_at_another_org_are_rejected(db):
+    db.rows["workflows"]["theirs"] = {"id": "theirs", "organization_id": OTHER}
+    db.rows["workflow_steps"]["their-step"] = {"id": "their-step", "workflow_id": "theirs"}
+    importer = await run(export(
+        *SAMPLE,
+        ("step", {"id": "s3", "workflow_id": "theirs", "title": "Sneaky"}),
+        ("comment", {"id": "c2", "workflow_id": "w1", "step_id": "their-step", "content": "Sneaky"}),
+    ))
+    assert counts(importer, "rejected") == {"step": 1, "comment": 1}
+    assert "s3" not in db.rows["workflow_steps"]
+    assert "c2" not in db.rows["comments"]
+    assert "c1" in db.rows["comments"]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("chunk_size", [None, 5])
+async def test_oversize_line_is_refused(db, chunk_size):
+    body = export(SAMPLE[0], ("workflow", {"id": "w2", "title": "x" * 500}))
+    with pytest.raises(MalformedImport) as e:
+        await run(body, chunk_size=chunk_size, max_line_bytes=200)
+    assert e.value.line == 3
+    assert "w2" not in db.rows["workflows"]
+
+
+@pytest.mark.anyio
+async def test_missing_header(db):
+    with pytest.raises(MalformedImport) as e:
+        await run(b"".join(line({"type": kind, "data": data}) for kind, data in SAMPLE))
+    assert e.value.line == 1
+
+
+@pytest.mark.anyio
+async def test_empty_import(db):
+    with pytest.raises(MalformedImport, match="Empty"):
+        await run(b"\n\n")
+
+
+@pytest.mark.anyio
+async def test_data_after_end(db):
+    body = export(SAMPLE[0]) + line({"type": "workflow", "data": {"id": "w9", "title": "Late"}})
+    with pytest.raises(MalformedImport, match="after the end") as e:
+        await run(body)
+    assert e.value.line == 4
+
+
+@pytest.mark.anyio
+async def test_incomplete_export_is_reported(db):
+    importer = await run(export(*SAMPLE, end=False))
+    assert not importer.complete
+    assert importer.result()["imported"]["step"] == 2
@@ -83,7 +83,7 @@ export default function WorkflowsPage() {
                     <td className="px-6 py-4 text-sm text-gray-600">
                       {new Date(workflow.created_at).toLocaleDateString()}
                     </td>
-                    <td className="px-6 py-4 text-sm">{workflow.steps?.length || 0}</td>
+                    <td className="px-6 py-4 text-sm">{workflow.step_count ?? workflow.steps?.length ?? 0}</td>
                   </tr>
                 ))}
               </tbody>
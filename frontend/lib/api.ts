@@ -8,6 +8,8 @@ import {
   ActivityLog,
   AIGenerateSopRequest,
   AIGenerateSopResponse,
+  SearchResult,
+  SyncPage,
 } from './types'
 
 
@@ -49,7 +51,9 @@ api.interceptors.response.use(
 export const workflowApi = {
   // Get all workflows
   list: async (organizationId: string) => {
-    const response = await api.get(`/workflows/?org_id=${organizationId}`)
+    // List views only need summary columns and a step count, not every step
+    const fields = 'id,organization_id,title,description,status,created_at,updated_at,step_count'
+    const response = await api.get(`/workflows/?org_id=${organizationId}&fields=${fields}`)
     console.log('Workflows API raw response:', response.data)
     // Backend returns { success: true, workflows: [...] }
     // Extract the workflows array
@@ -157,6 +161,11 @@ export const stepApi = {
     api.post(`/steps/reorder`, data),
 
 
+  // Move a single step between its new neighbours (only that step is rewritten)
+  move: (stepId: string, data: { prev_id?: string | null; next_id?: string | null }) =>
+    api.post<{ success: boolean; step: WorkflowStep }>(`/steps/${stepId}/move`, data),
+
+
   // Assign step to user
   assign: (workflowId: string, stepId: string, userId: string) =>
     api.patch<WorkflowStep>(`/steps/${stepId}`, { assigned_to: userId }),
@@ -361,6 +370,26 @@ export const organizationApi = {
 }
 
 
+// ============ SEARCH ============
+
+
+export const searchApi = {
+  // Ranked full-text search; snippets are HTML-escaped with <mark> highlights
+  query: async (q: string, organizationId?: string, limit: number = 20, offset: number = 0) => {
+    const params = new URLSearchParams({ q, limit: String(limit), offset: String(offset) })
+    if (organizationId) params.set('org_id', organizationId)
+    const response = await api.get(`/search/?${params.toString()}`)
+    return {
+      ...response,
+      data: {
+        results: (response.data?.results ?? []) as SearchResult[],
+        hasMore: Boolean(response.data?.has_more),
+      },
+    }
+  },
+}
+
+
 // ============ HEALTH CHECK ============
 
 
@@ -371,3 +400,38 @@ export const healthApi = {
 
 
 export default api
+
+
+// ============ DELTA SYNC ============
+
+
+export const syncApi = {
+  // Rows changed since `since` (omit for a full snapshot) plus deletions.
+  // Store the returned watermark and pass it back on the next call.
+  changes: async (organizationId: string, since?: string, limit: number = 1000) => {
+    const params = new URLSearchParams({ org_id: organizationId, limit: String(limit) })
+    if (since) params.set('since', since)
+    const response = await api.get(`/sync/?${params.toString()}`)
+    return { ...response, data: response.data as SyncPage }
+  },
+}
+
+
+// ============ CHANGE FEED ============
+
+
+export const streamApi = {
+  // Open the SSE change feed. fetch() is used instead of EventSource so the
+  // bearer token can be sent; the caller reads and parses response.body.
+  open: (organizationId: string, lastEventId?: string, signal?: AbortSignal) => {
+    const token = localStorage.getItem('auth_token')
+    const headers: Record<string, string> = { Accept: 'text/event-stream' }
+    if (token) headers.Authorization = `Bearer ${token}`
+    if (lastEventId) headers['Last-Event-ID'] = lastEventId
+    return fetch(`${API_URL}/stream/?org_id=${organizationId}`, {
+      headers,
+      signal,
+      credentials: 'include',
+    })
+  },
+}
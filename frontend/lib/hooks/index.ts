@@ -1,5 +1,6 @@
 export { useActivity } from './useActivity'
 export { useAuth } from './useAuth'
+export { useChangeFeed, useRefetchOnChange } from './useChangeFeed'
 export { useComments } from './useComments'
 export { useSteps } from './useSteps'
 export { useWorkflows } from './useWorkflows'
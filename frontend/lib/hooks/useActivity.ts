@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react'
 import { activityApi } from '../api'
 import { ActivityLog } from '../types'
+import { useRefetchOnChange } from './useChangeFeed'
 
 export function useActivity(organizationId: string) {
   const [activities, setActivities] = useState<ActivityLog[]>([])
@@ -26,11 +27,8 @@ export function useActivity(organizationId: string) {
     }
   }, [organizationId])
 
-  // Refresh every 10 seconds
-  useEffect(() => {
-    const interval = setInterval(loadActivity, 10000)
-    return () => clearInterval(interval)
-  }, [organizationId])
+  // Reload when the change feed reports new activity (replaces polling)
+  useRefetchOnChange(organizationId || undefined, (event) => event.type === 'activity', loadActivity)
 
   return { activities, loading, error, refetch: loadActivity }
 }
@@ -0,0 +1,130 @@
+import { useEffect, useRef } from 'react'
+import { streamApi } from '../api'
+import { ChangeEvent } from '../types'
+
+type Listener = (event: ChangeEvent) => void
+
+interface Feed {
+  listeners: Set<Listener>
+  controller: AbortController
+  lastEventId?: string
+}
+
+// One stream per organization, shared by every hook that listens to it
+const feeds = new Map<string, Feed>()
+
+const RECONNECT_MIN_MS = 1000
+const RECONNECT_MAX_MS = 30000
+
+function dispatch(feed: Feed, event: ChangeEvent) {
+  feed.listeners.forEach((listener) => listener(event))
+}
+
+function parseBlock(block: string): ChangeEvent | null {
+  let id: string | undefined
+  let type = 'message'
+  let data = ''
+  for (const line of block.split('\n')) {
+    if (line.startsWith(':')) continue // heartbeat
+    const colon = line.indexOf(':')
+    const field = colon === -1 ? line : line.slice(0, colon)
+    const value = colon === -1 ? '' : line.slice(colon + 1).replace(/^ /, '')
+    if (field === 'id') id = value
+    else if (field === 'event') type = value
+    else if (field === 'data') data += value
+  }
+  if (!data) return null
+  const parsed = JSON.parse(data)
+  return { ...parsed, id, type: type as ChangeEvent['type'] }
+}
+
+async function run(orgId: string, feed: Feed) {
+  let delay = RECONNECT_MIN_MS
+  while (!feed.controller.signal.aborted) {
+    try {
+      const response = await streamApi.open(orgId, feed.lastEventId, feed.controller.signal)
+      if (!response.ok || !response.body) throw new Error(`stream failed: ${response.status}`)
+      delay = RECONNECT_MIN_MS
+
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        let end
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+          const event = parseBlock(buffer.slice(0, end))
+          buffer = buffer.slice(end + 2)
+          if (!event) continue
+          if (event.id) feed.lastEventId = event.id
+          dispatch(feed, event)
+        }
+      }
+    } catch (err) {
+      if (feed.controller.signal.aborted) return
+      console.warn('Change feed disconnected:', err)
+    }
+    await new Promise((resolve) => setTimeout(resolve, delay))
+    delay = Math.min(delay * 2, RECONNECT_MAX_MS)
+  }
+}
+
+function subscribe(orgId: string, listener: Listener) {
+  let feed = feeds.get(orgId)
+  if (!feed) {
+    feed = { listeners: new Set(), controller: new AbortController() }
+    feeds.set(orgId, feed)
+    run(orgId, feed)
+  }
+  feed.listeners.add(listener)
+
+  return () => {
+    const current = feeds.get(orgId)
+    if (!current) return
+    current.listeners.delete(listener)
+    if (current.listeners.size === 0) {
+      current.controller.abort()
+      feeds.delete(orgId)
+    }
+  }
+}
+
+/**
+ * Listen to the real-time change feed of an organization ('' = every
+ * organization the feed exposes). `onEvent` receives each change plus a
+ * `reset` event when the client missed changes and should refetch.
+ */
+export function useChangeFeed(organizationId: string | undefined, onEvent: Listener) {
+  const handler = useRef(onEvent)
+  handler.current = onEvent
+
+  useEffect(() => {
+    if (organizationId === undefined) return
+    return subscribe(organizationId, (event) => handler.current(event))
+  }, [organizationId])
+}
+
+/**
+ * Debounced refetch on matching change events, so a burst of related events
+ * (a step change and its activity entry) triggers a single reload.
+ */
+export function useRefetchOnChange(
+  organizationId: string | undefined,
+  matches: (event: ChangeEvent) => boolean,
+  refetch: () => void,
+  delayMs: number = 250
+) {
+  const timer = useRef<ReturnType<typeof setTimeout> | null>(null)
+
+  useChangeFeed(organizationId, (event) => {
+    if (event.type !== 'reset' && !matches(event)) return
+    if (timer.current) clearTimeout(timer.current)
+    timer.current = setTimeout(refetch, delayMs)
+  })
+
+  useEffect(() => () => {
+    if (timer.current) clearTimeout(timer.current)
+  }, [])
+}
@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react'
 import { commentApi } from '../api'
 import { Comment } from '../types'
+import { useRefetchOnChange } from './useChangeFeed'
 
 export function useComments(workflowId: string, stepId?: string) {
   const [comments, setComments] = useState<Comment[]>([])
@@ -28,6 +29,15 @@ export function useComments(workflowId: string, stepId?: string) {
     }
   }, [workflowId, stepId])
 
+  useRefetchOnChange(
+    workflowId ? '' : undefined,
+    (event) =>
+      event.type === 'comment' &&
+      event.workflow_id === workflowId &&
+      (!stepId || !event.data || event.data.step_id === stepId),
+    loadComments
+  )
+
   return { comments, loading, error, refetch: loadComments }
 }
 
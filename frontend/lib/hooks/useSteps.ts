@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react'
 import { stepApi } from '../api'
 import { WorkflowStep } from '../types'
+import { useRefetchOnChange } from './useChangeFeed'
 
 export function useSteps(workflowId: string) {
   const [steps, setSteps] = useState<WorkflowStep[]>([])
@@ -26,5 +27,11 @@ export function useSteps(workflowId: string) {
     }
   }, [workflowId])
 
+  useRefetchOnChange(
+    workflowId ? '' : undefined,
+    (event) => event.type === 'step' && event.workflow_id === workflowId,
+    loadSteps
+  )
+
   return { steps, loading, error, refetch: loadSteps }
 }
@@ -2,6 +2,7 @@ import { useEffect } from 'react'
 import { workflowApi } from '../api'
 import { useWorkflowStore } from '../store/workflowStore'
 import { Workflow } from '../types'
+import { useRefetchOnChange } from './useChangeFeed'
 
 export function useWorkflows(organizationId: string) {
   const { workflows, loading, setWorkflows, setLoading, setError } = useWorkflowStore()
@@ -35,5 +36,12 @@ export function useWorkflows(organizationId: string) {
     }
   }, [organizationId])
 
+  // Workflow changes and step additions/removals (step_count) affect the list
+  useRefetchOnChange(
+    organizationId || undefined,
+    (event) => event.type === 'workflow' || (event.type === 'step' && (event.action === 'created' || event.action === 'deleted')),
+    loadWorkflows
+  )
+
   return { workflows, loading, refetch: loadWorkflows }
 }
@@ -35,6 +35,7 @@ export interface WorkflowStep {
   description?: string
   step_order: number
   order?: number
+  sort_key?: string
   status: 'pending' | 'in_progress' | 'completed' | 'blocked'
   assigned_to?: string
   context_url?: string
@@ -68,6 +69,43 @@ export interface ActivityLog {
   created_at: string
 }
 
+export interface SearchResult {
+  entity_type: 'workflow' | 'step' | 'comment'
+  entity_id: string
+  workflow_id: string
+  title?: string | null
+  snippet: string
+  rank: number
+}
+
+export interface ChangeEvent {
+  id?: string
+  type: 'workflow' | 'step' | 'comment' | 'activity' | 'reset'
+  action?: string
+  entity_id?: string | null
+  organization_id?: string | null
+  workflow_id?: string | null
+  data?: Record<string, any> | null
+  ts?: number
+}
+
+export interface Tombstone {
+  entity_type: 'workflow' | 'step' | 'comment'
+  entity_id: string
+  workflow_id?: string | null
+  deleted_at: string
+}
+
+export interface SyncPage {
+  full: boolean
+  watermark: string
+  has_more: boolean
+  workflows: Workflow[]
+  steps: WorkflowStep[]
+  comments: Comment[]
+  deleted: Tombstone[]
+}
+
 export interface AuthUser {
   id: string
   email: string